@@ -0,0 +1,31 @@
+from django.contrib import admin
+
+from .models import ApiToken, SyncChange, SyncSnapshot
+
+
+@admin.register(SyncChange)
+class SyncChangeAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'object_id', 'warehouse_id', 'changed_at']
+    list_filter = ['kind', 'changed_at']
+    search_fields = ['object_id']
+    readonly_fields = ['changed_at']
+
+
+@admin.register(SyncSnapshot)
+class SyncSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['warehouse', 'built_at', 'product_count', 'location_count', 'inventory_count', 'size']
+    list_filter = ['warehouse']
+    readonly_fields = ['built_at']
+
+
+@admin.register(ApiToken)
+class ApiTokenAdmin(admin.ModelAdmin):
+    list_display = ['name', 'user', 'prefix', 'is_active', 'created_at', 'last_used_at']
+    list_filter = ['is_active']
+    search_fields = ['name', 'user__username', 'prefix']
+    readonly_fields = ['prefix', 'created_at', 'last_used_at']
+    raw_id_fields = ['user']
+
+    def has_add_permission(self, request):
+        # keys are only shown once, by the create_api_token command
+        return False
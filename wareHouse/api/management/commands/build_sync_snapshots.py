@@ -0,0 +1,32 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from api.sync import build_snapshot, purge_changes
+from warehouses.models import Warehouse
+
+
+class Command(BaseCommand):
+    help = 'Build the handheld sync bootstrap snapshot of each warehouse and purge the old sync change log'
+
+    def add_arguments(self, parser):
+        parser.add_argument('warehouses', nargs='*', help='warehouse codes, e.g. WH-001 (default: every active warehouse)')
+
+    def handle(self, *args, **options):
+        if options['warehouses']:
+            warehouses = list(Warehouse.objects.filter(code__in=options['warehouses']))
+            missing = set(options['warehouses']) - {warehouse.code for warehouse in warehouses}
+            if missing:
+                raise CommandError(f"Unknown warehouse: {', '.join(sorted(missing))}")
+        else:
+            warehouses = list(Warehouse.objects.filter(is_active=True))
+
+        for warehouse in warehouses:
+            started = perf_counter()
+            snapshot = build_snapshot(warehouse)
+            self.stdout.write(
+                f'{warehouse.code}: {snapshot.product_count} products, {snapshot.location_count} locations, '
+                f'{snapshot.inventory_count} stock rows, {snapshot.size / 1024:.0f} KB ({perf_counter() - started:.1f}s)'
+            )
+
+        purged = purge_changes()
+        self.stdout.write(self.style.SUCCESS(f'✓ {len(warehouses)} sync snapshots built, {purged} change log entries purged'))
@@ -0,0 +1,26 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from api.models import ApiToken
+
+
+class Command(BaseCommand):
+    help = 'Create an API token for a user and print its key (shown only once)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='user the token acts as')
+        parser.add_argument('--name', required=True, help='what the token is for, e.g. "dock scanner 3"')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['username']} not found")
+        if not user.is_active:
+            raise CommandError(f'User {user.username} is not active')
+
+        token, key = ApiToken.issue(user, options['name'])
+        self.stdout.write(key)
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Token {token.prefix}... created for {user.username}, send it as "Authorization: Token <key>"'
+        ))
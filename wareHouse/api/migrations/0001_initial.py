@@ -0,0 +1,51 @@
+# Generated by Django 6.0.1 on 2026-10-19 00:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('warehouses', '0006_location_sync_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('product', 'Product'), ('location', 'Storage Location'), ('inventory', 'Inventory')], max_length=20)),
+                ('object_id', models.BigIntegerField(help_text='id of the deleted row')),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('warehouse', models.ForeignKey(blank=True, db_constraint=False, help_text='warehouse of a deleted location or inventory row, empty for products', null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='warehouses.warehouse')),
+            ],
+            options={
+                'verbose_name': 'Sync Tombstone',
+                'verbose_name_plural': 'Sync Tombstones',
+                'ordering': ['id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SyncSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(help_text='file path relative to SYNC_SNAPSHOT_DIR', max_length=500)),
+                ('cursor', models.CharField(help_text='sync cursor of the moment the snapshot was read', max_length=500)),
+                ('product_count', models.PositiveIntegerField(default=0)),
+                ('location_count', models.PositiveIntegerField(default=0)),
+                ('inventory_count', models.PositiveIntegerField(default=0)),
+                ('size', models.PositiveBigIntegerField(default=0, help_text='compressed size in bytes')),
+                ('built_at', models.DateTimeField(auto_now_add=True)),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sync_snapshots', to='warehouses.warehouse')),
+            ],
+            options={
+                'verbose_name': 'Sync Snapshot',
+                'verbose_name_plural': 'Sync Snapshots',
+                'ordering': ['-built_at'],
+                'indexes': [models.Index(fields=['warehouse', 'built_at'], name='api_syncsna_warehou_061553_idx')],
+            },
+        ),
+    ]
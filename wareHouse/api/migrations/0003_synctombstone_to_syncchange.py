@@ -0,0 +1,37 @@
+# Generated by Django 6.0.1 on 2026-10-19 01:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_apitoken'),
+        ('warehouses', '0006_location_sync_index'),
+    ]
+
+    operations = [
+        migrations.RenameModel(
+            old_name='SyncTombstone',
+            new_name='SyncChange',
+        ),
+        migrations.RenameField(
+            model_name='syncchange',
+            old_name='deleted_at',
+            new_name='changed_at',
+        ),
+        migrations.AlterModelOptions(
+            name='syncchange',
+            options={'ordering': ['id'], 'verbose_name': 'Sync Change', 'verbose_name_plural': 'Sync Changes'},
+        ),
+        migrations.AlterField(
+            model_name='syncchange',
+            name='object_id',
+            field=models.BigIntegerField(help_text='id of the changed row'),
+        ),
+        migrations.AlterField(
+            model_name='syncchange',
+            name='warehouse',
+            field=models.ForeignKey(blank=True, db_constraint=False, help_text='warehouse of a location or inventory row, empty for products', null=True, on_delete=models.deletion.DO_NOTHING, related_name='+', to='warehouses.warehouse'),
+        ),
+    ]
@@ -0,0 +1,139 @@
+import hashlib
+import secrets
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+# last_used_at is written at most this often per token
+TOKEN_TOUCH_INTERVAL = timedelta(minutes=1)
+
+
+class SyncChange(models.Model):
+    """
+    Append-only log of saved and deleted products, storage locations and
+    inventory rows, read in id order by the handheld sync feed (stock postings
+    are read from the InventoryEvent outbox instead). A row that no longer
+    exists when the feed reads its change is sent as deleted.
+    """
+
+    KIND_CHOICES = [
+        ('product', 'Product'),
+        ('location', 'Storage Location'),
+        ('inventory', 'Inventory'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField(help_text='id of the changed row')
+
+    # no database constraint: the warehouse can be deleted with the rows
+    warehouse = models.ForeignKey(
+        'warehouses.Warehouse',
+        on_delete=models.DO_NOTHING,
+        related_name='+',
+        null=True,
+        blank=True,
+        db_constraint=False,
+        help_text='warehouse of a location or inventory row, empty for products'
+    )
+
+    changed_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['id']
+        verbose_name = 'Sync Change'
+        verbose_name_plural = 'Sync Changes'
+
+    def __str__(self):
+        return f"#{self.pk} {self.kind} {self.object_id}"
+
+
+class SyncSnapshot(models.Model):
+    """
+    gzip JSON file with the catalog, locations and stock of one warehouse, built by
+    build_sync_snapshots and handed to devices starting a sync, with the cursor
+    their delta sync continues from.
+    """
+
+    warehouse = models.ForeignKey(
+        'warehouses.Warehouse',
+        on_delete=models.CASCADE,
+        related_name='sync_snapshots'
+    )
+    path = models.CharField(max_length=500, help_text='file path relative to SYNC_SNAPSHOT_DIR')
+    cursor = models.CharField(max_length=500, help_text='sync cursor of the moment the snapshot was read')
+
+    product_count = models.PositiveIntegerField(default=0)
+    location_count = models.PositiveIntegerField(default=0)
+    inventory_count = models.PositiveIntegerField(default=0)
+    size = models.PositiveBigIntegerField(default=0, help_text='compressed size in bytes')
+
+    built_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-built_at']
+        verbose_name = 'Sync Snapshot'
+        verbose_name_plural = 'Sync Snapshots'
+
+        indexes = [
+            models.Index(fields=['warehouse', 'built_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.warehouse_id} {self.built_at:%Y-%m-%d %H:%M} ({self.size} bytes)"
+
+
+class ApiToken(models.Model):
+    """
+    Key a script or handheld sends as "Authorization: Token <key>" instead of
+    logging in, so its POSTs need no session or CSRF token. Only the SHA-256 of
+    the key is stored, create_api_token prints the key once.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='api_tokens'
+    )
+    name = models.CharField(max_length=100, help_text='what the token is for, e.g. dock scanner 3')
+    key_hash = models.CharField(max_length=64, unique=True, editable=False)
+    prefix = models.CharField(max_length=8, editable=False, help_text='first characters of the key, to recognise it')
+    is_active = models.BooleanField(default=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['user', 'name']
+        verbose_name = 'API Token'
+        verbose_name_plural = 'API Tokens'
+
+    def __str__(self):
+        return f"{self.user} - {self.name} ({self.prefix}...)"
+
+    @staticmethod
+    def hash_key(key):
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    @classmethod
+    def issue(cls, user, name):
+        "create a token, returns (token, key), the key cannot be read back later"
+        key = secrets.token_urlsafe(32)
+        token = cls.objects.create(user=user, name=name, key_hash=cls.hash_key(key), prefix=key[:8])
+        return token, key
+
+    @classmethod
+    def authenticate(cls, header):
+        "active user of an Authorization header value (Token <key> or Bearer <key>), None when it is not valid"
+        scheme, _, key = header.strip().partition(' ')
+        if scheme.lower() not in ('token', 'bearer') or not key.strip():
+            return None
+        token = cls.objects.select_related('user').filter(key_hash=cls.hash_key(key.strip()), is_active=True).first()
+        if token is None or not token.user.is_active:
+            return None
+
+        now = timezone.now()
+        if token.last_used_at is None or token.last_used_at < now - TOKEN_TOUCH_INTERVAL:
+            cls.objects.filter(pk=token.pk).update(last_used_at=now)
+        return token.user
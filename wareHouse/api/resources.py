@@ -0,0 +1,330 @@
+"""
+Resources of the read-only JSON API.
+
+A Resource lists the public fields a client can ask for with ?fields= (mapped to
+ORM lookups, so a page is one .values() query over just those columns), applies
+the filters of the matching list view, and computes a version: a tuple that
+changes whenever a row of the filtered set may have changed. The views hash the
+version into the ETag without loading any rows.
+
+Versions are the row count and the latest updated_at of the filtered rows, plus
+the inventory version (last InventoryEvent id, see inventory.events) for the
+resources showing stock or occupancy, since the occupancy counters and some bulk
+postings do not touch updated_at. Movements are never edited, only appended or
+archived, so the count and last id of the whole table version every filtered
+set of movements, without the scan a date or search filter would need. Fields
+read from another table (a product's sku on an inventory row) add the latest
+updated_at of that table when they are selected.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime, time, timedelta
+
+from django.db.models import Count, F, Max, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from inventory.events import inventory_version
+from inventory.models import Inventory, StockMovement
+from products.models import Product, ProductCategory
+from search.index import filter_by_search
+from warehouses.models import StorageLocation, Warehouse
+
+
+@dataclass
+class Resource:
+    # public name -> ORM lookup, in output order
+    fields: dict
+    # (params) -> filtered queryset, ValueError for a bad parameter
+    filter: object
+    # (queryset, params) -> tuple
+    version: object
+    # public fields read from another model -> that model, whose last change versions them
+    related: dict = field(default_factory=dict)
+
+
+def int_param(params, name):
+    "integer value of a query parameter, None when absent"
+    value = params.get(name, '')
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f'{name} must be a whole number')
+
+
+def date_param(params, name):
+    "date value of a query parameter (YYYY-MM-DD), None when absent"
+    value = params.get(name, '')
+    if not value:
+        return None
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is None:
+        raise ValueError(f'{name} must be a date (YYYY-MM-DD)')
+    return day
+
+
+def choice_param(params, name, choices):
+    "value of a query parameter restricted to choices, '' when absent"
+    value = params.get(name, '')
+    if value and value not in choices:
+        raise ValueError(f"{name} must be one of: {', '.join(choices)}")
+    return value
+
+
+def start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def table_version(queryset):
+    "row count and latest updated_at of a queryset"
+    totals = queryset.order_by().aggregate(rows=Count('pk'), changed=Max('updated_at'))
+    return (totals['rows'], totals['changed'])
+
+
+def related_version(models):
+    "latest updated_at of each model"
+    return tuple(model.objects.aggregate(changed=Max('updated_at'))['changed'] for model in models)
+
+
+# products
+
+def filter_products(params):
+    products = Product.objects.all()
+    search_query = params.get('search', '')
+    if search_query:
+        products = filter_by_search(products, search_query)
+    category_id = int_param(params, 'category')
+    if category_id is not None:
+        products = products.filter(category_id=category_id)
+    status = choice_param(params, 'status', ['active', 'inactive'])
+    if status:
+        products = products.filter(is_active=status == 'active')
+    return products
+
+
+def product_version(products, params):
+    return table_version(products)
+
+
+# inventory
+
+def filter_inventory(params):
+    records = Inventory.objects.filter(quantity__gt=0)
+    search_query = params.get('search', '')
+    if search_query:
+        records = filter_by_search(records, search_query)
+    warehouse_id = int_param(params, 'warehouse')
+    if warehouse_id is not None:
+        records = records.filter(warehouse_id=warehouse_id)
+
+    # the stock status properties of Inventory, as queries
+    stock_status = choice_param(params, 'status', ['low', 'expiring', 'expired'])
+    today = timezone.now().date()
+    if stock_status == 'low':
+        records = records.filter(quantity__lte=F('product__reorder_level'))
+    elif stock_status == 'expiring':
+        records = records.filter(expiry_date__date__range=(today, today + timedelta(days=3)))
+    elif stock_status == 'expired':
+        records = records.filter(expiry_date__date__lt=today)
+    return records
+
+
+def inventory_records_version(records, params):
+    version = table_version(records) + (inventory_version(int_param(params, 'warehouse')),)
+    if params.get('status') in ('expiring', 'expired'):
+        # the same rows fall into another window tomorrow
+        version += (timezone.now().date(),)
+    return version
+
+
+# movements
+
+def filter_movements(params):
+    movements = StockMovement.objects.all()
+    search_query = params.get('search', '')
+    if search_query:
+        movements = filter_by_search(movements, search_query)
+    movement_type = choice_param(params, 'type', [choice for choice, label in StockMovement.MOVEMENT_TYPE_CHOICES])
+    if movement_type:
+        movements = movements.filter(movement_type=movement_type)
+    warehouse_id = int_param(params, 'warehouse')
+    if warehouse_id is not None:
+        movements = movements.filter(Q(from_warehouse_id=warehouse_id) | Q(to_warehouse_id=warehouse_id))
+
+    # whole days, date_to included
+    date_from = date_param(params, 'date_from')
+    date_to = date_param(params, 'date_to')
+    if date_from:
+        movements = movements.filter(movement_date__gte=start_of_day(date_from))
+    if date_to:
+        movements = movements.filter(movement_date__lt=start_of_day(date_to + timedelta(days=1)))
+    return movements
+
+
+def movement_version(movements, params):
+    totals = StockMovement.objects.order_by().aggregate(rows=Count('pk'), last=Max('pk'))
+    return (totals['rows'], totals['last'])
+
+
+# warehouses
+
+def filter_warehouses(params):
+    warehouses = Warehouse.objects.all()
+    search_query = params.get('search', '')
+    if search_query:
+        warehouses = warehouses.filter(
+            Q(name__icontains=search_query) |
+            Q(code__icontains=search_query) |
+            Q(city__icontains=search_query)
+        )
+    status = choice_param(params, 'status', [choice for choice, label in Warehouse.STATUS_CHOICES])
+    if status:
+        warehouses = warehouses.filter(status=status)
+    active = choice_param(params, 'active', ['true', 'false'])
+    if active:
+        warehouses = warehouses.filter(is_active=active == 'true')
+    return warehouses
+
+
+def warehouse_version(warehouses, params):
+    return table_version(warehouses) + (inventory_version(),)
+
+
+# locations
+
+def filter_locations(params):
+    locations = StorageLocation.objects.all()
+    warehouse_id = int_param(params, 'warehouse')
+    if warehouse_id is not None:
+        locations = locations.filter(warehouse_id=warehouse_id)
+    available = choice_param(params, 'available', ['true', 'false'])
+    if available == 'true':
+        locations = locations.filter(is_occupied=False, is_active=True)
+    elif available == 'false':
+        locations = locations.filter(is_occupied=True)
+    return locations
+
+
+def location_version(locations, params):
+    return table_version(locations) + (inventory_version(int_param(params, 'warehouse')),)
+
+
+RESOURCES = {
+    'products': Resource(
+        fields={
+            'id': 'id',
+            'sku': 'sku',
+            'name': 'name',
+            'barcode': 'barcode',
+            'category': 'category',
+            'category_name': 'category__name',
+            'description': 'description',
+            'purchase_price': 'purchase_price',
+            'selling_price': 'selling_price',
+            'unit': 'unit',
+            'reorder_level': 'reorder_level',
+            'shelf_life_days': 'shelf_life_days',
+            'storage_type': 'storage_type',
+            'status': 'status',
+            'is_active': 'is_active',
+            'created_at': 'created_at',
+            'updated_at': 'updated_at',
+        },
+        filter=filter_products,
+        version=product_version,
+        related={'category_name': ProductCategory},
+    ),
+    'inventory': Resource(
+        fields={
+            'id': 'id',
+            'product': 'product',
+            'sku': 'product__sku',
+            'product_name': 'product__name',
+            'warehouse': 'warehouse',
+            'warehouse_code': 'warehouse__code',
+            'storage_location': 'storage_location',
+            'location_code': 'storage_location__code',
+            'quantity': 'quantity',
+            'reserved_quantity': 'reserved_quantity',
+            'batch_number': 'batch_number',
+            'manufacturing_date': 'manufacturing_date',
+            'expiry_date': 'expiry_date',
+            'updated_at': 'updated_at',
+        },
+        filter=filter_inventory,
+        version=inventory_records_version,
+        related={'sku': Product, 'product_name': Product, 'warehouse_code': Warehouse, 'location_code': StorageLocation},
+    ),
+    'movements': Resource(
+        fields={
+            'id': 'id',
+            'movement_type': 'movement_type',
+            'transaction_type': 'transaction_type',
+            'reference_number': 'reference_number',
+            'product': 'product',
+            'sku': 'product__sku',
+            'from_warehouse': 'from_warehouse',
+            'from_location': 'from_location',
+            'to_warehouse': 'to_warehouse',
+            'to_location': 'to_location',
+            'quantity': 'quantity',
+            'unit_price': 'unit_price',
+            'total_amount': 'total_amount',
+            'batch_number': 'batch_number',
+            'expiry_date': 'expiry_date',
+            'party_name': 'party_name',
+            'reason': 'reason',
+            'notes': 'notes',
+            'movement_date': 'movement_date',
+            'recorded_by': 'recorded_by',
+        },
+        filter=filter_movements,
+        version=movement_version,
+        related={'sku': Product},
+    ),
+    'warehouses': Resource(
+        fields={
+            'id': 'id',
+            'code': 'code',
+            'name': 'name',
+            'address': 'address',
+            'city': 'city',
+            'state': 'state',
+            'postal_code': 'postal_code',
+            'country': 'country',
+            'phone': 'phone',
+            'email': 'email',
+            'manager': 'manager',
+            'total_capacity': 'total_capacity',
+            'occupied_quantity': 'occupied_quantity',
+            'status': 'status',
+            'is_active': 'is_active',
+            'updated_at': 'updated_at',
+        },
+        filter=filter_warehouses,
+        version=warehouse_version,
+    ),
+    'locations': Resource(
+        fields={
+            'id': 'id',
+            'warehouse': 'warehouse',
+            'zone': 'zone',
+            'code': 'code',
+            'aisle': 'aisle',
+            'rack': 'rack',
+            'shelf': 'shelf',
+            'bin': 'bin',
+            'capacity': 'capacity',
+            'occupied_quantity': 'occupied_quantity',
+            'is_occupied': 'is_occupied',
+            'is_active': 'is_active',
+            'updated_at': 'updated_at',
+        },
+        filter=filter_locations,
+        version=location_version,
+    ),
+}
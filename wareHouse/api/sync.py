@@ -0,0 +1,347 @@
+"""
+Delta sync feed for handheld devices.
+
+A device keeps a local copy of the product catalog and of the storage locations
+and stock of its warehouse. It starts from a bootstrap snapshot, a gzip JSON file
+built ahead by build_snapshot() (see build_sync_snapshots) and shared by every
+device of the warehouse, then calls changes() with the cursor it got. Both have
+the same shape:
+
+    {"warehouse": 1, "cursor": "...", "more": false,
+     "changes": {"products": {"fields": [...], "rows": [[...], ...]}, "locations": ..., "inventory": ...},
+     "deleted": {"products": [ids], "locations": [ids], "inventory": [ids]}}
+
+Changes are read from two id ordered logs written in the transaction of the
+change: the InventoryEvent outbox for stock postings and SyncChange for saved
+and deleted rows (post_save/post_delete, record_changes() after bulk writes).
+Each changed row is sent as it is when read, and as deleted when it is gone.
+The cursor is opaque to devices: per log the last id read and the gaps below it,
+ids not committed yet when read, tracked the way inventory.events consumers do
+and given up after SYNC_GAP_SECONDS. Snapshots leave out what devices do not
+keep (inactive products and locations, empty stock); deltas send those rows,
+meaning "drop it".
+"""
+import base64
+import gzip
+import json
+import os
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from inventory.events import advance_offset, pending_ids
+from inventory.models import Inventory, InventoryEvent
+from products.models import Product
+from warehouses.models import StorageLocation, Warehouse
+
+from .models import SyncChange, SyncSnapshot
+
+CHUNK_SIZE = 2000
+
+
+class SyncExpired(Exception):
+    "the cursor is older than the kept change log, the device has to bootstrap again"
+
+
+@dataclass
+class SyncTable:
+    model: type
+    kind: str
+    fields: list
+    # rows a snapshot holds, deltas send every changed row
+    kept: dict
+
+
+TABLES = {
+    'products': SyncTable(
+        Product, 'product',
+        ['id', 'sku', 'barcode', 'name', 'unit', 'storage_type', 'shelf_life_days', 'is_active'],
+        {'is_active': True},
+    ),
+    'locations': SyncTable(
+        StorageLocation, 'location',
+        ['id', 'code', 'zone_id', 'aisle', 'rack', 'shelf', 'bin', 'capacity', 'is_active'],
+        {'is_active': True},
+    ),
+    'inventory': SyncTable(
+        Inventory, 'inventory',
+        ['id', 'product_id', 'storage_location_id', 'batch_number', 'quantity', 'reserved_quantity', 'expiry_date'],
+        {'quantity__gt': 0},
+    ),
+}
+
+
+@dataclass
+class ChangeLog:
+    model: type
+    # cursor key
+    key: str
+    # insert time, for the position a snapshot continues from
+    moment: str
+    columns: list
+
+
+LOGS = [
+    ChangeLog(InventoryEvent, 'e', 'created_at', ['warehouse_id', 'inventory_id']),
+    ChangeLog(SyncChange, 'c', 'changed_at', ['warehouse_id', 'kind', 'object_id']),
+]
+
+
+def changed_rows(log, rows, warehouse):
+    "(table name, id) of the log rows that concern a device of the warehouse"
+    if log.model is InventoryEvent:
+        return [('inventory', inventory_id) for pk, warehouse_id, inventory_id in rows if warehouse_id == warehouse.pk and inventory_id]
+    names = {table.kind: name for name, table in TABLES.items()}
+    return [(names[kind], object_id) for pk, warehouse_id, kind, object_id in rows if warehouse_id in (None, warehouse.pk)]
+
+
+def table_rows(table, warehouse):
+    "rows of a table a device of the warehouse syncs"
+    if table.model is Product:
+        return Product.objects.all()
+    return table.model.objects.filter(warehouse=warehouse)
+
+
+def encode(data):
+    return json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':'))
+
+
+def encode_cursor(warehouse, positions, at):
+    data = {'w': warehouse.pk, 'at': at.isoformat(), **positions}
+    return base64.urlsafe_b64encode(encode(data).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, warehouse):
+    "({log key: [last id, gaps]}, moment) of a cursor, ValueError when it was not handed out for this warehouse"
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        at = parse_datetime(data['at'])
+        positions = {}
+        for log in LOGS:
+            last, gaps = data[log.key]
+            positions[log.key] = [int(last), [[int(first), int(end), seen] for first, end, seen in gaps]]
+        valid = (
+            data['w'] == warehouse.pk and at is not None
+            and all(parse_datetime(gap[2]) for last, gaps in positions.values() for gap in gaps)
+        )
+    except (ValueError, TypeError, KeyError, IndexError, AttributeError):
+        valid = False
+    if not valid:
+        raise ValueError('Invalid sync cursor')
+    return positions, at
+
+
+def changes(warehouse, cursor, limit=None):
+    """
+    Changes for a device of warehouse since cursor, read from at most limit
+    entries of each change log (settings.SYNC_PAGE_SIZE); "more" tells the device
+    to call again with the new cursor. Raises ValueError for a bad cursor and
+    SyncExpired when the change log since the cursor is no longer kept.
+    """
+    limit = limit or settings.SYNC_PAGE_SIZE
+    positions, at = decode_cursor(cursor, warehouse)
+    now = timezone.now()
+    if at < now - timedelta(days=settings.SYNC_CHANGE_DAYS):
+        raise SyncExpired('The sync cursor is older than the kept change log')
+
+    given_up = now - timedelta(seconds=settings.SYNC_GAP_SECONDS)
+    more = False
+    changed = {name: set() for name in TABLES}
+    new_positions = {}
+    for log in LOGS:
+        last, gaps = positions[log.key]
+        gaps = [gap for gap in gaps if parse_datetime(gap[2]) >= given_up]
+        rows = list(
+            log.model.objects.filter(pending_ids(last, gaps)).order_by('pk')
+            .values_list('pk', *log.columns)[:limit + 1]
+        )
+        full = len(rows) > limit
+        if full:
+            more = True
+            rows = rows[:limit]
+        new_positions[log.key] = list(advance_offset(last, gaps, [row[0] for row in rows], full, now))
+        for name, pk in changed_rows(log, rows, warehouse):
+            changed[name].add(pk)
+
+    result = {'warehouse': warehouse.pk, 'changes': {}, 'deleted': {}}
+    for name, table in TABLES.items():
+        ids = sorted(changed[name])
+        rows = []
+        for start in range(0, len(ids), CHUNK_SIZE):
+            rows += table_rows(table, warehouse).filter(pk__in=ids[start:start + CHUNK_SIZE]).order_by('pk').values_list(*table.fields)
+        found = {row[0] for row in rows}
+        result['changes'][name] = {'fields': table.fields, 'rows': rows}
+        result['deleted'][name] = [pk for pk in ids if pk not in found]
+
+    result['cursor'] = encode_cursor(warehouse, new_positions, now)
+    result['more'] = more
+    return result
+
+
+# =====================
+# BOOTSTRAP SNAPSHOTS
+# =====================
+
+def snapshot_file(snapshot):
+    return settings.SYNC_SNAPSHOT_DIR / snapshot.path
+
+
+def write_rows(out, rows, written):
+    "append rows to the JSON array being written, returns how many"
+    if rows:
+        out.write((',' if written else '') + encode(rows)[1:-1])
+    return len(rows)
+
+
+def settled_position(log, now):
+    """
+    id a snapshot read at now continues the log from: the last entry inserted
+    SYNC_GAP_SECONDS before, whose transaction has committed or is given up.
+    The entries after it are sent again by the first delta, as they are then.
+    """
+    settled = now - timedelta(seconds=settings.SYNC_GAP_SECONDS)
+    entries = log.model.objects.filter(**{f'{log.moment}__lte': settled}).order_by(f'-{log.moment}')
+    return entries.values_list('pk', flat=True).first() or 0
+
+
+def build_snapshot(warehouse):
+    """
+    Write the snapshot file of a warehouse, streamed from the database in chunks,
+    and return the new SyncSnapshot. The snapshots it replaces are removed by
+    prune_snapshots() once devices are done downloading them.
+    """
+    now = timezone.now()
+    positions = {log.key: [settled_position(log, now), []] for log in LOGS}
+    cursor = encode_cursor(warehouse, positions, now)
+
+    relative = f"warehouse-{warehouse.pk}/snapshot-{now:%Y%m%d-%H%M%S-%f}.json.gz"
+    path = settings.SYNC_SNAPSHOT_DIR / relative
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    counts = {}
+    tmp_path = path.with_name(path.name + '.tmp')
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as out:
+        out.write(f'{{"warehouse":{warehouse.pk},"cursor":{encode(cursor)},"more":false,"changes":{{')
+        for position, (name, table) in enumerate(TABLES.items()):
+            out.write(f'{"," if position else ""}{encode(name)}:{{"fields":{encode(table.fields)},"rows":[')
+            counts[name] = 0
+            rows = table_rows(table, warehouse).filter(**table.kept).order_by('pk').values_list(*table.fields)
+            chunk = []
+            for row in rows.iterator(chunk_size=CHUNK_SIZE):
+                chunk.append(row)
+                if len(chunk) == CHUNK_SIZE:
+                    counts[name] += write_rows(out, chunk, counts[name])
+                    chunk = []
+            counts[name] += write_rows(out, chunk, counts[name])
+            out.write(']}')
+        out.write('},"deleted":' + encode({name: [] for name in TABLES}) + '}')
+    os.replace(tmp_path, path)
+
+    snapshot = SyncSnapshot.objects.create(
+        warehouse=warehouse,
+        path=relative,
+        cursor=cursor,
+        product_count=counts['products'],
+        location_count=counts['locations'],
+        inventory_count=counts['inventory'],
+        size=path.stat().st_size,
+    )
+    prune_snapshots(warehouse)
+    return snapshot
+
+
+def prune_snapshots(warehouse):
+    """
+    Delete the snapshots of the warehouse replaced by a newer one more than
+    SYNC_SNAPSHOT_GRACE_SECONDS ago, with their files: a device handed the old
+    one just before has that long to download it. Returns how many.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.SYNC_SNAPSHOT_GRACE_SECONDS)
+    snapshots = list(warehouse.sync_snapshots.order_by('-built_at', '-pk'))
+    pruned = 0
+    for newer, old in zip(snapshots, snapshots[1:]):
+        if newer.built_at < cutoff:
+            snapshot_file(old).unlink(missing_ok=True)
+            old.delete()
+            pruned += 1
+    return pruned
+
+
+def latest_snapshot(warehouse):
+    "newest snapshot of the warehouse whose file is there, None when there is none"
+    snapshot = warehouse.sync_snapshots.order_by('-built_at', '-pk').first()
+    if snapshot is not None and snapshot_file(snapshot).exists():
+        return snapshot
+    return None
+
+
+def is_fresh(snapshot):
+    return snapshot.built_at > timezone.now() - timedelta(seconds=settings.SYNC_SNAPSHOT_MAX_AGE)
+
+
+def current_snapshot(warehouse):
+    """
+    Latest snapshot of the warehouse, built first when there is none or it is
+    older than SYNC_SNAPSHOT_MAX_AGE seconds. The build holds the warehouse row
+    lock: with a snapshot to serve the other requests skip the rebuild and get
+    the previous one, without one they wait for the build and get its snapshot.
+    """
+    snapshot = latest_snapshot(warehouse)
+    if snapshot is not None and is_fresh(snapshot):
+        return snapshot
+
+    if not connection.features.has_select_for_update:
+        # no row locks (SQLite): a stale snapshot is served until build_sync_snapshots
+        # replaces it, concurrent first requests may each build one
+        return snapshot or build_snapshot(warehouse)
+
+    with transaction.atomic():
+        # no key update: stock postings referencing the warehouse are not blocked
+        locked = Warehouse.objects.select_for_update(no_key=True, skip_locked=snapshot is not None).filter(pk=warehouse.pk)
+        if locked.first() is None:
+            # another request is rebuilding it
+            return snapshot
+        # built by the request this one waited for
+        latest = latest_snapshot(warehouse)
+        if latest is not None and is_fresh(latest):
+            return latest
+        return build_snapshot(warehouse)
+
+
+def purge_changes():
+    "delete change log entries older than SYNC_CHANGE_DAYS, returns how many"
+    cutoff = timezone.now() - timedelta(days=settings.SYNC_CHANGE_DAYS)
+    deleted, _ = SyncChange.objects.filter(changed_at__lt=cutoff).delete()
+    return deleted
+
+
+# =====================
+# CHANGE LOG
+# =====================
+
+def table_kind(model):
+    return next(table.kind for table in TABLES.values() if table.model is model)
+
+
+def record_changes(model, object_ids, warehouse_id=None):
+    "log rows of a synced model written without save() (bulk_create, update)"
+    kind = table_kind(model)
+    SyncChange.objects.bulk_create(
+        [SyncChange(kind=kind, object_id=pk, warehouse_id=warehouse_id) for pk in object_ids],
+        batch_size=CHUNK_SIZE,
+    )
+
+
+def record_change(sender, instance, **kwargs):
+    SyncChange.objects.create(kind=table_kind(sender), object_id=instance.pk, warehouse_id=getattr(instance, 'warehouse_id', None))
+
+
+for synced in TABLES.values():
+    post_save.connect(record_change, sender=synced.model, dispatch_uid=f'sync_change_saved_{synced.kind}')
+    post_delete.connect(record_change, sender=synced.model, dispatch_uid=f'sync_change_deleted_{synced.kind}')
@@ -0,0 +1,199 @@
+import gzip
+import json
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from inventory.models import Inventory, InventoryEvent
+from inventory.postings import post_operations
+from products.models import Product
+from warehouses.models import StorageLocation, Warehouse
+from .models import ApiToken, SyncChange
+from .sync import build_snapshot, changes, decode_cursor, encode_cursor, snapshot_file
+
+
+class MovementBatchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='scanner', password='pw12345678')
+        cls.token, cls.key = ApiToken.issue(cls.user, 'dock scanner')
+        cls.warehouse = Warehouse.objects.create(
+            name='Batch WH', code='BATCH-WH', address='-', city='-', state='-', postal_code='-', phone='-',
+            total_capacity=1000
+        )
+        cls.product = Product.objects.create(name='Batched', sku='BATCH-1', purchase_price=1, selling_price=2)
+
+    def post(self, operations, mode=None, **headers):
+        url = reverse('api:movement_batch') + (f'?mode={mode}' if mode else '')
+        headers.setdefault('HTTP_AUTHORIZATION', f'Token {self.key}')
+        return self.client.post(url, json.dumps(operations), content_type='application/json', **headers)
+
+    def operations(self):
+        return [
+            {'type': 'in', 'product': self.product.pk, 'to_warehouse': self.warehouse.pk, 'quantity': 5},
+            {'type': 'out', 'product': self.product.pk, 'from_warehouse': self.warehouse.pk, 'quantity': 9},
+        ]
+
+    def test_atomic_and_best_effort(self):
+        response = self.post(self.operations())
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([result['status'] for result in response.json()['results']], ['skipped', 'failed'])
+
+        response = self.post(self.operations(), mode='best_effort')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['posted'], response.json()['failed']), (1, 1))
+
+    def test_concurrent_write_is_a_conflict(self):
+        with mock.patch('api.views.post_operations', side_effect=IntegrityError('duplicate key')):
+            response = self.post(self.operations())
+        self.assertEqual(response.status_code, 409)
+        self.assertIn('send the batch again', response.json()['error'])
+
+    def test_credentials(self):
+        self.assertEqual(self.post(self.operations(), HTTP_AUTHORIZATION='Token wrong').status_code, 401)
+
+        # a session has to pass the CSRF check
+        client = self.client_class(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        response = client.post(reverse('api:movement_batch'), '[]', content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+        self.assertIn('CSRF verification failed', response.json()['error'])
+
+
+class SyncTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='handheld', password='pw12345678')
+        cls.token, cls.key = ApiToken.issue(cls.user, 'handheld')
+        cls.warehouse, cls.other = [
+            Warehouse.objects.create(
+                name=f'Sync WH {code}', code=code, address='-', city='-', state='-', postal_code='-', phone='-',
+                total_capacity=1000
+            )
+            for code in ('SYNC-A', 'SYNC-B')
+        ]
+        cls.product = Product.objects.create(name='Synced', sku='SYNC-1', purchase_price=1, selling_price=2)
+        cls.location = StorageLocation.objects.create(warehouse=cls.warehouse, code='SYNC-A1')
+        post_operations([
+            {'type': 'in', 'product': cls.product.pk, 'to_warehouse': cls.warehouse.pk, 'to_location': cls.location.pk, 'quantity': 4},
+            {'type': 'in', 'product': cls.product.pk, 'to_warehouse': cls.other.pk, 'quantity': 7},
+        ], user=cls.user)
+        cls.inventory = Inventory.objects.get(warehouse=cls.warehouse)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        snapshots = override_settings(SYNC_SNAPSHOT_DIR=Path(directory.name))
+        snapshots.enable()
+        self.addCleanup(snapshots.disable)
+
+    def settle(self):
+        "the changes so far were made long enough ago for a snapshot to cover them"
+        before = timezone.now() - timedelta(seconds=settings.SYNC_GAP_SECONDS + 60)
+        SyncChange.objects.update(changed_at=before)
+        InventoryEvent.objects.update(created_at=before)
+
+    def bootstrap(self):
+        with gzip.open(snapshot_file(build_snapshot(self.warehouse)), 'rt') as snapshot:
+            return json.load(snapshot)
+
+    def ids(self, data, name):
+        return [row[0] for row in data['changes'][name]['rows']]
+
+    def test_bootstrap_then_deltas(self):
+        self.settle()
+        data = self.bootstrap()
+        self.assertEqual(self.ids(data, 'products'), [self.product.pk])
+        self.assertEqual(self.ids(data, 'locations'), [self.location.pk])
+        # only the stock of the device's warehouse
+        self.assertEqual(self.ids(data, 'inventory'), [self.inventory.pk])
+
+        delta = changes(self.warehouse, data['cursor'])
+        self.assertEqual([self.ids(delta, name) for name in ('products', 'locations', 'inventory')], [[], [], []])
+        self.assertFalse(delta['more'])
+
+        post_operations([{'type': 'out', 'product': self.product.pk, 'from_warehouse': self.warehouse.pk, 'quantity': 1}])
+        post_operations([{'type': 'out', 'product': self.product.pk, 'from_warehouse': self.other.pk, 'quantity': 1}])
+        delta = changes(self.warehouse, delta['cursor'])
+        self.assertEqual(delta['changes']['inventory']['rows'][0][4], 3)
+        self.assertEqual(self.ids(delta, 'inventory'), [self.inventory.pk])
+
+        delta = changes(self.warehouse, delta['cursor'])
+        self.assertEqual(self.ids(delta, 'inventory'), [])
+
+    def test_recent_changes_are_sent_again_after_a_snapshot(self):
+        # not settled yet: their transactions may not have committed when the snapshot read
+        data = self.bootstrap()
+        delta = changes(self.warehouse, data['cursor'])
+        self.assertEqual(self.ids(delta, 'products'), [self.product.pk])
+        self.assertEqual(self.ids(delta, 'inventory'), [self.inventory.pk])
+
+    def test_deletions(self):
+        self.settle()
+        cursor = self.bootstrap()['cursor']
+        location_id = self.location.pk
+        self.location.delete()
+        self.product.is_active = False
+        self.product.save()
+
+        delta = changes(self.warehouse, cursor)
+        self.assertEqual(delta['deleted']['locations'], [location_id])
+        # rows a snapshot would leave out are sent, the device drops them
+        self.assertEqual(delta['changes']['products']['rows'][0][-1], False)
+        self.assertEqual(delta['deleted']['products'], [])
+
+    def test_paging(self):
+        cursor = self.bootstrap()['cursor']
+        for quantity in range(1, 4):
+            Inventory.objects.filter(pk=self.inventory.pk).update(quantity=quantity)
+            SyncChange.objects.create(kind='inventory', object_id=self.inventory.pk, warehouse=self.warehouse)
+
+        pages = []
+        while True:
+            delta = changes(self.warehouse, cursor, limit=2)
+            pages.append(delta['more'])
+            cursor = delta['cursor']
+            if not delta['more']:
+                break
+        self.assertGreater(len(pages), 1)
+        self.assertEqual(self.ids(changes(self.warehouse, cursor), 'inventory'), [])
+
+    def test_cursor(self):
+        cursor = self.bootstrap()['cursor']
+        positions, at = decode_cursor(cursor, self.warehouse)
+        self.assertEqual(set(positions), {'e', 'c'})
+        self.assertEqual(encode_cursor(self.warehouse, positions, at), cursor)
+
+        with self.assertRaisesMessage(ValueError, 'Invalid sync cursor'):
+            decode_cursor(cursor, self.other)
+        with self.assertRaisesMessage(ValueError, 'Invalid sync cursor'):
+            decode_cursor('not-a-cursor', self.warehouse)
+
+    def test_views(self):
+        headers = {'HTTP_AUTHORIZATION': f'Token {self.key}'}
+        response = self.client.get(reverse('api:sync_bootstrap', args=[self.warehouse.pk]), **headers)
+        self.assertEqual(response.status_code, 200)
+        cursor = json.loads(b''.join(response.streaming_content))['cursor']
+
+        url = reverse('api:sync_changes', args=[self.warehouse.pk])
+        response = self.client.get(url, {'cursor': cursor}, **headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('cursor', response.json())
+        self.assertEqual(self.client.get(url, {'cursor': 'nope'}, **headers).status_code, 400)
+
+        # older than the kept change log: the device bootstraps again
+        positions, at = decode_cursor(cursor, self.warehouse)
+        expired = encode_cursor(self.warehouse, positions, at - timedelta(days=settings.SYNC_CHANGE_DAYS + 1))
+        response = self.client.get(url, {'cursor': expired}, **headers)
+        self.assertEqual(response.status_code, 410)
+        self.assertEqual(response.json()['bootstrap'], reverse('api:sync_bootstrap', args=[self.warehouse.pk]))
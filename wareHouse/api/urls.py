@@ -0,0 +1,16 @@
+from django.urls import path
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [
+    path('products/', views.resource_list, {'resource': 'products'}, name='products'),
+    path('inventory/', views.resource_list, {'resource': 'inventory'}, name='inventory'),
+    path('movements/', views.resource_list, {'resource': 'movements'}, name='movements'),
+    path('movements/batch/', views.movement_batch, name='movement_batch'),
+    path('warehouses/', views.resource_list, {'resource': 'warehouses'}, name='warehouses'),
+    path('locations/', views.resource_list, {'resource': 'locations'}, name='locations'),
+    # handheld sync
+    path('sync/<int:warehouse_id>/', views.sync_changes, name='sync_changes'),
+    path('sync/<int:warehouse_id>/bootstrap/', views.sync_bootstrap, name='sync_bootstrap'),
+]
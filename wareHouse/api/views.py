@@ -0,0 +1,271 @@
+"""
+Read-only JSON API over products, inventory, movements, warehouses and locations.
+
+GET /api/v1/<resource>/ returns {"results": [...], "next": url or null}:
+
+- rows in id order, `limit` per page (settings.API_PAGE_SIZE, at most
+  API_MAX_PAGE_SIZE), `next` carries an opaque cursor to the following page,
+- `fields=sku,name` returns only those fields (and id), read with one .values()
+  query over the requested columns,
+- the filters of the matching list view (search, warehouse, status...).
+
+Every response has a strong ETag built from the resource version (see
+api.resources) and the request, so a client sending it back in If-None-Match
+gets 304 Not Modified before any row is read.
+
+POST /api/v1/movements/batch/ posts a JSON array of stock operations through
+inventory.postings and answers with the result of each one.
+
+Every endpoint takes either the login session or an API token. Scripts and
+handhelds send "Authorization: Token <key>" (manage.py create_api_token) and
+need no CSRF token. A browser session POSTing has to send the csrftoken cookie
+value back in the X-CSRFToken header: GET any page (e.g. /api/v1/warehouses/)
+to receive the cookie first. A failed check is a 403 JSON response, like the
+401 for missing credentials.
+
+GET /api/v1/sync/<warehouse>/bootstrap/ and /api/v1/sync/<warehouse>/?cursor=
+serve the handheld sync feed of api.sync as gzip JSON.
+"""
+import base64
+import binascii
+import gzip
+import hashlib
+import json
+import re
+from decimal import Decimal
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.http import FileResponse, HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import quote_etag
+from django.utils.text import compress_string
+from django.middleware.csrf import CsrfViewMiddleware, get_token
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from inventory.postings import post_operations
+from warehouses.models import Warehouse
+from .models import ApiToken
+from .resources import RESOURCES, int_param, related_version
+from .sync import SyncExpired, changes, current_snapshot, encode, snapshot_file
+
+ACCEPTS_GZIP = re.compile(r'\bgzip\b')
+
+
+class CsrfCheck(CsrfViewMiddleware):
+    "the middleware's CSRF check, returning the failure reason instead of the HTML 403 page"
+
+    def _reject(self, request, reason):
+        return reason
+
+
+def csrf_failure(request):
+    "reason the session-authenticated request fails the CSRF check, None when it passes"
+    check = CsrfCheck(lambda request: None)
+    check.process_request(request)
+    return check.process_view(request, None, (), {})
+
+
+def api_login_required(view):
+    """
+    like login_required, with a 401 JSON response instead of the redirect to
+    the login page. An Authorization: Token <key> header (api.models.ApiToken)
+    authenticates without a session or CSRF token, a session still has to pass
+    the CSRF check on POST, failing with a 403 JSON response.
+    """
+    @csrf_exempt
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        header = request.headers.get('Authorization')
+        if header:
+            user = ApiToken.authenticate(header)
+            if user is None:
+                return JsonResponse({'error': 'Invalid or inactive API token'}, status=401)
+            request.user = user
+        elif not request.user.is_authenticated:
+            return JsonResponse({'error': 'Authentication required'}, status=401)
+        else:
+            # sets the csrftoken cookie on the response, so any GET bootstraps it
+            get_token(request)
+            reason = csrf_failure(request)
+            if reason:
+                return JsonResponse({
+                    'error': f'CSRF verification failed: {reason}',
+                    'detail': 'Send the csrftoken cookie value in the X-CSRFToken header '
+                              '(GET any page to receive the cookie) or authenticate with '
+                              '"Authorization: Token <key>" instead of the session.'
+                }, status=403)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def encode_cursor(last_id):
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    "id after which the page starts, ValueError for a cursor this API did not hand out"
+    if not cursor:
+        return 0
+    try:
+        return int(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError('Invalid cursor')
+
+
+def selected_fields(resource, params):
+    "public field names asked for with fields=, id first, all of them by default"
+    requested = [name.strip() for name in params.get('fields', '').split(',') if name.strip()]
+    if not requested:
+        return list(resource.fields)
+    unknown = [name for name in requested if name not in resource.fields]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(resource.fields)}")
+    return ['id'] + [name for name in dict.fromkeys(requested) if name != 'id']
+
+
+def page_limit(params):
+    limit = int_param(params, 'limit')
+    if limit is None:
+        return settings.API_PAGE_SIZE
+    if limit < 1:
+        raise ValueError('limit must be at least 1')
+    return min(limit, settings.API_MAX_PAGE_SIZE)
+
+
+@require_GET
+@api_login_required
+def resource_list(request, resource):
+    'one page of a resource as JSON, or 304 when the If-None-Match ETag is still current'
+    definition = RESOURCES[resource]
+    try:
+        names = selected_fields(definition, request.GET)
+        limit = page_limit(request.GET)
+        after = decode_cursor(request.GET.get('cursor', ''))
+        queryset = definition.filter(request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    version = definition.version(queryset, request.GET) + related_version(
+        dict.fromkeys(definition.related[name] for name in names if name in definition.related)
+    )
+    etag = quote_etag(hashlib.sha1(repr((resource, sorted(request.GET.lists()), version)).encode()).hexdigest())
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        paths = [definition.fields[name] for name in names]
+        rows = list(queryset.filter(pk__gt=after).order_by('pk').values(*paths)[:limit + 1])
+        next_url = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            params = request.GET.copy()
+            params['cursor'] = encode_cursor(rows[-1]['id'])
+            next_url = request.build_absolute_uri(f"{request.path}?{params.urlencode()}")
+        response = JsonResponse({
+            'results': [{name: row[path] for name, path in zip(names, paths)} for row in rows],
+            'next': next_url,
+        })
+
+    response.headers['ETag'] = etag
+    # clients keep the page but check the ETag before using it again
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def operation_result_json(result):
+    data = {'index': result.index, 'status': result.status}
+    if result.movement is not None and result.status in ('posted', 'replayed'):
+        data['id'] = result.movement.pk
+        data['reference_number'] = result.movement.reference_number
+    if result.errors:
+        data['errors'] = result.errors
+    return data
+
+
+@require_POST
+@api_login_required
+def movement_batch(request):
+    """
+    post a JSON array of in/out/transfer/adjust operations (see inventory.postings),
+    all or nothing unless ?mode=best_effort, and answer with the result of each
+    """
+    mode = request.GET.get('mode', 'atomic')
+    if mode not in ('atomic', 'best_effort'):
+        return JsonResponse({'error': 'mode must be atomic or best_effort'}, status=400)
+    try:
+        operations = json.loads(request.body, parse_float=Decimal)
+    except (ValueError, UnicodeDecodeError):
+        operations = None
+    if not isinstance(operations, list) or not operations:
+        return JsonResponse({'error': 'Send a JSON array of operations'}, status=400)
+    if len(operations) > settings.API_BATCH_MAX_OPERATIONS:
+        return JsonResponse({'error': f'At most {settings.API_BATCH_MAX_OPERATIONS} operations per batch'}, status=400)
+
+    try:
+        results = post_operations(operations, atomic=mode == 'atomic', user=request.user)
+    except IntegrityError:
+        # a concurrent batch posted the same idempotency key or created the same balance first
+        return JsonResponse({'error': 'A concurrent request changed the same records, send the batch again'}, status=409)
+
+    counts = {status: sum(1 for result in results if result.status == status) for status in ('posted', 'replayed', 'failed', 'skipped')}
+    return JsonResponse(
+        {'mode': mode, **counts, 'results': [operation_result_json(result) for result in results]},
+        status=400 if mode == 'atomic' and counts['failed'] else 200,
+    )
+
+
+def accepts_gzip(request):
+    return bool(ACCEPTS_GZIP.search(request.headers.get('Accept-Encoding', '')))
+
+
+@require_GET
+@api_login_required
+def sync_bootstrap(request, warehouse_id):
+    'the pre-built snapshot a device of the warehouse starts its sync from, gzip JSON'
+    warehouse = get_object_or_404(Warehouse, pk=warehouse_id)
+    snapshot = current_snapshot(warehouse)
+    etag = quote_etag(f"sync-{snapshot.pk}")
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        if accepts_gzip(request):
+            response = FileResponse(open(snapshot_file(snapshot), 'rb'), content_type='application/json')
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            response = FileResponse(gzip.open(snapshot_file(snapshot), 'rb'), content_type='application/json')
+
+    response.headers['ETag'] = etag
+    patch_vary_headers(response, ['Accept-Encoding'])
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+@require_GET
+@api_login_required
+def sync_changes(request, warehouse_id):
+    'changes since the cursor of a device of the warehouse, gzip JSON'
+    warehouse = get_object_or_404(Warehouse, pk=warehouse_id)
+    bootstrap = reverse('api:sync_bootstrap', args=[warehouse.pk])
+    cursor = request.GET.get('cursor', '')
+    if not cursor:
+        return JsonResponse({'error': 'Start from the bootstrap snapshot', 'bootstrap': bootstrap}, status=400)
+    try:
+        data = changes(warehouse, cursor)
+    except SyncExpired as e:
+        return JsonResponse({'error': str(e), 'bootstrap': bootstrap}, status=410)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    content = encode(data).encode()
+    response = HttpResponse(content_type='application/json')
+    if accepts_gzip(request):
+        content = compress_string(content)
+        response.headers['Content-Encoding'] = 'gzip'
+    response.content = content
+    patch_vary_headers(response, ['Accept-Encoding'])
+    patch_cache_control(response, private=True, no_store=True)
+    return response
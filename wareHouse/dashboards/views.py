@@ -7,6 +7,7 @@ from datetime import timedelta
 from products.models import Product, ProductCategory
 from warehouses.models import Warehouse
 from inventory.models import Inventory, StockMovement, StockAlert
+from inventory.alerts import alerted_inventory
 
 @login_required
 def dashboard(request):
@@ -39,11 +40,8 @@ def dashboard(request):
     # ALERTS & WARNINGS
     # =====================
     
-    # Low Stock Items
-    low_stock_items = []
-    for inv in Inventory.objects.select_related('product', 'warehouse').filter(quantity__gt=0):
-        if inv.is_low_stock:
-            low_stock_items.append(inv)
+    # Low Stock Items (kept current by the stock alert engine)
+    low_stock_items = alerted_inventory('low_stock').order_by('quantity')
     
     # Out of Stock Items
     out_of_stock_products = Product.objects.filter(
@@ -53,16 +51,8 @@ def dashboard(request):
     ).count()
     
     # Expiring and Expired Items
-    expiring_soon = []
-    expired_items = []
-    for inv in Inventory.objects.select_related('product', 'warehouse').filter(
-        expiry_date__isnull=False,
-        quantity__gt=0
-    ):
-        if inv.is_expired:
-            expired_items.append(inv)
-        elif inv.is_expiring_soon:
-            expiring_soon.append(inv)
+    expiring_soon = alerted_inventory('expiring_soon').order_by('expiry_date')
+    expired_items = alerted_inventory('expired').order_by('expiry_date')
     
     # =====================
     # RECENT ACTIVITY
@@ -184,12 +174,12 @@ def dashboard(request):
         'total_warehouses': total_warehouses,
         
         # Alerts
-        'low_stock_count': len(low_stock_items),
+        'low_stock_count': low_stock_items.count(),
         'low_stock_items': low_stock_items[:5],
         'out_of_stock_count': out_of_stock_products,
-        'expiring_soon_count': len(expiring_soon),
+        'expiring_soon_count': expiring_soon.count(),
         'expiring_soon': expiring_soon[:5],
-        'expired_count': len(expired_items),
+        'expired_count': expired_items.count(),
         'expired_items': expired_items[:5],
         
         # Activity
@@ -0,0 +1,130 @@
+"""
+Bulk posting of absolute stock adjustments.
+
+Used where many balances are corrected at once (ledger reconciliation, stock-take
+approval): balances move by a delta worked out against the locked rows, and the
+adjustment movements, Inventory updates, outbox events, occupancy
+counters and search entries are written with bulk queries in one transaction instead of one
+StockMovement.save() per row.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from search.index import index_queryset
+from warehouses.occupancy import apply_deltas
+
+from .models import Inventory, InventoryEvent, StockMovement
+
+CHUNK_SIZE = 2000
+
+
+def lock_balances(adjustments):
+    "{(product_id, warehouse_id, batch_number): Inventory} of the balances the adjustments touch, locked"
+    keys = {(product_id, warehouse_id, batch_number or '') for product_id, warehouse_id, batch_number, *rest in adjustments}
+    product_ids = sorted({key[0] for key in keys})
+    warehouse_ids = {key[1] for key in keys}
+    balances = {}
+    for start in range(0, len(product_ids), CHUNK_SIZE):
+        rows = Inventory.objects.select_for_update().filter(
+            product_id__in=product_ids[start:start + CHUNK_SIZE], warehouse_id__in=warehouse_ids
+        ).order_by('pk')
+        for row in rows:
+            key = (row.product_id, row.warehouse_id, row.batch_number or '')
+            if key in keys:
+                balances.setdefault(key, row)
+    return balances
+
+
+def post_adjustments(adjustments, prefix, reason, note, source, user=None):
+    """
+    Move a balance by the delta of each (product_id, warehouse_id, batch_number,
+    delta, ...) tuple, never below 0, posting one adjustment movement that records
+    the balance it sets. The balance rows are locked and read again first, so
+    stock that moved after the caller worked out its deltas is kept.
+    Reference numbers are "<prefix>-000001"..., note(adjustment) gives the
+    movement notes (tuples may carry extra items for it) and source is recorded
+    on the outbox events. Returns the posted movements.
+    """
+    if not adjustments:
+        return []
+
+    now = timezone.now()
+    with transaction.atomic():
+        balances = lock_balances(adjustments)
+        before = {inventory.pk: inventory.quantity for inventory in balances.values()}
+
+        # (adjustment, inventory, quantity before, quantity after), in order
+        changes = []
+        created = []
+        occupancy = []
+        for adjustment in adjustments:
+            product_id, warehouse_id, batch_number, delta = adjustment[:4]
+            key = (product_id, warehouse_id, batch_number or '')
+            inventory = balances.get(key)
+            if inventory is None:
+                inventory = balances[key] = Inventory(
+                    product_id=product_id, warehouse_id=warehouse_id, batch_number=batch_number or '', quantity=Decimal(0)
+                )
+                created.append(inventory)
+            current = inventory.quantity
+            target = max(current + delta, Decimal(0))
+            inventory.quantity = target
+            changes.append((adjustment, inventory, current, target))
+            occupancy.append((warehouse_id, inventory.storage_location_id, target - current))
+
+        movements = StockMovement.objects.bulk_create([
+            StockMovement(
+                movement_type='adjustment',
+                transaction_type='adjustment',
+                reference_number=f"{prefix}-{seq:06d}",
+                product_id=adjustment[0],
+                to_warehouse_id=adjustment[1],
+                batch_number=adjustment[2],
+                quantity=target,
+                unit_price=0,
+                total_amount=0,
+                reason=reason,
+                notes=note(adjustment),
+                movement_date=now,
+                recorded_by=user,
+            )
+            for seq, (adjustment, inventory, current, target) in enumerate(changes, 1)
+        ], batch_size=CHUNK_SIZE)
+
+        # existing balances move by their net change, one UPDATE per distinct change
+        by_delta = defaultdict(list)
+        for inventory in balances.values():
+            if inventory.pk is not None and inventory.quantity != before[inventory.pk]:
+                by_delta[inventory.quantity - before[inventory.pk]].append(inventory.pk)
+        for delta, ids in by_delta.items():
+            for start in range(0, len(ids), CHUNK_SIZE):
+                Inventory.objects.filter(pk__in=ids[start:start + CHUNK_SIZE]).update(quantity=F('quantity') + delta, updated_at=now)
+        Inventory.objects.bulk_create(created, batch_size=CHUNK_SIZE)
+
+        InventoryEvent.objects.bulk_create([
+            InventoryEvent(
+                event_type='stock_changed',
+                movement=movement,
+                reference_number=movement.reference_number,
+                inventory=inventory,
+                product_id=inventory.product_id,
+                warehouse_id=inventory.warehouse_id,
+                quantity_delta=target - current,
+                quantity_after=target,
+                payload={'source': source},
+            )
+            for movement, (adjustment, inventory, current, target) in zip(movements, changes)
+        ], batch_size=CHUNK_SIZE)
+
+        apply_deltas(occupancy)
+
+        # bulk_create skips the post_save signals that maintain the search index
+        index_queryset(StockMovement.objects.filter(reference_number__startswith=f"{prefix}-"))
+        for start in range(0, len(created), CHUNK_SIZE):
+            index_queryset(Inventory.objects.filter(pk__in=[inv.pk for inv in created[start:start + CHUNK_SIZE]]))
+
+    return movements
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from django.db.models import Sum, F
-from .models import Inventory, StockMovement, StockAlert
+from .models import Inventory, StockMovement, StockAlert, IdempotencyKey, InventoryEvent, EventConsumerOffset, PendingAlertCheck, InventorySnapshot, CheckpointWatermark, PickCount, MovementArchiveSegment, StockTake, StockTakeLine
 
 # Register your models here.
 @admin.register(Inventory)
@@ -178,3 +178,81 @@ class StockAlertAdmin(admin.ModelAdmin):
     
 
     
+
+
+
+@admin.register(IdempotencyKey)
+class IdempotencyKeyAdmin(admin.ModelAdmin):
+    list_display = ['key', 'endpoint', 'movement', 'recorded_by', 'expires_at', 'created_at']
+    list_filter = ['endpoint', 'expires_at']
+    search_fields = ['key', 'movement__reference_number']
+    readonly_fields = ['fingerprint', 'created_at']
+
+
+
+@admin.register(InventoryEvent)
+class InventoryEventAdmin(admin.ModelAdmin):
+    list_display = ['id', 'event_type', 'reference_number', 'product', 'warehouse', 'quantity_delta', 'quantity_after', 'created_at']
+    list_filter = ['event_type', 'warehouse', 'created_at']
+    search_fields = ['reference_number', 'product__name']
+    readonly_fields = ['created_at']
+
+
+@admin.register(EventConsumerOffset)
+class EventConsumerOffsetAdmin(admin.ModelAdmin):
+    list_display = ['consumer', 'last_event_id', 'updated_at']
+    readonly_fields = ['gaps']
+
+
+@admin.register(PendingAlertCheck)
+class PendingAlertCheckAdmin(admin.ModelAdmin):
+    list_display = ['product', 'queued_at']
+    readonly_fields = ['product', 'queued_at']
+
+
+
+@admin.register(InventorySnapshot)
+class InventorySnapshotAdmin(admin.ModelAdmin):
+    list_display = ['as_of', 'product', 'warehouse', 'batch_number', 'quantity']
+    list_filter = ['as_of', 'warehouse']
+    search_fields = ['product__name', 'product__sku', 'batch_number']
+    readonly_fields = ['created_at']
+
+
+@admin.register(CheckpointWatermark)
+class CheckpointWatermarkAdmin(admin.ModelAdmin):
+    list_display = ['stale_from', 'version', 'updated_at']
+    readonly_fields = ['version', 'updated_at']
+
+
+
+@admin.register(PickCount)
+class PickCountAdmin(admin.ModelAdmin):
+    list_display = ['day', 'product', 'warehouse', 'picks', 'quantity']
+    list_filter = ['day', 'warehouse']
+    search_fields = ['product__name', 'product__sku']
+    raw_id_fields = ['product']
+
+
+
+@admin.register(MovementArchiveSegment)
+class MovementArchiveSegmentAdmin(admin.ModelAdmin):
+    list_display = ['month', 'part', 'row_count', 'first_movement_date', 'last_movement_date', 'path', 'created_at']
+    readonly_fields = ['created_at']
+
+
+
+class StockTakeLineInline(admin.TabularInline):
+    model = StockTakeLine
+    extra = 0
+    raw_id_fields = ['product', 'inventory', 'storage_location']
+    readonly_fields = ['expected_quantity', 'variance', 'counted_at']
+
+
+@admin.register(StockTake)
+class StockTakeAdmin(admin.ModelAdmin):
+    list_display = ['reference_number', 'warehouse', 'status', 'opened_by', 'opened_at', 'posted_at']
+    list_filter = ['status', 'warehouse']
+    search_fields = ['reference_number', 'notes']
+    readonly_fields = ['opened_at', 'posted_at']
+    inlines = [StockTakeLineInline]
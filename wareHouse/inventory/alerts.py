@@ -0,0 +1,251 @@
+"""
+Incremental stock alert engine.
+
+Only inventory rows touched by new InventoryEvents, or whose expiry date crossed the
+expiring-soon / expired boundary since the last run, are evaluated. Evaluation is
+idempotent: missing alerts are created, open alerts whose condition has cleared are
+resolved and duplicate open alerts are collapsed.
+
+The events are handled by the stock_alerts outbox consumer; sweep() is the time
+based half (expiry crossings, rows gone dormant, products and warehouses taken
+out of use, products queued by a reorder level change) and advances last_run_at. consume_inventory_events runs it every
+INVENTORY_EVENT_SWEEP_SECONDS, generate_stock_alerts runs both at once.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Q
+from django.db.models.signals import post_save, pre_save
+from django.utils import timezone
+
+from .events import advance_offset, consume_batch
+from .models import Inventory, InventoryEvent, PendingAlertCheck, StockAlert, EventConsumerOffset
+
+CONSUMER = 'stock_alerts'
+
+# matches Inventory.is_expiring_soon
+EXPIRING_SOON_DAYS = 3
+
+CHUNK_SIZE = 1000
+
+
+def day_start(day):
+    "start of a day as stored expiry dates see it (Inventory.days_until_expiry compares UTC dates)"
+    return datetime.combine(day, time.min, tzinfo=dt_timezone.utc)
+
+
+def dormant_before(now=None):
+    "empty rows last changed before this are batches used up long ago, not shortages"
+    return (now or timezone.now()) - timedelta(days=settings.STOCK_ALERT_DORMANT_DAYS)
+
+
+def desired_alerts(inventory, today, dormant=None):
+    "alert type -> message for every condition this inventory row is currently in"
+    product = inventory.product
+    if not product.is_active or not inventory.warehouse.is_active:
+        return {}
+    location = f"{product.name} in {inventory.warehouse.code}"
+    alerts = {}
+
+    if inventory.quantity <= 0:
+        if dormant is None or inventory.updated_at >= dormant:
+            alerts['out_of_stock'] = f"{location} is out of stock"
+    elif inventory.quantity <= product.reorder_level:
+        alerts['low_stock'] = (
+            f"{location} is low on stock: {inventory.quantity} {product.unit} "
+            f"(reorder level {product.reorder_level})"
+        )
+
+    if inventory.expiry_date and inventory.quantity > 0:
+        days = (inventory.expiry_date.date() - today).days
+        if days < 0:
+            alerts['expired'] = f"{location} batch {inventory.batch_number or '-'} expired on {inventory.expiry_date.date()}"
+        elif days <= EXPIRING_SOON_DAYS:
+            alerts['expiring_soon'] = f"{location} batch {inventory.batch_number or '-'} expires in {days} days"
+
+    return alerts
+
+
+def evaluate_inventory(inventory_ids, today=None):
+    "bring the open alerts of the given inventory rows in line with their current state"
+    today = today or timezone.now().date()
+    dormant = dormant_before()
+    ids = sorted(set(inventory_ids))
+    created = resolved = 0
+
+    for start in range(0, len(ids), CHUNK_SIZE):
+        chunk = ids[start:start + CHUNK_SIZE]
+
+        open_alerts = defaultdict(list)
+        for alert in StockAlert.objects.filter(
+            inventory_id__in=chunk,
+            status__in=StockAlert.OPEN_STATUSES
+        ).order_by('created_at'):
+            open_alerts[(alert.inventory_id, alert.alert_type)].append(alert)
+
+        to_create = []
+        to_resolve = []
+        for inventory in Inventory.objects.select_related('product', 'warehouse').filter(pk__in=chunk):
+            for alert_type, message in desired_alerts(inventory, today, dormant).items():
+                existing = open_alerts.pop((inventory.pk, alert_type), [])
+                if existing:
+                    # keep the oldest, collapse duplicates
+                    to_resolve.extend(existing[1:])
+                else:
+                    to_create.append(StockAlert(inventory=inventory, alert_type=alert_type, message=message))
+
+        # whatever is left over no longer applies
+        for alerts in open_alerts.values():
+            to_resolve.extend(alerts)
+
+        with transaction.atomic():
+            StockAlert.objects.bulk_create(to_create)
+            if to_resolve:
+                StockAlert.objects.filter(pk__in=[alert.pk for alert in to_resolve]).update(
+                    status='resolved',
+                    updated_at=timezone.now()
+                )
+
+        created += len(to_create)
+        resolved += len(to_resolve)
+
+    return created, resolved
+
+
+def handle_events(events):
+    "InventoryEvent handler - re-evaluate the inventory rows the events touched"
+    return evaluate_inventory([event.inventory_id for event in events if event.inventory_id])
+
+
+def expiry_crossings(since, now):
+    "inventory rows whose expiry date crossed the expiring-soon or expired boundary between two runs"
+    last_day = since.date()
+    today = now.date()
+    soon = timedelta(days=EXPIRING_SOON_DAYS + 1)
+
+    return Inventory.objects.filter(
+        Q(expiry_date__gte=day_start(last_day), expiry_date__lt=day_start(today)) |
+        Q(expiry_date__gte=day_start(last_day + soon), expiry_date__lt=day_start(today + soon))
+    ).values_list('pk', flat=True)
+
+
+def stale_alerts(now):
+    "inventory rows with an open alert that went dormant or whose product or warehouse is no longer in use"
+    return StockAlert.objects.filter(status__in=StockAlert.OPEN_STATUSES).filter(
+        Q(alert_type='out_of_stock', inventory__updated_at__lt=dormant_before(now)) |
+        Q(inventory__product__is_active=False) |
+        Q(inventory__warehouse__is_active=False)
+    ).values_list('inventory_id', flat=True)
+
+
+def queue_products(product_ids):
+    "queue the inventory rows of products whose alert conditions changed for the next sweep"
+    now = timezone.now()
+    PendingAlertCheck.objects.bulk_create(
+        [PendingAlertCheck(product_id=product_id, queued_at=now) for product_id in set(product_ids)],
+        batch_size=CHUNK_SIZE, update_conflicts=True,
+        unique_fields=['product'], update_fields=['queued_at'],
+    )
+
+
+def skip_covered_events(now):
+    """
+    Move the consumer past the events a full evaluation covers. Ids above the
+    offset that are not committed yet become gaps first seen now, as
+    advance_offset records them; the gaps it already has are kept. Events older
+    than INVENTORY_EVENT_GAP_SECONDS are settled and need no gap.
+    """
+    with transaction.atomic():
+        # writing first takes the row lock, see consume_batch
+        EventConsumerOffset.objects.filter(consumer=CONSUMER).update(updated_at=now)
+        state = EventConsumerOffset.objects.get(consumer=CONSUMER)
+
+        events = InventoryEvent.objects.filter(pk__gt=state.last_event_id)
+        settled = now - timedelta(seconds=settings.INVENTORY_EVENT_GAP_SECONDS)
+        start = events.filter(created_at__lt=settled).aggregate(last=Max('pk'))['last'] or state.last_event_id
+        ids = list(events.filter(pk__gt=start).order_by('pk').values_list('pk', flat=True))
+        last_event_id, gaps = advance_offset(start, state.gaps, ids, False, now)
+        EventConsumerOffset.objects.filter(pk=state.pk).update(last_event_id=last_event_id, gaps=gaps)
+
+
+def sweep():
+    """
+    Evaluate the rows whose alerts change with time rather than with postings
+    since the last sweep and the rows of queued products, and advance
+    last_run_at. The first sweep evaluates every row and moves the consumer past
+    the events that covers. Returns (created, resolved).
+    """
+    state, _ = EventConsumerOffset.objects.get_or_create(consumer=CONSUMER)
+    now = timezone.now()
+    queued = list(PendingAlertCheck.objects.values_list('product_id', flat=True))
+    if state.last_run_at is None:
+        skip_covered_events(now)
+        rows = Inventory.objects.values_list('pk', flat=True)
+    else:
+        rows = (
+            list(expiry_crossings(state.last_run_at, now)) + list(stale_alerts(now)) +
+            list(Inventory.objects.filter(product_id__in=queued).values_list('pk', flat=True))
+        )
+
+    created, resolved = evaluate_inventory(rows, now.date())
+    # products queued again while the rows were evaluated stay for the next sweep
+    PendingAlertCheck.objects.filter(product_id__in=queued, queued_at__lt=now).delete()
+    # only last_run_at, the consumer moves the offset concurrently
+    EventConsumerOffset.objects.filter(pk=state.pk).update(last_run_at=now)
+    return created, resolved
+
+
+def run_alert_engine(full=False, batch_size=1000):
+    """
+    Evaluate touched, expiry-crossing and stale inventory rows since the last run.
+    The first run (or full=True) evaluates everything once. Returns a stats dict.
+    """
+    stats = {'events': 0, 'created': 0, 'resolved': 0}
+    if full:
+        EventConsumerOffset.objects.filter(consumer=CONSUMER).update(last_run_at=None)
+
+    state = EventConsumerOffset.objects.filter(consumer=CONSUMER).first()
+    if state is not None and state.last_run_at is not None:
+        def handler(events):
+            created, resolved = handle_events(events)
+            stats['created'] += created
+            stats['resolved'] += resolved
+
+        # rows touched by postings since the last run
+        while True:
+            consumed = consume_batch(CONSUMER, handler, batch_size)
+            stats['events'] += consumed
+            if not consumed:
+                break
+
+    created, resolved = sweep()
+    stats['created'] += created
+    stats['resolved'] += resolved
+    return stats
+
+
+def alerted_inventory(alert_type):
+    "inventory rows with an open alert of the given type"
+    return Inventory.objects.select_related('product', 'warehouse').filter(
+        alerts__alert_type=alert_type,
+        alerts__status__in=StockAlert.OPEN_STATUSES
+    ).distinct()
+
+
+def remember_reorder_level(sender, instance, raw=False, **kwargs):
+    instance._previous_reorder_level = None
+    if instance.pk and not raw:
+        instance._previous_reorder_level = sender.objects.filter(pk=instance.pk).values_list('reorder_level', flat=True).first()
+
+
+def reorder_level_saved(sender, instance, raw=False, **kwargs):
+    # low stock depends on the reorder level, a change re-evaluates the product's rows
+    previous = getattr(instance, '_previous_reorder_level', None)
+    if not raw and previous is not None and previous != instance.reorder_level:
+        queue_products([instance.pk])
+
+
+pre_save.connect(remember_reorder_level, sender='products.Product', dispatch_uid='stock_alerts_reorder_level')
+post_save.connect(reorder_level_saved, sender='products.Product', dispatch_uid='stock_alerts_reorder_level_saved')
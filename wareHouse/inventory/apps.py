@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class InventoryConfig(AppConfig):
     name = 'inventory'
+
+    def ready(self):
+        # connects the reorder level signals of the stock alert engine
+        from . import alerts  # noqa: F401
@@ -0,0 +1,260 @@
+"""
+Cold storage for old StockMovement rows.
+
+archive_movements() moves closed months out of the hot table into gzip JSONL
+segment files (one MovementArchiveSegment row per file) and leaves an
+InventorySnapshot checkpoint at every archived month end. Readers merge segments
+back in only when the requested date range reaches an archived period.
+"""
+import gzip
+import heapq
+import json
+import os
+from datetime import datetime, time, timedelta
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from decimal import Decimal
+from itertools import groupby
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from products.models import Product
+from search.index import unindex
+from warehouses.models import Warehouse
+from .models import StockMovement, MovementArchiveSegment
+
+User = get_user_model()
+
+CHUNK_SIZE = 2000
+
+# stored per row, with the names needed to render reports after the referenced rows are gone
+ARCHIVE_FIELDS = [
+    'id', 'reference_number', 'movement_type', 'transaction_type',
+    'product_id', 'product__name', 'product__sku', 'product__unit',
+    'from_warehouse_id', 'from_warehouse__name', 'from_warehouse__code', 'from_location_id',
+    'to_warehouse_id', 'to_warehouse__name', 'to_warehouse__code', 'to_location_id',
+    'quantity', 'unit_price', 'total_amount', 'batch_number', 'expiry_date',
+    'party_name', 'notes', 'reason', 'movement_date', 'recorded_by_id', 'created_at',
+]
+DECIMAL_FIELDS = ['quantity', 'unit_price', 'total_amount']
+DATETIME_FIELDS = ['movement_date', 'expiry_date', 'created_at']
+
+
+def month_start(day):
+    "aware local midnight of the first day of the month"
+    return timezone.make_aware(datetime.combine(day.replace(day=1), time.min))
+
+
+def next_month(start):
+    return month_start((start.date() + timedelta(days=32)).replace(day=1))
+
+
+def segment_file(segment):
+    return settings.MOVEMENT_ARCHIVE_DIR / segment.path
+
+
+def archive_month(start, end):
+    "move the movements of one month into a new segment, returns it (or None when the month is empty)"
+    movements = StockMovement.objects.filter(movement_date__gte=start, movement_date__lt=end)
+
+    part = (MovementArchiveSegment.objects.filter(month=start.date()).aggregate(last=Max('part'))['last'] or 0) + 1
+    relative = f"{start:%Y}/movements-{start:%Y-%m}-p{part}.jsonl.gz"
+    path = settings.MOVEMENT_ARCHIVE_DIR / relative
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    ids = []
+    first = last = None
+    tmp_path = path.with_name(path.name + '.tmp')
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as segment:
+        for row in movements.order_by('movement_date', 'pk').values(*ARCHIVE_FIELDS).iterator(chunk_size=CHUNK_SIZE):
+            segment.write(json.dumps(row, cls=DjangoJSONEncoder) + '\n')
+            ids.append(row['id'])
+            first = first or row['movement_date']
+            last = row['movement_date']
+
+    if not ids:
+        os.remove(tmp_path)
+        return None
+    os.replace(tmp_path, path)
+
+    with transaction.atomic():
+        segment = MovementArchiveSegment.objects.create(
+            month=start.date(),
+            part=part,
+            path=relative,
+            row_count=len(ids),
+            first_movement_date=first,
+            last_movement_date=last,
+        )
+        # only the rows written to the file - anything posted meanwhile waits for the next run
+        for offset in range(0, len(ids), CHUNK_SIZE):
+            StockMovement.objects.filter(pk__in=ids[offset:offset + CHUNK_SIZE]).delete()
+            unindex(StockMovement, ids[offset:offset + CHUNK_SIZE])
+
+    return segment
+
+
+def archive_movements(before):
+    """
+    Archive every closed month before the month containing `before`. A checkpoint is
+    written at each month end first, so balances never need the archived rows.
+    Returns the created segments.
+    """
+    from .snapshots import write_checkpoint
+
+    cutoff = month_start(before)
+    oldest = StockMovement.objects.filter(movement_date__lt=cutoff).aggregate(first=Min('movement_date'))['first']
+    if oldest is None:
+        return []
+
+    segments = []
+    start = month_start(timezone.localtime(oldest).date())
+    while start < cutoff:
+        end = next_month(start)
+        write_checkpoint(end - timedelta(microseconds=1))
+        segment = archive_month(start, end)
+        if segment:
+            segments.append(segment)
+        start = end
+
+    return segments
+
+
+def overlapping_segments(start=None, end=None, newest_first=True):
+    "segments holding movements in [start, end], newest month first (parts of a month in part order)"
+    segments = MovementArchiveSegment.objects.all()
+    if start:
+        segments = segments.filter(last_movement_date__gte=start)
+    if end:
+        segments = segments.filter(first_movement_date__lte=end)
+    return segments.order_by('-month' if newest_first else 'month', 'part')
+
+
+def read_segment(segment):
+    "rows of a segment in (movement date, id) order"
+    with gzip.open(segment_file(segment), 'rt', encoding='utf-8') as lines:
+        for line in lines:
+            row = json.loads(line)
+            for field in DECIMAL_FIELDS:
+                row[field] = Decimal(row[field])
+            for field in DATETIME_FIELDS:
+                row[field] = parse_datetime(row[field]) if row[field] else None
+            yield row
+
+
+def row_order(row):
+    return row['movement_date'], row['id']
+
+
+def iter_archived_rows(start=None, end=None, movement_type='', warehouse_id='', product_id='', newest_first=True):
+    """
+    Archived movement rows matching the report filters in (movement_date, id) order,
+    newest first unless newest_first is False. Reads only the segments overlapping
+    [start, end]; callers skip this entirely for ranges that start after the archived
+    periods. A month archived again (a backdated posting after its first run) has
+    parts whose dates overlap, they are merged. Oldest first streams the rows,
+    newest first holds the matching rows of one month at a time.
+    """
+    warehouse_id = int(warehouse_id) if warehouse_id else None
+    product_id = int(product_id) if product_id else None
+
+    def matching(segment):
+        for row in read_segment(segment):
+            if start and row['movement_date'] < start:
+                continue
+            if end and row['movement_date'] > end:
+                continue
+            if movement_type and row['movement_type'] != movement_type:
+                continue
+            if product_id and row['product_id'] != product_id:
+                continue
+            if warehouse_id and warehouse_id not in (row['from_warehouse_id'], row['to_warehouse_id']):
+                continue
+            yield row
+
+    for month, parts in groupby(overlapping_segments(start, end, newest_first), key=lambda segment: segment.month):
+        rows = heapq.merge(*(matching(segment) for segment in parts), key=row_order)
+        if newest_first:
+            yield from reversed(list(rows))
+        else:
+            yield from rows
+
+
+@dataclass
+class ArchiveSummary:
+    "counts and total amount of archived rows, with the newest rows for display"
+    count: int = 0
+    total_amount: Decimal = Decimal('0')
+    type_counts: Counter = field(default_factory=Counter)
+    newest: list = field(default_factory=list)
+
+
+def summarize_archived_rows(rows, keep=100):
+    """
+    ArchiveSummary of rows given oldest first (iter_archived_rows(newest_first=False)),
+    holding only the newest keep rows, newest first, so a long range is read in
+    constant memory.
+    """
+    summary = ArchiveSummary()
+    newest = deque(maxlen=keep)
+    for row in rows:
+        summary.count += 1
+        summary.total_amount += row['total_amount']
+        summary.type_counts[row['movement_type']] += 1
+        newest.append(row)
+    summary.newest = list(reversed(newest))
+    return summary
+
+
+def build_movements(rows):
+    """
+    Unsaved StockMovement instances for archived rows, with product, warehouses and
+    user attached from bulk lookups (stand-ins built from the stored names when the
+    referenced rows no longer exist), so templates and exports treat them like live rows.
+    """
+    rows = list(rows)
+    products = Product.objects.in_bulk({row['product_id'] for row in rows})
+    warehouses = Warehouse.objects.in_bulk(
+        {row['from_warehouse_id'] for row in rows if row['from_warehouse_id']} |
+        {row['to_warehouse_id'] for row in rows if row['to_warehouse_id']}
+    )
+    users = User.objects.in_bulk({row['recorded_by_id'] for row in rows if row['recorded_by_id']})
+
+    movements = []
+    for row in rows:
+        movement = StockMovement(
+            id=row['id'],
+            reference_number=row['reference_number'],
+            movement_type=row['movement_type'],
+            transaction_type=row['transaction_type'],
+            quantity=row['quantity'],
+            unit_price=row['unit_price'],
+            total_amount=row['total_amount'],
+            batch_number=row['batch_number'],
+            expiry_date=row['expiry_date'],
+            party_name=row['party_name'],
+            notes=row['notes'],
+            reason=row['reason'],
+            movement_date=row['movement_date'],
+            created_at=row['created_at'],
+        )
+        movement.product = products.get(row['product_id']) or Product(
+            id=row['product_id'], name=row['product__name'], sku=row['product__sku'], unit=row['product__unit']
+        )
+        for side in ('from', 'to'):
+            warehouse_id = row[f'{side}_warehouse_id']
+            if warehouse_id:
+                setattr(movement, f'{side}_warehouse', warehouses.get(warehouse_id) or Warehouse(
+                    id=warehouse_id, name=row[f'{side}_warehouse__name'], code=row[f'{side}_warehouse__code']
+                ))
+        movement.recorded_by = users.get(row['recorded_by_id'])
+        movement.is_archived = True
+        movements.append(movement)
+
+    return movements
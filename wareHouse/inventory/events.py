@@ -0,0 +1,188 @@
+"""
+Consumers for the InventoryEvent outbox.
+
+Handlers are plain callables taking a list of InventoryEvent rows (in id order),
+registered by name in settings.INVENTORY_EVENT_HANDLERS. Every handler is its own
+consumer with a persisted offset in EventConsumerOffset, so a slow or failing
+handler never holds the others back. A consumer can also have a sweep in
+settings.INVENTORY_EVENT_SWEEPS, for work that depends on time rather than on
+new events, which consume_inventory_events runs every INVENTORY_EVENT_SWEEP_SECONDS.
+
+Ids are handed out when a row is inserted, not when its transaction commits, so a
+long posting can commit ids below events a consumer has already read. The offset
+therefore keeps the gaps: ids below last_event_id the consumer has not seen. Each
+batch reads the gaps again along with the new events, and a gap is only given up
+after INVENTORY_EVENT_GAP_SECONDS (a rolled back posting never fills it). Events
+from a gap reach the handler after higher ids, which the handlers do not mind.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.module_loading import import_string
+
+from .models import InventoryEvent, EventConsumerOffset
+
+logger = logging.getLogger(__name__)
+
+
+def log_events(events):
+    "default handler - log every event"
+    for event in events:
+        logger.info('inventory event %s', event)
+
+
+def get_handlers(names=None):
+    "load configured handlers, optionally limited to the given consumer names"
+    configured = settings.INVENTORY_EVENT_HANDLERS
+    if names:
+        unknown = set(names) - set(configured)
+        if unknown:
+            raise ValueError(f"Unknown inventory event consumers: {', '.join(sorted(unknown))}")
+        configured = {name: configured[name] for name in names}
+
+    return {name: import_string(path) for name, path in configured.items()}
+
+
+def get_sweeps(names=None):
+    "time-based sweeps (settings.INVENTORY_EVENT_SWEEPS) of the given consumers, or all"
+    configured = settings.INVENTORY_EVENT_SWEEPS
+    if names:
+        configured = {name: path for name, path in configured.items() if name in names}
+    return {name: import_string(path) for name, path in configured.items()}
+
+
+def inventory_version(warehouse_id=None, product_id=None):
+    """
+    id of the last event (of one warehouse or product when given), 0 before the
+    first. Every posting appends events, so the version moves whenever stock does.
+    """
+    events = InventoryEvent.objects.all()
+    if warehouse_id is not None:
+        events = events.filter(warehouse_id=warehouse_id)
+    if product_id is not None:
+        events = events.filter(product_id=product_id)
+    return events.aggregate(last=Max('pk'))['last'] or 0
+
+
+def missing_ranges(ids, first, last):
+    "[first id, last id] ranges between first and last (inclusive) not in ids, which are sorted"
+    ranges = []
+    expected = first
+    for pk in ids:
+        if pk > last:
+            break
+        if pk > expected:
+            ranges.append([expected, pk - 1])
+        expected = max(expected, pk + 1)
+    if expected <= last:
+        ranges.append([expected, last])
+    return ranges
+
+
+def pending_ids(last_event_id, gaps):
+    "Q for the ids after last_event_id and the ids in the [first, last, seen] gaps (any id ordered outbox)"
+    pending = Q(pk__gt=last_event_id)
+    for first, last, seen in gaps:
+        pending |= Q(pk__range=(first, last))
+    return pending
+
+
+def advance_offset(last_event_id, gaps, ids, full, now):
+    """
+    (last id, gaps) after reading ids (sorted) from pending_ids(last_event_id,
+    gaps), full when the read hit its limit: it has not looked past its last id.
+    Ids skipped on the way become gaps first seen now.
+    """
+    # a full batch has not read past its last id yet
+    read_until = ids[-1] if full else None
+    remaining = []
+    for first, last, seen in gaps:
+        if read_until is not None and read_until < first:
+            remaining.append([first, last, seen])
+            continue
+        until = last if read_until is None else min(last, read_until)
+        remaining += [[start, end, seen] for start, end in missing_ranges(ids, first, until)]
+        if until < last:
+            remaining.append([until + 1, last, seen])
+
+    new_ids = [pk for pk in ids if pk > last_event_id]
+    if new_ids:
+        remaining += [[start, end, now.isoformat()] for start, end in missing_ranges(new_ids, last_event_id + 1, new_ids[-1])]
+        last_event_id = new_ids[-1]
+    return last_event_id, remaining
+
+
+def consume_batch(consumer, handler, batch_size=500):
+    """
+    Hand the next batch of events of the consumer (its gaps, then the events after
+    its offset) to the handler and acknowledge the whole batch with one offset
+    update, in the same transaction as the handler's writes. Returns the number
+    of events acknowledged; on failure the offset and the handler's writes are
+    rolled back.
+    """
+    EventConsumerOffset.objects.get_or_create(consumer=consumer)
+    with transaction.atomic():
+        now = timezone.now()
+        # writing first takes the row lock (the database lock on SQLite, which cannot
+        # upgrade a read transaction that another writer raced): one worker per
+        # consumer at a time
+        EventConsumerOffset.objects.filter(consumer=consumer).update(updated_at=now)
+        offset = EventConsumerOffset.objects.get(consumer=consumer)
+
+        given_up = now - timedelta(seconds=settings.INVENTORY_EVENT_GAP_SECONDS)
+        gaps = []
+        for first, last, seen in offset.gaps:
+            if parse_datetime(seen) < given_up:
+                logger.warning('inventory event consumer %s stopped waiting for events %s-%s', consumer, first, last)
+            else:
+                gaps.append([first, last, seen])
+
+        events = list(InventoryEvent.objects.filter(pending_ids(offset.last_event_id, gaps)).order_by('pk')[:batch_size])
+        if not events and gaps == offset.gaps:
+            return 0
+
+        last_event_id, remaining = advance_offset(
+            offset.last_event_id, gaps, [event.pk for event in events], len(events) == batch_size, now
+        )
+
+        if events:
+            handler(events)
+
+        EventConsumerOffset.objects.filter(pk=offset.pk).update(
+            last_event_id=last_event_id,
+            gaps=remaining,
+            updated_at=now,
+        )
+    return len(events)
+
+
+def consume_in_thread(consumer, handler, batch_size):
+    "consume_batch for a worker thread, closing the connections the thread opened"
+    try:
+        return consume_batch(consumer, handler, batch_size)
+    finally:
+        connections.close_all()
+
+
+def consume(handlers, batch_size=500, workers=4):
+    "run one batch for every consumer in a thread pool, returns {consumer: acknowledged}"
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            name: pool.submit(consume_in_thread, name, handler, batch_size)
+            for name, handler in handlers.items()
+        }
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception:
+                logger.exception('inventory event consumer %s failed', name)
+                results[name] = 0
+
+    return results
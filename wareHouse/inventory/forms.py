@@ -1,28 +1,36 @@
 from django import forms
 from django.utils import timezone
-from .models import Inventory, StockMovement
+from .widgets import AutocompleteSelect
+from .models import Inventory, StockMovement, StockTake
 from products.models import Product
 from warehouses.models import Warehouse, StorageLocation
 from datetime import timedelta
+from uuid import uuid4
 
 
 class StockInForm(forms.ModelForm):
     "form for recording incoming stock"
 
+    # retried submissions carry the same key so the movement is only posted once
+    idempotency_key = forms.CharField(required=False, widget=forms.HiddenInput, initial=lambda: uuid4().hex)
+
     class Meta:
         model = StockMovement
         fields = '__all__'
 
         widgets = {
-            'product':forms.Select(attrs={
+            'recorded_by':AutocompleteSelect('inventory:user_autocomplete', attrs={
+                'class':'form-select'
+            }),
+            'product':AutocompleteSelect('inventory:product_autocomplete', attrs={
                 'class':'form-select',
                 'required':True
             }),
-            'to_warehouse':forms.Select(attrs={
+            'to_warehouse':AutocompleteSelect('inventory:warehouse_autocomplete', attrs={
                 'class':'form-select',
                 'required':True
             }),
-            'to_location':forms.Select(attrs={
+            'to_location':AutocompleteSelect('inventory:location_autocomplete', depends_on='to_warehouse', attrs={
                 'class':'form-select',
                 'required':True
             }),
@@ -92,20 +100,26 @@ class StockInForm(forms.ModelForm):
 class StockOutForm(forms.ModelForm):
     "form for recording outgoing stock (sales, wastage, damage)"
 
+    # retried submissions carry the same key so the movement is only posted once
+    idempotency_key = forms.CharField(required=False, widget=forms.HiddenInput, initial=lambda: uuid4().hex)
+
     class Meta:
         model = StockMovement
         fields = '__all__'
 
         widgets = {
-            'product':forms.Select(attrs={
+            'recorded_by':AutocompleteSelect('inventory:user_autocomplete', attrs={
+                'class':'form-select'
+            }),
+            'product':AutocompleteSelect('inventory:product_autocomplete', attrs={
                 'class':'form-select',
                 'required':True
             }),
-            'from_warehouse':forms.Select(attrs={
+            'from_warehouse':AutocompleteSelect('inventory:warehouse_autocomplete', attrs={
                 'class':'form-select',
                 'required':True
             }),
-            'from_location':forms.Select(attrs={
+            'from_location':AutocompleteSelect('inventory:location_autocomplete', depends_on='from_warehouse', attrs={
                 'class':'form-select',
                 'required':True
             }),
@@ -164,28 +178,34 @@ class StockOutForm(forms.ModelForm):
 class StockTransferForm(forms.ModelForm):
     "form for transferring stock between warehouses"
 
+    # retried submissions carry the same key so the movement is only posted once
+    idempotency_key = forms.CharField(required=False, widget=forms.HiddenInput, initial=lambda: uuid4().hex)
+
     class Meta:
         model = StockMovement
         fields = '__all__'
 
         widgets = {
-            'product':forms.Select(attrs={
+            'recorded_by':AutocompleteSelect('inventory:user_autocomplete', attrs={
+                'class':'form-select'
+            }),
+            'product':AutocompleteSelect('inventory:product_autocomplete', attrs={
                 'class':'form-select',
                 'required':True
             }),
-            'from_warehouse':forms.Select(attrs={
+            'from_warehouse':AutocompleteSelect('inventory:warehouse_autocomplete', attrs={
                 'class':'form-select',
                 'required':True
             }),
-            'from_location':forms.Select(attrs={
+            'from_location':AutocompleteSelect('inventory:location_autocomplete', depends_on='from_warehouse', attrs={
                 'class':'form-select',
                 'required':True
             }),
-            'to_warehouse':forms.Select(attrs={
+            'to_warehouse':AutocompleteSelect('inventory:warehouse_autocomplete', attrs={
                 'class':'form-select',
                 'required':True
             }),
-            'to_location':forms.Select(attrs={
+            'to_location':AutocompleteSelect('inventory:location_autocomplete', depends_on='to_warehouse', attrs={
                 'class':'form-select',
                 'required':True
             }),
@@ -243,20 +263,26 @@ class StockTransferForm(forms.ModelForm):
 class StockAdjustmentForm(forms.ModelForm):
     "form for adjusting stock quantity"
 
+    # retried submissions carry the same key so the movement is only posted once
+    idempotency_key = forms.CharField(required=False, widget=forms.HiddenInput, initial=lambda: uuid4().hex)
+
     class Meta:
         model = StockMovement
         fields = '__all__'
 
         widgets = {
-            'product':forms.Select(attrs={
+            'recorded_by':AutocompleteSelect('inventory:user_autocomplete', attrs={
+                'class':'form-select'
+            }),
+            'product':AutocompleteSelect('inventory:product_autocomplete', attrs={
                 'class':'form-select',
                 'required':True
             }),
-            'to_warehouse':forms.Select(attrs={
+            'to_warehouse':AutocompleteSelect('inventory:warehouse_autocomplete', attrs={
                 'class':'form-select',
                 'required':True
             }),
-            'to_location':forms.Select(attrs={
+            'to_location':AutocompleteSelect('inventory:location_autocomplete', depends_on='to_warehouse', attrs={
                 'class':'form-select',
                 'required':True
             }),
@@ -284,8 +310,8 @@ class StockAdjustmentForm(forms.ModelForm):
                 'class':'form-control',
                 'placeholder':'Adjustment Note'
             }),
-            'reason':forms.Select(attrs={
-                'class':'form-select',
+            'reason':forms.TextInput(attrs={
+                'class':'form-control',
                 'placeholder':'Adjustment Reason',
                 'required':True
             }),
@@ -301,4 +327,35 @@ class StockAdjustmentForm(forms.ModelForm):
             instance.save()
         return instance
 
-        
+
+class StockTakeForm(forms.ModelForm):
+    "open a stock take for a warehouse"
+
+    class Meta:
+        model = StockTake
+        fields = ['warehouse', 'notes']
+
+        widgets = {
+            'warehouse':forms.Select(attrs={
+                'class':'form-select',
+                'required':True
+            }),
+            'notes':forms.Textarea(attrs={
+                'class':'form-control',
+                'rows':3,
+                'placeholder':'Scope or instructions for the counters'
+            }),
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['warehouse'].queryset = Warehouse.objects.filter(is_active=True)
+
+
+class StockTakeUploadForm(forms.Form):
+    "count sheet upload: sku, batch_number, location, counted_quantity"
+
+    file = forms.FileField(widget=forms.ClearableFileInput(attrs={
+        'class':'form-control',
+        'accept':'.csv'
+    }))
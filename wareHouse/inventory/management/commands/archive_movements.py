@@ -0,0 +1,28 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from inventory.archive import archive_movements
+
+
+class Command(BaseCommand):
+    help = 'Move StockMovement rows of closed months into gzip JSONL archive segments'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--before',
+            required=True,
+            help='archive every whole month before the month of this date (YYYY-MM-DD)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            before = datetime.strptime(options['before'], '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError('--before must be a date in YYYY-MM-DD format')
+
+        segments = archive_movements(before)
+        for segment in segments:
+            self.stdout.write(f'{segment.month:%Y-%m}: {segment.row_count} movements -> {segment.path}')
+
+        total = sum(segment.row_count for segment in segments)
+        self.stdout.write(self.style.SUCCESS(f'✓ Archived {total} movements in {len(segments)} segments'))
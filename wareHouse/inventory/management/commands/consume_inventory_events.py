@@ -0,0 +1,48 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from inventory.events import get_handlers, get_sweeps, consume
+
+
+class Command(BaseCommand):
+    help = 'Dispatch InventoryEvent outbox rows to the configured handlers and run their time-based sweeps'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--consumer', action='append', dest='consumers', help='only run this consumer (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=500, help='events acknowledged per batch')
+        parser.add_argument('--workers', type=int, default=4, help='thread pool size')
+        parser.add_argument('--loop', action='store_true', help='keep polling for new events')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='seconds to sleep when idle')
+
+    def handle(self, *args, **options):
+        try:
+            handlers = get_handlers(options['consumers'])
+            sweeps = get_sweeps(options['consumers'])
+        except (ValueError, ImportError) as e:
+            raise CommandError(str(e))
+
+        next_sweep = 0
+        while True:
+            results = consume(handlers, batch_size=options['batch_size'], workers=options['workers'])
+            consumed = sum(results.values())
+
+            if consumed:
+                summary = ', '.join(f'{name}: {count}' for name, count in results.items())
+                self.stdout.write(f'Acknowledged {consumed} events ({summary})')
+
+            # a cron run sweeps once, a loop every INVENTORY_EVENT_SWEEP_SECONDS
+            if time.monotonic() >= next_sweep:
+                for name, sweep in sweeps.items():
+                    try:
+                        self.stdout.write(f'Swept {name}: {sweep()}')
+                    except Exception as e:
+                        self.stderr.write(self.style.ERROR(f'Sweep of {name} failed: {e}'))
+                next_sweep = time.monotonic() + settings.INVENTORY_EVENT_SWEEP_SECONDS
+
+            if not options['loop']:
+                break
+            if not consumed:
+                time.sleep(options['poll_interval'])
+
+        self.stdout.write(self.style.SUCCESS('✓ Inventory events consumed'))
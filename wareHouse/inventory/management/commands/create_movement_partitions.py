@@ -0,0 +1,45 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from inventory.partitioning import ensure_partitions, is_partitioned
+
+
+class Command(BaseCommand):
+    help = 'Create monthly StockMovement partitions ahead of time (PostgreSQL only, run monthly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months',
+            type=int,
+            default=3,
+            help='number of months to create starting with --from (default 3)'
+        )
+        parser.add_argument(
+            '--from',
+            dest='from_month',
+            help='first month to create (YYYY-MM), defaults to the current month'
+        )
+
+    def handle(self, *args, **options):
+        if not is_partitioned(connection):
+            self.stdout.write(self.style.WARNING('Stock movements are only partitioned on PostgreSQL, nothing to do'))
+            return
+
+        if options['from_month']:
+            try:
+                first_day = datetime.strptime(options['from_month'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError('--from must be a month in YYYY-MM format')
+        else:
+            first_day = timezone.localdate()
+
+        if options['months'] < 1:
+            raise CommandError('--months must be at least 1')
+
+        created = ensure_partitions(first_day, options['months'])
+        for name in created:
+            self.stdout.write(f'Created partition {name}')
+
+        self.stdout.write(self.style.SUCCESS(f'✓ {len(created)} partitions created, {options["months"] - len(created)} already existed'))
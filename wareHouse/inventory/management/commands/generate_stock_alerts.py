@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from inventory.alerts import run_alert_engine
+
+
+class Command(BaseCommand):
+    help = 'Create, dedupe and resolve stock alerts for inventory changed since the last run'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='re-evaluate every inventory record')
+        parser.add_argument('--batch-size', type=int, default=1000, help='events read per batch')
+
+    def handle(self, *args, **options):
+        stats = run_alert_engine(full=options['full'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Stock alerts updated: {stats['created']} created, {stats['resolved']} resolved "
+            f"({stats['events']} events)"
+        ))
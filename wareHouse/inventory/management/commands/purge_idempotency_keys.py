@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from inventory.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = 'Delete stock movement idempotency keys past their TTL'
+
+    def handle(self, *args, **kwargs):
+        deleted = IdempotencyKey.purge_expired()
+        self.stdout.write(self.style.SUCCESS(f'✓ Purged {deleted} expired idempotency keys'))
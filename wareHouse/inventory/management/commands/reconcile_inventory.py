@@ -0,0 +1,60 @@
+import csv
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from django.utils import timezone
+from inventory.reconciliation import product_shards, init_worker, reconcile_shard, recheck, post_corrections
+
+
+class Command(BaseCommand):
+    help = 'Recompute balances from the StockMovement ledger and report differences with Inventory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='worker processes')
+        parser.add_argument('--shards', type=int, default=None, help='product id shards (default 4 per worker)')
+        parser.add_argument('--output', help='CSV diff report path (default reconcile_<timestamp>.csv)')
+        parser.add_argument('--fix', action='store_true', help='post corrective adjustment movements')
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        as_of = timezone.now()
+        shards = product_shards(options['shards'] or workers * 4)
+        output = options['output'] or f"reconcile_{as_of:%Y%m%d_%H%M%S}.csv"
+
+        # workers must not share the parent's connection
+        connections.close_all()
+
+        found = []
+        for done, shard_diffs in enumerate(self.run_shards(shards, as_of, workers), 1):
+            found.extend(shard_diffs)
+            self.stdout.write(f'Shard {done}/{len(shards)}: {len(shard_diffs)} differences')
+
+        # postings made while the shards ran are not differences
+        with transaction.atomic():
+            diffs = recheck(found)
+        if len(diffs) != len(found):
+            self.stdout.write(f'{len(found) - len(diffs)} differences cleared by postings made during the run')
+
+        with open(output, 'w', newline='') as report:
+            writer = csv.writer(report)
+            writer.writerow(['Product ID', 'Warehouse ID', 'Batch Number', 'Inventory ID', 'Ledger Quantity', 'Inventory Quantity', 'Difference'])
+            for product_id, warehouse_id, batch_number, inventory_id, expected, actual in diffs:
+                writer.writerow([product_id, warehouse_id, batch_number, inventory_id or '', expected, actual, actual - expected])
+
+        self.stdout.write(f'{len(diffs)} differences written to {output}')
+
+        if options['fix'] and diffs:
+            posted = post_corrections(diffs)
+            self.stdout.write(f'Posted {posted} corrective adjustments')
+
+        self.stdout.write(self.style.SUCCESS('✓ Reconciliation complete'))
+
+    def run_shards(self, shards, as_of, workers):
+        "differences of each shard as it completes"
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+            futures = [pool.submit(partial(reconcile_shard, shard, as_of)) for shard in shards]
+            for future in as_completed(futures):
+                yield future.result()
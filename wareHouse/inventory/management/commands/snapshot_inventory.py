@@ -0,0 +1,35 @@
+from datetime import datetime, time, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from inventory.snapshots import rebuild_stale_checkpoints, write_checkpoint
+
+
+class Command(BaseCommand):
+    help = 'Write an InventorySnapshot checkpoint of ledger balances (run nightly or monthly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--as-of',
+            help='checkpoint the end of this day (YYYY-MM-DD), defaults to the end of yesterday'
+        )
+
+    def handle(self, *args, **options):
+        if options['as_of']:
+            try:
+                day = datetime.strptime(options['as_of'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('--as-of must be a date in YYYY-MM-DD format')
+        else:
+            # only checkpoint closed days so late postings for today are not missed
+            day = timezone.localdate() - timedelta(days=1)
+
+        # checkpoints a backdated posting made stale first, the new one starts from them
+        rebuilt = rebuild_stale_checkpoints()
+        if rebuilt:
+            self.stdout.write(f'{rebuilt} stale checkpoints rebuilt')
+
+        as_of = timezone.make_aware(datetime.combine(day, time.max))
+        count = write_checkpoint(as_of)
+
+        self.stdout.write(self.style.SUCCESS(f'✓ Checkpoint {as_of:%Y-%m-%d %H:%M} written with {count} balances'))
@@ -0,0 +1,51 @@
+# Generated by Django 6.0.1 on 2026-10-18 22:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0004_idempotencykey'),
+        ('products', '0002_rename_shelf_life_product_shelf_life_days'),
+        ('warehouses', '0002_alter_warehouse_manager'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventConsumerOffset',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('consumer', models.CharField(max_length=100, unique=True)),
+                ('last_event_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Event Consumer Offset',
+                'verbose_name_plural': 'Event Consumer Offsets',
+                'ordering': ['consumer'],
+            },
+        ),
+        migrations.CreateModel(
+            name='InventoryEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(choices=[('stock_changed', 'Stock Changed')], max_length=30)),
+                ('reference_number', models.CharField(blank=True, help_text='reference number of the movement', max_length=100)),
+                ('quantity_delta', models.DecimalField(decimal_places=2, help_text='signed change in quantity', max_digits=10)),
+                ('quantity_after', models.DecimalField(decimal_places=2, help_text='inventory quantity after the change', max_digits=10)),
+                ('payload', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('inventory', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='events', to='inventory.inventory')),
+                ('movement', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='events', to='inventory.stockmovement')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inventory_events', to='products.product')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inventory_events', to='warehouses.warehouse')),
+            ],
+            options={
+                'verbose_name': 'Inventory Event',
+                'verbose_name_plural': 'Inventory Events',
+                'ordering': ['id'],
+            },
+        ),
+    ]
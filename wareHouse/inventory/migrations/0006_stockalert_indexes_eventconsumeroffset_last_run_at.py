@@ -0,0 +1,28 @@
+# Generated by Django 6.0.1 on 2026-10-18 22:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_inventoryevent_eventconsumeroffset'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventconsumeroffset',
+            name='last_run_at',
+            field=models.DateTimeField(blank=True, help_text='last time a time-based sweep ran for this consumer', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='stockalert',
+            index=models.Index(fields=['inventory', 'status'], name='inventory_s_invento_121148_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockalert',
+            index=models.Index(fields=['alert_type', 'status'], name='inventory_s_alert_t_938177_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 6.0.1 on 2026-10-18 23:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_stockalert_indexes_eventconsumeroffset_last_run_at'),
+        ('products', '0002_rename_shelf_life_product_shelf_life_days'),
+        ('warehouses', '0002_alter_warehouse_manager'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventorySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('batch_number', models.CharField(blank=True, default='', max_length=100)),
+                ('quantity', models.DecimalField(decimal_places=2, help_text='ledger balance at as_of', max_digits=12)),
+                ('as_of', models.DateTimeField(help_text='balances include every movement up to this moment')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inventory_snapshots', to='products.product')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inventory_snapshots', to='warehouses.warehouse')),
+            ],
+            options={
+                'verbose_name': 'Inventory Snapshot',
+                'verbose_name_plural': 'Inventory Snapshots',
+                'ordering': ['-as_of', 'product', 'warehouse'],
+                'indexes': [models.Index(fields=['as_of'], name='inventory_i_as_of_5d0d5d_idx')],
+                'unique_together': {('as_of', 'product', 'warehouse', 'batch_number')},
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0.1 on 2026-10-18 23:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0007_inventorysnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovementArchiveSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='first day of the archived month')),
+                ('part', models.PositiveIntegerField(default=1)),
+                ('path', models.CharField(help_text='file path relative to MOVEMENT_ARCHIVE_DIR', max_length=500)),
+                ('row_count', models.PositiveIntegerField(default=0)),
+                ('first_movement_date', models.DateTimeField()),
+                ('last_movement_date', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Movement Archive Segment',
+                'verbose_name_plural': 'Movement Archive Segments',
+                'ordering': ['-month', '-part'],
+                'indexes': [models.Index(fields=['first_movement_date', 'last_movement_date'], name='inventory_m_first_m_1f260e_idx')],
+                'unique_together': {('month', 'part')},
+            },
+        ),
+    ]
@@ -0,0 +1,151 @@
+# Generated by Django 6.0.1 on 2026-10-18 23:07
+
+from datetime import datetime, time, timedelta
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.migrations.exceptions import IrreversibleError
+from django.utils import timezone
+
+TABLE = 'inventory_stockmovement'
+DEFAULT_PARTITION = f'{TABLE}_default'
+REFERENCES = f'{TABLE}_reference'
+
+# months created ahead of the newest movement, create_movement_partitions keeps extending them
+PARTITIONS_AHEAD = 3
+
+# the helpers below are frozen copies of inventory.archive / inventory.partitioning as of this migration
+
+def month_start(day):
+    return timezone.make_aware(datetime.combine(day.replace(day=1), time.min))
+
+
+def next_month(start):
+    return month_start((start.date() + timedelta(days=32)).replace(day=1))
+
+
+def create_partition(cursor, month):
+    name = f'{TABLE}_y{month:%Y}m{month:%m}'
+    start, end = month.isoformat(), next_month(month).isoformat()
+    cursor.execute(f"CREATE TABLE {name} PARTITION OF {TABLE} FOR VALUES FROM ('{start}') TO ('{end}')")
+    cursor.execute(f'CREATE INDEX {name}_date_brin ON {name} USING brin (movement_date)')
+
+
+def create_default_partition(cursor):
+    cursor.execute(f'CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT')
+    cursor.execute(f'CREATE INDEX {DEFAULT_PARTITION}_date_brin ON {DEFAULT_PARTITION} USING brin (movement_date)')
+
+
+def create_reference_registry(cursor):
+    """
+    reference_number can no longer be unique on the partitioned table (keys must
+    include movement_date), so a trigger reserves every reference in a plain
+    table whose primary key keeps it unique across all partitions
+    """
+    cursor.execute(f'CREATE TABLE {REFERENCES} (reference_number varchar(100) PRIMARY KEY)')
+    cursor.execute(f'INSERT INTO {REFERENCES} SELECT reference_number FROM {TABLE}')
+    cursor.execute(f'''
+        CREATE FUNCTION {REFERENCES}_reserve() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                DELETE FROM {REFERENCES} WHERE reference_number = OLD.reference_number;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO {REFERENCES} (reference_number) VALUES (NEW.reference_number);
+                RETURN NEW;
+            END IF;
+            RETURN OLD;
+        END
+        $$ LANGUAGE plpgsql
+    ''')
+    cursor.execute(
+        f'CREATE TRIGGER {REFERENCES}_reserve AFTER INSERT OR DELETE OR UPDATE OF reference_number '
+        f'ON {TABLE} FOR EACH ROW EXECUTE FUNCTION {REFERENCES}_reserve()'
+    )
+
+
+def partition_stock_movements(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+
+    old = f'{TABLE}_unpartitioned'
+    with connection.cursor() as cursor:
+        # indexes, unique constraints and foreign keys are recreated on the partitioned table under the same names
+        cursor.execute(
+            'SELECT pg_get_indexdef(x.indexrelid) FROM pg_index x '
+            'WHERE x.indrelid = to_regclass(%s) AND NOT x.indisunique', [TABLE]
+        )
+        indexes = [row[0] for row in cursor.fetchall()]
+        cursor.execute(
+            'SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint '
+            "WHERE conrelid = to_regclass(%s) AND contype IN ('f', 'u')", [TABLE]
+        )
+        constraints = cursor.fetchall()
+
+        cursor.execute(f'ALTER TABLE {TABLE} RENAME TO {old}')
+        cursor.execute(
+            f'CREATE TABLE {TABLE} (LIKE {old} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+            'PARTITION BY RANGE (movement_date)'
+        )
+
+        cursor.execute(f'SELECT min(movement_date), max(movement_date), max(id) FROM {old}')
+        first, last, last_id = cursor.fetchone()
+        now = timezone.now()
+        month = month_start(timezone.localtime(min(first or now, now)).date())
+        stop = month_start(timezone.localtime(max(last or now, now)).date())
+        for _ in range(PARTITIONS_AHEAD):
+            stop = next_month(stop)
+
+        create_default_partition(cursor)
+        while month <= stop:
+            create_partition(cursor, month)
+            month = next_month(month)
+
+        cursor.execute(f'INSERT INTO {TABLE} SELECT * FROM {old}')
+        cursor.execute(f'DROP TABLE {old}')
+
+        # the identity sequence went with the old table
+        cursor.execute(f'CREATE SEQUENCE {TABLE}_id_seq OWNED BY {TABLE}.id')
+        cursor.execute(f"SELECT setval('{TABLE}_id_seq', %s, %s)", [last_id or 1, last_id is not None])
+        cursor.execute(f"ALTER TABLE {TABLE} ALTER COLUMN id SET DEFAULT nextval('{TABLE}_id_seq')")
+
+        # keys on a partitioned table must include the partition key,
+        # reference_number stays globally unique through the registry instead
+        cursor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_pkey PRIMARY KEY (id, movement_date)')
+        for name, kind, definition in constraints:
+            if definition == 'UNIQUE (reference_number)':
+                continue
+            if kind == 'u':
+                definition = definition.replace(')', ', movement_date)', 1)
+            cursor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT {name} {definition}')
+        for definition in indexes:
+            cursor.execute(definition)
+
+        create_reference_registry(cursor)
+
+
+def unpartition_stock_movements(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        raise IrreversibleError('stock movement partitioning cannot be reversed')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0008_movementarchivesegment'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='idempotencykey',
+            name='movement',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='idempotency_keys', to='inventory.stockmovement'),
+        ),
+        migrations.AlterField(
+            model_name='inventoryevent',
+            name='movement',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='events', to='inventory.stockmovement'),
+        ),
+        migrations.RunPython(partition_stock_movements, unpartition_stock_movements),
+    ]
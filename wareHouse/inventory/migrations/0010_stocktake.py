@@ -0,0 +1,69 @@
+# Generated by Django 6.0.1 on 2026-10-18 23:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0009_partition_stockmovement'),
+        ('products', '0002_rename_shelf_life_product_shelf_life_days'),
+        ('warehouses', '0002_alter_warehouse_manager'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockTake',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reference_number', models.CharField(help_text='e.g., ST-20240101-0001', max_length=50, unique=True)),
+                ('status', models.CharField(choices=[('open', 'Open'), ('posted', 'Posted'), ('cancelled', 'Cancelled')], default='open', max_length=20)),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('opened_at', models.DateTimeField(auto_now_add=True, help_text='expected quantities are frozen at this moment')),
+                ('posted_at', models.DateTimeField(blank=True, null=True)),
+                ('opened_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='opened_stock_takes', to=settings.AUTH_USER_MODEL)),
+                ('posted_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='posted_stock_takes', to=settings.AUTH_USER_MODEL)),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='stock_takes', to='warehouses.warehouse')),
+            ],
+            options={
+                'verbose_name': 'Stock Take',
+                'verbose_name_plural': 'Stock Takes',
+                'ordering': ['-opened_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockTakeLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('batch_number', models.CharField(blank=True, default='', max_length=100)),
+                ('expected_quantity', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('counted_quantity', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('variance', models.DecimalField(blank=True, decimal_places=2, help_text='counted - expected, computed in bulk after each count upload', max_digits=12, null=True)),
+                ('counted_at', models.DateTimeField(blank=True, null=True)),
+                ('inventory', models.ForeignKey(blank=True, help_text='balance the line was frozen from, empty for stock found during the count', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_take_lines', to='inventory.inventory')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_take_lines', to='products.product')),
+                ('stock_take', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='inventory.stocktake')),
+                ('storage_location', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_take_lines', to='warehouses.storagelocation')),
+            ],
+            options={
+                'verbose_name': 'Stock Take Line',
+                'verbose_name_plural': 'Stock Take Lines',
+                'ordering': ['stock_take', 'product'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='stocktake',
+            index=models.Index(fields=['warehouse', 'status'], name='inventory_s_warehou_5e76bc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stocktakeline',
+            index=models.Index(fields=['stock_take', 'variance'], name='inventory_s_stock_t_786739_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='stocktakeline',
+            unique_together={('stock_take', 'product', 'batch_number')},
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 6.0.1 on 2026-10-18 23:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import TruncDate
+
+
+def populate(apps, schema_editor):
+    "count the OUT movements so far and start the pick_counts consumer after the existing events"
+    StockMovement = apps.get_model('inventory', 'StockMovement')
+    PickCount = apps.get_model('inventory', 'PickCount')
+    InventoryEvent = apps.get_model('inventory', 'InventoryEvent')
+    EventConsumerOffset = apps.get_model('inventory', 'EventConsumerOffset')
+
+    totals = StockMovement.objects.filter(
+        movement_type='out', from_warehouse__isnull=False
+    ).values_list('product_id', 'from_warehouse_id', TruncDate('movement_date')).annotate(
+        picks=Count('id'), total=Sum('quantity')
+    ).order_by()
+    PickCount.objects.bulk_create([
+        PickCount(product_id=product_id, warehouse_id=warehouse_id, day=day, picks=picks, quantity=total)
+        for product_id, warehouse_id, day, picks, total in totals.iterator(chunk_size=2000)
+    ], batch_size=2000)
+    EventConsumerOffset.objects.update_or_create(
+        consumer='pick_counts',
+        defaults={'last_event_id': InventoryEvent.objects.aggregate(last=Max('pk'))['last'] or 0},
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0010_stocktake'),
+        ('products', '0003_product_storage_type'),
+        ('warehouses', '0005_location_unique_code'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PickCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('picks', models.PositiveIntegerField(default=0, help_text='OUT movements of the day')),
+                ('quantity', models.DecimalField(decimal_places=2, default=0, help_text='units picked on the day', max_digits=14)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pick_counts', to='products.product')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pick_counts', to='warehouses.warehouse')),
+            ],
+            options={
+                'verbose_name': 'Pick Count',
+                'verbose_name_plural': 'Pick Counts',
+                'ordering': ['-day', 'product'],
+                'indexes': [models.Index(fields=['warehouse', 'day'], name='inventory_p_warehou_0dbb2b_idx')],
+                'unique_together': {('product', 'warehouse', 'day')},
+            },
+        ),
+        migrations.RunPython(populate, migrations.RunPython.noop),
+    ]
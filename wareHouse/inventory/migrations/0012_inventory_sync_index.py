@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-19 00:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0011_pickcount'),
+        ('products', '0004_product_sync_index'),
+        ('warehouses', '0006_location_sync_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inventory',
+            index=models.Index(fields=['warehouse', 'updated_at', 'id'], name='inventory_i_warehou_5ae54b_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 6.0.1 on 2026-10-19 00:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0012_inventory_sync_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='idempotencykey',
+            name='fingerprint',
+            field=models.CharField(blank=True, default='', help_text='sha256 of the submitted fields, a retry sends the same ones', max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='idempotencykey',
+            name='key',
+            field=models.CharField(help_text='Idempotency-Key header or form value', max_length=100),
+        ),
+        migrations.AddConstraint(
+            model_name='idempotencykey',
+            constraint=models.UniqueConstraint(fields=('recorded_by', 'endpoint', 'key'), name='unique_idempotency_key_scope'),
+        ),
+    ]
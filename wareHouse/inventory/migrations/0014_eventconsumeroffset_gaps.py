@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-19 00:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0013_idempotency_key_scope'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventconsumeroffset',
+            name='gaps',
+            field=models.JSONField(blank=True, default=list, help_text='[first id, last id, first seen] ranges below last_event_id not committed when read, see inventory.events'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0.1 on 2026-10-19 00:32
+
+from django.db import migrations, models
+
+
+def create_watermark(apps, schema_editor):
+    "the single watermark row, postings only ever update it"
+    CheckpointWatermark = apps.get_model('inventory', 'CheckpointWatermark')
+    CheckpointWatermark.objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0014_eventconsumeroffset_gaps'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CheckpointWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stale_from', models.DateTimeField(blank=True, help_text='checkpoints at or after this moment miss a backdated posting', null=True)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Checkpoint Watermark',
+                'verbose_name_plural': 'Checkpoint Watermark',
+            },
+        ),
+        migrations.RunPython(create_watermark, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-19 00:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0015_checkpointwatermark'),
+        ('products', '0004_product_sync_index'),
+        ('warehouses', '0006_location_sync_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inventoryevent',
+            index=models.Index(fields=['product', 'id'], name='inventory_i_product_9db446_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 6.0.1 on 2026-10-19 01:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0016_inventoryevent_product_index'),
+        ('products', '0004_product_sync_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingAlertCheck',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('queued_at', models.DateTimeField()),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='pending_alert_check', to='products.product')),
+            ],
+            options={
+                'verbose_name': 'Pending Alert Check',
+                'verbose_name_plural': 'Pending Alert Checks',
+            },
+        ),
+    ]
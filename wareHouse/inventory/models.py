@@ -1,5 +1,10 @@
-from django.db import models
+import hashlib
+import json
+from datetime import datetime, time, timedelta
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
 from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinValueValidator
 from django.db.models import Sum, F, Q
 from django.utils import timezone
@@ -7,6 +12,9 @@ from django.utils import timezone
 
 User = get_user_model()
 
+# saves of a movement with a generated reference_number that lost a race for it
+REFERENCE_ATTEMPTS = 3
+
 class Inventory(models.Model):
     "current stock levels for each product in each warehouse This is the master inventory table - real-time stock tracking"
 
@@ -69,6 +77,8 @@ class Inventory(models.Model):
         indexes = [
             models.Index(fields=['product', 'warehouse']),
             models.Index(fields=['expiry_date']),
+            # handheld sync feed (api.sync): changes of a warehouse since a cursor
+            models.Index(fields=['warehouse', 'updated_at', 'id']),
         ]
 
     def __str__(self):
@@ -88,7 +98,7 @@ class Inventory(models.Model):
     def is_expired(self):
         'check if product has expired'
         if self.expiry_date:
-            return self.expiry_date < timezone.now().date()
+            return self.expiry_date.date() < timezone.now().date()
         return False
 
     @property
@@ -247,16 +257,37 @@ class StockMovement(models.Model):
         self.total_amount = self.quantity * self.unit_price
 
         # generate reference number if not exists
-        if not self.reference_number:
+        generated = not self.reference_number
+        if generated:
             self.reference_number = self.generate_reference_number()
 
-        # save the movement
+        # save the movement, inventory posting and outbox events in one transaction
         is_new = self.pk is None
-        super().save(*args, **kwargs)
-
-        # update inventory after saving
-        if is_new:
-            self.update_inventory()
+        for attempt in range(REFERENCE_ATTEMPTS):
+            try:
+                with transaction.atomic():
+                    super().save(*args, **kwargs)
+
+                    # update inventory after saving
+                    if is_new:
+                        self.update_inventory()
+                        self.invalidate_checkpoints()
+                return
+            except IntegrityError:
+                # a concurrent save took the same generated reference, read the next one again
+                taken = StockMovement.objects.filter(reference_number=self.reference_number).exists()
+                if not generated or not taken or attempt == REFERENCE_ATTEMPTS - 1:
+                    raise
+                if is_new:
+                    self.pk = None
+                    self._state.adding = True
+                self.reference_number = self.generate_reference_number()
+
+    def invalidate_checkpoints(self):
+        "a backdated posting makes the InventorySnapshot checkpoints after its date stale"
+        start_of_today = timezone.make_aware(datetime.combine(timezone.localdate(), time.min))
+        if self.movement_date < start_of_today:
+            CheckpointWatermark.mark_stale(self.movement_date)
 
     def generate_reference_number(self):
         "generate unique reference number for stock movement"
@@ -312,6 +343,7 @@ class StockMovement(models.Model):
         )
 
         # increase quantity
+        previous_location_id = inventory.storage_location_id
         inventory.quantity = F('quantity') + self.quantity
         if self.to_location:
             inventory.storage_location = self.to_location
@@ -319,11 +351,18 @@ class StockMovement(models.Model):
 
         # refresh from database
         inventory.refresh_from_db()
-
-        # update location status
-        if self.to_location:
-            self.to_location.is_occupied = True
-            self.to_location.save()
+        self.record_event(inventory, self.quantity)
+
+        # update occupancy, a new location takes over the whole balance
+        if previous_location_id != inventory.storage_location_id:
+            previous_quantity = inventory.quantity - self.quantity
+            self.record_occupancy(
+                (inventory.warehouse_id, None, self.quantity),
+                (None, previous_location_id, -previous_quantity),
+                (None, inventory.storage_location_id, inventory.quantity),
+            )
+        else:
+            self.record_occupancy((inventory.warehouse_id, inventory.storage_location_id, self.quantity))
 
 
     def stock_out(self):
@@ -352,12 +391,10 @@ class StockMovement(models.Model):
 
         # referesh from database
         inventory.refresh_from_db()
+        self.record_event(inventory, -self.quantity)
 
-        # if quantity is 0, mark location as available
-        if inventory.quantity == 0:
-            if inventory.storage_location:
-                inventory.storage_location.is_occupied = False
-                inventory.storage_location.save()
+        # update occupancy, a location left empty becomes available
+        self.record_occupancy((inventory.warehouse_id, inventory.storage_location_id, -self.quantity))
 
     
     def stock_transfer(self):
@@ -374,22 +411,291 @@ class StockMovement(models.Model):
 
     def stock_adjustment(self):
         # handle stock adjustment - manual change in inventory
-        if not self.warehouse:
+        if not self.to_warehouse:
             raise ValueError("Warehouse is required for stock adjustment")
 
         # get or create inventory record
         inventory, created = Inventory.objects.get_or_create(
             product=self.product,
-            warehouse=self.warehouse,
+            warehouse=self.to_warehouse,
             batch_number=self.batch_number or '',
             defaults={
-                'quantity':0           
+                'storage_location': self.to_location,
+                'quantity':0
             }
         )
 
         # set to exact quantity (adjustment sets absolute value)
+        previous_quantity = inventory.quantity
         inventory.quantity = self.quantity
         inventory.save()
+        self.record_event(inventory, self.quantity - previous_quantity)
+        self.record_occupancy((inventory.warehouse_id, inventory.storage_location_id, self.quantity - previous_quantity))
+
+    def record_event(self, inventory, quantity_delta):
+        "append an outbox event for an inventory balance change made by this movement"
+        return InventoryEvent.objects.create(
+            event_type='stock_changed',
+            movement=self,
+            reference_number=self.reference_number,
+            inventory=inventory,
+            product_id=inventory.product_id,
+            warehouse_id=inventory.warehouse_id,
+            quantity_delta=quantity_delta,
+            quantity_after=inventory.quantity,
+        )
+
+    def record_occupancy(self, *deltas):
+        "move the warehouse, zone and location occupancy counters by (warehouse_id, location_id, quantity change)"
+        # warehouses.models imports this module
+        from warehouses.occupancy import apply_deltas
+        apply_deltas(deltas)
+
+
+class InventorySnapshot(models.Model):
+    """
+    Checkpoint of ledger balances per (product, warehouse, batch) at a moment in time.
+    Written nightly or monthly by snapshot_inventory so stock_as_of() only replays the
+    movements after the nearest checkpoint. Keys without a row had zero stock.
+    """
+
+    product = models.ForeignKey(
+        'products.Product',
+        on_delete=models.CASCADE,
+        related_name='inventory_snapshots'
+    )
+    warehouse = models.ForeignKey(
+        'warehouses.Warehouse',
+        on_delete=models.CASCADE,
+        related_name='inventory_snapshots'
+    )
+    batch_number = models.CharField(max_length=100, blank=True, default='')
+
+    quantity = models.DecimalField(max_digits=12, decimal_places=2, help_text='ledger balance at as_of')
+    as_of = models.DateTimeField(help_text='balances include every movement up to this moment')
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-as_of', 'product', 'warehouse']
+        verbose_name = 'Inventory Snapshot'
+        verbose_name_plural = 'Inventory Snapshots'
+        unique_together = ['as_of', 'product', 'warehouse', 'batch_number']
+
+        indexes = [
+            models.Index(fields=['as_of']),
+        ]
+
+    def __str__(self):
+        return f"{self.as_of:%Y-%m-%d %H:%M} {self.product_id}/{self.warehouse_id}/{self.batch_number}: {self.quantity}"
+
+
+class CheckpointWatermark(models.Model):
+    """
+    Single row (pk 1) with the moment from which InventorySnapshot checkpoints are
+    stale. A backdated posting lowers it instead of deleting checkpoints on the
+    request path; stock_as_of() skips stale checkpoints and snapshot_inventory
+    rebuilds them (see inventory.snapshots.rebuild_stale_checkpoints).
+    """
+
+    stale_from = models.DateTimeField(null=True, blank=True, help_text='checkpoints at or after this moment miss a backdated posting')
+    # bumped by every change, the rebuild only moves the watermark when nothing changed it meanwhile
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Checkpoint Watermark'
+        verbose_name_plural = 'Checkpoint Watermark'
+
+    def __str__(self):
+        return f"stale from {self.stale_from:%Y-%m-%d %H:%M}" if self.stale_from else 'checkpoints current'
+
+    @classmethod
+    def current(cls):
+        "(stale_from, version)"
+        return cls.objects.filter(pk=1).values_list('stale_from', 'version').first() or (None, 0)
+
+    @classmethod
+    def mark_stale(cls, moment):
+        "make the checkpoints from moment on stale, a row write only when the watermark is not already before it"
+        updated = cls.objects.filter(pk=1).filter(Q(stale_from__isnull=True) | Q(stale_from__gte=moment)).update(
+            stale_from=moment, version=F('version') + 1, updated_at=timezone.now()
+        )
+        if not updated and not cls.objects.filter(pk=1).exists():
+            # the row the migration creates was flushed
+            cls.objects.get_or_create(pk=1, defaults={'stale_from': moment, 'version': 1})
+
+
+class PickCount(models.Model):
+    """
+    Number of OUT movements (picks) and units picked per product, warehouse and day.
+    Kept up to date by the pick_counts inventory event consumer (inventory.pickcounts)
+    so pick frequency is read from this table instead of scanning the movement ledger.
+    """
+
+    product = models.ForeignKey(
+        'products.Product',
+        on_delete=models.CASCADE,
+        related_name='pick_counts'
+    )
+    warehouse = models.ForeignKey(
+        'warehouses.Warehouse',
+        on_delete=models.CASCADE,
+        related_name='pick_counts'
+    )
+    day = models.DateField()
+
+    picks = models.PositiveIntegerField(default=0, help_text='OUT movements of the day')
+    quantity = models.DecimalField(max_digits=14, decimal_places=2, default=0, help_text='units picked on the day')
+
+    class Meta:
+        ordering = ['-day', 'product']
+        verbose_name = 'Pick Count'
+        verbose_name_plural = 'Pick Counts'
+        unique_together = ['product', 'warehouse', 'day']
+
+        indexes = [
+            models.Index(fields=['warehouse', 'day']),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.product_id}/{self.warehouse_id}: {self.picks} picks"
+
+
+class MovementArchiveSegment(models.Model):
+    """
+    gzip JSONL file holding StockMovement rows of one closed month that were moved out
+    of the hot table by archive_movements. A month archived again later (backdated
+    postings) gets another part.
+    """
+
+    month = models.DateField(help_text='first day of the archived month')
+    part = models.PositiveIntegerField(default=1)
+    path = models.CharField(max_length=500, help_text='file path relative to MOVEMENT_ARCHIVE_DIR')
+
+    row_count = models.PositiveIntegerField(default=0)
+    first_movement_date = models.DateTimeField()
+    last_movement_date = models.DateTimeField()
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-month', '-part']
+        verbose_name = 'Movement Archive Segment'
+        verbose_name_plural = 'Movement Archive Segments'
+        unique_together = ['month', 'part']
+
+        indexes = [
+            models.Index(fields=['first_movement_date', 'last_movement_date']),
+        ]
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} part {self.part} ({self.row_count} movements)"
+
+
+class InventoryEvent(models.Model):
+    """
+    Append-only outbox of inventory changes, written in the same transaction as the posting.
+    Downstream consumers read it in id order (see inventory.events) instead of polling
+    StockMovement and Inventory.
+    """
+
+    EVENT_TYPE_CHOICES = [
+        ('stock_changed', 'Stock Changed'),
+    ]
+
+    event_type = models.CharField(max_length=30, choices=EVENT_TYPE_CHOICES)
+
+    # no database constraint: a partitioned stock movement table has no key on id alone
+    movement = models.ForeignKey(
+        StockMovement,
+        on_delete=models.SET_NULL,
+        related_name='events',
+        null=True,
+        blank=True,
+        db_constraint=False
+    )
+    reference_number = models.CharField(max_length=100, blank=True, help_text='reference number of the movement')
+
+    inventory = models.ForeignKey(
+        Inventory,
+        on_delete=models.SET_NULL,
+        related_name='events',
+        null=True,
+        blank=True
+    )
+    product = models.ForeignKey(
+        'products.Product',
+        on_delete=models.CASCADE,
+        related_name='inventory_events'
+    )
+    warehouse = models.ForeignKey(
+        'warehouses.Warehouse',
+        on_delete=models.CASCADE,
+        related_name='inventory_events'
+    )
+
+    quantity_delta = models.DecimalField(max_digits=10, decimal_places=2, help_text='signed change in quantity')
+    quantity_after = models.DecimalField(max_digits=10, decimal_places=2, help_text='inventory quantity after the change')
+    payload = models.JSONField(default=dict, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['id']
+        verbose_name = 'Inventory Event'
+        verbose_name_plural = 'Inventory Events'
+        indexes = [
+            # last event of a product, the version the scan location cache is keyed on
+            models.Index(fields=['product', 'id']),
+        ]
+
+    def __str__(self):
+        return f"#{self.pk} {self.event_type} {self.reference_number} ({self.quantity_delta})"
+
+
+class EventConsumerOffset(models.Model):
+    "last InventoryEvent id acknowledged by each named consumer"
+
+    consumer = models.CharField(max_length=100, unique=True)
+    last_event_id = models.BigIntegerField(default=0)
+    gaps = models.JSONField(
+        default=list,
+        blank=True,
+        help_text='[first id, last id, first seen] ranges below last_event_id not committed when read, see inventory.events'
+    )
+    last_run_at = models.DateTimeField(null=True, blank=True, help_text='last time a time-based sweep ran for this consumer')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['consumer']
+        verbose_name = 'Event Consumer Offset'
+        verbose_name_plural = 'Event Consumer Offsets'
+
+    def __str__(self):
+        return f"{self.consumer} @ {self.last_event_id}"
+
+
+class PendingAlertCheck(models.Model):
+    """
+    Products whose inventory rows wait for the stock alert engine because the
+    product changed rather than its stock, e.g. a new reorder level. Worked off by
+    the stock_alerts sweep (inventory.alerts.sweep).
+    """
+
+    product = models.OneToOneField(
+        'products.Product',
+        on_delete=models.CASCADE,
+        related_name='pending_alert_check'
+    )
+    queued_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = 'Pending Alert Check'
+        verbose_name_plural = 'Pending Alert Checks'
+
+    def __str__(self):
+        return f"alerts of product #{self.product_id}"
 
 
 class StockAlert(models.Model):
@@ -408,6 +714,9 @@ class StockAlert(models.Model):
         ('resolved', 'Resolved'),
     ]
 
+    # alerts still describing a current condition
+    OPEN_STATUSES = ['active', 'acknowledged']
+
     inventory = models.ForeignKey(
         Inventory,
         on_delete=models.CASCADE,
@@ -443,6 +752,10 @@ class StockAlert(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Stock Alert'
         verbose_name_plural = 'Stock Alerts'
+        indexes = [
+            models.Index(fields=['inventory', 'status']),
+            models.Index(fields=['alert_type', 'status']),
+        ]
 
     def __str__(self):
         return f"{self.alert_type} - {self.inventory.product.name}"
@@ -458,3 +771,222 @@ class StockAlert(models.Model):
         # mark alert as resolved
         self.status = 'resolved'
         self.save()
+
+
+
+class IdempotencyConflict(ValueError):
+    "an idempotency key sent again with a different submission"
+
+
+class IdempotencyKey(models.Model):
+    """
+    client supplied key remembered per posted movement so retried submissions are
+    not posted twice. Keys are scoped to the user and endpoint that sent them.
+    """
+
+    key = models.CharField(max_length=100, help_text='Idempotency-Key header or form value')
+    endpoint = models.CharField(max_length=50, help_text='endpoint that recorded the movement e.g. stock_in')
+    fingerprint = models.CharField(
+        max_length=64,
+        blank=True,
+        default='',
+        help_text='sha256 of the submitted fields, a retry sends the same ones'
+    )
+
+    movement = models.ForeignKey(
+        StockMovement,
+        on_delete=models.CASCADE,
+        related_name='idempotency_keys',
+        db_constraint=False
+    )
+
+    recorded_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='idempotency_keys'
+    )
+
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Idempotency Key'
+        verbose_name_plural = 'Idempotency Keys'
+
+        constraints = [
+            models.UniqueConstraint(fields=['recorded_by', 'endpoint', 'key'], name='unique_idempotency_key_scope'),
+        ]
+
+    def __str__(self):
+        return f"{self.key} - {self.endpoint}"
+
+    @property
+    def is_expired(self):
+        return self.expires_at <= timezone.now()
+
+    @staticmethod
+    def make_fingerprint(data):
+        "sha256 of submitted fields (a dict), independent of their order"
+        return hashlib.sha256(json.dumps(data, sort_keys=True, cls=DjangoJSONEncoder).encode()).hexdigest()
+
+    @classmethod
+    def lookup(cls, key, endpoint, user, fingerprint=''):
+        """
+        return the live key record (with its movement) of this user and endpoint or
+        None - a single lookup on the unique key index. Raises IdempotencyConflict
+        when the key was used for a different submission. Expired keys are left to
+        purge_expired().
+        """
+        if not key:
+            return None
+
+        record = cls.objects.select_related('movement__product').filter(
+            key=key, endpoint=endpoint, recorded_by=user, expires_at__gt=timezone.now()
+        ).first()
+        if record and fingerprint and record.fingerprint and record.fingerprint != fingerprint:
+            raise IdempotencyConflict(f'Idempotency key {key} was already used for a different submission')
+        return record
+
+    @classmethod
+    def record(cls, key, endpoint, movement, fingerprint=''):
+        "remember the movement posted for this key, must run in the same transaction as the posting"
+        if not key:
+            return None
+
+        # an expired key of the same scope is not purged yet
+        cls.objects.filter(
+            key=key, endpoint=endpoint, recorded_by=movement.recorded_by, expires_at__lte=timezone.now()
+        ).delete()
+        return cls.objects.create(
+            key=key,
+            endpoint=endpoint,
+            fingerprint=fingerprint,
+            movement=movement,
+            recorded_by=movement.recorded_by,
+            expires_at=timezone.now() + timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+        )
+
+    @classmethod
+    def purge_expired(cls):
+        "delete keys past their TTL"
+        deleted, _ = cls.objects.filter(expires_at__lte=timezone.now()).delete()
+        return deleted
+
+
+class StockTake(models.Model):
+    """
+    Cycle count / stock-take document for one warehouse. Expected quantities are
+    frozen into StockTakeLine rows when it is opened, counts are recorded in bulk
+    and approval posts every variance as an adjustment in one transaction.
+    """
+
+    STATUS_CHOICES = [
+        ('open', 'Open'),
+        ('posted', 'Posted'),
+        ('cancelled', 'Cancelled'),
+    ]
+
+    reference_number = models.CharField(max_length=50, unique=True, help_text='e.g., ST-20240101-0001')
+    warehouse = models.ForeignKey(
+        'warehouses.Warehouse',
+        on_delete=models.PROTECT,
+        related_name='stock_takes'
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='open')
+    notes = models.TextField(blank=True, null=True)
+
+    opened_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='opened_stock_takes'
+    )
+    opened_at = models.DateTimeField(auto_now_add=True, help_text='expected quantities are frozen at this moment')
+    posted_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='posted_stock_takes'
+    )
+    posted_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-opened_at']
+        verbose_name = 'Stock Take'
+        verbose_name_plural = 'Stock Takes'
+        indexes = [
+            models.Index(fields=['warehouse', 'status']),
+        ]
+
+    def __str__(self):
+        return f"{self.reference_number} - {self.warehouse.name}"
+
+    def save(self, *args, **kwargs):
+        if not self.reference_number:
+            today = timezone.now().strftime('%Y%m%d')
+            count = StockTake.objects.filter(reference_number__startswith=f"ST-{today}").count() + 1
+            self.reference_number = f"ST-{today}-{count:04d}"
+        super().save(*args, **kwargs)
+
+    @property
+    def is_open(self):
+        return self.status == 'open'
+
+
+class StockTakeLine(models.Model):
+    "expected (frozen at open) and counted quantity of one product/batch in a stock take"
+
+    stock_take = models.ForeignKey(
+        StockTake,
+        on_delete=models.CASCADE,
+        related_name='lines'
+    )
+    product = models.ForeignKey(
+        'products.Product',
+        on_delete=models.CASCADE,
+        related_name='stock_take_lines'
+    )
+    batch_number = models.CharField(max_length=100, blank=True, default='')
+    inventory = models.ForeignKey(
+        Inventory,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='stock_take_lines',
+        help_text='balance the line was frozen from, empty for stock found during the count'
+    )
+    storage_location = models.ForeignKey(
+        'warehouses.StorageLocation',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='stock_take_lines'
+    )
+
+    expected_quantity = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    counted_quantity = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    variance = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        help_text='counted - expected, computed in bulk after each count upload'
+    )
+    counted_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['stock_take', 'product']
+        verbose_name = 'Stock Take Line'
+        verbose_name_plural = 'Stock Take Lines'
+        unique_together = ['stock_take', 'product', 'batch_number']
+        indexes = [
+            models.Index(fields=['stock_take', 'variance']),
+        ]
+
+    def __str__(self):
+        return f"{self.stock_take.reference_number} - {self.product.name}"
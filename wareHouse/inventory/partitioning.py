@@ -0,0 +1,89 @@
+"""
+Monthly range partitioning of StockMovement on PostgreSQL.
+
+Migration 0009 turns inventory_stockmovement into a table partitioned by
+movement_date (one partition per local month plus a default partition) when
+the database is PostgreSQL; on SQLite nothing changes. create_movement_partitions
+keeps partitions created ahead of time. Each partition gets a BRIN index on
+movement_date, which stays tiny because movements arrive in date order.
+
+A partitioned table can only enforce keys that include movement_date, so the
+primary key is (id, movement_date) and foreign keys pointing at StockMovement
+are declared with db_constraint=False. reference_number is kept unique across
+partitions by a trigger that reserves each reference in a separate registry
+table (inventory_stockmovement_reference); a duplicate raises IntegrityError
+just like the plain unique constraint on SQLite.
+
+Against a local PostgreSQL: DJANGO_DB_BACKEND=postgres (plus the POSTGRES_*
+settings) python manage.py migrate && python manage.py create_movement_partitions
+"""
+from django.db import connection, transaction
+
+from .archive import month_start, next_month
+
+TABLE = 'inventory_stockmovement'
+DEFAULT_PARTITION = f'{TABLE}_default'
+REFERENCES = f'{TABLE}_reference'
+
+
+def partition_name(month):
+    return f'{TABLE}_y{month:%Y}m{month:%m}'
+
+
+def is_partitioned(conn=connection):
+    if conn.vendor != 'postgresql':
+        return False
+    with conn.cursor() as cursor:
+        cursor.execute('SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)', [TABLE])
+        return cursor.fetchone() is not None
+
+
+def table_exists(cursor, name):
+    cursor.execute('SELECT to_regclass(%s)', [name])
+    return cursor.fetchone()[0] is not None
+
+
+def create_brin_index(cursor, name):
+    cursor.execute(f'CREATE INDEX IF NOT EXISTS {name}_date_brin ON {name} USING brin (movement_date)')
+
+
+def create_default_partition(cursor):
+    "catches rows outside every monthly partition so inserts never fail"
+    cursor.execute(f'CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT')
+    create_brin_index(cursor, DEFAULT_PARTITION)
+
+
+def create_partition(cursor, month):
+    """
+    Create the partition for the month starting at `month` (aware local midnight),
+    returns False when it already exists. Rows that already landed in the default
+    partition for that month are moved into it before it is attached.
+    """
+    name = partition_name(month)
+    if table_exists(cursor, name):
+        return False
+
+    start, end = month.isoformat(), next_month(month).isoformat()
+    cursor.execute(f'CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+    if table_exists(cursor, DEFAULT_PARTITION):
+        bounds = 'movement_date >= %s AND movement_date < %s'
+        cursor.execute(f'INSERT INTO {name} SELECT * FROM {DEFAULT_PARTITION} WHERE {bounds}', [start, end])
+        cursor.execute(f'DELETE FROM {DEFAULT_PARTITION} WHERE {bounds}', [start, end])
+        # the delete trigger released the references of the moved rows, the new table has no trigger yet
+        cursor.execute(f'INSERT INTO {REFERENCES} SELECT reference_number FROM {name}')
+    cursor.execute(f"ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES FROM ('{start}') TO ('{end}')")
+    create_brin_index(cursor, name)
+    return True
+
+
+def ensure_partitions(first_day, months):
+    "create the monthly partitions for `months` months from the month of `first_day`, returns the new names"
+    created = []
+    month = month_start(first_day)
+    with transaction.atomic(), connection.cursor() as cursor:
+        create_default_partition(cursor)
+        for _ in range(months):
+            if create_partition(cursor, month):
+                created.append(partition_name(month))
+            month = next_month(month)
+    return created
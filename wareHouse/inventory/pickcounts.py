@@ -0,0 +1,94 @@
+"""
+Daily pick counts.
+
+count_picks() is an InventoryEvent consumer (registered as "pick_counts" in
+settings.INVENTORY_EVENT_HANDLERS): it adds the OUT movements behind a batch of
+events to the PickCount rows of their product, warehouse and day, so pick
+frequency over any window is a sum over a few rows per product instead of a
+scan of the movement ledger. The consumer acknowledges a batch in the same
+transaction as its writes and reads the ids that committed late again (see
+inventory.events), so every pick is counted once.
+
+rebuild_pick_counts() recomputes the table from the ledger and moves the
+consumer past the existing events, for repairs.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import EventConsumerOffset, InventoryEvent, PickCount, StockMovement
+
+CONSUMER = 'pick_counts'
+CHUNK_SIZE = 2000
+
+
+def add_counts(counts):
+    "add {(product_id, warehouse_id, day): [picks, quantity]} to the PickCount rows"
+    if not counts:
+        return
+    keys = list(counts)
+    existing = {
+        (row.product_id, row.warehouse_id, row.day): row
+        for row in PickCount.objects.filter(
+            product_id__in={key[0] for key in keys},
+            warehouse_id__in={key[1] for key in keys},
+            day__in={key[2] for key in keys},
+        )
+    }
+    to_update = []
+    to_create = []
+    for key, (picks, quantity) in counts.items():
+        row = existing.get(key)
+        if row is None:
+            to_create.append(PickCount(product_id=key[0], warehouse_id=key[1], day=key[2], picks=picks, quantity=quantity))
+        else:
+            row.picks += picks
+            row.quantity += quantity
+            to_update.append(row)
+    PickCount.objects.bulk_update(to_update, ['picks', 'quantity'], batch_size=CHUNK_SIZE)
+    PickCount.objects.bulk_create(to_create, batch_size=CHUNK_SIZE)
+
+
+def count_picks(events):
+    "InventoryEvent handler - count the OUT movements of the events"
+    movement_ids = [event.movement_id for event in events if event.movement_id and event.quantity_delta < 0]
+    dates = dict(
+        StockMovement.objects.filter(pk__in=movement_ids, movement_type='out').values_list('pk', 'movement_date')
+    )
+    counts = defaultdict(lambda: [0, Decimal(0)])
+    for event in events:
+        if event.movement_id in dates and event.quantity_delta < 0:
+            key = (event.product_id, event.warehouse_id, timezone.localdate(dates[event.movement_id]))
+            counts[key][0] += 1
+            counts[key][1] -= event.quantity_delta
+    add_counts(counts)
+
+
+def rebuild_pick_counts():
+    """
+    Recompute every PickCount from the OUT movements and set the consumer offset
+    to the last event, returns the number of rows written. Movements posted
+    while it runs can be missed, run it when stock is not moving.
+    """
+    totals = StockMovement.objects.filter(
+        movement_type='out', from_warehouse__isnull=False
+    ).values_list('product_id', 'from_warehouse_id', TruncDate('movement_date')).annotate(
+        picks=Count('id'), total=Sum('quantity')
+    ).order_by()
+
+    with transaction.atomic():
+        PickCount.objects.all().delete()
+        rows = [
+            PickCount(product_id=product_id, warehouse_id=warehouse_id, day=day, picks=picks, quantity=total)
+            for product_id, warehouse_id, day, picks, total in totals.iterator(chunk_size=CHUNK_SIZE)
+        ]
+        PickCount.objects.bulk_create(rows, batch_size=CHUNK_SIZE)
+        EventConsumerOffset.objects.update_or_create(
+            consumer=CONSUMER,
+            defaults={'last_event_id': InventoryEvent.objects.aggregate(last=Max('pk'))['last'] or 0, 'gaps': []},
+        )
+    return len(rows)
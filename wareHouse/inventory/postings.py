@@ -0,0 +1,480 @@
+"""
+Bulk posting of mixed stock movements.
+
+post_operations() takes a list of in/out/transfer/adjust operations (dicts, as
+sent by handhelds and the POS), validates every one of them before anything is
+written, and posts them with bulk queries in one transaction: the movements,
+Inventory balances, outbox events, occupancy counters, idempotency keys and
+search entries, instead of one StockMovement.save() per operation.
+
+Balances follow the rules of StockMovement.update_inventory() and operations
+apply in order, so an out can use stock received earlier in the same batch. In
+atomic mode one failed operation leaves the whole batch unposted; otherwise the
+failed operations are left out and the others are posted.
+
+An operation is a dict of StockMovement fields: type ("in", "out", "transfer"
+or "adjust"), product (id) or sku, quantity, from_warehouse, from_location,
+to_warehouse, to_location (ids), and optionally transaction_type, unit_price,
+batch_number, expiry_date, movement_date, party_name, reason, notes and an
+idempotency key, scoped to the posting user like the keys of the stock forms.
+"""
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, time, timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from products.models import Product
+from search.index import index_queryset
+from warehouses.models import StorageLocation, Warehouse
+from warehouses.occupancy import apply_deltas
+
+from .models import CheckpointWatermark, IdempotencyKey, Inventory, InventoryEvent, StockMovement
+
+CHUNK_SIZE = 2000
+
+OPERATION_TYPES = {'in': 'in', 'out': 'out', 'transfer': 'transfer', 'adjust': 'adjustment', 'adjustment': 'adjustment'}
+DEFAULT_TRANSACTION_TYPES = {'in': 'purchase', 'out': 'sale', 'transfer': 'transfer', 'adjustment': 'adjustment'}
+# warehouses StockMovement.update_inventory() reads for each movement type
+WAREHOUSE_FIELDS = {
+    'in': ['to_warehouse'],
+    'out': ['from_warehouse'],
+    'transfer': ['from_warehouse', 'to_warehouse'],
+    'adjustment': ['to_warehouse'],
+}
+TEXT_FIELDS = {'batch_number': 100, 'party_name': 200, 'reason': 200, 'notes': None}
+MAX_AMOUNT = Decimal('99999999.99')
+IDEMPOTENCY_ENDPOINT = 'api_batch'
+
+
+@dataclass
+class OperationResult:
+    index: int
+    # pending, then posted, replayed (its key was posted before), failed or skipped (atomic batch not posted)
+    status: str = 'pending'
+    movement: StockMovement = None
+    key: str = ''
+    errors: dict = field(default_factory=dict)
+    # of the operation without its key, see IdempotencyKey.make_fingerprint()
+    fingerprint: str = ''
+
+
+def parse_amount(value, minimum):
+    "Decimal with at most 2 places between minimum and MAX_AMOUNT, ValueError otherwise"
+    try:
+        amount = Decimal(str(value))
+    except (InvalidOperation, ValueError):
+        raise ValueError('Enter a number')
+    if not amount.is_finite() or amount != amount.quantize(Decimal('0.01')):
+        raise ValueError('Enter a number with at most 2 decimal places')
+    if amount < minimum or amount > MAX_AMOUNT:
+        raise ValueError(f'Enter a number between {minimum} and {MAX_AMOUNT}')
+    return amount
+
+
+def parse_moment(value):
+    "aware datetime from an ISO datetime or date string, ValueError otherwise"
+    moment = parse_datetime(value) if isinstance(value, str) else None
+    if moment is None:
+        day = parse_date(value) if isinstance(value, str) else None
+        if day is None:
+            raise ValueError('Enter an ISO date or date and time')
+        moment = datetime.combine(day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def reference(value):
+    "id sent for a foreign key, None for anything else"
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.isdigit():
+        return int(value)
+    return None
+
+
+def load_lookups(operations):
+    "products (by id and by sku), warehouse ids and locations the operations refer to, a few queries for the batch"
+    product_ids, skus, warehouse_ids, location_ids = set(), set(), set(), set()
+    for operation in operations:
+        if not isinstance(operation, dict):
+            continue
+        if operation.get('product') is not None:
+            product_ids.add(reference(operation['product']))
+        elif isinstance(operation.get('sku'), str):
+            skus.add(operation['sku'])
+        warehouse_ids.update(reference(operation.get(name)) for name in ('from_warehouse', 'to_warehouse'))
+        location_ids.update(reference(operation.get(name)) for name in ('from_location', 'to_location'))
+
+    fields = ['sku', 'name', 'purchase_price', 'selling_price', 'shelf_life_days']
+    products, by_sku, locations = {}, {}, {}
+    product_ids = list(product_ids - {None})
+    for start in range(0, len(product_ids), CHUNK_SIZE):
+        products.update((p.pk, p) for p in Product.objects.filter(pk__in=product_ids[start:start + CHUNK_SIZE]).only(*fields))
+    skus = list(skus)
+    for start in range(0, len(skus), CHUNK_SIZE):
+        by_sku.update((p.sku, p) for p in Product.objects.filter(sku__in=skus[start:start + CHUNK_SIZE]).only(*fields))
+    warehouses = set(Warehouse.objects.filter(pk__in=warehouse_ids - {None}).values_list('pk', flat=True))
+    location_ids = list(location_ids - {None})
+    for start in range(0, len(location_ids), CHUNK_SIZE):
+        locations.update(
+            (pk, warehouse_id)
+            for pk, warehouse_id in StorageLocation.objects.filter(
+                pk__in=location_ids[start:start + CHUNK_SIZE], is_active=True
+            ).values_list('pk', 'warehouse_id')
+        )
+    return products, by_sku, warehouses, locations
+
+
+def build_movement(operation, lookups, now):
+    "(unsaved StockMovement, idempotency key, errors) for one operation"
+    products, by_sku, warehouses, locations = lookups
+    if not isinstance(operation, dict):
+        return None, '', {'operation': 'Expected an object'}
+    errors = {}
+
+    movement_type = OPERATION_TYPES.get(operation.get('type'))
+    if movement_type is None:
+        errors['type'] = 'Must be one of: in, out, transfer, adjust'
+
+    if operation.get('product') is not None:
+        product = products.get(reference(operation['product']))
+    else:
+        product = by_sku.get(operation.get('sku'))
+    if product is None:
+        errors['product'] = 'Unknown product, send its id as product or its SKU as sku'
+
+    try:
+        quantity = parse_amount(operation.get('quantity'), Decimal(0) if movement_type == 'adjustment' else Decimal('0.01'))
+    except ValueError as e:
+        errors['quantity'] = str(e)
+        quantity = None
+
+    ids = {}
+    for name in ('from_warehouse', 'to_warehouse'):
+        required = name in WAREHOUSE_FIELDS.get(movement_type, [])
+        value = operation.get(name)
+        if value is None:
+            if required:
+                errors[name] = f'Required for {operation.get("type")} operations'
+            continue
+        if not required:
+            errors[name] = f'Not used by {operation.get("type")} operations'
+        elif reference(value) not in warehouses:
+            errors[name] = 'Unknown warehouse'
+        ids[name] = reference(value)
+    if movement_type == 'transfer' and 'from_warehouse' in ids and ids['from_warehouse'] == ids.get('to_warehouse'):
+        errors['to_warehouse'] = 'Source and destination warehouses must be different'
+
+    for name, warehouse in (('from_location', 'from_warehouse'), ('to_location', 'to_warehouse')):
+        value = operation.get(name)
+        if value is None:
+            continue
+        if locations.get(reference(value)) is None or locations[reference(value)] != ids.get(warehouse):
+            errors[name] = f'Not an active location of {warehouse}'
+        ids[name] = reference(value)
+
+    transaction_type = operation.get('transaction_type') or DEFAULT_TRANSACTION_TYPES.get(movement_type)
+    if transaction_type not in dict(StockMovement.TRANSACTION_TYPE_CHOICES):
+        errors['transaction_type'] = 'Unknown transaction type'
+
+    unit_price = Decimal(0)
+    if operation.get('unit_price') is not None:
+        try:
+            unit_price = parse_amount(operation['unit_price'], Decimal(0))
+        except ValueError as e:
+            errors['unit_price'] = str(e)
+    elif product is not None and movement_type == 'in':
+        unit_price = product.purchase_price
+    elif product is not None and movement_type == 'out':
+        unit_price = product.selling_price
+
+    text = {}
+    for name, max_length in TEXT_FIELDS.items():
+        value = operation.get(name)
+        if value is not None and not isinstance(value, str):
+            errors[name] = 'Must be text'
+        elif value and max_length and len(value) > max_length:
+            errors[name] = f'At most {max_length} characters'
+        else:
+            text[name] = value or None
+    if movement_type == 'adjustment' and not text.get('reason'):
+        errors['reason'] = 'Required for adjust operations'
+
+    key = operation.get('key') or ''
+    if not isinstance(key, str) or len(key) > 100:
+        errors['key'] = 'Must be text of at most 100 characters'
+
+    dates = {'movement_date': now, 'expiry_date': None}
+    for name in dates:
+        if operation.get(name):
+            try:
+                dates[name] = parse_moment(operation[name])
+            except ValueError as e:
+                errors[name] = str(e)
+    # like StockInForm, stock received without an expiry date gets the product's shelf life
+    if movement_type == 'in' and product is not None and product.shelf_life_days and not dates['expiry_date']:
+        dates['expiry_date'] = dates['movement_date'] + timedelta(days=product.shelf_life_days)
+
+    if errors:
+        return None, key, errors
+    movement = StockMovement(
+        movement_type=movement_type,
+        transaction_type=transaction_type,
+        product=product,
+        from_warehouse_id=ids.get('from_warehouse'),
+        from_location_id=ids.get('from_location'),
+        to_warehouse_id=ids.get('to_warehouse'),
+        to_location_id=ids.get('to_location'),
+        quantity=quantity,
+        unit_price=unit_price,
+        total_amount=quantity * unit_price,
+        batch_number=text['batch_number'],
+        expiry_date=dates['expiry_date'],
+        movement_date=dates['movement_date'],
+        party_name=text['party_name'],
+        reason=text['reason'],
+        notes=text['notes'],
+    )
+    return movement, key, {}
+
+
+def replay_keys(results, user):
+    """
+    mark operations whose key the user already posted as replayed, keys repeated
+    in the batch or already used for a different operation as failed
+    """
+    keyed = {}
+    for result in results:
+        if result.key and result.status == 'pending':
+            if result.key in keyed:
+                result.status = 'failed'
+                result.errors = {'key': f'Already used by operation {keyed[result.key].index} of this batch'}
+            else:
+                keyed[result.key] = result
+    if not keyed:
+        return
+
+    keys = list(keyed)
+    now = timezone.now()
+    for start in range(0, len(keys), CHUNK_SIZE):
+        records = IdempotencyKey.objects.select_related('movement').filter(
+            key__in=keys[start:start + CHUNK_SIZE], endpoint=IDEMPOTENCY_ENDPOINT, recorded_by=user, expires_at__gt=now
+        )
+        for record in records:
+            result = keyed[record.key]
+            if record.fingerprint and record.fingerprint != result.fingerprint:
+                result.status = 'failed'
+                result.errors = {'key': 'Already used for a different operation'}
+                continue
+            result.status = 'replayed'
+            result.movement = record.movement
+    # expired keys of the batch are not purged yet
+    IdempotencyKey.objects.filter(
+        key__in=keys, endpoint=IDEMPOTENCY_ENDPOINT, recorded_by=user, expires_at__lte=now
+    ).delete()
+
+
+def load_balances(movements):
+    "{(product_id, warehouse_id, batch_number): Inventory} of the balances the movements touch, locked"
+    wanted = set()
+    for movement in movements:
+        for warehouse_id in (movement.from_warehouse_id, movement.to_warehouse_id):
+            if warehouse_id:
+                wanted.add((movement.product_id, warehouse_id, movement.batch_number or ''))
+
+    product_ids = list({key[0] for key in wanted})
+    warehouse_ids = {key[1] for key in wanted}
+    balances = {}
+    for start in range(0, len(product_ids), CHUNK_SIZE):
+        rows = Inventory.objects.select_for_update().filter(
+            product_id__in=product_ids[start:start + CHUNK_SIZE], warehouse_id__in=warehouse_ids
+        )
+        for row in rows:
+            key = (row.product_id, row.warehouse_id, row.batch_number)
+            if key in wanted:
+                balances[key] = row
+    return balances
+
+
+def apply_operation(movement, balances, created):
+    """
+    Apply one movement to the in-memory balances as StockMovement.update_inventory()
+    would. Returns ([(inventory, delta, quantity after)], occupancy deltas), or
+    raises ValueError without touching any balance.
+    """
+    batch = movement.batch_number or ''
+    quantity = movement.quantity
+    changes = []
+    occupancy = []
+
+    def balance(warehouse_id, **defaults):
+        key = (movement.product_id, warehouse_id, batch)
+        if key not in balances:
+            balances[key] = Inventory(
+                product_id=movement.product_id, warehouse_id=warehouse_id, batch_number=batch, quantity=Decimal(0), **defaults
+            )
+            created.append(balances[key])
+        return balances[key]
+
+    if movement.movement_type in ('out', 'transfer'):
+        source = balances.get((movement.product_id, movement.from_warehouse_id, batch))
+        if source is None:
+            raise ValueError(f"No inventory record found for {movement.product.name} product and batch number")
+        if source.quantity < quantity:
+            raise ValueError(f"Insufficient stock. Available: {source.quantity}, Required: {quantity}")
+        source.quantity -= quantity
+        changes.append((source, -quantity, source.quantity))
+        occupancy.append((source.warehouse_id, source.storage_location_id, -quantity))
+
+    if movement.movement_type in ('in', 'transfer'):
+        target = balance(movement.to_warehouse_id, storage_location_id=movement.to_location_id, expiry_date=movement.expiry_date)
+        previous_location_id = target.storage_location_id
+        target.quantity += quantity
+        if movement.to_location_id:
+            target.storage_location_id = movement.to_location_id
+        changes.append((target, quantity, target.quantity))
+        # a new location takes over the whole balance
+        if previous_location_id != target.storage_location_id:
+            occupancy += [
+                (target.warehouse_id, None, quantity),
+                (None, previous_location_id, -(target.quantity - quantity)),
+                (None, target.storage_location_id, target.quantity),
+            ]
+        else:
+            occupancy.append((target.warehouse_id, target.storage_location_id, quantity))
+
+    if movement.movement_type == 'adjustment':
+        target = balance(movement.to_warehouse_id, storage_location_id=movement.to_location_id)
+        delta = quantity - target.quantity
+        target.quantity = quantity
+        changes.append((target, delta, target.quantity))
+        occupancy.append((target.warehouse_id, target.storage_location_id, delta))
+
+    return changes, occupancy
+
+
+def post_operations(operations, atomic=True, user=None, source='api'):
+    """
+    Validate and post a list of operations, returns an OperationResult per
+    operation in the same order. Nothing is written when atomic and any
+    operation failed; the valid ones are then 'skipped'. Operations whose key
+    was posted before are 'replayed' with their original movement.
+    """
+    now = timezone.now()
+    lookups = load_lookups(operations)
+    results = []
+    for index, operation in enumerate(operations):
+        movement, key, errors = build_movement(operation, lookups, now)
+        result = OperationResult(index, 'failed' if errors else 'pending', movement, key, errors)
+        if key and not errors:
+            result.fingerprint = IdempotencyKey.make_fingerprint({name: value for name, value in operation.items() if name != 'key'})
+        results.append(result)
+
+    with transaction.atomic():
+        replay_keys(results, user)
+        pending = [result for result in results if result.status == 'pending']
+        balances = load_balances([result.movement for result in pending])
+        before = {inventory.pk: (inventory.quantity, inventory.storage_location_id) for inventory in balances.values()}
+
+        created = []
+        events = []
+        occupancy = []
+        for result in pending:
+            try:
+                changes, deltas = apply_operation(result.movement, balances, created)
+            except ValueError as e:
+                result.status = 'failed'
+                result.errors = {'quantity': str(e)}
+                continue
+            events.append((result, changes))
+            occupancy += deltas
+
+        if atomic and any(result.status == 'failed' for result in results):
+            for result in pending:
+                if result.status == 'pending':
+                    result.status = 'skipped'
+            # nothing was written, the locks are released with the transaction
+            return results
+
+        posted = [result for result, changes in events]
+        if not posted:
+            return results
+
+        prefix = f"API-{now:%Y%m%d%H%M%S%f}"
+        for seq, result in enumerate(posted, 1):
+            result.movement.reference_number = f"{prefix}-{seq:06d}"
+            result.movement.recorded_by = user
+        movements = StockMovement.objects.bulk_create([result.movement for result in posted], batch_size=CHUNK_SIZE)
+
+        created_ids = {id(inventory) for inventory in created}
+        changed = {
+            id(inventory): inventory
+            for result, changes in events
+            for inventory, delta, after in changes
+            if id(inventory) not in created_ids
+        }
+        # balances move by their net change, one UPDATE per distinct change (scanned quantities
+        # repeat a lot) instead of the CASE over every row bulk_update would build
+        by_delta = defaultdict(list)
+        for inventory in changed.values():
+            by_delta[inventory.quantity - before[inventory.pk][0]].append(inventory.pk)
+        for delta, ids in by_delta.items():
+            for start in range(0, len(ids), CHUNK_SIZE):
+                Inventory.objects.filter(pk__in=ids[start:start + CHUNK_SIZE]).update(quantity=F('quantity') + delta, updated_at=now)
+        relocated = [inventory for inventory in changed.values() if inventory.storage_location_id != before[inventory.pk][1]]
+        Inventory.objects.bulk_update(relocated, ['storage_location'], batch_size=CHUNK_SIZE)
+        Inventory.objects.bulk_create(created, batch_size=CHUNK_SIZE)
+
+        InventoryEvent.objects.bulk_create([
+            InventoryEvent(
+                event_type='stock_changed',
+                movement=result.movement,
+                reference_number=result.movement.reference_number,
+                inventory=inventory,
+                product_id=inventory.product_id,
+                warehouse_id=inventory.warehouse_id,
+                quantity_delta=delta,
+                quantity_after=after,
+                payload={'source': source},
+            )
+            for result, changes in events
+            for inventory, delta, after in changes
+        ], batch_size=CHUNK_SIZE)
+
+        expires_at = now + timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+        IdempotencyKey.objects.bulk_create([
+            IdempotencyKey(
+                key=result.key,
+                endpoint=IDEMPOTENCY_ENDPOINT,
+                fingerprint=result.fingerprint,
+                movement=result.movement,
+                recorded_by=user,
+                expires_at=expires_at,
+            )
+            for result in posted if result.key
+        ], batch_size=CHUNK_SIZE)
+
+        apply_deltas(occupancy)
+
+        # backdated postings make the checkpoints after them stale, see StockMovement.invalidate_checkpoints()
+        earliest = min(movement.movement_date for movement in movements)
+        if earliest < timezone.make_aware(datetime.combine(timezone.localdate(), time.min)):
+            CheckpointWatermark.mark_stale(earliest)
+
+        # bulk_create skips the post_save signals that maintain the search index
+        for start in range(0, len(movements), CHUNK_SIZE):
+            index_queryset(StockMovement.objects.filter(pk__in=[movement.pk for movement in movements[start:start + CHUNK_SIZE]]))
+        for start in range(0, len(created), CHUNK_SIZE):
+            index_queryset(Inventory.objects.filter(pk__in=[inventory.pk for inventory in created[start:start + CHUNK_SIZE]]))
+
+        for result in posted:
+            result.status = 'posted'
+
+    return results
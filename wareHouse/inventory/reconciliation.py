@@ -0,0 +1,131 @@
+"""
+Ledger vs balance reconciliation.
+
+Expected balances are rebuilt from the StockMovement ledger (nearest checkpoint plus
+later movements, see inventory.snapshots) and compared with Inventory.quantity.
+Work is sharded by product id range so shards can run in separate processes.
+
+The shards read the ledger and the balances at different moments, so a posting
+landing meanwhile shows up as a difference. recheck() compares the keys found
+again with their balance rows locked, which drops those, and corrections are
+posted as deltas against the locked rows.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+import django
+from django.db import connections, transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from .adjustments import lock_balances, post_adjustments
+from .models import Inventory, StockMovement
+from .snapshots import stock_as_of
+
+CHUNK_SIZE = 2000
+
+
+def product_shards(shard_count):
+    "split the product ids that appear in the ledger or the balances into inclusive ranges"
+    bounds = [
+        StockMovement.objects.aggregate(low=Min('product_id'), high=Max('product_id')),
+        Inventory.objects.aggregate(low=Min('product_id'), high=Max('product_id')),
+    ]
+    lows = [b['low'] for b in bounds if b['low'] is not None]
+    highs = [b['high'] for b in bounds if b['high'] is not None]
+    if not lows:
+        return []
+
+    low, high = min(lows), max(highs)
+    size = max(1, -(-(high - low + 1) // shard_count))
+    return [(start, min(start + size - 1, high)) for start in range(low, high + 1, size)]
+
+
+def init_worker():
+    "process pool initializer - set Django up (spawned workers) and drop inherited connections"
+    django.setup()
+    connections.close_all()
+
+
+def reconcile_shard(product_range, as_of=None):
+    """
+    Compare ledger and Inventory for one product id range. Returns a list of
+    (product_id, warehouse_id, batch_number, inventory_id, expected, actual) for every
+    key that differs; inventory_id is None when the ledger has stock but no row exists.
+    """
+    as_of = as_of or timezone.now()
+    expected = stock_as_of(as_of, product_range=product_range)
+
+    actual = defaultdict(Decimal)
+    inventory_ids = {}
+    for pk, product_id, warehouse_id, batch_number, quantity in Inventory.objects.filter(
+        product_id__gte=product_range[0],
+        product_id__lte=product_range[1],
+        product__isnull=False,
+        warehouse__isnull=False,
+    ).values_list('pk', 'product_id', 'warehouse_id', 'batch_number', 'quantity').iterator(chunk_size=CHUNK_SIZE):
+        key = (product_id, warehouse_id, batch_number or '')
+        actual[key] += quantity
+        inventory_ids.setdefault(key, pk)
+
+    diffs = []
+    for key in sorted(set(expected) | set(actual)):
+        expected_qty = expected.get(key, Decimal('0'))
+        actual_qty = actual.get(key, Decimal('0'))
+        if expected_qty != actual_qty:
+            diffs.append((*key, inventory_ids.get(key), expected_qty, actual_qty))
+
+    connections.close_all()
+    return diffs
+
+
+def recheck(diffs):
+    """
+    The differences among diffs that still hold, ledger and balances read again
+    with the balance rows locked, as reconcile_shard() tuples. Call it inside a
+    transaction, the rows stay locked until it ends.
+    """
+    diffs = list(diffs)
+    if not diffs:
+        return []
+
+    keys = {(product_id, warehouse_id, batch_number or '') for product_id, warehouse_id, batch_number, *rest in diffs}
+    # locked first: a posting waiting on a row is not in the ledger read below either
+    balances = lock_balances(diffs)
+    now = timezone.now()
+    product_ids = sorted({key[0] for key in keys})
+    expected = {}
+    for start in range(0, len(product_ids), CHUNK_SIZE):
+        expected.update(stock_as_of(now, product_ids=product_ids[start:start + CHUNK_SIZE]))
+
+    current = []
+    for key in sorted(keys):
+        inventory = balances.get(key)
+        expected_qty = expected.get(key, Decimal('0'))
+        actual_qty = inventory.quantity if inventory else Decimal('0')
+        if expected_qty != actual_qty:
+            current.append((*key, inventory.pk if inventory else None, expected_qty, actual_qty))
+    return current
+
+
+def post_corrections(diffs, user=None):
+    """
+    Bring Inventory back in line with the ledger by posting adjustment movements in
+    bulk, together with their inventory updates and outbox events. Every
+    difference is checked again against the locked rows and applied as a delta,
+    so stock posted since the shards ran is kept. Returns the number of
+    movements posted.
+    """
+    with transaction.atomic():
+        movements = post_adjustments(
+            [
+                (product_id, warehouse_id, batch_number, expected - actual, expected, actual)
+                for product_id, warehouse_id, batch_number, inventory_id, expected, actual in recheck(diffs)
+            ],
+            prefix=f"ADJ-RECON-{timezone.now():%Y%m%d%H%M%S%f}",
+            reason='Ledger reconciliation',
+            note=lambda adjustment: f"Inventory showed {adjustment[5]}, ledger balance is {adjustment[4]}",
+            source='reconcile_inventory',
+            user=user,
+        )
+    return len(movements)
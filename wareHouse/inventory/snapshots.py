@@ -0,0 +1,164 @@
+"""
+Point-in-time stock balances.
+
+Balances are keyed by (product_id, warehouse_id, batch_number) exactly like Inventory
+rows. stock_as_of() starts from the nearest InventorySnapshot checkpoint at or before
+the requested moment and replays only the StockMovements after it (reading archived
+months back from their segments), so the cost of a historical query is bounded by the
+checkpoint interval rather than the ledger size.
+
+A backdated posting makes the checkpoints after its date stale by lowering the
+CheckpointWatermark; readers skip those until snapshot_inventory rebuilds them
+with rebuild_stale_checkpoints().
+"""
+import heapq
+from datetime import timedelta
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Max, Min, Q
+
+from .archive import iter_archived_rows
+from .models import CheckpointWatermark, InventorySnapshot, StockMovement
+
+CHUNK_SIZE = 2000
+
+
+def latest_checkpoint(as_of):
+    "as_of of the nearest checkpoint at or before the given moment that is not stale, or None"
+    checkpoints = InventorySnapshot.objects.filter(as_of__lte=as_of)
+    stale_from, version = CheckpointWatermark.current()
+    if stale_from:
+        checkpoints = checkpoints.filter(as_of__lt=stale_from)
+    return checkpoints.aggregate(last=Max('as_of'))['last']
+
+
+def apply_movement(balances, movement_type, product_id, from_warehouse_id, to_warehouse_id, batch_number, quantity):
+    "apply one ledger row the way StockMovement.update_inventory() posts it"
+    batch = batch_number or ''
+
+    if movement_type in ('out', 'transfer') and from_warehouse_id:
+        balances[(product_id, from_warehouse_id, batch)] -= quantity
+    if movement_type in ('in', 'transfer') and to_warehouse_id:
+        balances[(product_id, to_warehouse_id, batch)] += quantity
+    elif movement_type == 'adjustment' and to_warehouse_id:
+        # adjustments set the absolute balance
+        balances[(product_id, to_warehouse_id, batch)] = quantity
+
+
+def stock_as_of(as_of, product_id=None, warehouse_id=None, product_range=None, product_ids=None):
+    """
+    Ledger balances as of a moment: {(product_id, warehouse_id, batch_number): quantity}.
+    product_range is an optional (first_id, last_id) inclusive shard, product_ids an
+    optional list of products. Zero balances are dropped.
+    """
+    balances = defaultdict(Decimal)
+
+    checkpoint = latest_checkpoint(as_of)
+    if checkpoint:
+        snapshot = InventorySnapshot.objects.filter(as_of=checkpoint)
+        if product_id:
+            snapshot = snapshot.filter(product_id=product_id)
+        if product_range:
+            snapshot = snapshot.filter(product_id__gte=product_range[0], product_id__lte=product_range[1])
+        if product_ids is not None:
+            snapshot = snapshot.filter(product_id__in=product_ids)
+        if warehouse_id:
+            snapshot = snapshot.filter(warehouse_id=warehouse_id)
+        for key_product, key_warehouse, batch, quantity in snapshot.values_list(
+            'product_id', 'warehouse_id', 'batch_number', 'quantity'
+        ).iterator(chunk_size=CHUNK_SIZE):
+            balances[(key_product, key_warehouse, batch)] = quantity
+
+    wanted = set(product_ids or [])
+    # movements of archived months are read back from their segments
+    archived = (
+        (row['movement_date'], row['id'], row['movement_type'], row['product_id'], row['from_warehouse_id'],
+         row['to_warehouse_id'], row['batch_number'], row['quantity'])
+        for row in iter_archived_rows(checkpoint, as_of, '', warehouse_id or '', product_id or '', newest_first=False)
+        if (not checkpoint or row['movement_date'] > checkpoint)
+        and (not product_range or product_range[0] <= row['product_id'] <= product_range[1])
+        and (product_ids is None or row['product_id'] in wanted)
+    )
+
+    movements = StockMovement.objects.filter(movement_date__lte=as_of)
+    if checkpoint:
+        movements = movements.filter(movement_date__gt=checkpoint)
+    if product_id:
+        movements = movements.filter(product_id=product_id)
+    if product_range:
+        movements = movements.filter(product_id__gte=product_range[0], product_id__lte=product_range[1])
+    if product_ids is not None:
+        movements = movements.filter(product_id__in=product_ids)
+    if warehouse_id:
+        movements = movements.filter(Q(from_warehouse_id=warehouse_id) | Q(to_warehouse_id=warehouse_id))
+    live = movements.order_by('movement_date', 'pk').values_list(
+        'movement_date', 'pk', 'movement_type', 'product_id', 'from_warehouse_id', 'to_warehouse_id', 'batch_number', 'quantity'
+    ).iterator(chunk_size=CHUNK_SIZE)
+
+    # adjustments set absolute balances, so archived and live rows are replayed in one
+    # (movement_date, id) order: a month archived twice, or a backdated posting not yet
+    # archived, has rows older than the archived ones
+    for row in heapq.merge(archived, live, key=lambda row: row[:2]):
+        apply_movement(balances, *row[2:])
+
+    if warehouse_id:
+        # transfers also touched the other warehouse
+        warehouse_id = int(warehouse_id)
+        return {key: qty for key, qty in balances.items() if key[1] == warehouse_id and qty}
+    return {key: qty for key, qty in balances.items() if qty}
+
+
+def write_checkpoint(as_of):
+    "write InventorySnapshot rows for every non-zero balance at as_of, returns the row count"
+    balances = stock_as_of(as_of)
+    rows = [
+        InventorySnapshot(
+            product_id=product_id,
+            warehouse_id=warehouse_id,
+            batch_number=batch,
+            quantity=quantity,
+            as_of=as_of,
+        )
+        for (product_id, warehouse_id, batch), quantity in balances.items()
+    ]
+
+    with transaction.atomic():
+        # re-running a checkpoint replaces it
+        InventorySnapshot.objects.filter(as_of=as_of).delete()
+        InventorySnapshot.objects.bulk_create(rows, batch_size=CHUNK_SIZE)
+
+    return len(rows)
+
+
+def move_watermark(version, stale_from):
+    "set the watermark if nobody changed it since version was read, returns the new version or None"
+    moved = CheckpointWatermark.objects.filter(pk=1, version=version).update(stale_from=stale_from, version=F('version') + 1)
+    return version + 1 if moved else None
+
+
+def rebuild_stale_checkpoints():
+    """
+    Rewrite the checkpoints made stale by backdated postings, oldest first, moving
+    the watermark past each one. A posting backdated before a checkpoint while it
+    is rewritten changes the watermark, and that checkpoint is rewritten again.
+    Returns the number of checkpoints rewritten.
+    """
+    rebuilt = 0
+    while True:
+        stale_from, version = CheckpointWatermark.current()
+        if stale_from is None:
+            return rebuilt
+        as_of = InventorySnapshot.objects.filter(as_of__gte=stale_from).aggregate(first=Min('as_of'))['first']
+        if as_of is None:
+            move_watermark(version, None)
+            continue
+
+        # from here on a posting dated up to the checkpoint bumps the version
+        version = move_watermark(version, as_of)
+        if version is None:
+            continue
+        write_checkpoint(as_of)
+        if move_watermark(version, as_of + timedelta(microseconds=1)) is not None:
+            rebuilt += 1
@@ -0,0 +1,226 @@
+"""
+Stock-take (cycle count) workflow.
+
+open_stock_take() freezes a warehouse's balances into StockTakeLine rows,
+record_counts() applies a whole batch of counted quantities (CSV upload or the
+JSON batch endpoint) with bulk queries and recomputes the variances in SQL, and
+approve_stock_take() posts every variance as an adjustment in one transaction.
+"""
+import csv
+import io
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import F, Value
+from django.utils import timezone
+
+from products.models import Product
+from warehouses.models import StorageLocation
+from .adjustments import post_adjustments
+from .models import Inventory, StockTake, StockTakeLine
+
+CHUNK_SIZE = 2000
+
+# errors reported back for a rejected upload
+MAX_ERRORS = 20
+
+
+def open_stock_take(warehouse, user=None, notes=''):
+    "create a stock take with the warehouse's current balances frozen as expected quantities"
+    with transaction.atomic():
+        stock_take = StockTake.objects.create(warehouse=warehouse, opened_by=user, notes=notes)
+
+        # duplicate balance rows for the same product/batch are counted as one line
+        expected = {}
+        balances = Inventory.objects.filter(warehouse=warehouse, quantity__gt=0).order_by('pk').values_list(
+            'pk', 'product_id', 'batch_number', 'storage_location_id', 'quantity'
+        )
+        for pk, product_id, batch_number, location_id, quantity in balances.iterator(chunk_size=CHUNK_SIZE):
+            key = (product_id, batch_number or '')
+            if key in expected:
+                expected[key].expected_quantity += quantity
+            else:
+                expected[key] = StockTakeLine(
+                    stock_take=stock_take,
+                    product_id=product_id,
+                    batch_number=key[1],
+                    inventory_id=pk,
+                    storage_location_id=location_id,
+                    expected_quantity=quantity,
+                )
+        StockTakeLine.objects.bulk_create(expected.values(), batch_size=CHUNK_SIZE)
+
+    return stock_take
+
+
+def parse_count_csv(upload):
+    """
+    Rows of an uploaded count sheet: sku and counted_quantity (or quantity)
+    columns, optional batch_number and location. Raises ValueError when the
+    required columns are missing.
+    """
+    reader = csv.DictReader(io.TextIOWrapper(upload, encoding='utf-8-sig'))
+    columns = {name.strip().lower() for name in reader.fieldnames or []}
+    if 'sku' not in columns or not columns & {'counted_quantity', 'quantity'}:
+        raise ValueError('The CSV needs a sku column and a counted_quantity (or quantity) column')
+
+    rows = []
+    for row in reader:
+        row = {(key or '').strip().lower(): (value or '').strip() for key, value in row.items()}
+        if not any(row.values()):
+            continue
+        rows.append({
+            'sku': row.get('sku', ''),
+            'batch_number': row.get('batch_number', ''),
+            'quantity': row.get('counted_quantity') or row.get('quantity', ''),
+            'location': row.get('location', ''),
+        })
+    return rows
+
+
+def resolve_counts(stock_take, rows):
+    """
+    Validate count rows and sum them per (product_id, batch_number), returns
+    ({key: quantity}, {key: location_id}). Raises ValueError listing the bad rows,
+    nothing is applied when any row is invalid.
+    """
+    skus = {str(row.get('sku') or '').strip() for row in rows}
+    product_ids = {}
+    sku_list = list(skus)
+    for start in range(0, len(sku_list), CHUNK_SIZE):
+        product_ids.update(Product.objects.filter(sku__in=sku_list[start:start + CHUNK_SIZE]).values_list('sku', 'pk'))
+
+    codes = list({str(row.get('location') or '').strip() for row in rows} - {''})
+    location_ids = {}
+    for start in range(0, len(codes), CHUNK_SIZE):
+        location_ids.update(StorageLocation.objects.filter(
+            warehouse_id=stock_take.warehouse_id, code__in=codes[start:start + CHUNK_SIZE]
+        ).values_list('code', 'pk'))
+
+    counts = defaultdict(Decimal)
+    locations = {}
+    errors = []
+    for number, row in enumerate(rows, 1):
+        sku = str(row.get('sku') or '').strip()
+        location = str(row.get('location') or '').strip()
+        try:
+            quantity = Decimal(str(row.get('quantity', '')).strip())
+        except InvalidOperation:
+            quantity = None
+
+        if sku not in product_ids:
+            errors.append(f"Row {number}: unknown SKU '{sku}'")
+        elif quantity is None or quantity < 0 or not quantity.is_finite():
+            errors.append(f"Row {number}: quantity must be a number of 0 or more")
+        elif location and location not in location_ids:
+            errors.append(f"Row {number}: unknown location '{location}' in {stock_take.warehouse.code}")
+        else:
+            key = (product_ids[sku], str(row.get('batch_number') or '').strip())
+            counts[key] += quantity
+            if location:
+                locations[key] = location_ids[location]
+
+    if errors:
+        more = f" (and {len(errors) - MAX_ERRORS} more)" if len(errors) > MAX_ERRORS else ''
+        raise ValueError('; '.join(errors[:MAX_ERRORS]) + more)
+    return counts, locations
+
+
+def record_counts(stock_take, rows):
+    """
+    Apply a batch of counts to an open stock take. Counts of the same product and
+    batch within a batch are summed and replace any earlier count; products not
+    expected in the warehouse get a new line with an expected quantity of 0.
+    Returns {'updated': n, 'created': n}.
+    """
+    if not stock_take.is_open:
+        raise ValueError(f"{stock_take.reference_number} is {stock_take.get_status_display().lower()}")
+    if not rows:
+        raise ValueError('No counts to record')
+
+    counts, locations = resolve_counts(stock_take, rows)
+    now = timezone.now()
+
+    with transaction.atomic():
+        lines = {
+            (product_id, batch_number): pk
+            for pk, product_id, batch_number in StockTakeLine.objects.filter(
+                stock_take=stock_take
+            ).values_list('pk', 'product_id', 'batch_number').iterator(chunk_size=CHUNK_SIZE)
+        }
+
+        to_update = []
+        to_create = []
+        for key, quantity in counts.items():
+            line = StockTakeLine(
+                stock_take=stock_take,
+                product_id=key[0],
+                batch_number=key[1],
+                storage_location_id=locations.get(key),
+                counted_quantity=quantity,
+                counted_at=now,
+            )
+            if key in lines:
+                line.pk = lines[key]
+                to_update.append(line)
+            else:
+                to_create.append(line)
+
+        StockTakeLine.objects.bulk_update(to_update, ['counted_quantity', 'counted_at'], batch_size=CHUNK_SIZE)
+        located = [line for line in to_update if line.storage_location_id]
+        StockTakeLine.objects.bulk_update(located, ['storage_location'], batch_size=CHUNK_SIZE)
+        StockTakeLine.objects.bulk_create(to_create, batch_size=CHUNK_SIZE)
+
+        # one statement for every variance of the document
+        StockTakeLine.objects.filter(stock_take=stock_take, counted_quantity__isnull=False).update(
+            variance=F('counted_quantity') - F('expected_quantity')
+        )
+
+    return {'updated': len(to_update), 'created': len(to_create)}
+
+
+def approve_stock_take(stock_take, user=None, zero_uncounted=False):
+    """
+    Post the variances of an open stock take as adjustment movements in one bulk
+    transaction and mark it posted. Each balance moves by its variance, so stock
+    received or shipped since the stock take was opened is kept. With
+    zero_uncounted, lines nobody counted are treated as counted 0.
+    Returns the number of adjustments posted.
+    """
+    with transaction.atomic():
+        stock_take = StockTake.objects.select_for_update().select_related('warehouse').get(pk=stock_take.pk)
+        if not stock_take.is_open:
+            raise ValueError(f"{stock_take.reference_number} is {stock_take.get_status_display().lower()}")
+
+        now = timezone.now()
+        lines = StockTakeLine.objects.filter(stock_take=stock_take)
+        if zero_uncounted:
+            lines.filter(counted_quantity__isnull=True).update(
+                counted_quantity=0, counted_at=now, variance=Value(0) - F('expected_quantity')
+            )
+
+        adjustments = []
+        notes = {}
+        variances = lines.filter(variance__isnull=False).exclude(variance=0).values_list(
+            'product_id', 'batch_number', 'expected_quantity', 'counted_quantity', 'variance'
+        )
+        for product_id, batch_number, expected, counted, variance in variances.iterator(chunk_size=CHUNK_SIZE):
+            adjustments.append((product_id, stock_take.warehouse_id, batch_number, variance))
+            notes[(product_id, batch_number)] = f"Expected {expected}, counted {counted} (variance {variance:+})"
+
+        post_adjustments(
+            adjustments,
+            prefix=stock_take.reference_number,
+            reason=f"Stock take {stock_take.reference_number}",
+            note=lambda adjustment: notes[(adjustment[0], adjustment[2])],
+            source='stock_take',
+            user=user,
+        )
+
+        stock_take.status = 'posted'
+        stock_take.posted_by = user
+        stock_take.posted_at = now
+        stock_take.save(update_fields=['status', 'posted_by', 'posted_at'])
+
+    return len(adjustments)
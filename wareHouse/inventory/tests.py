@@ -1,3 +1,516 @@
-from django.test import TestCase
+import tempfile
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from products.importer import import_products
+from products.models import Product
+from warehouses.models import StorageLocation, Warehouse
+from .alerts import CONSUMER as ALERTS, run_alert_engine, sweep
+from .archive import archive_movements, iter_archived_rows, month_start, summarize_archived_rows
+from .events import advance_offset, consume_batch, missing_ranges
+from .models import (
+    EventConsumerOffset, Inventory, InventoryEvent, MovementArchiveSegment, PendingAlertCheck, StockAlert,
+    StockMovement,
+)
+from .partitioning import DEFAULT_PARTITION, ensure_partitions, is_partitioned, partition_name, table_exists
+from .postings import post_operations
+from .snapshots import stock_as_of
+
+
+@skipUnless(connection.vendor == 'postgresql', 'stock movements are only partitioned on PostgreSQL')
+class MovementPartitioningTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(
+            name='Partitioned', sku='PART-1', purchase_price=1, selling_price=2
+        )
+        cls.warehouse = Warehouse.objects.create(
+            name='Partition WH', code='PART-WH', address='-', city='-', state='-',
+            postal_code='-', phone='-', total_capacity=1000
+        )
+
+    def receive(self, moment, reference=''):
+        return StockMovement.objects.create(
+            movement_type='in', transaction_type='purchase', reference_number=reference,
+            product=self.product, to_warehouse=self.warehouse, quantity=1, unit_price=1,
+            movement_date=moment,
+        )
+
+    def partition_of(self, movement):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT tableoid::regclass::text FROM inventory_stockmovement WHERE id = %s', [movement.pk])
+            return cursor.fetchone()[0]
+
+    def test_table_is_partitioned(self):
+        self.assertTrue(is_partitioned())
+        with connection.cursor() as cursor:
+            self.assertTrue(table_exists(cursor, DEFAULT_PARTITION))
+            self.assertTrue(table_exists(cursor, partition_name(timezone.localtime().replace(day=1))))
+
+    def test_command_creates_partitions_once(self):
+        out = StringIO()
+        call_command('create_movement_partitions', '--from', '2099-01', '--months', '2', stdout=out)
+        self.assertIn('2 partitions created', out.getvalue())
+        with connection.cursor() as cursor:
+            for month in (datetime(2099, 1, 1), datetime(2099, 2, 1)):
+                self.assertTrue(table_exists(cursor, partition_name(month)))
+
+        out = StringIO()
+        call_command('create_movement_partitions', '--from', '2099-01', '--months', '2', stdout=out)
+        self.assertIn('0 partitions created', out.getvalue())
+
+    def test_rows_route_to_their_month(self):
+        current = self.receive(timezone.now())
+        self.assertEqual(self.partition_of(current), partition_name(timezone.localtime().replace(day=1)))
+
+        # no partition yet, lands in the default one and moves when the month is created
+        later = self.receive(timezone.make_aware(datetime(2099, 5, 15, 12)))
+        self.assertEqual(self.partition_of(later), DEFAULT_PARTITION)
+
+        self.assertEqual(ensure_partitions(date(2099, 5, 1), 1), [partition_name(datetime(2099, 5, 1))])
+        self.assertEqual(self.partition_of(later), partition_name(datetime(2099, 5, 1)))
+        self.assertEqual(StockMovement.objects.filter(movement_date__year=2099).count(), 1)
+
+    def test_reference_unique_across_partitions(self):
+        self.receive(timezone.now(), 'PART-REF-1')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.receive(timezone.make_aware(datetime(2099, 5, 15, 12)), 'PART-REF-1')
+
+        # the reference of a moved default-partition row stays reserved
+        self.receive(timezone.make_aware(datetime(2099, 6, 15, 12)), 'PART-REF-2')
+        ensure_partitions(date(2099, 6, 1), 1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.receive(timezone.now(), 'PART-REF-2')
+
+        # deleting a movement releases its reference
+        StockMovement.objects.filter(reference_number='PART-REF-1').delete()
+        self.receive(timezone.now(), 'PART-REF-1')
+
+
+class MovementReferenceTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(name='Referenced', sku='REF-1', purchase_price=1, selling_price=2)
+        cls.warehouse = Warehouse.objects.create(
+            name='Reference WH', code='REF-WH', address='-', city='-', state='-', postal_code='-', phone='-',
+            total_capacity=1000
+        )
+
+    def receive(self, reference=''):
+        return StockMovement.objects.create(
+            movement_type='in', transaction_type='purchase', reference_number=reference,
+            product=self.product, to_warehouse=self.warehouse, quantity=1, unit_price=1,
+        )
+
+    def stock(self):
+        return sum(Inventory.objects.filter(product=self.product).values_list('quantity', flat=True))
+
+    def test_generated_references_follow_each_other(self):
+        first, second = self.receive(), self.receive()
+        self.assertRegex(first.reference_number, r'^SM-\d{4}-\d{2}-\d{2}-\d+$')
+        self.assertEqual(int(second.reference_number.split('-')[-1]), int(first.reference_number.split('-')[-1]) + 1)
+
+    def test_generated_reference_taken_by_a_concurrent_save_is_retried(self):
+        self.receive('SM-TAKEN')
+        with mock.patch.object(StockMovement, 'generate_reference_number', side_effect=['SM-TAKEN', 'SM-FREE']):
+            movement = self.receive()
+        self.assertEqual(movement.reference_number, 'SM-FREE')
+        # the failed attempt was rolled back with its inventory posting
+        self.assertEqual(self.stock(), 2)
+        self.assertEqual(InventoryEvent.objects.filter(reference_number='SM-FREE').count(), 1)
+
+    def test_retries_give_up(self):
+        self.receive('SM-TAKEN')
+        with mock.patch.object(StockMovement, 'generate_reference_number', return_value='SM-TAKEN'):
+            with self.assertRaises(IntegrityError), transaction.atomic():
+                self.receive()
+        self.assertEqual(self.stock(), 1)
+
+    def test_explicit_reference_is_not_replaced(self):
+        self.receive('PO-1')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.receive('PO-1')
+        self.assertEqual(StockMovement.objects.filter(reference_number='PO-1').count(), 1)
+        self.assertEqual(self.stock(), 1)
+
+
+class ArchiveReplayTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(name='Archived', sku='ARCH-1', purchase_price=1, selling_price=2)
+        cls.warehouse = Warehouse.objects.create(
+            name='Archive WH', code='ARCH-WH', address='-', city='-', state='-', postal_code='-', phone='-',
+            total_capacity=1000
+        )
+        # a closed month, two months back
+        cls.month = month_start((timezone.localdate() - timedelta(days=62)).replace(day=1))
+
+    def setUp(self):
+        archive_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(archive_dir.cleanup)
+        settings = override_settings(MOVEMENT_ARCHIVE_DIR=Path(archive_dir.name))
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def post(self, movement_type, quantity, day):
+        return StockMovement.objects.create(
+            movement_type=movement_type, transaction_type='purchase' if movement_type == 'in' else 'adjustment',
+            product=self.product, to_warehouse=self.warehouse, quantity=quantity, unit_price=1,
+            movement_date=self.month + timedelta(days=day - 1, hours=12),
+        )
+
+    def balance(self, day):
+        balances = stock_as_of(self.month + timedelta(days=day - 1, hours=23), product_id=self.product.pk)
+        return balances.get((self.product.pk, self.warehouse.pk, ''), Decimal('0'))
+
+    def test_backdated_adjustment_replays_before_later_rows(self):
+        self.post('in', 5, 20)
+        archive_movements(timezone.now())
+        self.assertEqual(self.balance(25), 5)
+
+        # counted 100 on the 5th, entered after the month was archived
+        self.post('adjustment', 100, 5)
+        self.assertEqual(self.balance(25), 105)
+
+        # archived again: the adjustment lands in part 2, older than the rows of part 1
+        archive_movements(timezone.now())
+        self.assertEqual(
+            list(MovementArchiveSegment.objects.filter(month=self.month.date()).values_list('part', flat=True).order_by('part')),
+            [1, 2]
+        )
+        self.assertFalse(StockMovement.objects.filter(product=self.product).exists())
+        self.assertEqual(self.balance(10), 100)
+        self.assertEqual(self.balance(25), 105)
+
+    def test_archived_rows_are_ordered_across_parts(self):
+        self.post('in', 5, 20)
+        archive_movements(timezone.now())
+        self.post('in', 1, 5)
+        self.post('in', 2, 25)
+        archive_movements(timezone.now())
+
+        newest = [row['quantity'] for row in iter_archived_rows(product_id=self.product.pk)]
+        oldest = [row['quantity'] for row in iter_archived_rows(product_id=self.product.pk, newest_first=False)]
+        self.assertEqual(newest, [2, 5, 1])
+        self.assertEqual(oldest, [1, 5, 2])
+
+    def test_summary_keeps_only_the_newest_rows(self):
+        for day, quantity in ((3, 1), (9, 2), (20, 3)):
+            self.post('in', quantity, day)
+        archive_movements(timezone.now())
+
+        summary = summarize_archived_rows(iter_archived_rows(newest_first=False), keep=2)
+        self.assertEqual(summary.count, 3)
+        self.assertEqual(summary.total_amount, 6)
+        self.assertEqual(summary.type_counts['in'], 3)
+        self.assertEqual([row['quantity'] for row in summary.newest], [3, 2])
+
+
+class LocationAutocompleteTests(TestCase):
+
+    def setUp(self):
+        self.client.force_login(get_user_model().objects.create_user(username='picker', password='-'))
+
+    def test_warehouse_must_be_a_number(self):
+        url = reverse('inventory:location_autocomplete')
+        response = self.client.get(url, {'warehouse': 'abc'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'warehouse must be a whole number')
+        self.assertEqual(self.client.get(url, {'warehouse': '1'}).json(), {'results': [], 'more': False})
+
+
+class StockAlertEngineTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.warehouse = Warehouse.objects.create(
+            name='Alert WH', code='ALERT-WH', address='-', city='-', state='-', postal_code='-', phone='-',
+            total_capacity=1000
+        )
+        cls.product = Product.objects.create(
+            name='Alerted', sku='ALERT-1', purchase_price=1, selling_price=2, reorder_level=5
+        )
+        cls.inventory = Inventory.objects.create(
+            product=cls.product, warehouse=cls.warehouse, batch_number='', quantity=8
+        )
+
+    def event(self, pk=None):
+        return InventoryEvent.objects.create(
+            pk=pk, event_type='stock_changed', inventory=self.inventory, product=self.product,
+            warehouse=self.warehouse, quantity_delta=1, quantity_after=8,
+        )
+
+    def low_stock(self):
+        return StockAlert.objects.filter(
+            inventory=self.inventory, alert_type='low_stock', status__in=StockAlert.OPEN_STATUSES
+        ).count()
+
+    def test_reorder_level_change_queues_the_products_rows(self):
+        run_alert_engine()
+        self.assertEqual(self.low_stock(), 0)
+
+        self.product.reorder_level = 10
+        self.product.save()
+        self.assertTrue(PendingAlertCheck.objects.filter(product=self.product).exists())
+        sweep()
+        self.assertEqual(self.low_stock(), 1)
+        self.assertFalse(PendingAlertCheck.objects.exists())
+
+        # saving other fields queues nothing
+        self.product.name = 'Renamed'
+        self.product.save()
+        self.assertFalse(PendingAlertCheck.objects.exists())
+
+    def test_importer_queues_changed_reorder_levels(self):
+        run_alert_engine()
+        import_products(BytesIO(b'sku,reorder_level\nALERT-1,10\n'))
+        sweep()
+        self.assertEqual(self.low_stock(), 1)
+
+        import_products(BytesIO(b'sku,reorder_level\nALERT-1,10\n'))
+        self.assertFalse(PendingAlertCheck.objects.exists())
+
+    def test_first_sweep_records_uncommitted_ids_as_gaps(self):
+        EventConsumerOffset.objects.create(consumer=ALERTS, last_event_id=1, gaps=[[1, 1, timezone.now().isoformat()]])
+        # 3 and 5 are taken by postings that have not committed yet
+        for pk in (2, 4, 6):
+            self.event(pk)
+
+        sweep()
+        state = EventConsumerOffset.objects.get(consumer=ALERTS)
+        self.assertEqual(state.last_event_id, 6)
+        self.assertEqual([gap[:2] for gap in state.gaps], [[1, 1], [3, 3], [5, 5]])
+        self.assertIsNotNone(state.last_run_at)
+
+    def test_first_sweep_settles_old_events(self):
+        for pk in (2, 4):
+            self.event(pk)
+        InventoryEvent.objects.update(created_at=timezone.now() - timedelta(days=1))
+        self.event(6)
+
+        sweep()
+        state = EventConsumerOffset.objects.get(consumer=ALERTS)
+        self.assertEqual(state.last_event_id, 6)
+        self.assertEqual([gap[:2] for gap in state.gaps], [[5, 5]])
+
+
+class EventOffsetTests(SimpleTestCase):
+    now = datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+    seen = '2025-12-31T23:00:00+00:00'
+
+    def test_missing_ranges(self):
+        self.assertEqual(missing_ranges([2, 3, 6], 1, 8), [[1, 1], [4, 5], [7, 8]])
+        self.assertEqual(missing_ranges([1, 2, 9], 1, 4), [[3, 4]])
+        self.assertEqual(missing_ranges([], 5, 6), [[5, 6]])
+
+    def test_skipped_ids_become_gaps(self):
+        self.assertEqual(
+            advance_offset(10, [], [11, 14, 15], False, self.now),
+            (15, [[12, 13, self.now.isoformat()]])
+        )
+
+    def test_gaps_shrink_as_their_ids_commit(self):
+        # 3 committed, 4-5 still missing, they keep when they were first seen
+        self.assertEqual(
+            advance_offset(10, [[3, 5, self.seen]], [3], False, self.now),
+            (10, [[4, 5, self.seen]])
+        )
+
+    def test_full_batch_keeps_what_it_has_not_read(self):
+        # the batch stopped at 4, it knows nothing about 5-6 or the gap at 8
+        self.assertEqual(
+            advance_offset(10, [[2, 6, self.seen], [8, 8, self.seen]], [3, 4], True, self.now),
+            (10, [[2, 2, self.seen], [5, 6, self.seen], [8, 8, self.seen]])
+        )
+
+
+class EventConsumerTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.warehouse = Warehouse.objects.create(
+            name='Event WH', code='EVENT-WH', address='-', city='-', state='-', postal_code='-', phone='-',
+            total_capacity=1000
+        )
+        cls.product = Product.objects.create(name='Evented', sku='EVENT-1', purchase_price=1, selling_price=2)
+
+    def setUp(self):
+        self.handled = []
+
+    def event(self, pk):
+        return InventoryEvent.objects.create(
+            pk=pk, event_type='stock_changed', product=self.product, warehouse=self.warehouse,
+            quantity_delta=1, quantity_after=1,
+        )
+
+    def consume(self, consumer='first', batch_size=500):
+        return consume_batch(consumer, lambda events: self.handled.append([event.pk for event in events]), batch_size)
+
+    def offset(self, consumer='first'):
+        state = EventConsumerOffset.objects.get(consumer=consumer)
+        return state.last_event_id, [gap[:2] for gap in state.gaps]
+
+    def test_late_committing_ids_are_handled(self):
+        for pk in (1, 3, 6):
+            self.event(pk)
+        self.assertEqual(self.consume(), 3)
+        self.assertEqual(self.offset(), (6, [[2, 2], [4, 5]]))
+
+        # 4 commits after the consumer read past it
+        self.event(4)
+        self.event(7)
+        self.assertEqual(self.consume(), 2)
+        self.assertEqual(self.handled, [[1, 3, 6], [4, 7]])
+        self.assertEqual(self.offset(), (7, [[2, 2], [5, 5]]))
+
+        self.assertEqual(self.consume(), 0)
+
+    def test_gaps_are_given_up(self):
+        for pk in (1, 3):
+            self.event(pk)
+        self.consume()
+        EventConsumerOffset.objects.filter(consumer='first').update(
+            gaps=[[2, 2, (timezone.now() - timedelta(hours=2)).isoformat()]]
+        )
+
+        # a posting that rolled back never fills the gap, the next batch drops it
+        self.assertEqual(self.consume(), 0)
+        self.assertEqual(self.offset(), (3, []))
+        self.event(2)
+        self.assertEqual(self.consume(), 0)
+        self.assertEqual(self.handled, [[1, 3]])
+
+    def test_full_batches(self):
+        for pk in (1, 2, 4, 5):
+            self.event(pk)
+        self.assertEqual(self.consume(batch_size=2), 2)
+        self.assertEqual(self.offset(), (2, []))
+        self.assertEqual(self.consume(batch_size=2), 2)
+        self.assertEqual(self.offset(), (5, [[3, 3]]))
+
+    def test_consumers_keep_their_own_offsets(self):
+        for pk in (1, 2):
+            self.event(pk)
+        self.consume('first')
+        self.event(3)
+        self.consume('second')
+        self.assertEqual(self.offset('first'), (2, []))
+        self.assertEqual(self.offset('second'), (3, []))
+
+        self.consume('first')
+        self.assertEqual(self.handled, [[1, 2], [1, 2, 3], [3]])
+
+    def test_failing_handler_keeps_the_offset(self):
+        self.event(1)
+
+        def fail(events):
+            raise RuntimeError('handler failed')
+
+        with self.assertRaises(RuntimeError):
+            consume_batch('first', fail)
+        self.assertEqual(self.offset(), (0, []))
+        self.assertEqual(self.consume(), 1)
+
+
+class PostOperationsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(username='poster', password='pw12345678')
+        cls.warehouse = Warehouse.objects.create(
+            name='Post WH', code='POST-WH', address='-', city='-', state='-', postal_code='-', phone='-',
+            total_capacity=1000
+        )
+        cls.shelf = StorageLocation.objects.create(warehouse=cls.warehouse, code='POST-A1')
+        cls.bin = StorageLocation.objects.create(warehouse=cls.warehouse, code='POST-B1')
+        cls.product = Product.objects.create(name='Posted', sku='POST-1', purchase_price=1, selling_price=2)
+
+    def receive(self, quantity, location=None, **extra):
+        return {
+            'type': 'in', 'product': self.product.pk, 'to_warehouse': self.warehouse.pk,
+            'to_location': location, 'quantity': quantity, **extra,
+        }
+
+    def pick(self, quantity, **extra):
+        return {'type': 'out', 'sku': self.product.sku, 'from_warehouse': self.warehouse.pk, 'quantity': quantity, **extra}
+
+    def stock(self):
+        return sum(Inventory.objects.filter(product=self.product).values_list('quantity', flat=True))
+
+    def statuses(self, results):
+        return [result.status for result in results]
+
+    def test_atomic_batch_posts_nothing_when_one_operation_fails(self):
+        results = post_operations([self.receive(5), self.pick(10)], user=self.user)
+        self.assertEqual(self.statuses(results), ['skipped', 'failed'])
+        self.assertIn('Insufficient stock', results[1].errors['quantity'])
+        self.assertFalse(StockMovement.objects.exists())
+        self.assertFalse(Inventory.objects.exists())
+
+    def test_best_effort_batch_posts_the_valid_operations(self):
+        results = post_operations([self.receive(5), self.pick(10), {'type': 'drop'}], atomic=False, user=self.user)
+        self.assertEqual(self.statuses(results), ['posted', 'failed', 'failed'])
+        self.assertEqual(StockMovement.objects.count(), 1)
+        self.assertEqual(self.stock(), 5)
+
+    def test_out_uses_stock_received_in_the_same_batch(self):
+        results = post_operations([self.receive(5), self.pick(3), self.pick(2)], user=self.user)
+        self.assertEqual(self.statuses(results), ['posted'] * 3)
+        self.assertEqual(self.stock(), 0)
+        self.assertEqual(
+            list(InventoryEvent.objects.values_list('quantity_after', flat=True)),
+            [Decimal(5), Decimal(2), Decimal(0)]
+        )
+
+    def test_replayed_key_posts_once(self):
+        [first] = post_operations([self.receive(5, key='scan-1')], user=self.user)
+        [again] = post_operations([self.receive(5, key='scan-1')], user=self.user)
+        self.assertEqual(again.status, 'replayed')
+        self.assertEqual(again.movement.pk, first.movement.pk)
+        self.assertEqual(self.stock(), 5)
+
+        # the same key for a different operation
+        [conflict] = post_operations([self.receive(6, key='scan-1')], user=self.user)
+        self.assertEqual(conflict.status, 'failed')
+        self.assertEqual(conflict.errors, {'key': 'Already used for a different operation'})
+        # keys belong to their user
+        other = get_user_model().objects.create_user(username='other', password='pw12345678')
+        [own] = post_operations([self.receive(6, key='scan-1')], user=other)
+        self.assertEqual(own.status, 'posted')
+        self.assertEqual(self.stock(), 11)
+
+    def test_key_repeated_in_a_batch(self):
+        results = post_operations([self.receive(5, key='scan-2'), self.receive(5, key='scan-2')], atomic=False, user=self.user)
+        self.assertEqual(self.statuses(results), ['posted', 'failed'])
+        self.assertEqual(results[1].errors, {'key': 'Already used by operation 0 of this batch'})
+
+    def test_relocation_moves_the_occupancy(self):
+        post_operations([self.receive(5, self.shelf.pk)], user=self.user)
+        post_operations([self.receive(3, self.bin.pk)], user=self.user)
+
+        # the balance moved to the bin with everything it holds
+        self.assertEqual(Inventory.objects.get(product=self.product).storage_location_id, self.bin.pk)
+        self.shelf.refresh_from_db()
+        self.bin.refresh_from_db()
+        self.warehouse.refresh_from_db()
+        self.assertEqual((self.shelf.occupied_quantity, self.shelf.is_occupied), (0, False))
+        self.assertEqual((self.bin.occupied_quantity, self.bin.is_occupied), (8, True))
+        self.assertEqual(self.warehouse.occupied_quantity, 8)
+
+        post_operations([self.pick(2)], user=self.user)
+        self.bin.refresh_from_db()
+        self.warehouse.refresh_from_db()
+        self.assertEqual((self.bin.occupied_quantity, self.warehouse.occupied_quantity), (6, 6))
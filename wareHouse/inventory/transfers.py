@@ -0,0 +1,103 @@
+"""
+Bulk posting of moves between the storage locations of a warehouse.
+
+Used where many Inventory rows are relocated at once (slotting): every row moves
+with its whole balance, as one transfer movement with the warehouse as both
+source and destination, so ledger balances do not change. The movements, the
+new locations of the rows, outbox events, occupancy counters and search entries
+are written with bulk queries in one transaction instead of one
+StockMovement.save() per row.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from search.index import index_queryset
+from warehouses.models import StorageLocation
+from warehouses.occupancy import apply_deltas
+
+from .models import Inventory, InventoryEvent, StockMovement
+
+CHUNK_SIZE = 2000
+
+
+def post_relocations(relocations, prefix, reason, source, user=None):
+    """
+    Move the Inventory rows of relocations, (inventory_id, to_location_id)
+    pairs, to their new locations. Rows that are empty, gone or already at the
+    location are skipped. Reference numbers are "<prefix>-000001"... and source
+    is recorded on the outbox events. Raises ValueError for a location that is
+    not an active location of the row's warehouse. Returns the posted movements.
+    """
+    targets = dict(relocations)
+    if not targets:
+        return []
+
+    now = timezone.now()
+    with transaction.atomic():
+        inventory_ids = list(targets)
+        rows = []
+        for start in range(0, len(inventory_ids), CHUNK_SIZE):
+            rows += Inventory.objects.select_for_update().filter(pk__in=inventory_ids[start:start + CHUNK_SIZE], quantity__gt=0)
+        rows = [row for row in sorted(rows, key=lambda row: row.pk) if row.storage_location_id != targets[row.pk]]
+
+        location_ids = list({targets[row.pk] for row in rows})
+        locations = {}
+        for start in range(0, len(location_ids), CHUNK_SIZE):
+            locations.update(StorageLocation.objects.filter(
+                pk__in=location_ids[start:start + CHUNK_SIZE], is_active=True
+            ).values_list('pk', 'warehouse_id'))
+        for row in rows:
+            if locations.get(targets[row.pk]) != row.warehouse_id:
+                raise ValueError(f'Location {targets[row.pk]} is not an active location of warehouse {row.warehouse_id}')
+
+        movements = StockMovement.objects.bulk_create([
+            StockMovement(
+                movement_type='transfer',
+                transaction_type='transfer',
+                reference_number=f"{prefix}-{seq:06d}",
+                product_id=row.product_id,
+                from_warehouse_id=row.warehouse_id,
+                from_location_id=row.storage_location_id,
+                to_warehouse_id=row.warehouse_id,
+                to_location_id=targets[row.pk],
+                batch_number=row.batch_number or '',
+                expiry_date=row.expiry_date,
+                quantity=row.quantity,
+                unit_price=0,
+                total_amount=0,
+                reason=reason,
+                movement_date=now,
+                recorded_by=user,
+            )
+            for seq, row in enumerate(rows, 1)
+        ], batch_size=CHUNK_SIZE)
+
+        occupancy = []
+        for row in rows:
+            occupancy.append((None, row.storage_location_id, -row.quantity))
+            occupancy.append((None, targets[row.pk], row.quantity))
+            row.storage_location_id = targets[row.pk]
+            row.updated_at = now
+        Inventory.objects.bulk_update(rows, ['storage_location', 'updated_at'], batch_size=CHUNK_SIZE)
+
+        InventoryEvent.objects.bulk_create([
+            InventoryEvent(
+                event_type='stock_changed',
+                movement=movement,
+                reference_number=movement.reference_number,
+                inventory=row,
+                product_id=row.product_id,
+                warehouse_id=row.warehouse_id,
+                quantity_delta=0,
+                quantity_after=row.quantity,
+                payload={'source': source, 'from_location': movement.from_location_id, 'to_location': movement.to_location_id},
+            )
+            for movement, row in zip(movements, rows)
+        ], batch_size=CHUNK_SIZE)
+
+        apply_deltas(occupancy)
+
+        # bulk_create skips the post_save signals that maintain the search index
+        index_queryset(StockMovement.objects.filter(reference_number__startswith=f"{prefix}-"))
+
+    return movements
@@ -22,4 +22,20 @@ urlpatterns = [
     # Alerts
     path('alerts/', views.stock_alerts, name='alerts'),
     path('alerts/<int:pk>/acknowledge/', views.acknowledge_alert, name='acknowledge_alert'),
+
+    # Stock takes (cycle counts)
+    path('stock-takes/', views.stock_take_list, name='stock_take_list'),
+    path('stock-takes/new/', views.stock_take_create, name='stock_take_create'),
+    path('stock-takes/<int:pk>/', views.stock_take_detail, name='stock_take_detail'),
+    path('stock-takes/<int:pk>/sheet/', views.stock_take_sheet, name='stock_take_sheet'),
+    path('stock-takes/<int:pk>/upload/', views.stock_take_upload, name='stock_take_upload'),
+    path('stock-takes/<int:pk>/counts/', views.stock_take_counts, name='stock_take_counts'),
+    path('stock-takes/<int:pk>/approve/', views.stock_take_approve, name='stock_take_approve'),
+    path('stock-takes/<int:pk>/cancel/', views.stock_take_cancel, name='stock_take_cancel'),
+
+    # Autocomplete (stock movement form widgets)
+    path('autocomplete/products/', views.product_autocomplete, name='product_autocomplete'),
+    path('autocomplete/warehouses/', views.warehouse_autocomplete, name='warehouse_autocomplete'),
+    path('autocomplete/locations/', views.location_autocomplete, name='location_autocomplete'),
+    path('autocomplete/users/', views.user_autocomplete, name='user_autocomplete'),
 ]
@@ -1,18 +1,81 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.conf import settings
 from django.core.paginator import Paginator
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse, JsonResponse
+from django.db import IntegrityError, transaction
 from django.db.models import Q, Sum, F, Count
 from django.utils import timezone
 from datetime import timedelta
-from .models import Inventory, StockMovement, StockAlert
-from .forms import StockInForm, StockOutForm, StockTransferForm, StockAdjustmentForm
+import csv
+import json
+from .models import Inventory, StockMovement, StockAlert, IdempotencyKey, IdempotencyConflict, StockTake
+from .alerts import alerted_inventory
+from .forms import StockInForm, StockOutForm, StockTransferForm, StockAdjustmentForm, StockTakeForm, StockTakeUploadForm
+from .stocktake import open_stock_take, parse_count_csv, record_counts, approve_stock_take
 from products.models import Product
-from warehouses.models import Warehouse
+from warehouses.models import Warehouse, StorageLocation
+from search.index import filter_by_search
 
 
 # Create your views here.
 
+# IDEMPOTENT POSTING HELPERS
+def get_idempotency_key(request):
+    "idempotency key from the request header, falling back to the hidden form field"
+    return request.headers.get(settings.IDEMPOTENCY_KEY_HEADER) or request.POST.get('idempotency_key', '')
+
+
+def submission_fingerprint(request):
+    "fingerprint of the submitted form fields, a retry sends the same ones"
+    ignored = {'csrfmiddlewaretoken', 'idempotency_key'}
+    return IdempotencyKey.make_fingerprint({name: request.POST.getlist(name) for name in request.POST if name not in ignored})
+
+
+def find_replay(request, endpoint):
+    """
+    (idempotency key, fingerprint, earlier movement or None) of a submission.
+    Raises IdempotencyConflict when the user already used the key on this
+    endpoint for a different submission.
+    """
+    idempotency_key = get_idempotency_key(request)
+    fingerprint = submission_fingerprint(request)
+    existing = IdempotencyKey.lookup(idempotency_key, endpoint, request.user, fingerprint)
+    return idempotency_key, fingerprint, existing.movement if existing else None
+
+
+def post_movement(movement, idempotency_key, endpoint, fingerprint=''):
+    """
+    Save the movement (which posts it to inventory) and remember its idempotency key
+    in the same transaction. Returns (movement, replayed).
+    """
+    try:
+        with transaction.atomic():
+            movement.save()
+            IdempotencyKey.record(idempotency_key, endpoint, movement, fingerprint)
+    except IntegrityError:
+        # a concurrent retry with the same key won the race - its movement is the result
+        existing = IdempotencyKey.lookup(idempotency_key, endpoint, movement.recorded_by, fingerprint)
+        if existing is None:
+            raise
+        return existing.movement, True
+
+    return movement, False
+
+
+def idempotency_conflict(error):
+    "answer a key reused for a different submission, nothing is posted"
+    return HttpResponse(str(error), status=409, content_type='text/plain')
+
+
+def replay_movement(request, movement):
+    "answer a retried submission with the result of the original posting"
+    messages.info(request, f'Stock movement {movement.reference_number} was already recorded')
+    return redirect('inventory:stock_movement_list')
+
+
 # INVENTORY VIEWS
 @login_required
 def inventory_list(request):
@@ -25,11 +88,7 @@ def inventory_list(request):
     # search 
     search_query = request.GET.get('search', '')
     if search_query:
-        inventory_records = inventory_records.filter(
-            Q(product__name__icontains=search_query) |
-            Q(product__sku__icontains=search_query) |
-            Q(batch_number__icontains=search_query)
-        )
+        inventory_records = filter_by_search(inventory_records, search_query)
 
     # filter by warehouse
     warehouse_id = request.GET.get('warehouse', '')
@@ -102,12 +161,22 @@ def inventory_detail(request, pk):
 def stock_in(request):
     'handle stock in operations'
     if request.method == 'POST':
+        # retried submission - answer with the original movement without posting again
+        try:
+            idempotency_key, fingerprint, existing = find_replay(request, 'stock_in')
+        except IdempotencyConflict as e:
+            return idempotency_conflict(e)
+        if existing:
+            return replay_movement(request, existing)
+
         form = StockInForm(request.POST)
         if form.is_valid():
             try:
                 movement = form.save(commit=False)
                 movement.recorded_by = request.user
-                movement.save()
+                movement, replayed = post_movement(movement, idempotency_key, 'stock_in', fingerprint)
+                if replayed:
+                    return replay_movement(request, movement)
                 messages.success(request, f'Stock IN recorded: {movement.quantity} {movement.product.unit} of {movement.product.name}')
                 return redirect('inventory:stock_movement_list')
             except Exception as e:
@@ -115,7 +184,9 @@ def stock_in(request):
         else:
             messages.error(request, 'Form is not valid')
     else:
-        form = StockInForm()
+        # a scan (api_scan stock_in_url) pre-fills the form from the query string
+        prefill = ['product', 'to_warehouse', 'to_location', 'quantity', 'batch_number', 'expiry_date']
+        form = StockInForm(initial={field: request.GET[field] for field in prefill if request.GET.get(field)})
 
     content = {
         'form': form,
@@ -131,12 +202,22 @@ def stock_out(request):
     "record outgoing stock"
      
     if request.method == 'POST':
+        # retried submission - answer with the original movement without posting again
+        try:
+            idempotency_key, fingerprint, existing = find_replay(request, 'stock_out')
+        except IdempotencyConflict as e:
+            return idempotency_conflict(e)
+        if existing:
+            return replay_movement(request, existing)
+
         form = StockOutForm(request.POST)
         if form.is_valid():
             try:
                 movement = form.save(commit=False)
                 movement.recorded_by = request.user
-                movement.save()
+                movement, replayed = post_movement(movement, idempotency_key, 'stock_out', fingerprint)
+                if replayed:
+                    return replay_movement(request, movement)
                 messages.success(request, f'Stock OUT recorded: {movement.quantity} {movement.product.unit} of {movement.product.name}')
                 return redirect('inventory:stock_movement_list')
             except ValueError as e:
@@ -162,12 +243,22 @@ def stock_transfer(request):
     "transfer stock between warehouses"
 
     if request.method == 'POST':
+        # retried submission - answer with the original movement without posting again
+        try:
+            idempotency_key, fingerprint, existing = find_replay(request, 'stock_transfer')
+        except IdempotencyConflict as e:
+            return idempotency_conflict(e)
+        if existing:
+            return replay_movement(request, existing)
+
         form = StockTransferForm(request.POST)
         if form.is_valid():
             try:
                 movement = form.save(commit=False)
                 movement.recorded_by = request.user
-                movement.save()
+                movement, replayed = post_movement(movement, idempotency_key, 'stock_transfer', fingerprint)
+                if replayed:
+                    return replay_movement(request, movement)
                 messages.success(request, 
                 f'Stock TRANSFER recorded: {movement.quantity} {movement.product.unit} of {movement.product.name}'
                 f'from {movement.from_warehouse.code} to {movement.to_warehouse.code}'
@@ -196,15 +287,25 @@ def stock_adjustment(request):
     "adjust stock for corrections"
 
     if request.method == 'POST':
+        # retried submission - answer with the original movement without posting again
+        try:
+            idempotency_key, fingerprint, existing = find_replay(request, 'stock_adjustment')
+        except IdempotencyConflict as e:
+            return idempotency_conflict(e)
+        if existing:
+            return replay_movement(request, existing)
+
         form = StockAdjustmentForm(request.POST)
         if form.is_valid():
             try:
                 movement = form.save(commit=False)
                 movement.recorded_by = request.user
-                movement.save()
+                movement, replayed = post_movement(movement, idempotency_key, 'stock_adjustment', fingerprint)
+                if replayed:
+                    return replay_movement(request, movement)
                 messages.success(request, 
                 f'Stock ADJUSTMENT recorded: {movement.product.name} set to {movement.quantity} {movement.product.unit}'
-                f'for {movement.warehouse.code}'
+                f' for {movement.to_warehouse.code}'
                 )
                 return redirect('inventory:stock_movement_list')
             except Exception as e:
@@ -232,11 +333,7 @@ def stock_movement_list(request):
     # Search
     search_query = request.GET.get('search', '')
     if search_query:
-        movements = movements.filter(
-            Q(reference_number__icontains=search_query) |
-            Q(product__name__icontains=search_query) |
-            Q(party_name__icontains=search_query)
-        )
+        movements = filter_by_search(movements, search_query)
     
     # Filter by movement type
     movement_type = request.GET.get('type', '')
@@ -307,19 +404,11 @@ def inventory_dashboard(request):
     # Total products in stock
     total_products = Inventory.objects.filter(quantity__gt=0).count()
     
-    # Low stock items
-    low_stock_items = [
-        inv for inv in Inventory.objects.select_related('product').filter(quantity__gt=0)
-        if inv.is_low_stock
-    ]
+    # Low stock items (kept current by the stock alert engine)
+    low_stock_items = alerted_inventory('low_stock').order_by('quantity')
     
     # Expiring soon
-    expiring_soon = [
-        inv for inv in Inventory.objects.select_related('product').filter(
-            expiry_date__isnull=False,
-            quantity__gt=0
-        ) if inv.is_expiring_soon
-    ]
+    expiring_soon = alerted_inventory('expiring_soon').order_by('expiry_date')
     
     # Recent movements
     recent_movements = StockMovement.objects.select_related(
@@ -335,8 +424,8 @@ def inventory_dashboard(request):
     content = {
         'total_value': total_value,
         'total_products': total_products,
-        'low_stock_count': len(low_stock_items),
-        'expiring_count': len(expiring_soon),
+        'low_stock_count': low_stock_items.count(),
+        'expiring_count': expiring_soon.count(),
         'low_stock_items': low_stock_items[:5],
         'expiring_soon': expiring_soon[:5],
         'recent_movements': recent_movements,
@@ -373,4 +462,243 @@ def stock_alerts(request):
         'selected_status': status,
     }
     
-    return render(request, 'inventory/alerts.html', content)
\ No newline at end of file
+    return render(request, 'inventory/alerts.html', content)
+
+
+# STOCK TAKE (CYCLE COUNT) VIEWS
+@login_required
+def stock_take_list(request):
+    "list stock takes"
+    stock_takes = StockTake.objects.select_related('warehouse', 'opened_by').annotate(
+        line_count=Count('lines'),
+        counted_count=Count('lines', filter=Q(lines__counted_quantity__isnull=False)),
+    ).order_by('-opened_at')
+
+    status = request.GET.get('status', '')
+    if status:
+        stock_takes = stock_takes.filter(status=status)
+
+    paginator = Paginator(stock_takes, 20)
+    stock_takes = paginator.get_page(request.GET.get('page'))
+
+    content = {
+        'stock_takes': stock_takes,
+        'selected_status': status,
+    }
+
+    return render(request, 'inventory/stock_take_list.html', content)
+
+
+@login_required
+def stock_take_create(request):
+    "open a stock take, freezing the warehouse's expected quantities"
+    if request.method == 'POST':
+        form = StockTakeForm(request.POST)
+        if form.is_valid():
+            stock_take = open_stock_take(form.cleaned_data['warehouse'], request.user, form.cleaned_data['notes'])
+            messages.success(request, f'{stock_take.reference_number} opened with {stock_take.lines.count()} expected lines')
+            return redirect('inventory:stock_take_detail', pk=stock_take.pk)
+        else:
+            messages.error(request, 'Please correct the errors below.')
+    else:
+        form = StockTakeForm()
+
+    content = {
+        'form': form,
+        'title': 'Open Stock Take',
+    }
+
+    return render(request, 'inventory/stock_take_form.html', content)
+
+
+@login_required
+def stock_take_detail(request, pk):
+    "stock take summary, variance lines and count upload"
+    stock_take = get_object_or_404(StockTake.objects.select_related('warehouse', 'opened_by', 'posted_by'), pk=pk)
+
+    lines = stock_take.lines.select_related('product', 'storage_location')
+    summary = lines.aggregate(
+        line_count=Count('id'),
+        counted_count=Count('id', filter=Q(counted_quantity__isnull=False)),
+        variance_count=Count('id', filter=Q(variance__isnull=False) & ~Q(variance=0)),
+        variance_value=Sum(F('variance') * F('product__purchase_price')),
+    )
+
+    show = request.GET.get('show', 'variance')
+    if show == 'variance':
+        lines = lines.filter(variance__isnull=False).exclude(variance=0)
+    elif show == 'uncounted':
+        lines = lines.filter(counted_quantity__isnull=True)
+
+    paginator = Paginator(lines, 50)
+    lines = paginator.get_page(request.GET.get('page'))
+
+    content = {
+        'stock_take': stock_take,
+        'lines': lines,
+        'summary': summary,
+        'show': show,
+        'upload_form': StockTakeUploadForm(),
+    }
+
+    return render(request, 'inventory/stock_take_detail.html', content)
+
+
+@login_required
+def stock_take_sheet(request, pk):
+    "blind count sheet CSV (no expected quantities) to fill in and upload"
+    stock_take = get_object_or_404(StockTake, pk=pk)
+
+    response = HttpResponse(content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{stock_take.reference_number}.csv"'
+
+    writer = csv.writer(response)
+    writer.writerow(['sku', 'product', 'batch_number', 'location', 'counted_quantity'])
+    rows = stock_take.lines.order_by('storage_location__code', 'product__sku').values_list(
+        'product__sku', 'product__name', 'batch_number', 'storage_location__code'
+    )
+    for sku, name, batch_number, location in rows.iterator(chunk_size=2000):
+        writer.writerow([sku, name, batch_number, location or '', ''])
+
+    return response
+
+
+@login_required
+def stock_take_upload(request, pk):
+    "record a CSV of counts in one bulk update"
+    stock_take = get_object_or_404(StockTake.objects.select_related('warehouse'), pk=pk)
+    if request.method != 'POST':
+        return redirect('inventory:stock_take_detail', pk=pk)
+
+    form = StockTakeUploadForm(request.POST, request.FILES)
+    if form.is_valid():
+        try:
+            result = record_counts(stock_take, parse_count_csv(form.cleaned_data['file']))
+            messages.success(request, f"Counts recorded: {result['updated']} lines updated, {result['created']} found items added")
+        except ValueError as e:
+            messages.error(request, f'Upload rejected: {e}')
+    else:
+        messages.error(request, 'Choose a CSV file to upload')
+
+    return redirect('inventory:stock_take_detail', pk=pk)
+
+
+@login_required
+def stock_take_counts(request, pk):
+    """
+    Batch count API: POST {"counts": [{"sku": ..., "batch_number": ..., "location": ...,
+    "quantity": ...}, ...]} records every count in one request.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST a JSON body with a counts list'}, status=405)
+
+    stock_take = get_object_or_404(StockTake.objects.select_related('warehouse'), pk=pk)
+    try:
+        counts = json.loads(request.body).get('counts')
+        if not isinstance(counts, list) or not all(isinstance(row, dict) for row in counts):
+            raise ValueError('counts must be a list of objects')
+        result = record_counts(stock_take, counts)
+    except (ValueError, AttributeError) as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    return JsonResponse({'stock_take': stock_take.reference_number, **result})
+
+
+@login_required
+def stock_take_approve(request, pk):
+    "post every variance of the stock take as adjustments"
+    stock_take = get_object_or_404(StockTake, pk=pk)
+    if request.method == 'POST':
+        try:
+            posted = approve_stock_take(stock_take, request.user, zero_uncounted=bool(request.POST.get('zero_uncounted')))
+            messages.success(request, f'{stock_take.reference_number} posted with {posted} adjustments')
+        except ValueError as e:
+            messages.error(request, f'Error: {e}')
+
+    return redirect('inventory:stock_take_detail', pk=pk)
+
+
+@login_required
+def stock_take_cancel(request, pk):
+    "cancel an open stock take without posting anything"
+    stock_take = get_object_or_404(StockTake, pk=pk)
+    if request.method == 'POST':
+        if stock_take.is_open:
+            stock_take.status = 'cancelled'
+            stock_take.save(update_fields=['status'])
+            messages.success(request, f'{stock_take.reference_number} cancelled')
+        else:
+            messages.error(request, f'{stock_take.reference_number} is already {stock_take.get_status_display().lower()}')
+
+    return redirect('inventory:stock_take_detail', pk=pk)
+
+
+# AUTOCOMPLETE ENDPOINTS (inventory.widgets.AutocompleteSelect)
+AUTOCOMPLETE_PAGE_SIZE = 20
+
+
+def autocomplete_response(request, queryset, fields, label):
+    """
+    One page of {id, text} results for a queryset, read with values() so no
+    __str__ foreign key lookups happen per row. ?page= is 1-based.
+    """
+    try:
+        page = max(1, int(request.GET.get('page', 1)))
+    except ValueError:
+        page = 1
+    offset = (page - 1) * AUTOCOMPLETE_PAGE_SIZE
+    rows = list(queryset.values('pk', *fields)[offset:offset + AUTOCOMPLETE_PAGE_SIZE + 1])
+
+    return JsonResponse({
+        'results': [{'id': row['pk'], 'text': label(row)} for row in rows[:AUTOCOMPLETE_PAGE_SIZE]],
+        'more': len(rows) > AUTOCOMPLETE_PAGE_SIZE,
+    })
+
+
+@login_required
+def product_autocomplete(request):
+    "active products matching ?q= through the search index, best match first"
+    products = Product.objects.filter(is_active=True)
+    query = request.GET.get('q', '').strip()
+    products = filter_by_search(products, query) if query else products.order_by('name')
+    return autocomplete_response(request, products, ['name', 'sku'], lambda row: f"{row['name']} ({row['sku']})")
+
+
+@login_required
+def warehouse_autocomplete(request):
+    "active warehouses matching ?q= on name or code"
+    warehouses = Warehouse.objects.filter(is_active=True).order_by('name')
+    query = request.GET.get('q', '').strip()
+    if query:
+        warehouses = warehouses.filter(Q(name__icontains=query) | Q(code__istartswith=query))
+    return autocomplete_response(request, warehouses, ['name', 'code'], lambda row: f"{row['name']} ({row['code']})")
+
+
+@login_required
+def location_autocomplete(request):
+    "active storage locations of ?warehouse= matching ?q= as a code prefix"
+    locations = StorageLocation.objects.filter(is_active=True).order_by('warehouse', 'code')
+    warehouse_id = request.GET.get('warehouse', '')
+    if warehouse_id:
+        try:
+            locations = locations.filter(warehouse_id=int(warehouse_id))
+        except ValueError:
+            return JsonResponse({'error': 'warehouse must be a whole number'}, status=400)
+    query = request.GET.get('q', '').strip()
+    if query:
+        locations = locations.filter(code__istartswith=query)
+    return autocomplete_response(
+        request, locations, ['code', 'warehouse__code'], lambda row: f"{row['warehouse__code']} - {row['code']}"
+    )
+
+
+@login_required
+def user_autocomplete(request):
+    "active users matching ?q= on username or name"
+    users = get_user_model().objects.filter(is_active=True).order_by('username')
+    query = request.GET.get('q', '').strip()
+    if query:
+        users = users.filter(
+            Q(username__istartswith=query) | Q(first_name__istartswith=query) | Q(last_name__istartswith=query)
+        )
+    return autocomplete_response(request, users, ['username'], lambda row: row['username'])
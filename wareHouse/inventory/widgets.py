@@ -0,0 +1,36 @@
+from django import forms
+from django.urls import reverse
+
+
+class AutocompleteSelect(forms.Select):
+    """
+    Select for a foreign key that renders only its current value and loads the
+    other options from a JSON autocomplete endpoint as the user types, so
+    rendering the form never loads the whole table. depends_on names another
+    field whose value is sent along (a location filtered by its warehouse).
+    """
+
+    def __init__(self, url_name, depends_on=None, attrs=None):
+        super().__init__(attrs)
+        self.url_name = url_name
+        self.depends_on = depends_on
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        attrs['data-autocomplete-url'] = reverse(self.url_name)
+        if self.depends_on:
+            attrs['data-depends-on'] = self.depends_on
+        return attrs
+
+    def optgroups(self, name, value, attrs=None):
+        # only the empty choice and the selected objects, the queryset is never iterated
+        selected = {str(v) for v in value if v not in (None, '')}
+        choices = [('', '---------')]
+        if selected:
+            field = self.choices.field
+            choices += [(obj.pk, field.label_from_instance(obj)) for obj in self.choices.queryset.filter(pk__in=selected)]
+
+        return [
+            (None, [self.create_option(name, option_value, label, str(option_value) in selected, index, attrs=attrs)], index)
+            for index, (option_value, label) in enumerate(choices)
+        ]
@@ -1,6 +1,10 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import PurchaseOrder, PurchaseOrderItem, SalesOrder, SalesOrderItem
+from .models import (
+    PurchaseOrder, PurchaseOrderItem, SalesOrder, SalesOrderItem, ReorderSuggestion, DocumentSequence, DemandForecast,
+    PickWave, PickWaveOrder, PickWavePick,
+)
+from .waves import release_stock
 
 class PurchaseOrderItemInline(admin.TabularInline):
     model = PurchaseOrderItem
@@ -169,4 +173,62 @@ class SalesOrderAdmin(admin.ModelAdmin):
     
     def items_count(self, obj):
         return obj.get_items_count()
-    items_count.short_description = 'Items'
\ No newline at end of file
+    items_count.short_description = 'Items'
+
+
+@admin.register(ReorderSuggestion)
+class ReorderSuggestionAdmin(admin.ModelAdmin):
+    list_display = [
+        'product', 'warehouse', 'supplier', 'avg_daily_demand', 'reorder_point',
+        'available_quantity', 'on_order_quantity', 'suggested_quantity', 'computed_at'
+    ]
+    list_filter = ['warehouse', 'supplier']
+    search_fields = ['product__name', 'product__sku']
+    raw_id_fields = ['product', 'warehouse', 'supplier']
+
+
+@admin.register(DocumentSequence)
+class DocumentSequenceAdmin(admin.ModelAdmin):
+    list_display = ['prefix', 'last_value', 'updated_at']
+    search_fields = ['prefix']
+
+
+@admin.register(DemandForecast)
+class DemandForecastAdmin(admin.ModelAdmin):
+    list_display = [
+        'product', 'warehouse', 'method', 'alpha', 'demand_days', 'history_days',
+        'daily_forecast', 'forecast_quantity', 'computed_at'
+    ]
+    list_filter = ['method', 'warehouse']
+    search_fields = ['product__name', 'product__sku']
+    raw_id_fields = ['product', 'warehouse']
+
+
+class PickWaveOrderInline(admin.TabularInline):
+    model = PickWaveOrder
+    extra = 0
+    raw_id_fields = ['sales_order']
+
+
+class PickWavePickInline(admin.TabularInline):
+    model = PickWavePick
+    extra = 0
+    raw_id_fields = ['product', 'location', 'inventory']
+
+
+@admin.register(PickWave)
+class PickWaveAdmin(admin.ModelAdmin):
+    list_display = ['wave_number', 'warehouse', 'cutoff', 'line_count', 'unit_count', 'released_by', 'released_at']
+    list_filter = ['warehouse']
+    search_fields = ['wave_number']
+    raw_id_fields = ['released_by']
+    inlines = [PickWaveOrderInline, PickWavePickInline]
+
+    # a deleted wave gives back the stock it still holds
+    def delete_model(self, request, obj):
+        release_stock(obj.slots.all())
+        super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        release_stock(PickWaveOrder.objects.filter(wave__in=queryset))
+        super().delete_queryset(request, queryset)
@@ -1,5 +1,9 @@
 from django import forms
+from django.conf import settings
+from django.utils import timezone
+from warehouses.models import Warehouse
 from .models import PurchaseOrder, PurchaseOrderItem, SalesOrder, SalesOrderItem
+from .picking import ROUTE_METHODS
 
 class PurchaseOrderForm(forms.ModelForm):
     """Form for creating/updating purchase orders"""
@@ -83,4 +87,41 @@ class SalesOrderItemForm(forms.ModelForm):
             'quantity': forms.NumberInput(attrs={'class': 'form-control', 'placeholder': '0.00', 'step': '0.01'}),
             'unit_price': forms.NumberInput(attrs={'class': 'form-control', 'placeholder': '0.00', 'step': '0.01'}),
             'notes': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Item notes'}),
-        }
\ No newline at end of file
+        }
+
+class WavePlanForm(forms.Form):
+    """Form for planning pick waves of waiting sales orders"""
+
+    warehouse = forms.ModelChoiceField(
+        queryset=Warehouse.objects.filter(is_active=True),
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    cutoff = forms.DateField(
+        initial=timezone.localdate,
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
+        help_text='orders dated on or before this day'
+    )
+    max_orders = forms.IntegerField(
+        min_value=0,
+        initial=settings.WAVE_MAX_ORDERS,
+        label='Orders per wave',
+        widget=forms.NumberInput(attrs={'class': 'form-control'})
+    )
+    max_lines = forms.IntegerField(
+        min_value=0,
+        initial=settings.WAVE_MAX_LINES,
+        label='Lines per wave',
+        widget=forms.NumberInput(attrs={'class': 'form-control'})
+    )
+    max_units = forms.IntegerField(
+        min_value=0,
+        initial=settings.WAVE_MAX_UNITS,
+        label='Units per wave',
+        widget=forms.NumberInput(attrs={'class': 'form-control'}),
+        help_text='0 for no limit'
+    )
+    route = forms.ChoiceField(
+        choices=[(method, method.title()) for method in ROUTE_METHODS],
+        initial=settings.PICK_ROUTE,
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
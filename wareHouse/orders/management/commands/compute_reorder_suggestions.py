@@ -0,0 +1,46 @@
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from orders.replenishment import compute_reorder_suggestions
+
+
+class Command(BaseCommand):
+    help = 'Recompute reorder points and suggested purchase quantities of every product and warehouse'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.REORDER_DEMAND_DAYS,
+            help=f'days of OUT movements the demand is measured over (default {settings.REORDER_DEMAND_DAYS})'
+        )
+        parser.add_argument(
+            '--service-level',
+            type=float,
+            default=settings.REORDER_SERVICE_LEVEL,
+            help=f'share of lead times covered without a stock-out (default {settings.REORDER_SERVICE_LEVEL})'
+        )
+        parser.add_argument(
+            '--review-days',
+            type=int,
+            default=settings.REORDER_REVIEW_DAYS,
+            help=f'days an order has to last until the next review (default {settings.REORDER_REVIEW_DAYS})'
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] < 1:
+            raise CommandError('--days must be at least 1')
+        if not 0.5 <= options['service_level'] < 1:
+            raise CommandError('--service-level must be between 0.5 and 1')
+
+        started = perf_counter()
+        stats = compute_reorder_suggestions(
+            days=options['days'],
+            service_level=options['service_level'],
+            review_days=options['review_days'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ {stats['rows']} product/warehouse pairs computed, {stats['to_order']} to reorder "
+            f"({perf_counter() - started:.1f}s)"
+        ))
@@ -0,0 +1,89 @@
+import os
+import random
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from orders.forecasting import fit_all, forecast_demand
+
+
+class Command(BaseCommand):
+    help = 'Fit demand forecasts of every product and warehouse with OUT movements, in parallel'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.FORECAST_HISTORY_DAYS,
+            help=f'days of OUT movements the models are fitted on (default {settings.FORECAST_HISTORY_DAYS})'
+        )
+        parser.add_argument(
+            '--horizon',
+            type=int,
+            default=settings.FORECAST_HORIZON_DAYS,
+            help=f'days ahead the forecast quantity covers (default {settings.FORECAST_HORIZON_DAYS})'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='worker processes (default one per core, 1 fits in process)'
+        )
+        parser.add_argument(
+            '--benchmark',
+            type=int,
+            metavar='SERIES',
+            help='time the fitting of SERIES synthetic series with 1 worker up to --workers, nothing is saved'
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] < 2:
+            raise CommandError('--days must be at least 2')
+        if options['horizon'] < 1:
+            raise CommandError('--horizon must be at least 1')
+        if options['workers'] is not None and options['workers'] < 1:
+            raise CommandError('--workers must be at least 1')
+
+        if options['benchmark']:
+            self.benchmark(options['benchmark'], options['days'], options['workers'] or os.cpu_count() or 1)
+            return
+
+        run = forecast_demand(
+            history_days=options['days'],
+            horizon_days=options['horizon'],
+            workers=options['workers'],
+        )
+        self.stdout.write(
+            f'Read {run.series} series in {run.read_seconds:.1f}s, '
+            f'fitted in {run.fit_seconds:.1f}s with {run.workers} worker(s)'
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {run.series} forecasts saved ({run.croston} intermittent, {run.series - run.croston} smoothed)'
+        ))
+
+    def benchmark(self, count, days, max_workers):
+        rng = random.Random(42)
+        series = []
+        for _ in range(count):
+            # a mix of fast movers and intermittent items
+            density = rng.choice((0.9, 0.5, 0.2, 0.05))
+            picked = [day for day in range(days) if rng.random() < density] or [days - 1]
+            series.append((picked, [float(rng.randint(1, 20)) for _ in picked]))
+        self.stdout.write(f'{count} series, {sum(len(days) for days, _ in series)} demand days')
+
+        workers = 1
+        baseline = None
+        while True:
+            started = perf_counter()
+            _, used = fit_all(series, days, workers)
+            elapsed = perf_counter() - started
+            baseline = baseline or elapsed
+            self.stdout.write(
+                f'{used} worker(s): {elapsed:.2f}s - {count / elapsed:,.0f} series/s, '
+                f'{baseline / elapsed:.1f}x'
+            )
+            if workers >= max_workers:
+                break
+            workers = min(workers * 2, max_workers)
+
+        self.stdout.write(self.style.SUCCESS('✓ Forecast benchmark complete'))
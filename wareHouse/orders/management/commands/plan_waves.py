@@ -0,0 +1,61 @@
+from datetime import date
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from orders.picking import ROUTE_METHODS
+from orders.waves import plan_waves, release_waves
+from warehouses.models import Warehouse
+
+
+class Command(BaseCommand):
+    help = 'Plan pick waves of the pending and confirmed sales orders of a warehouse'
+
+    def add_arguments(self, parser):
+        parser.add_argument('warehouse', help='warehouse code')
+        parser.add_argument('--cutoff', help='plan orders dated on or before this day, YYYY-MM-DD (default today)')
+        parser.add_argument('--max-orders', type=int, help='orders per wave (default WAVE_MAX_ORDERS, 0 for no limit)')
+        parser.add_argument('--max-lines', type=int, help='order lines per wave (default WAVE_MAX_LINES, 0 for no limit)')
+        parser.add_argument('--max-units', type=int, help='units per wave (default WAVE_MAX_UNITS, 0 for no limit)')
+        parser.add_argument('--route', choices=ROUTE_METHODS, help='route through the picks (default PICK_ROUTE)')
+        parser.add_argument('--release', action='store_true', help='move the planned orders to processing')
+
+    def handle(self, *args, **options):
+        try:
+            warehouse = Warehouse.objects.get(code=options['warehouse'])
+        except Warehouse.DoesNotExist:
+            raise CommandError(f"Warehouse {options['warehouse']} not found")
+        try:
+            cutoff = date.fromisoformat(options['cutoff']) if options['cutoff'] else None
+        except ValueError:
+            raise CommandError('--cutoff must be a date, YYYY-MM-DD')
+
+        plan_options = {
+            'cutoff': cutoff,
+            'max_orders': options['max_orders'],
+            'max_lines': options['max_lines'],
+            'max_units': options['max_units'],
+            'method': options['route'],
+        }
+        started = perf_counter()
+        try:
+            plan = plan_waves(warehouse, **plan_options)
+        except ValueError as e:
+            raise CommandError(str(e))
+        elapsed = perf_counter() - started
+
+        for wave in plan.waves:
+            self.stdout.write(
+                f'Wave {wave.number}: {len(wave.orders)} orders, {wave.line_count} lines, '
+                f'{wave.pick_count} picks at {len(wave.stops)} stops, about {wave.distance:.0f} m'
+                + (f', {len(wave.shortages)} lines short' if wave.shortages else '')
+            )
+        self.stdout.write(f'Planned {plan.order_count} orders up to {plan.cutoff} in {elapsed:.2f}s')
+
+        if options['release']:
+            pick_waves = release_waves(warehouse, plan.order_ids, **plan_options)
+            for pick_wave in pick_waves:
+                self.stdout.write(f'Released {pick_wave.wave_number}')
+            released = sum(pick_wave.slots.count() for pick_wave in pick_waves)
+            self.stdout.write(self.style.SUCCESS(f'✓ {released} orders in {len(pick_waves)} waves released for picking'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✓ {len(plan.waves)} waves planned, run with --release to start them'))
@@ -0,0 +1,44 @@
+# Generated by Django 6.0.1 on 2026-10-18 23:29
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_initial'),
+        ('products', '0002_rename_shelf_life_product_shelf_life_days'),
+        ('suppliers', '0002_price_history_best_supplier'),
+        ('warehouses', '0002_alter_warehouse_manager'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReorderSuggestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('avg_daily_demand', models.DecimalField(decimal_places=3, default=0, max_digits=12)),
+                ('demand_std_dev', models.DecimalField(decimal_places=3, default=0, max_digits=12)),
+                ('lead_time_days', models.IntegerField(default=0)),
+                ('safety_stock', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('reorder_point', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('available_quantity', models.DecimalField(decimal_places=2, default=0, help_text='on hand minus reserved', max_digits=12)),
+                ('on_order_quantity', models.DecimalField(decimal_places=2, default=0, help_text='open purchase order lines not received yet', max_digits=12)),
+                ('suggested_quantity', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('unit_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('computed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reorder_suggestions', to='products.product')),
+                ('supplier', models.ForeignKey(blank=True, help_text='best supplier at computation time', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reorder_suggestions', to='suppliers.supplier')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reorder_suggestions', to='warehouses.warehouse')),
+            ],
+            options={
+                'verbose_name': 'Reorder Suggestion',
+                'verbose_name_plural': 'Reorder Suggestions',
+                'ordering': ['warehouse', 'product'],
+                'indexes': [models.Index(fields=['warehouse', 'suggested_quantity'], name='orders_reor_warehou_9b66d3_idx')],
+                'unique_together': {('product', 'warehouse')},
+            },
+        ),
+    ]
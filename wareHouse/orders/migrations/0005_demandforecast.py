@@ -0,0 +1,40 @@
+# Generated by Django 6.0.1 on 2026-10-18 23:35
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_documentsequence'),
+        ('products', '0002_rename_shelf_life_product_shelf_life_days'),
+        ('warehouses', '0002_alter_warehouse_manager'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DemandForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('method', models.CharField(choices=[('ses', 'Exponential Smoothing'), ('croston', 'Croston (intermittent)')], max_length=10)),
+                ('alpha', models.DecimalField(decimal_places=2, help_text='smoothing factor', max_digits=4)),
+                ('history_days', models.IntegerField(help_text='days of history the model was fitted on')),
+                ('demand_days', models.IntegerField(help_text='days of the history with demand')),
+                ('daily_forecast', models.DecimalField(decimal_places=3, default=0, max_digits=12)),
+                ('horizon_days', models.IntegerField(default=30)),
+                ('forecast_quantity', models.DecimalField(decimal_places=2, default=0, help_text='expected demand over the horizon', max_digits=12)),
+                ('computed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='demand_forecasts', to='products.product')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='demand_forecasts', to='warehouses.warehouse')),
+            ],
+            options={
+                'verbose_name': 'Demand Forecast',
+                'verbose_name_plural': 'Demand Forecasts',
+                'ordering': ['warehouse', 'product'],
+                'indexes': [models.Index(fields=['warehouse', 'forecast_quantity'], name='orders_dema_warehou_dab393_idx')],
+                'unique_together': {('product', 'warehouse')},
+            },
+        ),
+    ]
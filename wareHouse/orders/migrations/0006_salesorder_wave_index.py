@@ -0,0 +1,20 @@
+# Generated by Django 6.0.1 on 2026-10-18 23:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_demandforecast'),
+        ('warehouses', '0005_location_unique_code'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='salesorder',
+            index=models.Index(fields=['from_warehouse', 'status', 'order_date'], name='orders_sale_from_wa_b3cdeb_idx'),
+        ),
+    ]
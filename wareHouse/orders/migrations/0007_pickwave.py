@@ -0,0 +1,75 @@
+# Generated by Django 6.0.1 on 2026-10-19 00:59
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0016_inventoryevent_product_index'),
+        ('orders', '0006_salesorder_wave_index'),
+        ('products', '0004_product_sync_index'),
+        ('warehouses', '0006_location_sync_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PickWave',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('wave_number', models.CharField(help_text='e.g., WV-20240101-0001', max_length=50, unique=True)),
+                ('cutoff', models.DateField(help_text='orders dated on or before this day were planned')),
+                ('route_method', models.CharField(max_length=20)),
+                ('distance', models.FloatField(default=0, help_text='metres walked over the stops')),
+                ('line_count', models.IntegerField(default=0)),
+                ('unit_count', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('shortages', models.JSONField(blank=True, default=list, help_text='[sales order id, product id, quantity not available]')),
+                ('released_at', models.DateTimeField(auto_now_add=True)),
+                ('released_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='released_pick_waves', to=settings.AUTH_USER_MODEL)),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='pick_waves', to='warehouses.warehouse')),
+            ],
+            options={
+                'verbose_name': 'Pick Wave',
+                'verbose_name_plural': 'Pick Waves',
+                'ordering': ['-released_at', '-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PickWavePick',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sequence', models.PositiveIntegerField(help_text='stop number on the route')),
+                ('batch_number', models.CharField(blank=True, max_length=100)),
+                ('expiry_date', models.DateTimeField(blank=True, null=True)),
+                ('quantity', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('drops', models.JSONField(default=list, help_text='[slot, quantity] put into each slot')),
+                ('inventory', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='wave_picks', to='inventory.inventory')),
+                ('location', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='wave_picks', to='warehouses.storagelocation')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='wave_picks', to='products.product')),
+                ('wave', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='picks', to='orders.pickwave')),
+            ],
+            options={
+                'verbose_name': 'Pick Wave Pick',
+                'verbose_name_plural': 'Pick Wave Picks',
+                'ordering': ['wave', 'sequence', 'id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PickWaveOrder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slot', models.PositiveIntegerField()),
+                ('sales_order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='wave_slots', to='orders.salesorder')),
+                ('wave', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slots', to='orders.pickwave')),
+            ],
+            options={
+                'verbose_name': 'Pick Wave Order',
+                'verbose_name_plural': 'Pick Wave Orders',
+                'ordering': ['wave', 'slot'],
+                'unique_together': {('wave', 'slot')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-19 01:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0007_pickwave'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pickwaveorder',
+            name='stock_reserved',
+            field=models.BooleanField(default=False, help_text='the quantities dropped into this slot are reserved on their Inventory rows (see orders.waves)'),
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
 from django.utils import timezone
@@ -93,28 +93,38 @@ class PurchaseOrder(models.Model):
         self.calculate_total()
         
         super().save(*args, **kwargs)
+
+        # stock a pick wave reserved is held only while the order is processing
+        if self.status != 'processing':
+            from .waves import release_stock
+            release_stock(self.wave_slots.all())
     
     def generate_po_number(self):
         """Generate unique PO number"""
-        date_str = timezone.now().strftime('%Y%m%d')
-        last_po = PurchaseOrder.objects.filter(
-            po_number__startswith=f'PO-{date_str}'
-        ).order_by('-po_number').first()
-        
-        if last_po:
-            last_seq = int(last_po.po_number.split('-')[-1])
-            new_seq = last_seq + 1
-        else:
-            new_seq = 1
-        
-        return f'PO-{date_str}-{new_seq:04d}'
+        return PurchaseOrder.allocate_po_numbers(1)[0]
+
+    @staticmethod
+    def allocate_po_numbers(count):
+        """Reserve a block of `count` consecutive PO numbers of today"""
+        prefix = f"PO-{timezone.now().strftime('%Y%m%d')}"
+
+        def last_used():
+            last_po = PurchaseOrder.objects.filter(
+                po_number__startswith=prefix
+            ).order_by('-po_number').first()
+            return int(last_po.po_number.split('-')[-1]) if last_po else 0
+
+        first = DocumentSequence.allocate(prefix, count, seed=last_used)
+        return [f'{prefix}-{seq:04d}' for seq in range(first, first + count)]
     
     def calculate_total(self):
         """Calculate order totals"""
-        items_total = self.items.aggregate(
-            total=models.Sum(models.F('quantity') * models.F('unit_price'))
-        )['total'] or 0
-        
+        items_total = 0
+        if self.pk:  # a new order has no items yet
+            items_total = self.items.aggregate(
+                total=models.Sum(models.F('quantity') * models.F('unit_price'))
+            )['total'] or 0
+
         self.subtotal = items_total
         self.total_amount = (
             self.subtotal + 
@@ -322,6 +332,8 @@ class SalesOrder(models.Model):
         indexes = [
             models.Index(fields=['so_number']),
             models.Index(fields=['order_date']),
+            # orders waiting for a pick wave (orders.waves)
+            models.Index(fields=['from_warehouse', 'status', 'order_date']),
         ]
     
     def __str__(self):
@@ -336,6 +348,11 @@ class SalesOrder(models.Model):
         self.calculate_total()
         
         super().save(*args, **kwargs)
+
+        # stock a pick wave reserved is held only while the order is processing
+        if self.status != 'processing':
+            from .waves import release_stock
+            release_stock(self.wave_slots.all())
     
     def generate_so_number(self):
         """Generate unique SO number"""
@@ -354,10 +371,12 @@ class SalesOrder(models.Model):
     
     def calculate_total(self):
         """Calculate order totals"""
-        items_total = self.items.aggregate(
-            total=models.Sum(models.F('quantity') * models.F('unit_price'))
-        )['total'] or 0
-        
+        items_total = 0
+        if self.pk:  # a new order has no items yet
+            items_total = self.items.aggregate(
+                total=models.Sum(models.F('quantity') * models.F('unit_price'))
+            )['total'] or 0
+
         self.subtotal = items_total
         self.total_amount = (
             self.subtotal + 
@@ -449,4 +468,269 @@ class SalesOrderItem(models.Model):
         
         # Update SO totals
         self.sales_order.calculate_total()
-        self.sales_order.save()
\ No newline at end of file
+        self.sales_order.save()
+
+class ReorderSuggestion(models.Model):
+    """
+    Computed reorder point and suggested purchase quantity of a product in a
+    warehouse, replaced as a whole by compute_reorder_suggestions.
+    """
+
+    product = models.ForeignKey(
+        'products.Product',
+        on_delete=models.CASCADE,
+        related_name='reorder_suggestions'
+    )
+    warehouse = models.ForeignKey(
+        'warehouses.Warehouse',
+        on_delete=models.CASCADE,
+        related_name='reorder_suggestions'
+    )
+    supplier = models.ForeignKey(
+        'suppliers.Supplier',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='reorder_suggestions',
+        help_text='best supplier at computation time'
+    )
+
+    # demand
+    avg_daily_demand = models.DecimalField(max_digits=12, decimal_places=3, default=0)
+    demand_std_dev = models.DecimalField(max_digits=12, decimal_places=3, default=0)
+    lead_time_days = models.IntegerField(default=0)
+
+    # policy
+    safety_stock = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    reorder_point = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    # position
+    available_quantity = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text='on hand minus reserved')
+    on_order_quantity = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text='open purchase order lines not received yet')
+
+    # suggestion
+    suggested_quantity = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+
+    computed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['warehouse', 'product']
+        verbose_name = 'Reorder Suggestion'
+        verbose_name_plural = 'Reorder Suggestions'
+        unique_together = ['product', 'warehouse']
+        indexes = [
+            models.Index(fields=['warehouse', 'suggested_quantity']),
+        ]
+
+    def __str__(self):
+        return f"{self.product} @ {self.warehouse.code}: {self.suggested_quantity}"
+
+    @property
+    def estimated_cost(self):
+        return self.suggested_quantity * (self.unit_price or 0)
+
+    @property
+    def days_of_cover(self):
+        "days the available and on-order stock lasts at the average demand"
+        if self.avg_daily_demand > 0:
+            return (self.available_quantity + self.on_order_quantity) / self.avg_daily_demand
+        return None
+
+
+class DocumentSequence(models.Model):
+    """
+    Last number handed out under a document number prefix (e.g. PO-20240101).
+    Numbers are reserved in blocks under a row lock, so bulk generation and
+    single saves never hand out the same number.
+    """
+
+    prefix = models.CharField(max_length=50, unique=True)
+    last_value = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['prefix']
+        verbose_name = 'Document Sequence'
+        verbose_name_plural = 'Document Sequences'
+
+    def __str__(self):
+        return f"{self.prefix}: {self.last_value}"
+
+    @classmethod
+    def allocate(cls, prefix, count=1, seed=None):
+        """
+        Reserve `count` consecutive numbers under prefix, returns the first one.
+        seed() returns the last number already in use when the prefix is new.
+        """
+        with transaction.atomic():
+            sequence = cls.objects.select_for_update().filter(prefix=prefix).first()
+            if sequence is None:
+                try:
+                    with transaction.atomic():
+                        sequence = cls.objects.create(prefix=prefix, last_value=seed() if seed else 0)
+                except IntegrityError:
+                    # created concurrently, wait for its lock
+                    sequence = cls.objects.select_for_update().get(prefix=prefix)
+
+            first = sequence.last_value + 1
+            sequence.last_value += count
+            sequence.save(update_fields=['last_value', 'updated_at'])
+        return first
+
+
+class DemandForecast(models.Model):
+    """
+    Next-horizon demand forecast of a product in a warehouse, replaced as a
+    whole by forecast_demand.
+    """
+
+    METHOD_CHOICES = [
+        ('ses', 'Exponential Smoothing'),
+        ('croston', 'Croston (intermittent)'),
+    ]
+
+    product = models.ForeignKey(
+        'products.Product',
+        on_delete=models.CASCADE,
+        related_name='demand_forecasts'
+    )
+    warehouse = models.ForeignKey(
+        'warehouses.Warehouse',
+        on_delete=models.CASCADE,
+        related_name='demand_forecasts'
+    )
+
+    # model
+    method = models.CharField(max_length=10, choices=METHOD_CHOICES)
+    alpha = models.DecimalField(max_digits=4, decimal_places=2, help_text='smoothing factor')
+    history_days = models.IntegerField(help_text='days of history the model was fitted on')
+    demand_days = models.IntegerField(help_text='days of the history with demand')
+
+    # forecast
+    daily_forecast = models.DecimalField(max_digits=12, decimal_places=3, default=0)
+    horizon_days = models.IntegerField(default=30)
+    forecast_quantity = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text='expected demand over the horizon')
+
+    computed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['warehouse', 'product']
+        verbose_name = 'Demand Forecast'
+        verbose_name_plural = 'Demand Forecasts'
+        unique_together = ['product', 'warehouse']
+        indexes = [
+            models.Index(fields=['warehouse', 'forecast_quantity']),
+        ]
+
+    def __str__(self):
+        return f"{self.product} @ {self.warehouse.code}: {self.forecast_quantity} / {self.horizon_days}d"
+
+
+class PickWave(models.Model):
+    """
+    A released wave of sales orders picked in one round (see orders.waves).
+    Its cart slots and merged picks are stored as planned at release, so the
+    pick list and sort instructions can be printed again once the orders are
+    processing.
+    """
+
+    wave_number = models.CharField(max_length=50, unique=True, help_text='e.g., WV-20240101-0001')
+    warehouse = models.ForeignKey(
+        'warehouses.Warehouse',
+        on_delete=models.PROTECT,
+        related_name='pick_waves'
+    )
+    cutoff = models.DateField(help_text='orders dated on or before this day were planned')
+    route_method = models.CharField(max_length=20)
+    distance = models.FloatField(default=0, help_text='metres walked over the stops')
+    line_count = models.IntegerField(default=0)
+    unit_count = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    shortages = models.JSONField(
+        default=list,
+        blank=True,
+        help_text='[sales order id, product id, quantity not available]'
+    )
+
+    released_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='released_pick_waves'
+    )
+    released_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-released_at', '-id']
+        verbose_name = 'Pick Wave'
+        verbose_name_plural = 'Pick Waves'
+
+    def __str__(self):
+        return f"{self.wave_number} ({self.warehouse.code})"
+
+    @staticmethod
+    def allocate_wave_numbers(count):
+        """Reserve a block of `count` consecutive wave numbers of today"""
+        prefix = f"WV-{timezone.now().strftime('%Y%m%d')}"
+        first = DocumentSequence.allocate(prefix, count)
+        return [f'{prefix}-{seq:04d}' for seq in range(first, first + count)]
+
+
+class PickWaveOrder(models.Model):
+    "cart slot of a sales order in a pick wave"
+
+    wave = models.ForeignKey(PickWave, on_delete=models.CASCADE, related_name='slots')
+    sales_order = models.ForeignKey(SalesOrder, on_delete=models.CASCADE, related_name='wave_slots')
+    slot = models.PositiveIntegerField()
+    stock_reserved = models.BooleanField(
+        default=False,
+        help_text='the quantities dropped into this slot are reserved on their Inventory rows (see orders.waves)'
+    )
+
+    class Meta:
+        ordering = ['wave', 'slot']
+        verbose_name = 'Pick Wave Order'
+        verbose_name_plural = 'Pick Wave Orders'
+        unique_together = ['wave', 'slot']
+
+    def __str__(self):
+        return f"{self.wave.wave_number} slot {self.slot}: {self.sales_order.so_number}"
+
+
+class PickWavePick(models.Model):
+    "merged pick of one Inventory row in a pick wave, with the quantity dropped into each slot"
+
+    wave = models.ForeignKey(PickWave, on_delete=models.CASCADE, related_name='picks')
+    sequence = models.PositiveIntegerField(help_text='stop number on the route')
+    product = models.ForeignKey(
+        'products.Product',
+        on_delete=models.PROTECT,
+        related_name='wave_picks'
+    )
+    location = models.ForeignKey(
+        'warehouses.StorageLocation',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='wave_picks'
+    )
+    inventory = models.ForeignKey(
+        'inventory.Inventory',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='wave_picks'
+    )
+    batch_number = models.CharField(max_length=100, blank=True)
+    expiry_date = models.DateTimeField(null=True, blank=True)
+    quantity = models.DecimalField(max_digits=10, decimal_places=2)
+    drops = models.JSONField(default=list, help_text='[slot, quantity] put into each slot')
+
+    class Meta:
+        ordering = ['wave', 'sequence', 'id']
+        verbose_name = 'Pick Wave Pick'
+        verbose_name_plural = 'Pick Wave Picks'
+
+    def __str__(self):
+        return f"{self.wave.wave_number} #{self.sequence} {self.product.sku} x {self.quantity}"
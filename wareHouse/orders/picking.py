@@ -0,0 +1,225 @@
+"""
+Pick lists with a walking route.
+
+build_pick_list() resolves the lines of a sales order to the Inventory rows
+(and so the storage locations) to pick from, then orders the stops into a
+route through the warehouse:
+
+- allocation takes the available quantity (quantity - reserved) of the
+  warehouse's rows of each product, earliest expiry first, splitting a line
+  over several rows when one is not enough. Whatever cannot be covered is
+  reported as a shortage.
+- "serpentine" routing walks the aisles in order, up the racks of one aisle and
+  back down the next; "nearest" routing repeatedly walks to the closest
+  unvisited stop, using the coordinates returned by settings.PICK_LOCATION_COORDINATES
+  (a dotted path to a callable taking a StorageLocation and returning (x, y)).
+  Stock without a location is picked last.
+
+The inventory of all the order's products is read with one query, and the
+routes are built in memory, so a few hundred lines take milliseconds.
+"""
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import F
+from django.utils.module_loading import import_string
+
+from inventory.models import Inventory
+
+CHUNK_SIZE = 2000
+ROUTE_METHODS = ['serpentine', 'nearest']
+
+# metres between neighbouring aisles and racks for grid_coordinates()
+AISLE_SPACING = 3.0
+RACK_SPACING = 1.0
+
+
+@dataclass
+class PickLine:
+    # caller's key of the demand (e.g. the SalesOrderItem id)
+    key: object
+    product: object
+    quantity: Decimal
+    inventory_id: int = None
+    # None for stock without a storage location
+    location: object = None
+    batch_number: str = ''
+    expiry_date: object = None
+
+
+@dataclass
+class PickStop:
+    sequence: int
+    location: object
+    lines: list = field(default_factory=list)
+
+
+@dataclass
+class PickList:
+    stops: list = field(default_factory=list)
+    # (key, product, quantity not available)
+    shortages: list = field(default_factory=list)
+    method: str = 'serpentine'
+    distance: float = 0.0
+
+    @property
+    def line_count(self):
+        return sum(len(stop.lines) for stop in self.stops)
+
+
+def natural_key(value):
+    "sort key that puts R2 before R10"
+    return [(0, int(part), '') if part.isdigit() else (1, 0, part) for part in re.split(r'(\d+)', (value or '').upper()) if part]
+
+
+def label_position(value):
+    "number of an aisle or rack label: 12 -> 12, C -> 3, AB -> 28"
+    value = (value or '').strip().upper()
+    if value.isdigit():
+        return int(value)
+    if value.isalpha():
+        position = 0
+        for letter in value:
+            position = position * 26 + ord(letter) - ord('A') + 1
+        return position
+    digits = re.findall(r'\d+', value)
+    return int(digits[0]) if digits else 0
+
+
+def grid_coordinates(location):
+    "default (x, y) of a location: aisles side by side, racks along each aisle"
+    return (label_position(location.aisle) * AISLE_SPACING, label_position(location.rack) * RACK_SPACING)
+
+
+def distance(a, b):
+    return abs(a[0] - b[0]) + abs(a[1] - b[1])
+
+
+def stock_rows(warehouse_id, product_ids):
+    """
+    {product_id: [Inventory rows with available stock]} of the warehouse,
+    earliest expiry first. product_ids is a list of ids or a queryset of them,
+    which is run as a subquery.
+    """
+    if not isinstance(product_ids, (list, tuple, set)):
+        chunks = [product_ids]
+    else:
+        product_ids = list(product_ids)
+        chunks = [product_ids[start:start + CHUNK_SIZE] for start in range(0, len(product_ids), CHUNK_SIZE)]
+
+    rows = defaultdict(list)
+    for chunk in chunks:
+        inventory = Inventory.objects.filter(
+            warehouse_id=warehouse_id,
+            product_id__in=chunk,
+            quantity__gt=F('reserved_quantity'),
+        ).select_related('storage_location').order_by(F('expiry_date').asc(nulls_last=True), 'pk')
+        for row in inventory:
+            rows[row.product_id].append(row)
+    return rows
+
+
+def allocate(demands, rows, available=None):
+    """
+    Split demands, (key, product, quantity) tuples, over the stock_rows() of
+    their products in order. Returns (lines, shortages). available
+    ({inventory_id: quantity}) carries what is left between calls, so several
+    allocations never hand out the same stock twice.
+    """
+    available = {} if available is None else available
+    lines = []
+    shortages = []
+    for key, product, quantity in demands:
+        remaining = Decimal(quantity)
+        for row in rows.get(product.pk, ()):
+            if remaining <= 0:
+                break
+            left = available.setdefault(row.pk, row.quantity - row.reserved_quantity)
+            take = min(remaining, left)
+            if take <= 0:
+                continue
+            available[row.pk] = left - take
+            remaining -= take
+            lines.append(PickLine(key, product, take, row.pk, row.storage_location, row.batch_number or '', row.expiry_date))
+        if remaining > 0:
+            shortages.append((key, product, remaining))
+    return lines, shortages
+
+
+def serpentine(locations):
+    "locations in aisle order, racks ascending in odd aisles and descending in even ones"
+    aisles = defaultdict(lambda: defaultdict(list))
+    for location in locations:
+        aisles[location.aisle or ''][location.rack or ''].append(location)
+
+    ordered = []
+    for index, aisle in enumerate(sorted(aisles, key=natural_key)):
+        racks = sorted(aisles[aisle], key=natural_key, reverse=index % 2 == 1)
+        for rack in racks:
+            ordered += sorted(aisles[aisle][rack], key=lambda loc: (natural_key(loc.shelf), natural_key(loc.bin), natural_key(loc.code)))
+    return ordered
+
+
+def nearest_neighbour(locations, coordinates, start=(0.0, 0.0)):
+    "greedy route from start, always to the closest unvisited location"
+    points = {location.pk: coordinates(location) for location in locations}
+    unvisited = sorted(locations, key=lambda loc: natural_key(loc.code))
+    ordered = []
+    position = start
+    while unvisited:
+        closest = min(unvisited, key=lambda loc: distance(position, points[loc.pk]))
+        unvisited.remove(closest)
+        ordered.append(closest)
+        position = points[closest.pk]
+    return ordered
+
+
+def route_stops(lines, method=None):
+    """
+    Group pick lines into stops, one per location, in walking order. Returns
+    (stops, distance) with the distance walked from (0, 0) over the stops.
+    """
+    method = method or settings.PICK_ROUTE
+    if method not in ROUTE_METHODS:
+        raise ValueError(f"Unknown route method {method!r}, use {' or '.join(ROUTE_METHODS)}")
+    coordinates = import_string(settings.PICK_LOCATION_COORDINATES)
+
+    by_location = defaultdict(list)
+    locations = {}
+    unlocated = []
+    for line in lines:
+        if line.location is None:
+            unlocated.append(line)
+        else:
+            by_location[line.location.pk].append(line)
+            locations[line.location.pk] = line.location
+
+    if method == 'nearest':
+        ordered = nearest_neighbour(list(locations.values()), coordinates)
+    else:
+        ordered = serpentine(locations.values())
+
+    stops = [PickStop(sequence, location, by_location[location.pk]) for sequence, location in enumerate(ordered, 1)]
+    if unlocated:
+        stops.append(PickStop(len(stops) + 1, None, unlocated))
+
+    walked = 0.0
+    position = (0.0, 0.0)
+    for location in ordered:
+        point = coordinates(location)
+        walked += distance(position, point)
+        position = point
+    return stops, walked
+
+
+def build_pick_list(order, method=None):
+    "PickList of a SalesOrder, picked from its from_warehouse"
+    method = method or settings.PICK_ROUTE
+    demands = [(item.pk, item.product, item.quantity) for item in order.items.select_related('product')]
+    rows = stock_rows(order.from_warehouse_id, [product.pk for _, product, _ in demands])
+    lines, shortages = allocate(demands, rows)
+    stops, walked = route_stops(lines, method)
+    return PickList(stops=stops, shortages=shortages, method=method, distance=walked)
@@ -0,0 +1,120 @@
+"""
+Bulk draft purchase order generation.
+
+generate_draft_orders() turns a set of (product, warehouse, quantity) needs into
+draft purchase orders: one per best supplier and destination warehouse, the
+quantities rounded up to the supplier's minimum order quantity. PO numbers are
+reserved as one block and every order and line is written with bulk_create,
+totals computed up front, so hundreds of orders cost a few queries instead of
+a PurchaseOrder recalculation per line.
+"""
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from search.index import index_queryset
+from suppliers.sync import best_suppliers
+from .models import PurchaseOrder, PurchaseOrderItem, ReorderSuggestion
+
+CHUNK_SIZE = 2000
+
+
+@dataclass
+class DraftOrders:
+    orders: list = field(default_factory=list)
+    line_count: int = 0
+    # needs without an available supplier offer, (product_id, warehouse_id, quantity)
+    skipped: list = field(default_factory=list)
+
+
+def generate_draft_orders(needs, user=None, notes='Generated from reorder needs'):
+    """
+    Create draft purchase orders for needs, an iterable of (product_id,
+    warehouse_id, quantity). Needs of the same product and warehouse are added
+    up. Returns a DraftOrders with the created orders and the skipped needs.
+    """
+    wanted = defaultdict(Decimal)
+    for product_id, warehouse_id, quantity in needs:
+        if quantity > 0:
+            wanted[product_id, warehouse_id] += Decimal(quantity)
+
+    result = DraftOrders()
+    best = best_suppliers({product_id for product_id, _ in wanted})
+    groups = defaultdict(list)
+    for (product_id, warehouse_id), quantity in wanted.items():
+        offer = best.get(product_id)
+        if offer is None:
+            result.skipped.append((product_id, warehouse_id, quantity))
+            continue
+        groups[offer.supplier_id, warehouse_id].append((product_id, offer.order_quantity(quantity), offer))
+    if not groups:
+        return result
+
+    today = timezone.now().date()
+    keys = sorted(groups)
+    with transaction.atomic():
+        numbers = PurchaseOrder.allocate_po_numbers(len(keys))
+
+        orders = []
+        for po_number, (supplier_id, warehouse_id) in zip(numbers, keys):
+            lines = groups[supplier_id, warehouse_id]
+            subtotal = sum(quantity * offer.unit_price for _, quantity, offer in lines)
+            orders.append(PurchaseOrder(
+                po_number=po_number,
+                supplier_id=supplier_id,
+                deliver_to_warehouse_id=warehouse_id,
+                status='draft',
+                order_date=today,
+                expected_delivery_date=today + timedelta(days=max(offer.lead_time_days for _, _, offer in lines)),
+                subtotal=subtotal,
+                total_amount=subtotal,
+                notes=notes,
+                created_by=user,
+            ))
+        PurchaseOrder.objects.bulk_create(orders, batch_size=CHUNK_SIZE)
+
+        # bulk_create does not return ids on every backend, read them back by number
+        ids = dict(PurchaseOrder.objects.filter(po_number__in=numbers).values_list('po_number', 'pk'))
+        items = [
+            PurchaseOrderItem(
+                purchase_order_id=ids[order.po_number],
+                product_id=product_id,
+                quantity=quantity,
+                unit_price=offer.unit_price,
+                line_total=quantity * offer.unit_price,
+            )
+            for order, key in zip(orders, keys)
+            for product_id, quantity, offer in groups[key]
+        ]
+        PurchaseOrderItem.objects.bulk_create(items, batch_size=CHUNK_SIZE)
+
+        index_queryset(PurchaseOrder.objects.filter(pk__in=ids.values()))
+
+    result.orders = orders
+    result.line_count = len(items)
+    return result
+
+
+def draft_orders_from_suggestions(suggestions, user=None):
+    """
+    Create draft purchase orders for the ReorderSuggestions of a queryset with a
+    suggested quantity, then move those quantities to on order so the same
+    suggestion is not ordered twice before the next recompute.
+    """
+    rows = list(suggestions.filter(suggested_quantity__gt=0).values_list('pk', 'product_id', 'warehouse_id', 'suggested_quantity'))
+    with transaction.atomic():
+        result = generate_draft_orders([row[1:] for row in rows], user=user, notes='Generated from reorder suggestions')
+
+        skipped = {(product_id, warehouse_id) for product_id, warehouse_id, _ in result.skipped}
+        ordered = [pk for pk, product_id, warehouse_id, _ in rows if (product_id, warehouse_id) not in skipped]
+        for start in range(0, len(ordered), CHUNK_SIZE):
+            ReorderSuggestion.objects.filter(pk__in=ordered[start:start + CHUNK_SIZE]).update(
+                on_order_quantity=F('on_order_quantity') + F('suggested_quantity'),
+                suggested_quantity=0,
+            )
+    return result
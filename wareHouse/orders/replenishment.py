@@ -0,0 +1,154 @@
+"""
+Demand driven reorder suggestions.
+
+compute_reorder_suggestions() recomputes the reorder point and suggested
+purchase quantity of every active product in every warehouse in one batch. The
+inputs are a handful of grouped queries, never a query per product:
+
+- daily demand: one GROUP BY (product, warehouse, day) over the OUT movements of
+  the last REORDER_DEMAND_DAYS days,
+- available stock (quantity - reserved) and open purchase order quantities: one
+  GROUP BY (product, warehouse) each,
+- lead time, minimum order quantity and price: the BestSupplier index.
+
+The policy is then evaluated column by column over those arrays, with d the
+average daily demand, sigma its standard deviation (days without a sale count
+as 0), L the lead time, R the review period and z the service level factor:
+
+    safety stock   = z * sigma * sqrt(L)
+    reorder point  = max(d * L + safety stock, product.reorder_level)
+    order up to    = reorder point + d * R
+    suggestion     = order up to - (available + on order) once the position is
+                     at or below the reorder point, rounded up to whole units
+                     and to the supplier's minimum order quantity
+"""
+import math
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from statistics import NormalDist
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from inventory.models import Inventory, StockMovement
+from products.models import Product
+from suppliers.sync import best_suppliers
+from .models import PurchaseOrderItem, ReorderSuggestion
+
+CHUNK_SIZE = 2000
+
+# purchase orders whose undelivered quantity counts as on order
+OPEN_PO_STATUSES = ['draft', 'pending', 'approved', 'ordered']
+
+
+def daily_out_totals(since, ordered=False):
+    "(product_id, warehouse_id, day, quantity) of every day with OUT movements since `since`, one grouped query"
+    rows = StockMovement.objects.filter(
+        movement_type='out', movement_date__gte=since, from_warehouse__isnull=False
+    ).annotate(day=TruncDate('movement_date')).values_list(
+        'product_id', 'from_warehouse_id', 'day'
+    ).annotate(total=Sum('quantity'))
+    rows = rows.order_by('product_id', 'from_warehouse_id', 'day') if ordered else rows.order_by()
+    return rows.iterator(chunk_size=CHUNK_SIZE)
+
+
+def daily_demand(since):
+    "{(product_id, warehouse_id): (total, sum of squared daily totals)} of OUT movements since `since`"
+    totals = defaultdict(float)
+    squares = defaultdict(float)
+    for product_id, warehouse_id, _, total in daily_out_totals(since):
+        quantity = float(total)
+        totals[product_id, warehouse_id] += quantity
+        squares[product_id, warehouse_id] += quantity * quantity
+    return totals, squares
+
+
+def available_stock():
+    rows = Inventory.objects.values_list('product_id', 'warehouse_id').annotate(
+        available=Sum(F('quantity') - F('reserved_quantity'))
+    ).order_by()
+    return {(product_id, warehouse_id): float(available) for product_id, warehouse_id, available in rows.iterator(chunk_size=CHUNK_SIZE)}
+
+
+def open_order_quantities():
+    rows = PurchaseOrderItem.objects.filter(purchase_order__status__in=OPEN_PO_STATUSES).values_list(
+        'product_id', 'purchase_order__deliver_to_warehouse_id'
+    ).annotate(pending=Sum(F('quantity') - F('quantity_received'))).order_by()
+    return {(product_id, warehouse_id): max(float(pending), 0.0) for product_id, warehouse_id, pending in rows.iterator(chunk_size=CHUNK_SIZE)}
+
+
+def to_decimal(value, places=2):
+    return Decimal(str(round(value, places)))
+
+
+def compute_reorder_suggestions(days=None, service_level=None, review_days=None):
+    """
+    Replace every ReorderSuggestion with freshly computed ones, returns
+    {'rows': n, 'to_order': n} (to_order counts the suggestions above 0).
+    """
+    days = days or settings.REORDER_DEMAND_DAYS
+    service_level = service_level or settings.REORDER_SERVICE_LEVEL
+    review_days = settings.REORDER_REVIEW_DAYS if review_days is None else review_days
+    z = NormalDist().inv_cdf(service_level)
+    now = timezone.now()
+
+    totals, squares = daily_demand(now - timedelta(days=days))
+    available = available_stock()
+    on_order = open_order_quantities()
+    reorder_levels = dict(Product.objects.filter(is_active=True).values_list('pk', 'reorder_level'))
+
+    keys = sorted(key for key in set(totals) | set(available) | set(on_order) if key[0] in reorder_levels)
+    best = best_suppliers({product_id for product_id, _ in keys})
+    offers = [best.get(product_id) for product_id, _ in keys]
+
+    # columns, one entry per (product, warehouse)
+    demand = [totals.get(key, 0.0) / days for key in keys]
+    sigma = [
+        math.sqrt(max(squares.get(key, 0.0) / days - d * d, 0.0))
+        for key, d in zip(keys, demand)
+    ]
+    lead = [offer.lead_time_days if offer else settings.REORDER_DEFAULT_LEAD_TIME_DAYS for offer in offers]
+    moq = [float(offer.minimum_order_quantity) if offer else 0.0 for offer in offers]
+    safety = [z * s * math.sqrt(l) for s, l in zip(sigma, lead)]
+    reorder_point = [
+        max(d * l + ss, reorder_levels[key[0]])
+        for key, d, l, ss in zip(keys, demand, lead, safety)
+    ]
+    position = [available.get(key, 0.0) + on_order.get(key, 0.0) for key in keys]
+    shortfall = [
+        rop + d * review_days - p if p <= rop else 0.0
+        for rop, d, p in zip(reorder_point, demand, position)
+    ]
+    suggested = [
+        max(math.ceil(q - 1e-9), m) if q > 0 else 0
+        for q, m in zip(shortfall, moq)
+    ]
+
+    suggestions = [
+        ReorderSuggestion(
+            product_id=key[0],
+            warehouse_id=key[1],
+            supplier_id=offer.supplier_id if offer else None,
+            avg_daily_demand=to_decimal(d, 3),
+            demand_std_dev=to_decimal(s, 3),
+            lead_time_days=l,
+            safety_stock=to_decimal(ss),
+            reorder_point=to_decimal(rop),
+            available_quantity=to_decimal(available.get(key, 0.0)),
+            on_order_quantity=to_decimal(on_order.get(key, 0.0)),
+            suggested_quantity=to_decimal(q),
+            unit_price=offer.unit_price if offer else None,
+            computed_at=now,
+        )
+        for key, offer, d, s, l, ss, rop, q in zip(keys, offers, demand, sigma, lead, safety, reorder_point, suggested)
+    ]
+
+    with transaction.atomic():
+        ReorderSuggestion.objects.all().delete()
+        ReorderSuggestion.objects.bulk_create(suggestions, batch_size=CHUNK_SIZE)
+
+    return {'rows': len(suggestions), 'to_order': sum(1 for q in suggested if q > 0)}
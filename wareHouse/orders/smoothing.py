@@ -0,0 +1,108 @@
+"""
+Demand models fitted by forecast_demand.
+
+Pure Python with no Django imports, so the functions can run in worker
+processes whatever their start method. A series is sparse: the day indexes
+(0 = first day of the history) and quantities of the days with demand, every
+other day of the history counts as 0. Both models are evaluated directly on
+that sparse form:
+
+- exponential smoothing (SES) decays its level by (1 - alpha) ** k over a run
+  of k days without demand and adds the run's squared errors as a geometric
+  series, so the cost is per demand day, not per calendar day. alpha is fitted
+  by the smallest one-step-ahead squared error over ALPHAS.
+- Croston, for intermittent demand, smooths the demand sizes and the intervals
+  between them separately and forecasts size / interval per day, with the
+  Syntetos-Boylan (1 - alpha / 2) bias correction.
+
+A series is intermittent when its average demand interval (days of history per
+day with demand, counted from its first demand) is above INTERMITTENT_ADI.
+"""
+from array import array
+
+ALPHAS = (0.05, 0.1, 0.15, 0.2, 0.25, 0.3, 0.4, 0.5)
+CROSTON_ALPHA = 0.1
+INTERMITTENT_ADI = 1.32
+
+
+def fit_ses(days, quantities, length, alpha):
+    "(level, squared error) of exponential smoothing over `length` days"
+    decay = 1.0 - alpha
+    decay2 = decay * decay
+    level = sum(quantities) / length
+    sse = 0.0
+    position = 0
+    for day, quantity in zip(days, quantities):
+        gap = day - position
+        if gap:
+            # zero days: error -level, -level*decay, ... and the level decays geometrically
+            sse += level * level * (1.0 - decay2 ** gap) / (1.0 - decay2)
+            level *= decay ** gap
+        error = quantity - level
+        sse += error * error
+        level += alpha * error
+        position = day + 1
+    gap = length - position
+    if gap:
+        sse += level * level * (1.0 - decay2 ** gap) / (1.0 - decay2)
+        level *= decay ** gap
+    return level, sse
+
+
+def fit_croston(days, quantities, length, alpha=CROSTON_ALPHA):
+    "per day demand rate of the bias corrected Croston method"
+    size = sum(quantities) / len(quantities)
+    interval = length / len(quantities)
+    previous = -1
+    for day, quantity in zip(days, quantities):
+        size += alpha * (quantity - size)
+        interval += alpha * ((day - previous) - interval)
+        previous = day
+    return (1.0 - alpha / 2.0) * size / interval
+
+
+def fit_series(days, quantities, history_days):
+    """
+    Fit one series, days relative to a history of history_days days. Returns
+    (method, alpha, fitted history days, demand days, daily forecast).
+    """
+    start = days[0]
+    if start:
+        days = [day - start for day in days]
+    length = history_days - start
+    count = len(days)
+
+    if length / count > INTERMITTENT_ADI:
+        return 'croston', CROSTON_ALPHA, length, count, fit_croston(days, quantities, length)
+
+    best = None
+    for alpha in ALPHAS:
+        level, sse = fit_ses(days, quantities, length, alpha)
+        if best is None or sse < best[1]:
+            best = (level, sse, alpha)
+    return 'ses', best[2], length, count, best[0]
+
+
+def fit_shard(shard):
+    """
+    Fit the series of a shard, (history_days, offsets, days, quantities) with
+    series i stored at [offsets[i], offsets[i + 1]) of the day and quantity
+    arrays. Returns one fit_series() tuple per series, in order.
+    """
+    history_days, offsets, days, quantities = shard
+    return [
+        fit_series(days[offsets[i]:offsets[i + 1]], quantities[offsets[i]:offsets[i + 1]], history_days)
+        for i in range(len(offsets) - 1)
+    ]
+
+
+def build_shard(history_days, series):
+    "pack (days, quantities) series into the columnar shard fit_shard() expects"
+    offsets = array('l', [0])
+    days = array('l')
+    quantities = array('d')
+    for series_days, series_quantities in series:
+        days.extend(series_days)
+        quantities.extend(series_quantities)
+        offsets.append(len(days))
+    return history_days, offsets, days, quantities
@@ -1,3 +1,70 @@
+from decimal import Decimal
+
 from django.test import TestCase
 
-# Create your tests here.
+from inventory.models import Inventory
+from products.models import Product
+from warehouses.models import Warehouse
+from .models import PickWave, SalesOrder, SalesOrderItem
+from .waves import plan_waves, release_stock, release_waves
+
+
+class WaveReservationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.warehouse = Warehouse.objects.create(
+            name='Wave WH', code='WAVE-WH', address='-', city='-', state='-', postal_code='-', phone='-',
+            total_capacity=1000
+        )
+        cls.product = Product.objects.create(name='Waved', sku='WAVE-1', purchase_price=1, selling_price=2)
+        cls.inventory = Inventory.objects.create(product=cls.product, warehouse=cls.warehouse, batch_number='', quantity=10)
+
+    def order(self, quantity):
+        order = SalesOrder.objects.create(
+            customer_name='Customer', customer_phone='-', delivery_address='-', delivery_city='-',
+            delivery_state='-', delivery_postal_code='-', from_warehouse=self.warehouse, status='confirmed'
+        )
+        SalesOrderItem.objects.create(sales_order=order, product=self.product, quantity=quantity, unit_price=1)
+        return order
+
+    def reserved(self):
+        self.inventory.refresh_from_db()
+        return self.inventory.reserved_quantity
+
+    def test_release_reserves_the_picked_stock(self):
+        first = self.order(6)
+        [wave] = release_waves(self.warehouse, [first.pk])
+        self.assertEqual(self.reserved(), 6)
+        self.assertTrue(wave.slots.get().stock_reserved)
+
+        # the next release only gets what is left
+        second = self.order(6)
+        plan = plan_waves(self.warehouse, order_ids=[second.pk])
+        self.assertEqual(plan.waves[0].shortages[0][2], Decimal('2'))
+
+    def test_order_leaving_processing_gives_the_stock_back(self):
+        first, second = self.order(3), self.order(4)
+        release_waves(self.warehouse, [first.pk, second.pk])
+        self.assertEqual(self.reserved(), 7)
+
+        first.refresh_from_db()
+        first.status = 'cancelled'
+        first.save()
+        self.assertEqual(self.reserved(), 4)
+
+        # saved again, nothing more is given back
+        first.save()
+        self.assertEqual(self.reserved(), 4)
+
+        second.refresh_from_db()
+        second.mark_as_shipped()
+        self.assertEqual(self.reserved(), 0)
+        self.inventory.refresh_from_db()
+        self.assertEqual(self.inventory.quantity, 6)
+
+    def test_deleted_wave_releases_its_slots(self):
+        order = self.order(5)
+        [wave] = release_waves(self.warehouse, [order.pk])
+        self.assertEqual(release_stock(PickWave.objects.get(pk=wave.pk).slots.all()), 1)
+        self.assertEqual(self.reserved(), 0)
@@ -8,9 +8,14 @@ urlpatterns = [
     path('purchase/', views.purchase_order_list, name='purchase_order_list'),
     path('purchase/<int:pk>/', views.purchase_order_detail, name='purchase_order_detail'),
     path('purchase/create/', views.purchase_order_create, name='purchase_order_create'),
+    path('purchase/suggestions/', views.reorder_suggestions, name='reorder_suggestions'),
     
     # Sales Order URLs
     path('sales/', views.sales_order_list, name='sales_order_list'),
     path('sales/<int:pk>/', views.sales_order_detail, name='sales_order_detail'),
+    path('sales/<int:pk>/pick-list/', views.sales_order_pick_list, name='sales_order_pick_list'),
     path('sales/create/', views.sales_order_create, name='sales_order_create'),
+    path('sales/waves/', views.sales_order_waves, name='sales_order_waves'),
+    path('sales/waves/released/', views.pick_wave_list, name='pick_wave_list'),
+    path('sales/waves/released/<int:pk>/', views.pick_wave_detail, name='pick_wave_detail'),
 ]
\ No newline at end of file
@@ -1,11 +1,20 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.http import JsonResponse
 from django.core.paginator import Paginator
-from django.db.models import Q
+from django.db.models import Count, F, Q, Sum
 
-from .models import PurchaseOrder, SalesOrder
-from .forms import PurchaseOrderForm, SalesOrderForm
+from .models import PickWave, PurchaseOrder, SalesOrder, ReorderSuggestion
+from .replenishment import compute_reorder_suggestions
+from .purchasing import draft_orders_from_suggestions
+from .picking import ROUTE_METHODS, build_pick_list
+from .waves import load_wave, plan_waves, release_waves
+from suppliers.models import Supplier
+from warehouses.models import Warehouse
+from .forms import PurchaseOrderForm, SalesOrderForm, WavePlanForm
+from search.index import filter_by_search
 
 # =====================
 # PURCHASE ORDER VIEWS
@@ -21,10 +30,7 @@ def purchase_order_list(request):
     # Search
     search_query = request.GET.get('search', '')
     if search_query:
-        orders = orders.filter(
-            Q(po_number__icontains=search_query) |
-            Q(supplier__name__icontains=search_query)
-        )
+        orders = filter_by_search(orders, search_query)
     
     # Filter by status
     status = request.GET.get('status', '')
@@ -87,6 +93,71 @@ def purchase_order_create(request):
     return render(request, 'orders/purchase_order_form.html', context)
 
 
+def filter_suggestions(suggestions, params):
+    """Apply the warehouse/supplier filters of the suggested purchases screen"""
+    warehouse_id = params.get('warehouse', '')
+    if warehouse_id:
+        suggestions = suggestions.filter(warehouse_id=warehouse_id)
+
+    supplier_id = params.get('supplier', '')
+    if supplier_id == 'none':
+        suggestions = suggestions.filter(supplier__isnull=True)
+    elif supplier_id:
+        suggestions = suggestions.filter(supplier_id=supplier_id)
+    return suggestions
+
+
+@login_required
+def reorder_suggestions(request):
+    """Suggested purchases from the last reorder computation"""
+    if request.method == 'POST':
+        if request.POST.get('action') == 'create_orders':
+            # one draft PO per supplier and warehouse for the filtered suggestions
+            result = draft_orders_from_suggestions(filter_suggestions(ReorderSuggestion.objects.all(), request.POST), user=request.user)
+            if result.orders:
+                messages.success(request, f'{len(result.orders)} draft purchase orders created with {result.line_count} lines')
+            if result.skipped:
+                messages.warning(request, f'{len(result.skipped)} lines skipped, no available supplier offer')
+            return redirect(f"{reverse('orders:purchase_order_list')}?status=draft")
+
+        stats = compute_reorder_suggestions()
+        messages.success(request, f"Reorder suggestions recomputed: {stats['to_order']} of {stats['rows']} product/warehouse pairs to reorder")
+        return redirect('orders:reorder_suggestions')
+
+    warehouse_id = request.GET.get('warehouse', '')
+    supplier_id = request.GET.get('supplier', '')
+    suggestions = filter_suggestions(
+        ReorderSuggestion.objects.select_related('product', 'warehouse', 'supplier'), request.GET
+    )
+
+    show = request.GET.get('show', 'to_order')
+    if show == 'to_order':
+        suggestions = suggestions.filter(suggested_quantity__gt=0)
+
+    summary = suggestions.aggregate(
+        lines=Count('id'),
+        to_order=Count('id', filter=Q(suggested_quantity__gt=0)),
+        estimated_cost=Sum(F('suggested_quantity') * F('unit_price')),
+    )
+
+    paginator = Paginator(suggestions.order_by('supplier__name', 'warehouse__code', 'product__name'), 50)
+    page_number = request.GET.get('page')
+    suggestions_page = paginator.get_page(page_number)
+
+    context = {
+        'suggestions': suggestions_page,
+        'summary': summary,
+        'computed_at': ReorderSuggestion.objects.values_list('computed_at', flat=True).first(),
+        'warehouses': Warehouse.objects.filter(is_active=True),
+        'suppliers': Supplier.objects.filter(is_active=True),
+        'selected_warehouse': warehouse_id,
+        'selected_supplier': supplier_id,
+        'show': show,
+    }
+
+    return render(request, 'orders/reorder_suggestions.html', context)
+
+
 # =====================
 # SALES ORDER VIEWS
 # =====================
@@ -99,11 +170,7 @@ def sales_order_list(request):
     # Search
     search_query = request.GET.get('search', '')
     if search_query:
-        orders = orders.filter(
-            Q(so_number__icontains=search_query) |
-            Q(customer_name__icontains=search_query) |
-            Q(customer_phone__icontains=search_query)
-        )
+        orders = filter_by_search(orders, search_query)
     
     # Filter by status
     status = request.GET.get('status', '')
@@ -142,6 +209,172 @@ def sales_order_detail(request, pk):
     return render(request, 'orders/sales_order_detail.html', context)
 
 
+def pick_list_json(order, pick_list):
+    return {
+        'order': order.so_number,
+        'warehouse': order.from_warehouse.code,
+        'route': pick_list.method,
+        'distance': round(pick_list.distance, 2),
+        'stops': [
+            {
+                'sequence': stop.sequence,
+                'location': stop.location.code if stop.location else None,
+                'lines': [
+                    {
+                        'item': line.key,
+                        'sku': line.product.sku,
+                        'product': line.product.name,
+                        'quantity': float(line.quantity),
+                        'batch': line.batch_number,
+                        'expiry_date': line.expiry_date.date().isoformat() if line.expiry_date else None,
+                    }
+                    for line in stop.lines
+                ],
+            }
+            for stop in pick_list.stops
+        ],
+        'shortages': [
+            {'item': key, 'sku': product.sku, 'quantity': float(quantity)}
+            for key, product, quantity in pick_list.shortages
+        ],
+    }
+
+
+@login_required
+def sales_order_pick_list(request, pk):
+    """Pick list of a sales order in walking order, printable or ?format=json"""
+    order = get_object_or_404(SalesOrder.objects.select_related('from_warehouse'), pk=pk)
+    route = request.GET.get('route') or None
+    if route and route not in ROUTE_METHODS:
+        route = None
+    pick_list = build_pick_list(order, route)
+
+    if request.GET.get('format') == 'json':
+        return JsonResponse(pick_list_json(order, pick_list))
+
+    context = {
+        'order': order,
+        'pick_list': pick_list,
+        'route_methods': ROUTE_METHODS,
+    }
+
+    return render(request, 'orders/pick_list.html', context)
+
+
+def wave_json(wave):
+    return {
+        'wave': wave.number,
+        'orders': [{'slot': slot, 'order': order.so_number} for slot, order in enumerate(wave.orders, 1)],
+        'lines': wave.line_count,
+        'units': float(wave.unit_count),
+        'distance': round(wave.distance, 2),
+        'picks': [
+            {
+                'sequence': stop.sequence,
+                'location': stop.location.code if stop.location else None,
+                'sku': line.product.sku,
+                'batch': line.batch_number,
+                'quantity': float(line.quantity),
+                'drops': [
+                    {'slot': drop.slot, 'order': drop.order.so_number, 'quantity': float(drop.quantity)}
+                    for drop in line.key
+                ],
+            }
+            for stop in wave.stops
+            for line in stop.lines
+        ],
+        'shortages': [
+            {'order': order.so_number, 'sku': product.sku, 'quantity': float(quantity)}
+            for order, product, quantity in wave.shortages
+        ],
+    }
+
+
+def wave_plan_json(plan):
+    return {
+        'warehouse': plan.warehouse.code,
+        'cutoff': plan.cutoff.isoformat(),
+        'waves': [wave_json(wave) for wave in plan.waves],
+    }
+
+
+@login_required
+def sales_order_waves(request):
+    """Plan pick waves of the waiting sales orders of a warehouse, POST releases the planned orders"""
+    data = request.POST if request.method == 'POST' else request.GET
+    form = WavePlanForm(data if data.get('warehouse') else None)
+    plan = None
+    if form.is_valid():
+        options = {
+            'cutoff': form.cleaned_data['cutoff'],
+            'max_orders': form.cleaned_data['max_orders'],
+            'max_lines': form.cleaned_data['max_lines'],
+            'max_units': form.cleaned_data['max_units'],
+            'method': form.cleaned_data['route'],
+        }
+        warehouse = form.cleaned_data['warehouse']
+        if request.method == 'POST':
+            # only the orders of the plan on screen, not whatever arrived since
+            order_ids = [int(pk) for pk in request.POST.get('orders', '').split(',') if pk.strip().isdigit()]
+            pick_waves = release_waves(warehouse, order_ids, request.user, **options)
+            released = sum(pick_wave.slots.count() for pick_wave in pick_waves)
+            if released < len(order_ids):
+                messages.warning(request, f'{len(order_ids) - released} orders were no longer waiting and were left out')
+            messages.success(request, f'{released} orders in {len(pick_waves)} waves released for picking')
+            return redirect(f"{reverse('orders:pick_wave_list')}?warehouse={warehouse.pk}")
+        plan = plan_waves(warehouse, **options)
+        if request.GET.get('format') == 'json':
+            return JsonResponse(wave_plan_json(plan))
+
+    context = {
+        'form': form,
+        'plan': plan,
+    }
+
+    return render(request, 'orders/sales_order_waves.html', context)
+
+
+@login_required
+def pick_wave_list(request):
+    """Released pick waves, newest first"""
+    waves = PickWave.objects.select_related('warehouse', 'released_by').annotate(
+        order_count=Count('slots')
+    ).order_by('-released_at', '-id')
+
+    warehouse_id = request.GET.get('warehouse', '')
+    if warehouse_id:
+        waves = waves.filter(warehouse_id=warehouse_id)
+
+    paginator = Paginator(waves, 20)
+    page_number = request.GET.get('page')
+    waves_page = paginator.get_page(page_number)
+
+    context = {
+        'waves': waves_page,
+        'warehouses': Warehouse.objects.filter(is_active=True),
+        'warehouse_id': warehouse_id,
+    }
+
+    return render(request, 'orders/pick_wave_list.html', context)
+
+
+@login_required
+def pick_wave_detail(request, pk):
+    """Pick list and sort instructions of a released wave, printable or ?format=json"""
+    pick_wave = get_object_or_404(PickWave.objects.select_related('warehouse', 'released_by'), pk=pk)
+    wave = load_wave(pick_wave)
+
+    if request.GET.get('format') == 'json':
+        return JsonResponse({'warehouse': pick_wave.warehouse.code, 'cutoff': pick_wave.cutoff.isoformat(), **wave_json(wave)})
+
+    context = {
+        'pick_wave': pick_wave,
+        'wave': wave,
+    }
+
+    return render(request, 'orders/pick_wave_detail.html', context)
+
+
 @login_required
 def sales_order_create(request):
     """Create new sales order"""
@@ -0,0 +1,318 @@
+"""
+Wave picking.
+
+plan_waves() takes the sales orders of a warehouse that are waiting to be picked
+(pending or confirmed, ordered on or before a cutoff date), oldest first, and
+fills waves with them until a wave would go over one of its limits: the number
+of orders (the slots of a picking cart), the number of order lines or the
+number of units. An order that is over a limit on its own gets a wave to itself.
+
+Stock is allocated to the orders oldest first with orders.picking, so earlier
+orders are served before later ones run short. Within a wave, picks of the same
+Inventory row (same SKU, location and batch) for different orders are merged
+into one pick, and the picks are routed like a single pick list. Each merged
+pick carries its drops, the quantity of it that goes into each order's slot,
+which give the sort instructions at the end of the wave.
+
+Orders, their lines and the stock of their products are loaded with three
+queries whatever the number of orders; the rest happens in memory.
+
+release_waves() releases exactly the orders the user was shown: it plans them
+again under a row lock, stores each wave as a PickWave with its slots and picks,
+reserves the picked quantities on their Inventory rows (so the next release
+allocates what is left) and moves the orders to processing. The reservation of
+an order is given back by release_stock() when it leaves processing: shipped,
+cancelled or sent back to be planned again. load_wave() turns a stored PickWave back
+into a Wave to print its pick list again.
+"""
+from collections import defaultdict
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from api.sync import record_changes
+from inventory.models import Inventory
+from products.models import Product
+from .models import PickWave, PickWaveOrder, PickWavePick, SalesOrder, SalesOrderItem
+from .picking import CHUNK_SIZE, PickLine, PickStop, allocate, route_stops, stock_rows
+
+WAVE_STATUSES = ['pending', 'confirmed']
+RELEASED_STATUS = 'processing'
+
+
+@dataclass
+class Drop:
+    "quantity of a merged pick that goes into the slot of an order"
+    slot: int
+    order: SalesOrder
+    quantity: Decimal
+
+
+@dataclass
+class Wave:
+    # position in the plan, or the wave_number of a stored PickWave
+    number: object
+    # slot n of the cart holds orders[n - 1]
+    orders: list = field(default_factory=list)
+    # orders.picking.PickStops, the key of each line is its list of Drops
+    stops: list = field(default_factory=list)
+    distance: float = 0.0
+    # (order, product, quantity not available)
+    shortages: list = field(default_factory=list)
+    line_count: int = 0
+    unit_count: Decimal = Decimal(0)
+
+    @property
+    def pick_count(self):
+        return sum(len(stop.lines) for stop in self.stops)
+
+    def sort_instructions(self):
+        "[(slot, order, [(stop sequence, PickLine, quantity)])] in slot order"
+        slots = {slot: [] for slot in range(1, len(self.orders) + 1)}
+        for stop in self.stops:
+            for line in stop.lines:
+                for drop in line.key:
+                    slots[drop.slot].append((stop.sequence, line, drop.quantity))
+        return [(slot, self.orders[slot - 1], slots[slot]) for slot in slots]
+
+
+@dataclass
+class WavePlan:
+    warehouse: object
+    cutoff: object
+    method: str = ''
+    waves: list = field(default_factory=list)
+
+    @property
+    def order_count(self):
+        return sum(len(wave.orders) for wave in self.waves)
+
+    @property
+    def order_ids(self):
+        return [order.pk for wave in self.waves for order in wave.orders]
+
+
+def waiting_orders(warehouse, cutoff):
+    return SalesOrder.objects.filter(
+        from_warehouse=warehouse, status__in=WAVE_STATUSES, order_date__lte=cutoff
+    )
+
+
+def group_orders(orders, order_lines, max_orders, max_lines, max_units):
+    "lists of orders filling waves in turn, a limit of 0 is no limit"
+    groups = []
+    current = []
+    lines = 0
+    units = Decimal(0)
+    for order in orders:
+        items = order_lines[order.pk]
+        order_units = sum((quantity for _, _, quantity in items), Decimal(0))
+        full = current and (
+            (max_orders and len(current) + 1 > max_orders)
+            or (max_lines and lines + len(items) > max_lines)
+            or (max_units and units + order_units > max_units)
+        )
+        if full:
+            groups.append(current)
+            current, lines, units = [], 0, Decimal(0)
+        current.append(order)
+        lines += len(items)
+        units += order_units
+    if current:
+        groups.append(current)
+    return groups
+
+
+def consolidate(lines, slots):
+    "merge PickLines of the same Inventory row, keyed by order item, into lines keyed by Drops"
+    merged = {}
+    for line in lines:
+        order, slot = slots[line.key]
+        pick = merged.get(line.inventory_id)
+        if pick is None:
+            pick = merged[line.inventory_id] = PickLine(
+                [], line.product, Decimal(0), line.inventory_id, line.location, line.batch_number, line.expiry_date
+            )
+        pick.quantity += line.quantity
+        if pick.key and pick.key[-1].slot == slot:
+            pick.key[-1].quantity += line.quantity
+        else:
+            pick.key.append(Drop(slot, order, line.quantity))
+    return list(merged.values())
+
+
+def plan_waves(warehouse, cutoff=None, max_orders=None, max_lines=None, max_units=None, method=None, order_ids=None):
+    """
+    WavePlan of the orders of warehouse waiting to be picked up to cutoff (a
+    date, default today), or of those of order_ids only. Limits default to the
+    WAVE_MAX_* settings, 0 turns a limit off. Nothing is saved, see release_waves().
+    """
+    cutoff = cutoff or timezone.localdate()
+    method = method or settings.PICK_ROUTE
+    max_orders = settings.WAVE_MAX_ORDERS if max_orders is None else max_orders
+    max_lines = settings.WAVE_MAX_LINES if max_lines is None else max_lines
+    max_units = settings.WAVE_MAX_UNITS if max_units is None else max_units
+    if min(max_orders, max_lines, max_units) < 0:
+        raise ValueError('Wave limits cannot be negative')
+
+    orders_qs = waiting_orders(warehouse, cutoff)
+    if order_ids is not None:
+        orders_qs = orders_qs.filter(pk__in=order_ids)
+    orders = list(orders_qs.order_by('order_date', 'pk'))
+    items = SalesOrderItem.objects.filter(sales_order__in=orders_qs).select_related('product').order_by('pk')
+    order_lines = defaultdict(list)
+    for item in items:
+        order_lines[item.sales_order_id].append((item.pk, item.product, item.quantity))
+    orders = [order for order in orders if order_lines[order.pk]]
+
+    product_ids = SalesOrderItem.objects.filter(sales_order__in=orders_qs).values('product_id')
+    rows = stock_rows(warehouse.pk, product_ids)
+    available = {}
+
+    plan = WavePlan(warehouse, cutoff, method)
+    for number, group in enumerate(group_orders(orders, order_lines, max_orders, max_lines, max_units), 1):
+        wave = Wave(number, group)
+        slots = {}
+        demands = []
+        for slot, order in enumerate(group, 1):
+            for key, product, quantity in order_lines[order.pk]:
+                slots[key] = (order, slot)
+                demands.append((key, product, quantity))
+                wave.unit_count += quantity
+        wave.line_count = len(demands)
+
+        lines, shortages = allocate(demands, rows, available)
+        wave.shortages = [(slots[key][0], product, quantity) for key, product, quantity in shortages]
+        wave.stops, wave.distance = route_stops(consolidate(lines, slots), method)
+        plan.waves.append(wave)
+    return plan
+
+
+def save_wave(plan, wave, wave_number, user=None):
+    "store a planned wave as a PickWave with its slots and picks, and reserve the picked stock"
+    pick_wave = PickWave.objects.create(
+        wave_number=wave_number, warehouse=plan.warehouse, cutoff=plan.cutoff, route_method=plan.method,
+        distance=wave.distance, line_count=wave.line_count, unit_count=wave.unit_count,
+        shortages=[[order.pk, product.pk, str(quantity)] for order, product, quantity in wave.shortages],
+        released_by=user,
+    )
+    PickWaveOrder.objects.bulk_create([
+        PickWaveOrder(wave=pick_wave, sales_order=order, slot=slot, stock_reserved=True)
+        for slot, order in enumerate(wave.orders, 1)
+    ])
+    picks = PickWavePick.objects.bulk_create([
+        PickWavePick(
+            wave=pick_wave, sequence=stop.sequence, product=line.product, location=stop.location,
+            inventory_id=line.inventory_id, batch_number=line.batch_number or '', expiry_date=line.expiry_date,
+            quantity=line.quantity, drops=[[drop.slot, str(drop.quantity)] for drop in line.key],
+        )
+        for stop in wave.stops
+        for line in stop.lines
+    ])
+
+    reserved = defaultdict(Decimal)
+    for pick in picks:
+        if pick.inventory_id:
+            reserved[pick.inventory_id] += pick.quantity
+    change_reserved(plan.warehouse.pk, reserved, 1)
+    return pick_wave
+
+
+def change_reserved(warehouse_id, quantities, sign):
+    """
+    Add (sign 1) or give back (sign -1) {inventory_id: quantity} to the reserved
+    quantity of Inventory rows, one UPDATE per distinct quantity. Giving back
+    never goes below zero.
+    """
+    by_quantity = defaultdict(list)
+    for inventory_id, quantity in quantities.items():
+        by_quantity[quantity].append(inventory_id)
+    for quantity, ids in by_quantity.items():
+        if sign > 0:
+            reserved = F('reserved_quantity') + quantity
+        else:
+            reserved = Greatest(F('reserved_quantity') - quantity, Value(Decimal(0)))
+        for start in range(0, len(ids), CHUNK_SIZE):
+            Inventory.objects.filter(pk__in=ids[start:start + CHUNK_SIZE]).update(reserved_quantity=reserved)
+    # update() skips the post_save signal that logs the change for handheld sync
+    record_changes(Inventory, list(quantities), warehouse_id)
+
+
+def release_stock(slots):
+    """
+    Give back the stock reserved for wave slots (a PickWaveOrder queryset): the
+    quantity of each pick dropped into a slot still holding its reservation.
+    Returns the number of slots released.
+    """
+    with transaction.atomic():
+        held = list(slots.filter(stock_reserved=True).select_for_update(of=('self',)).values_list('pk', 'wave_id', 'wave__warehouse_id', 'slot'))
+        if not held:
+            return 0
+
+        wanted = {(wave_id, slot) for pk, wave_id, warehouse_id, slot in held}
+        warehouses = {wave_id: warehouse_id for pk, wave_id, warehouse_id, slot in held}
+        released = defaultdict(lambda: defaultdict(Decimal))
+        picks = PickWavePick.objects.filter(wave_id__in=warehouses, inventory__isnull=False)
+        for wave_id, inventory_id, drops in picks.values_list('wave_id', 'inventory_id', 'drops'):
+            for slot, quantity in drops:
+                if (wave_id, slot) in wanted:
+                    released[warehouses[wave_id]][inventory_id] += Decimal(quantity)
+        for warehouse_id, quantities in released.items():
+            change_reserved(warehouse_id, quantities, -1)
+
+        PickWaveOrder.objects.filter(pk__in=[pk for pk, wave_id, warehouse_id, slot in held]).update(stock_reserved=False)
+    return len(held)
+
+
+def release_waves(warehouse, order_ids, user=None, **options):
+    """
+    Release the given orders (the ones of the plan shown) in waves: the orders
+    still waiting are locked and planned again with options (see plan_waves),
+    every wave is saved as a PickWave and the orders move to processing. Orders
+    released or changed in the meantime are left out. Returns the PickWaves.
+    """
+    with transaction.atomic():
+        waiting = list(
+            SalesOrder.objects.select_for_update()
+            .filter(pk__in=order_ids, from_warehouse=warehouse, status__in=WAVE_STATUSES)
+            .values_list('pk', flat=True)
+        )
+        plan = plan_waves(warehouse, order_ids=waiting, **options)
+        numbers = PickWave.allocate_wave_numbers(len(plan.waves)) if plan.waves else []
+        pick_waves = [save_wave(plan, wave, number, user) for wave, number in zip(plan.waves, numbers)]
+        SalesOrder.objects.filter(pk__in=plan.order_ids).update(status=RELEASED_STATUS, updated_at=timezone.now())
+    return pick_waves
+
+
+def load_wave(pick_wave):
+    "Wave of a stored PickWave, with its pick list and sort instructions as released"
+    orders = [slot.sales_order for slot in pick_wave.slots.select_related('sales_order').order_by('slot')]
+    wave = Wave(
+        pick_wave.wave_number, orders, distance=pick_wave.distance,
+        line_count=pick_wave.line_count, unit_count=pick_wave.unit_count,
+    )
+
+    stops = {}
+    for pick in pick_wave.picks.select_related('product', 'location').order_by('sequence', 'pk'):
+        stop = stops.get(pick.sequence)
+        if stop is None:
+            stop = stops[pick.sequence] = PickStop(pick.sequence, pick.location)
+        drops = [Drop(slot, orders[slot - 1], Decimal(quantity)) for slot, quantity in pick.drops]
+        stop.lines.append(PickLine(
+            drops, pick.product, pick.quantity, pick.inventory_id, pick.location, pick.batch_number, pick.expiry_date
+        ))
+    wave.stops = list(stops.values())
+
+    by_id = {order.pk: order for order in orders}
+    products = Product.objects.in_bulk({product_id for _, product_id, _ in pick_wave.shortages})
+    wave.shortages = [
+        (by_id[order_id], products[product_id], Decimal(quantity))
+        for order_id, product_id, quantity in pick_wave.shortages
+        if order_id in by_id and product_id in products
+    ]
+    return wave
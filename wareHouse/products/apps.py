@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class ProductsConfig(AppConfig):
     name = 'products'
+
+    def ready(self):
+        # connects the scan cache invalidation signals
+        from . import scanning  # noqa: F401
@@ -8,7 +8,7 @@ class ProductForm(forms.ModelForm):
         fields = [
             'name', 'sku', 'barcode', 'category', 'description',
             'purchase_price', 'selling_price', 'unit',
-            'reorder_level', 'shelf_life_days', 'image', 'status'
+            'reorder_level', 'shelf_life_days', 'storage_type', 'image', 'status'
         ]
 
         widgets = {
@@ -55,6 +55,9 @@ class ProductForm(forms.ModelForm):
                 'class': 'form-control',
                 'accept': 'images/*'
             }),
+            'storage_type': forms.Select(attrs={
+                'class': 'form-select'
+            }),
             'status': forms.Select(attrs={
                 'class': 'form-select'
             })
@@ -72,6 +75,7 @@ class ProductForm(forms.ModelForm):
             'unit': 'Unit',
             'reorder_level': 'Reorder Level',
             'shelf_life_days': 'Shelf Life (Days)',
+            'storage_type': 'Storage Type',
             'image': 'Product Image',
             'status': 'Status'
         }
@@ -126,3 +130,21 @@ class ProductCategoryForm(forms.ModelForm):
             'description': 'Description',
             'is_active': 'Active'
         }
+
+
+
+class ProductImportForm(forms.Form):
+    file = forms.FileField(
+        help_text='CSV or JSONL with a sku column, see the columns listed on this page',
+        widget=forms.ClearableFileInput(attrs={
+            'class': 'form-control',
+            'accept': '.csv,.jsonl,.ndjson'
+        })
+    )
+    create_categories = forms.BooleanField(
+        required=False,
+        help_text='Create categories that do not exist yet instead of rejecting the row',
+        widget=forms.CheckboxInput(attrs={
+            'class': 'form-check-input'
+        })
+    )
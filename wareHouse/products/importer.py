@@ -0,0 +1,317 @@
+"""
+Bulk product catalog import.
+
+import_products() streams rows from a CSV or JSONL catalog and upserts them by
+SKU in chunks with a single INSERT ... ON CONFLICT (sku) DO UPDATE per chunk.
+Categories are resolved by name through an in-memory map, slugs for new
+products are generated per chunk against one query of the taken slugs, and a
+bad row is reported with its line number without stopping the import.
+
+Columns missing from the file (or keys missing from a JSONL object) keep the
+product's current value, so a price list with just sku, purchase_price and
+selling_price leaves names, descriptions and categories alone.
+"""
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from api.sync import record_changes
+from inventory.alerts import queue_products
+from search.index import index_objects
+from .models import Product, ProductCategory
+from .scanning import product_cache
+
+CHUNK_SIZE = 2000
+
+# file columns that map onto Product fields
+COLUMNS = [
+    'name', 'barcode', 'category', 'description', 'purchase_price', 'selling_price',
+    'unit', 'reorder_level', 'shelf_life_days', 'storage_type', 'status', 'is_active',
+]
+REQUIRED_FOR_NEW = ['name', 'purchase_price', 'selling_price']
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 'active'}
+FALSE_VALUES = {'0', 'false', 'no', 'n', 'inactive'}
+
+UNIT_LABELS = {label.lower(): value for value, label in Product.UNIT_CHOICES}
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    updated: int = 0
+    categories_created: int = 0
+    errors: list = field(default_factory=list)
+
+    def add_error(self, line, sku, message):
+        self.errors.append((line, sku, message))
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def read_rows(stream, fmt):
+    """
+    Yield (line_number, row dict) from a binary CSV or JSONL stream, keys are
+    lower cased. A JSONL line that does not parse is yielded as an error string.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, {(key or '').strip().lower(): (value or '').strip() for key, value in row.items()}
+    elif fmt == 'jsonl':
+        for number, line in enumerate(text, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+                if not isinstance(row, dict):
+                    raise ValueError
+            except ValueError:
+                yield number, 'not a JSON object'
+                continue
+            yield number, {key.strip().lower(): '' if value is None else str(value).strip() for key, value in row.items()}
+    else:
+        raise ValueError(f'Unsupported format {fmt!r}, use csv or jsonl')
+
+
+def detect_format(filename):
+    return 'jsonl' if filename.lower().endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+
+
+def clean_value(name, raw):
+    "one file value converted with the model field, raises ValidationError"
+    if name == 'is_active':
+        if raw.lower() in TRUE_VALUES:
+            return True
+        if raw.lower() in FALSE_VALUES:
+            return False
+        raise ValidationError('must be true or false')
+    if name == 'unit':
+        raw = UNIT_LABELS.get(raw.lower(), raw.lower())
+    elif name in ('status', 'storage_type'):
+        raw = raw.lower()
+
+    model_field = Product._meta.get_field(name)
+    if raw == '':
+        if model_field.null:
+            return None
+        if model_field.has_default():
+            return model_field.get_default()
+        raise ValidationError('is required')
+    return model_field.clean(raw, None)
+
+
+class CatalogImport:
+    "state shared by the chunks of one import"
+
+    # existing products are rebuilt from their current values, so every column can be written back
+    update_fields = COLUMNS + ['updated_at']
+
+    def __init__(self, user=None, create_categories=False):
+        self.user = user
+        self.create_categories = create_categories
+        self.categories = {name.lower(): pk for pk, name in ProductCategory.objects.values_list('pk', 'name')}
+        self.result = ImportResult()
+
+    def resolve_categories(self, names):
+        "category ids by lower cased name, creating the missing ones when allowed"
+        missing = {name.strip() for name in names if name.strip().lower() not in self.categories}
+        if missing and self.create_categories:
+            ProductCategory.objects.bulk_create(
+                [ProductCategory(name=name, slug=slugify(name)) for name in missing],
+                ignore_conflicts=True,
+            )
+            found = ProductCategory.objects.filter(name__in=missing).values_list('pk', 'name')
+            for pk, name in found:
+                if name.lower() not in self.categories:
+                    self.categories[name.lower()] = pk
+                    self.result.categories_created += 1
+
+    def clean_rows(self, chunk):
+        "validated rows of a chunk, {sku: (line, values)}, the last row wins for a repeated SKU"
+        self.resolve_categories({row.get('category', '') for _, row in chunk if isinstance(row, dict)} - {''})
+
+        rows = {}
+        for line, row in chunk:
+            if isinstance(row, str):
+                self.result.add_error(line, '', row)
+                continue
+            sku = row.get('sku', '')
+            if not sku:
+                self.result.add_error(line, '', 'sku is required')
+                continue
+            if len(sku) > 100:
+                self.result.add_error(line, sku[:100], 'sku is longer than 100 characters')
+                continue
+
+            values = {}
+            problems = []
+            for column in COLUMNS:
+                if column not in row:
+                    continue
+                raw = row[column]
+                if column == 'category':
+                    if raw and raw.lower() not in self.categories:
+                        problems.append(f"category: unknown category '{raw}'")
+                    values['category_id'] = self.categories.get(raw.lower()) if raw else None
+                    continue
+                try:
+                    values[column] = clean_value(column, raw)
+                except ValidationError as e:
+                    problems.append(f"{column}: {' '.join(e.messages)}")
+            if problems:
+                self.result.add_error(line, sku, '; '.join(problems))
+                continue
+            rows[sku] = (line, values)
+        return rows
+
+    def build_products(self, rows):
+        """
+        Product instances for the upsert, existing ones carry their current
+        values, the new SKUs and the SKUs whose reorder level changes
+        """
+        field_names = [model_field.attname for model_field in Product._meta.concrete_fields if model_field.attname not in ('id', 'created_at')]
+        existing = {
+            values['sku']: values
+            for values in Product.objects.filter(sku__in=list(rows)).values(*field_names)
+        }
+
+        # a barcode belongs to one SKU, in the database and within the chunk
+        barcodes = {values['barcode']: sku for sku, (_, values) in rows.items() if values.get('barcode')}
+        owners = dict(Product.objects.filter(barcode__in=list(barcodes)).values_list('barcode', 'sku'))
+        claimed = {}
+
+        products = {}
+        new_skus = set()
+        reordered = set()
+        for sku, (line, values) in rows.items():
+            barcode = values.get('barcode')
+            owner = owners.get(barcode, sku) if barcode else sku
+            if owner == sku and barcode:
+                owner = claimed.get(barcode, sku)
+            if owner != sku:
+                self.result.add_error(line, sku, f'barcode: {barcode} already belongs to {owner}')
+                continue
+            if sku not in existing:
+                missing = [column for column in REQUIRED_FOR_NEW if values.get(column) in (None, '')]
+                if missing:
+                    self.result.add_error(line, sku, f"{', '.join(missing)} required for a new product")
+                    continue
+            if barcode:
+                claimed[barcode] = sku
+
+            if sku in existing:
+                product = Product(**existing[sku])
+            else:
+                product = Product(sku=sku, created_by=self.user)
+                new_skus.add(sku)
+            for name, value in values.items():
+                setattr(product, name, value)
+            if sku in existing and product.reorder_level != existing[sku]['reorder_level']:
+                reordered.add(sku)
+            products[sku] = product
+
+        self.assign_slugs([products[sku] for sku in new_skus])
+        return products, new_skus, reordered
+
+    def assign_slugs(self, products):
+        "unique slugs for new products: the name, then name-sku, then a counter"
+        candidates = {}
+        for product in products:
+            base = slugify(product.name)[:100] or slugify(product.sku)[:100]
+            candidates[product.sku] = [base, f"{base[:99 - len(slugify(product.sku))]}-{slugify(product.sku)}".strip('-')]
+
+        wanted = {slug for pair in candidates.values() for slug in pair}
+        taken = set(Product.objects.filter(slug__in=wanted).values_list('slug', flat=True))
+        for product in products:
+            slug = next((slug for slug in candidates[product.sku] if slug and slug not in taken), None)
+            counter = 2
+            while slug is None:
+                base = candidates[product.sku][1][:95]
+                candidate = f"{base}-{counter}"
+                if candidate not in taken and not Product.objects.filter(slug=candidate).exists():
+                    slug = candidate
+                counter += 1
+            product.slug = slug
+            taken.add(slug)
+
+    def save(self, products):
+        Product.objects.bulk_create(
+            products,
+            batch_size=CHUNK_SIZE,
+            update_conflicts=True,
+            unique_fields=['sku'],
+            update_fields=self.update_fields,
+        )
+
+    def import_chunk(self, chunk):
+        rows = self.clean_rows(chunk)
+        products, new_skus, reordered = self.build_products(rows)
+        if not products:
+            return
+
+        now = timezone.now()
+        for product in products.values():
+            product.updated_at = now
+        try:
+            with transaction.atomic():
+                self.save(list(products.values()))
+        except IntegrityError:
+            # a constraint the checks above did not foresee, find the offending rows one by one
+            for sku, product in list(products.items()):
+                try:
+                    with transaction.atomic():
+                        self.save([product])
+                except IntegrityError as e:
+                    self.result.add_error(rows[sku][0], sku, str(e))
+                    del products[sku]
+
+        created = len(new_skus & products.keys())
+        self.result.created += created
+        self.result.updated += len(products) - created
+
+        pks = list(Product.objects.filter(sku__in=list(products)).values_list('pk', flat=True))
+        index_objects(Product, pks)
+        # bulk_create skips the post_save signal that logs the change for handheld sync
+        record_changes(Product, pks)
+        # and the one that queues the stock alerts of a changed reorder level
+        reordered &= products.keys()
+        if reordered:
+            queue_products(Product.objects.filter(sku__in=list(reordered)).values_list('pk', flat=True))
+
+
+def import_products(stream, fmt='csv', user=None, create_categories=False, chunk_size=CHUNK_SIZE):
+    """
+    Upsert the products of a CSV/JSONL catalog by sku, returns an ImportResult
+    with the counts and the (line, sku, message) of every rejected row. Raises
+    ValueError when the file has no sku column.
+    """
+    rows = read_rows(stream, fmt)
+    first = next(rows, None)
+    if first is None:
+        raise ValueError('The file is empty')
+    if fmt == 'csv' and 'sku' not in first[1]:
+        raise ValueError('The file needs a sku column')
+
+    catalog = CatalogImport(user=user, create_categories=create_categories)
+    pending = [first]
+    for chunk in chunked(rows, chunk_size):
+        catalog.import_chunk(pending + chunk)
+        pending = []
+    if pending:
+        catalog.import_chunk(pending)
+
+    # bulk upserts skip the save signals that keep the scan cache fresh
+    product_cache.clear()
+    return catalog.result
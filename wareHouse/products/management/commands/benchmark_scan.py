@@ -0,0 +1,51 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from products.models import Product
+from products.scanning import location_cache, product_cache, resolve_scan
+
+
+class Command(BaseCommand):
+    help = 'Benchmark scan lookups (resolve_scan) with a cold and a warm cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lookups',
+            type=int,
+            default=20000,
+            help='number of warm cache lookups to time (default 20000)'
+        )
+        parser.add_argument(
+            '--products',
+            type=int,
+            default=500,
+            help='number of distinct product codes to cycle through (default 500)'
+        )
+
+    def handle(self, *args, **options):
+        codes = []
+        for sku, barcode in Product.objects.values_list('sku', 'barcode')[:options['products']]:
+            codes.append(barcode or sku)
+        if not codes:
+            raise CommandError('No products to scan, load some products first')
+
+        product_cache.clear()
+        location_cache.clear()
+        started = perf_counter()
+        for code in codes:
+            resolve_scan(code)
+        self.report('Cold (database)', len(codes), perf_counter() - started)
+
+        lookups = options['lookups']
+        started = perf_counter()
+        for index in range(lookups):
+            resolve_scan(codes[index % len(codes)])
+        self.report('Warm (cache)', lookups, perf_counter() - started)
+
+        self.stdout.write(self.style.SUCCESS('✓ Scan benchmark complete'))
+
+    def report(self, label, count, elapsed):
+        self.stdout.write(
+            f'{label}: {count} lookups in {elapsed:.3f}s - '
+            f'{count / elapsed:,.0f} lookups/s, {elapsed / count * 1_000_000:.1f} µs each'
+        )
@@ -0,0 +1,79 @@
+import csv
+from time import perf_counter
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from products.importer import CHUNK_SIZE, detect_format, import_products
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Import (upsert by SKU) a product catalog from a CSV or JSONL file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='catalog file, .csv or .jsonl')
+        parser.add_argument(
+            '--format',
+            choices=['csv', 'jsonl'],
+            help='file format (default: from the file extension)'
+        )
+        parser.add_argument(
+            '--create-categories',
+            action='store_true',
+            help='create categories that do not exist yet instead of rejecting the row'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=CHUNK_SIZE,
+            help=f'rows per upsert statement (default {CHUNK_SIZE})'
+        )
+        parser.add_argument(
+            '--user',
+            help='username recorded as created_by on new products'
+        )
+        parser.add_argument(
+            '--errors',
+            help='write the rejected rows (line, sku, error) to this CSV file'
+        )
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+            if user is None:
+                raise CommandError(f"Unknown user {options['user']}")
+
+        fmt = options['format'] or detect_format(options['path'])
+        started = perf_counter()
+        try:
+            with open(options['path'], 'rb') as stream:
+                result = import_products(
+                    stream,
+                    fmt=fmt,
+                    user=user,
+                    create_categories=options['create_categories'],
+                    chunk_size=options['chunk_size'],
+                )
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+        elapsed = perf_counter() - started
+
+        for line, sku, message in result.errors[:20]:
+            self.stdout.write(self.style.WARNING(f'  line {line} {sku}: {message}'))
+        if len(result.errors) > 20:
+            self.stdout.write(self.style.WARNING(f'  ... {len(result.errors) - 20} more rejected rows'))
+
+        if options['errors'] and result.errors:
+            with open(options['errors'], 'w', newline='') as out:
+                writer = csv.writer(out)
+                writer.writerow(['line', 'sku', 'error'])
+                writer.writerows(result.errors)
+
+        rows = result.created + result.updated
+        rate = rows / elapsed * 60 if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {result.created} products created, {result.updated} updated, {len(result.errors)} rejected, '
+            f'{result.categories_created} categories created ({elapsed:.1f}s, {rate:,.0f} rows/min)'
+        ))
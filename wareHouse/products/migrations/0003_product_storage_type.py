@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 23:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_rename_shelf_life_product_shelf_life_days'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='storage_type',
+            field=models.CharField(blank=True, choices=[('dry', 'Dry Storage'), ('cold', 'Cold Storage'), ('frozen', 'Frozen Storage'), ('ambient', 'Ambient Storage'), ('hazmat', 'Hazardous Material Storage')], default='', help_text='zone type the product has to be stored in, blank for any zone', max_length=20),
+        ),
+    ]
@@ -56,6 +56,15 @@ class Product(models.Model):
         ('disconnected', 'Disconnected'),
     ]
 
+    # same values as StorageZone.zone_type
+    STORAGE_TYPE_CHOICES = [
+        ('dry', 'Dry Storage'),
+        ('cold', 'Cold Storage'),
+        ('frozen', 'Frozen Storage'),
+        ('ambient', 'Ambient Storage'),
+        ('hazmat', 'Hazardous Material Storage'),
+    ]
+
     name = models.CharField(max_length=100)
     slug = models.SlugField(max_length=100, unique=True, blank=True)
     sku = models.CharField(max_length=100, unique=True, help_text="Stock Keeping Unit")
@@ -104,6 +113,13 @@ class Product(models.Model):
         validators=[MinValueValidator(1)],
         help_text="Shelf life in days (for perishable items)",
     )
+    storage_type = models.CharField(
+        max_length=20,
+        choices=STORAGE_TYPE_CHOICES,
+        blank=True,
+        default='',
+        help_text='zone type the product has to be stored in, blank for any zone'
+    )
 
     # Image
     image = models.ImageField(
@@ -135,6 +151,8 @@ class Product(models.Model):
             models.Index(fields=['slug']),
             models.Index(fields=['sku']),
             models.Index(fields=['barcode']),
+            # handheld sync feed (api.sync): changes since a cursor
+            models.Index(fields=['updated_at', 'id']),
         ]
 
     def __str__(self):
@@ -0,0 +1,289 @@
+"""
+Dock scanning fast path.
+
+resolve_scan() turns a scanned barcode, SKU or GS1-128 string into the product
+record, its current stock locations and the values a stock-in form needs.
+Product records and locations are held in per-process LRU caches: product saves
+clear the product cache and product records expire after SCAN_CACHE_TTL seconds,
+which bounds how stale other worker processes can be. Locations are cached with
+the product's inventory version (its last InventoryEvent id) and re-read when
+it moved, which also catches the bulk postings and other processes. The version
+is checked again at most every SCAN_LOCATION_RECHECK seconds, so a warm lookup
+runs no query; a posting shows up in a scan within that many seconds.
+"""
+import calendar
+import re
+import threading
+from collections import OrderedDict
+from datetime import date
+from time import monotonic
+
+from django.conf import settings
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+
+from .models import Product
+
+MISSING = object()
+
+# GS1 application identifiers handled: AI -> (field, fixed length or None, max length)
+GS1_AIS = {
+    '00': ('sscc', 18, 18),
+    '01': ('gtin', 14, 14),
+    '02': ('content_gtin', 14, 14),
+    '10': ('batch', None, 20),
+    '11': ('production_date', 6, 6),
+    '15': ('best_before', 6, 6),
+    '17': ('expiry', 6, 6),
+    '21': ('serial', None, 20),
+    '37': ('count', None, 8),
+}
+GS1_DATE_FIELDS = ['production_date', 'best_before', 'expiry']
+GROUP_SEPARATOR = '\x1d'
+SYMBOLOGY_PREFIX = re.compile(r'^\][A-Za-z]\d')
+
+
+class LRUCache:
+    "thread safe least recently used cache whose entries expire after ttl seconds"
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.data.get(key)
+            if item is None:
+                return MISSING
+            value, expires = item
+            if expires < monotonic():
+                del self.data[key]
+                return MISSING
+            self.data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.data[key] = (value, monotonic() + self.ttl)
+            self.data.move_to_end(key)
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+
+product_cache = LRUCache(settings.SCAN_CACHE_SIZE, settings.SCAN_CACHE_TTL)
+location_cache = LRUCache(settings.SCAN_CACHE_SIZE, settings.SCAN_CACHE_TTL)
+
+
+# =====================
+# GS1-128 PARSING
+# =====================
+
+def has_gs1_markers(code):
+    "a ]C1 symbology prefix, bracketed AIs or a GS separator: the scanner says it is GS1-128"
+    return bool(SYMBOLOGY_PREFIX.match(code) or code.startswith('(') or GROUP_SEPARATOR in code)
+
+
+def may_be_gs1(code):
+    "an unmarked string starting with AI 01 and its GTIN, which may as well be a long SKU or barcode"
+    return len(code) > 16 and code[:2] == '01' and code[2:16].isdigit()
+
+
+def gs1_date(value):
+    "YYMMDD, a day of 00 means the last day of the month"
+    year, month, day = 2000 + int(value[:2]), int(value[2:4]), int(value[4:6])
+    if day == 0:
+        day = calendar.monthrange(year, month)[1]
+    return date(year, month, day)
+
+
+def parse_gs1(code):
+    """
+    Parse a GS1-128 string, raw (FNC1 sent as the GS character, optional ]C1
+    symbology prefix) or human readable with the AIs in brackets. Returns a dict
+    of the fields found, raises ValueError on an unknown or truncated AI.
+    """
+    code = SYMBOLOGY_PREFIX.sub('', code.strip())
+    if code.startswith('('):
+        pairs = re.findall(r'\((\d{2,4})\)([^(]*)', code)
+    else:
+        pairs = []
+        position = 0
+        while position < len(code):
+            if code[position] == GROUP_SEPARATOR:
+                position += 1
+                continue
+            ai = code[position:position + 2]
+            if ai not in GS1_AIS:
+                raise ValueError(f'Unsupported GS1 application identifier {ai!r}')
+            field, fixed, maxlength = GS1_AIS[ai]
+            position += 2
+            if fixed:
+                value = code[position:position + fixed]
+            else:
+                end = code.find(GROUP_SEPARATOR, position)
+                value = code[position:end if end != -1 else len(code)][:maxlength]
+            position += len(value)
+            pairs.append((ai, value))
+
+    fields = {}
+    for ai, value in pairs:
+        if ai not in GS1_AIS:
+            raise ValueError(f'Unsupported GS1 application identifier {ai!r}')
+        field, fixed, maxlength = GS1_AIS[ai]
+        if fixed and len(value) != fixed:
+            raise ValueError(f'GS1 ({ai}) must be {fixed} characters')
+        fields[field] = gs1_date(value) if field in GS1_DATE_FIELDS else value
+    return fields
+
+
+def gtin_candidates(gtin):
+    "a GTIN-14 as it may be stored on the product: GTIN-14, EAN-13, UPC-A or EAN-8"
+    candidates = [gtin]
+    for width in (13, 12, 8):
+        if gtin[:14 - width] == '0' * (14 - width):
+            candidates.append(gtin[14 - width:])
+    return candidates
+
+
+# =====================
+# LOOKUPS
+# =====================
+
+def product_record(code):
+    "cached product dict for a barcode, GTIN or SKU (None when unknown)"
+    record = product_cache.get(code)
+    if record is not MISSING:
+        return record
+
+    barcodes = gtin_candidates(code) if len(code) == 14 and code.isdigit() else [code]
+    product = Product.objects.select_related('category').filter(
+        Q(barcode__in=barcodes) | Q(sku=code)
+    ).first()
+    record = None
+    if product:
+        record = {
+            'id': product.pk,
+            'sku': product.sku,
+            'barcode': product.barcode,
+            'name': product.name,
+            'category': product.category.name if product.category else None,
+            'unit': product.unit,
+            'purchase_price': str(product.purchase_price),
+            'selling_price': str(product.selling_price),
+            'shelf_life_days': product.shelf_life_days,
+            'is_active': product.is_active,
+        }
+    product_cache.set(code, record)
+    return record
+
+
+def product_locations(product_id):
+    "cached stock on hand of a product by warehouse, location and batch, entries are (version, locations, recheck at)"
+    from inventory.events import inventory_version
+    from inventory.models import Inventory
+
+    cached = location_cache.get(product_id)
+    if cached is not MISSING and cached[2] > monotonic():
+        return cached[1]
+
+    # read before the rows, a posting in between only costs a re-read next time
+    version = inventory_version(product_id=product_id)
+    recheck = monotonic() + settings.SCAN_LOCATION_RECHECK
+    if cached is not MISSING and cached[0] == version:
+        location_cache.set(product_id, (version, cached[1], recheck))
+        return cached[1]
+
+    records = Inventory.objects.filter(product_id=product_id, quantity__gt=0).values(
+        'warehouse_id', 'warehouse__code', 'storage_location_id', 'storage_location__code',
+        'batch_number', 'quantity', 'expiry_date',
+    ).order_by('expiry_date')
+    locations = [
+        {
+            'warehouse_id': record['warehouse_id'],
+            'warehouse': record['warehouse__code'],
+            'location_id': record['storage_location_id'],
+            'location': record['storage_location__code'],
+            'batch_number': record['batch_number'] or '',
+            'quantity': str(record['quantity']),
+            'expiry_date': record['expiry_date'].date().isoformat() if record['expiry_date'] else None,
+        }
+        for record in records
+    ]
+    location_cache.set(product_id, (version, locations, recheck))
+    return locations
+
+
+def scan_gs1(code):
+    """
+    Parsed GS1 fields of a scanned code, None when it is not GS1-128. A code with
+    GS1 markers must parse (ValueError otherwise); an unmarked one is only read as
+    GS1 when no product has it as its SKU or barcode and it parses.
+    """
+    if has_gs1_markers(code):
+        return parse_gs1(code)
+    if not may_be_gs1(code) or product_record(code.strip()) is not None:
+        return None
+    try:
+        return parse_gs1(code)
+    except ValueError:
+        return None
+
+
+def resolve_scan(code):
+    """
+    Resolve a scanned code, returns a dict with the parsed GS1 fields (or None),
+    the product record (or None), its locations and the stock-in form prefill.
+    Raises ValueError for a malformed GS1 string.
+    """
+    gs1 = scan_gs1(code)
+    lookup = (gs1.get('gtin') or gs1.get('content_gtin')) if gs1 else code.strip()
+    product = product_record(lookup) if lookup else None
+
+    prefill = {}
+    if product:
+        prefill['product'] = product['id']
+    if gs1:
+        if gs1.get('batch'):
+            prefill['batch_number'] = gs1['batch']
+        if gs1.get('expiry') or gs1.get('best_before'):
+            prefill['expiry_date'] = (gs1.get('expiry') or gs1['best_before']).isoformat()
+        if gs1.get('count'):
+            prefill['quantity'] = gs1['count']
+
+    return {
+        'code': code,
+        'gs1': {key: value.isoformat() if isinstance(value, date) else value for key, value in gs1.items()} if gs1 else None,
+        'product': product,
+        'locations': product_locations(product['id']) if product else [],
+        'prefill': prefill,
+    }
+
+
+# =====================
+# INVALIDATION
+# =====================
+
+def clear_products(sender, **kwargs):
+    # a save can change the barcode or SKU a record is cached under, so drop them all
+    product_cache.clear()
+
+
+def forget_locations(sender, instance, **kwargs):
+    # inventory edited outside a posting (e.g. the admin) writes no event
+    location_cache.delete(instance.product_id)
+
+
+post_save.connect(clear_products, sender=Product, dispatch_uid='scan_clear_products_saved')
+post_delete.connect(clear_products, sender=Product, dispatch_uid='scan_clear_products_deleted')
+post_save.connect(forget_locations, sender='inventory.Inventory', dispatch_uid='scan_forget_locations_saved')
+post_delete.connect(forget_locations, sender='inventory.Inventory', dispatch_uid='scan_forget_locations_deleted')
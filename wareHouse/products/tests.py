@@ -1,3 +1,66 @@
-from django.test import TestCase
+from datetime import date
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase
+
+from .models import Product
+from .scanning import location_cache, parse_gs1, product_cache, resolve_scan, scan_gs1
+
+GS = '\x1d'
+
+
+class GS1ParserTests(SimpleTestCase):
+
+    def test_raw_with_group_separator(self):
+        fields = parse_gs1(f'01095011015300031728123110AB-12{GS}3712')
+        self.assertEqual(fields, {
+            'gtin': '09501101530003', 'expiry': date(2028, 12, 31), 'batch': 'AB-12', 'count': '12',
+        })
+
+    def test_symbology_prefix_and_brackets(self):
+        self.assertEqual(parse_gs1(']C10109501101530003')['gtin'], '09501101530003')
+        fields = parse_gs1('(01)09501101530003(15)280200(10)L1')
+        self.assertEqual(fields['best_before'], date(2028, 2, 29))
+        self.assertEqual(fields['batch'], 'L1')
+
+    def test_malformed(self):
+        with self.assertRaisesMessage(ValueError, 'GS1 (11) must be 6 characters'):
+            parse_gs1('01111111111111111111')
+        with self.assertRaisesMessage(ValueError, 'Unsupported GS1 application identifier'):
+            parse_gs1(f'{GS}0109501101530003991')
+
+
+class ScanGS1Tests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.long_sku = Product.objects.create(
+            name='Long SKU', sku='0111111111111111111111', purchase_price=1, selling_price=2
+        )
+        cls.gtin = Product.objects.create(
+            name='GTIN', sku='GTIN-1', barcode='9501101530003', purchase_price=1, selling_price=2
+        )
+
+    def setUp(self):
+        product_cache.clear()
+        location_cache.clear()
+
+    def test_unmarked_code_of_a_product_is_not_gs1(self):
+        self.assertIsNone(scan_gs1('0111111111111111111111'))
+        result = resolve_scan('0111111111111111111111')
+        self.assertIsNone(result['gs1'])
+        self.assertEqual(result['product']['id'], self.long_sku.pk)
+
+    def test_unmarked_code_that_does_not_parse_is_looked_up_as_is(self):
+        result = resolve_scan('0122222222222222222222')
+        self.assertIsNone(result['gs1'])
+        self.assertIsNone(result['product'])
+
+    def test_unmarked_gs1(self):
+        result = resolve_scan('010950110153000317281231')
+        self.assertEqual(result['gs1']['expiry'], '2028-12-31')
+        self.assertEqual(result['product']['id'], self.gtin.pk)
+        self.assertEqual(result['prefill']['expiry_date'], '2028-12-31')
+
+    def test_marked_gs1_must_parse(self):
+        with self.assertRaises(ValueError):
+            scan_gs1(']C101111111111111111111')
@@ -7,6 +7,7 @@ urlpatterns = [
     # product urls
     path('', views.product_list, name='product_list'),
     path('products/product_create/', views.product_create, name='product_create'),
+    path('import/', views.product_import, name='product_import'),
     path('<int:pk>/', views.product_detail, name='product_detail'),
     path('<int:pk>/update/', views.product_update, name='product_update'),
     path('<int:pk>/delete/', views.product_delete, name='product_delete'),
@@ -2,9 +2,14 @@ from django.shortcuts import render, get_list_or_404, get_object_or_404, redirec
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.core.paginator import Paginator
-from django.db.models import Q
+from django.http import JsonResponse
+from django.urls import reverse
+from urllib.parse import urlencode
 from .models import ProductCategory, Product
-from .forms import ProductCategoryForm, ProductForm
+from .forms import ProductCategoryForm, ProductForm, ProductImportForm
+from .importer import COLUMNS, detect_format, import_products
+from .scanning import resolve_scan
+from search.index import filter_by_search
 
 
 # Create your views here.
@@ -17,11 +22,7 @@ def product_list(request):
     # search 
     search_query = request.GET.get('search', '')
     if search_query:
-        products = products.filter(
-            Q(name__icontains=search_query) |
-            Q(description__icontains=search_query) |
-            Q(category__name__icontains=search_query)
-        )
+        products = filter_by_search(products, search_query)
 
     # filters by category
     category_id = request.GET.get('category', '')
@@ -95,6 +96,40 @@ def product_create(request):
 
     return render(request, 'products/product_form.html', context)
 
+@login_required
+def product_import(request):
+    "upsert products from an uploaded CSV/JSONL catalog"
+
+    result = None
+    if request.method == 'POST':
+        form = ProductImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            try:
+                result = import_products(
+                    upload,
+                    fmt=detect_format(upload.name),
+                    user=request.user,
+                    create_categories=form.cleaned_data['create_categories'],
+                )
+                messages.success(request, f'Import finished: {result.created} created, {result.updated} updated, {len(result.errors)} rejected')
+            except ValueError as e:
+                messages.error(request, f'Import failed: {e}')
+        else:
+            messages.error(request, 'Please fix the errors below.')
+    else:
+        form = ProductImportForm()
+
+    context = {
+        'form': form,
+        'result': result,
+        'errors': result.errors[:200] if result else [],
+        'columns': ['sku'] + COLUMNS,
+        'title': 'Import products',
+    }
+
+    return render(request, 'products/product_import.html', context)
+
 @login_required
 def product_update(request, pk):
     "update existing product"
@@ -180,3 +215,19 @@ def category_create(request):
     }
 
     return render(request, 'products/category_form.html', context)
+
+
+@login_required
+def scan_lookup(request, code):
+    'resolve a scanned barcode, SKU or GS1-128 string to the product, its locations and a stock-in prefill'
+    try:
+        result = resolve_scan(code)
+    except ValueError as e:
+        return JsonResponse({'code': code, 'error': str(e)}, status=400)
+
+    if result['product'] is None:
+        result['error'] = 'No product matches this code'
+        return JsonResponse(result, status=404)
+
+    result['stock_in_url'] = f"{reverse('inventory:stock_in')}?{urlencode(result['prefill'])}"
+    return JsonResponse(result)
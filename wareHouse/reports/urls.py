@@ -18,6 +18,9 @@ urlpatterns = [
     path('stock-movements/', views.stock_movement_report, name='stock_movement_report'),
     path('stock-movements/export/', views.stock_movement_export, name='stock_movement_export'),
     
+    # Stock As Of Date
+    path('stock-as-of/', views.stock_as_of_report, name='stock_as_of_report'),
+    
     # Expiry Report
     path('expiry/', views.expiry_report, name='expiry_report'),
     
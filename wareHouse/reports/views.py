@@ -1,14 +1,17 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 from django.http import HttpResponse, JsonResponse
-from django.db.models import Sum, Count, F, Q, Avg
+from django.db.models import Sum, Count, F, Q, Avg, Max
 from django.utils import timezone
-from datetime import timedelta, datetime
+from datetime import timedelta, datetime, time
+from itertools import chain
 import csv
 
 from products.models import Product, ProductCategory
 from warehouses.models import Warehouse
-from inventory.models import Inventory, StockMovement
+from inventory.models import Inventory, StockMovement, MovementArchiveSegment
+from inventory.archive import ArchiveSummary, build_movements, iter_archived_rows, summarize_archived_rows
+from inventory.snapshots import stock_as_of, latest_checkpoint
 
 # =====================
 # MAIN REPORTS PAGE
@@ -175,6 +178,30 @@ def low_stock_report(request):
 # STOCK MOVEMENT REPORT
 # =====================
 
+def parse_report_date(value):
+    """Aware local midnight for a YYYY-MM-DD filter value, or None"""
+    try:
+        return timezone.make_aware(datetime.strptime(value, '%Y-%m-%d'))
+    except (TypeError, ValueError):
+        return None
+
+
+def movement_date_filter(date_from, date_to):
+    """
+    movement_date bounds covering whole local days. Comparing the raw column
+    (rather than movement_date__date) keeps the index usable and lets PostgreSQL
+    prune stock movement partitions.
+    """
+    filters = {}
+    start = parse_report_date(str(date_from))
+    end = parse_report_date(str(date_to))
+    if start:
+        filters['movement_date__gte'] = start
+    if end:
+        filters['movement_date__lt'] = end + timedelta(days=1)
+    return filters
+
+
 @login_required
 def stock_movement_report(request):
     """Report of stock movements with filters"""
@@ -209,20 +236,42 @@ def stock_movement_report(request):
     if date_to:
         movements = movements.filter(movement_date__lte=date_to)
     
-    # Calculate summary
-    total_movements = movements.count()
-    total_value = movements.aggregate(total=Sum('total_amount'))['total'] or 0
+    # Archived periods are merged in only when the date range reaches back to them,
+    # read once in constant memory for the totals and the newest 100 rows
+    archive_start = parse_report_date(date_from)
+    archived = ArchiveSummary()
+    archived_before = None
+    if archive_start:
+        archived = summarize_archived_rows(iter_archived_rows(
+            archive_start, parse_report_date(date_to), movement_type, warehouse_id, product_id, newest_first=False
+        ))
+    else:
+        archived_before = MovementArchiveSegment.objects.aggregate(last=Max('last_movement_date'))['last']
     
-    stock_in_count = movements.filter(movement_type='in').count()
-    stock_out_count = movements.filter(movement_type='out').count()
-    transfers_count = movements.filter(movement_type='transfer').count()
+    # Calculate summary
+    total_movements = movements.count() + archived.count
+    total_value = (movements.aggregate(total=Sum('total_amount'))['total'] or 0) + archived.total_amount
+    
+    stock_in_count = movements.filter(movement_type='in').count() + archived.type_counts['in']
+    stock_out_count = movements.filter(movement_type='out').count() + archived.type_counts['out']
+    transfers_count = movements.filter(movement_type='transfer').count() + archived.type_counts['transfer']
+    
+    # Newest 100 across the hot table and the archive
+    recent_movements = list(movements[:100])
+    if archived.newest:
+        recent_movements = sorted(
+            recent_movements + build_movements(archived.newest),
+            key=lambda movement: (movement.movement_date, movement.pk),
+            reverse=True
+        )[:100]
     
     # Get filter options
     warehouses = Warehouse.objects.filter(is_active=True)
     products = Product.objects.filter(is_active=True)
     
     context = {
-        'movements': movements[:100],  # Limit to 100 for performance
+        'movements': recent_movements,  # Limit to 100 for performance
+        'archived_before': archived_before,
         'total_movements': total_movements,
         'total_value': total_value,
         'stock_in_count': stock_in_count,
@@ -277,7 +326,21 @@ def stock_movement_export(request):
         'To Warehouse', 'Party Name', 'Recorded By'
     ])
     
-    for movement in movements:
+    def archived_movements():
+        # Archived periods only when the date range reaches back to them
+        archive_start = parse_report_date(date_from)
+        if not archive_start:
+            return
+        rows = iter_archived_rows(archive_start, parse_report_date(date_to), movement_type, warehouse_id)
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == 1000:
+                yield from build_movements(chunk)
+                chunk = []
+        yield from build_movements(chunk)
+    
+    for movement in chain(movements.iterator(chunk_size=1000), archived_movements()):
         writer.writerow([
             movement.reference_number,
             movement.movement_date.strftime('%Y-%m-%d %H:%M:%S'),
@@ -296,6 +359,63 @@ def stock_movement_export(request):
     return response
 
 
+# =====================
+# STOCK AS OF DATE REPORT
+# =====================
+
+@login_required
+def stock_as_of_report(request):
+    """Historical stock balances as of the end of a date"""
+    
+    as_of_date = request.GET.get('date', '')
+    warehouse_id = request.GET.get('warehouse', '')
+    product_id = request.GET.get('product', '')
+    
+    # Default to today
+    try:
+        day = datetime.strptime(as_of_date, '%Y-%m-%d').date()
+    except ValueError:
+        day = timezone.localdate()
+    as_of = timezone.make_aware(datetime.combine(day, time.max))
+    
+    # Nearest checkpoint plus the movements after it
+    balances = stock_as_of(as_of, product_id=product_id or None, warehouse_id=warehouse_id or None)
+    
+    products_by_id = Product.objects.in_bulk({key[0] for key in balances})
+    warehouses_by_id = Warehouse.objects.in_bulk({key[1] for key in balances})
+    
+    rows = []
+    for (row_product_id, row_warehouse_id, batch_number), quantity in balances.items():
+        product = products_by_id.get(row_product_id)
+        rows.append({
+            'product': product,
+            'warehouse': warehouses_by_id.get(row_warehouse_id),
+            'batch_number': batch_number,
+            'quantity': quantity,
+            'value': quantity * product.purchase_price if product else 0,
+        })
+    rows.sort(key=lambda row: (row['product'].name if row['product'] else '', row['warehouse'].code if row['warehouse'] else ''))
+    
+    warehouses = Warehouse.objects.filter(is_active=True)
+    products = Product.objects.filter(is_active=True)
+    
+    context = {
+        'rows': rows,
+        'as_of': as_of,
+        'checkpoint': latest_checkpoint(as_of),
+        'total_items': len(rows),
+        'total_quantity': sum(row['quantity'] for row in rows),
+        'total_value': sum(row['value'] for row in rows),
+        'warehouses': warehouses,
+        'products': products,
+        'selected_date': day.strftime('%Y-%m-%d'),
+        'selected_warehouse': warehouse_id,
+        'selected_product': product_id,
+    }
+    
+    return render(request, 'reports/stock_as_of_report.html', context)
+
+
 # =====================
 # EXPIRY REPORT
 # =====================
@@ -363,6 +483,7 @@ def warehouse_performance_report(request):
     if not date_to:
         date_to = timezone.now().date()
     
+    day_filter = movement_date_filter(date_from, date_to)
     warehouses = Warehouse.objects.filter(is_active=True)
     
     warehouse_stats = []
@@ -383,8 +504,7 @@ def warehouse_performance_report(request):
         # Stock movements in date range
         movements_in = StockMovement.objects.filter(
             to_warehouse=warehouse,
-            movement_date__date__gte=date_from,
-            movement_date__date__lte=date_to
+            **day_filter
         ).aggregate(
             count=Count('id'),
             total=Sum('total_amount')
@@ -392,8 +512,7 @@ def warehouse_performance_report(request):
         
         movements_out = StockMovement.objects.filter(
             from_warehouse=warehouse,
-            movement_date__date__gte=date_from,
-            movement_date__date__lte=date_to
+            **day_filter
         ).aggregate(
             count=Count('id'),
             total=Sum('total_amount')
@@ -436,6 +555,7 @@ def product_performance_report(request):
     if not date_to:
         date_to = timezone.now().date()
     
+    day_filter = movement_date_filter(date_from, date_to)
     # Get products with movement activity
     products = Product.objects.filter(is_active=True)
     
@@ -453,8 +573,7 @@ def product_performance_report(request):
         stock_in = StockMovement.objects.filter(
             product=product,
             movement_type='in',
-            movement_date__date__gte=date_from,
-            movement_date__date__lte=date_to
+            **day_filter
         ).aggregate(
             count=Count('id'),
             quantity=Sum('quantity'),
@@ -464,8 +583,7 @@ def product_performance_report(request):
         stock_out = StockMovement.objects.filter(
             product=product,
             movement_type='out',
-            movement_date__date__gte=date_from,
-            movement_date__date__lte=date_to
+            **day_filter
         ).aggregate(
             count=Count('id'),
             quantity=Sum('quantity'),
@@ -525,8 +643,7 @@ def profit_analysis_report(request):
     sales = StockMovement.objects.filter(
         movement_type='out',
         transaction_type='sale',
-        movement_date__date__gte=date_from,
-        movement_date__date__lte=date_to
+        **movement_date_filter(date_from, date_to)
     ).select_related('product')
     
     # Calculate profit for each sale
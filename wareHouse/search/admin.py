@@ -0,0 +1,17 @@
+from django.contrib import admin
+from .models import PendingReindex, SearchEntry
+
+
+@admin.register(SearchEntry)
+class SearchEntryAdmin(admin.ModelAdmin):
+    list_display = ['kind', 'object_id', 'codes', 'text', 'updated_at']
+    list_filter = ['kind']
+    search_fields = ['codes', 'text']
+    readonly_fields = ['kind', 'object_id', 'codes', 'text', 'updated_at']
+
+
+@admin.register(PendingReindex)
+class PendingReindexAdmin(admin.ModelAdmin):
+    list_display = ['kind', 'field', 'object_id', 'queued_at']
+    list_filter = ['kind']
+    readonly_fields = ['kind', 'field', 'object_id', 'queued_at']
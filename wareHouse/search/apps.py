@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class SearchConfig(AppConfig):
+    name = 'search'
+
+    def ready(self):
+        from django.db.models.signals import post_migrate
+        from .signals import backfill_index, connect_signals
+        connect_signals()
+        post_migrate.connect(backfill_index, sender=self)
@@ -0,0 +1,43 @@
+"""
+What gets indexed for each model.
+
+codes and text are ORM paths read with a single values() query; dependents
+are (model label, foreign key) pairs whose documents include this model's
+fields and are re-indexed when its document changes.
+"""
+from collections import namedtuple
+
+Document = namedtuple('Document', ['codes', 'text', 'dependents'])
+
+DOCUMENTS = {
+    'products.product': Document(
+        codes=['sku', 'barcode'],
+        text=['name', 'description', 'category__name'],
+        dependents=[('inventory.inventory', 'product'), ('inventory.stockmovement', 'product')],
+    ),
+    'inventory.inventory': Document(
+        codes=['product__sku', 'product__barcode', 'batch_number'],
+        text=['product__name', 'warehouse__name'],
+        dependents=[],
+    ),
+    'inventory.stockmovement': Document(
+        codes=['reference_number', 'product__sku', 'batch_number'],
+        text=['product__name', 'party_name'],
+        dependents=[],
+    ),
+    'orders.purchaseorder': Document(
+        codes=['po_number', 'supplier__code'],
+        text=['supplier__name'],
+        dependents=[],
+    ),
+    'orders.salesorder': Document(
+        codes=['so_number', 'customer_phone'],
+        text=['customer_name'],
+        dependents=[],
+    ),
+    'suppliers.supplier': Document(
+        codes=['code', 'phone'],
+        text=['name', 'contact_person'],
+        dependents=[('orders.purchaseorder', 'supplier')],
+    ),
+}
@@ -0,0 +1,182 @@
+"""
+Search index shared by the list views.
+
+Every indexed object has one SearchEntry row with its codes (SKU, barcode,
+PO/SO/SM numbers) and its text (names, party names). On SQLite the entries are
+mirrored by triggers into an FTS5 table, on PostgreSQL they are covered by a
+weighted tsvector GIN index plus a trigram index on codes. A search joins the
+entries into the list view's own query, so its filters and pagination see
+every hit, ranked.
+
+Saving an object re-indexes its own entry right away; the documents that embed
+its fields (dependents, e.g. every movement of a product) are queued in
+PendingReindex and refreshed by reindex_pending, a sweep of
+consume_inventory_events.
+"""
+import re
+from collections import defaultdict
+from itertools import islice
+
+from django.apps import apps
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from .documents import DOCUMENTS
+from .models import PendingReindex, SearchEntry
+
+CHUNK_SIZE = 2000
+
+ENTRY_TABLE = 'search_searchentry'
+FTS_TABLE = 'search_searchentry_fts'
+
+# a code prefix match (SKU, document number) outranks a text match
+CODE_WEIGHT = 10.0
+
+# the expression of the GIN index, qualified as it is joined into other queries
+TSVECTOR = (
+    f"setweight(to_tsvector('simple', {ENTRY_TABLE}.codes), 'A') || to_tsvector('simple', {ENTRY_TABLE}.text)"
+)
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def join_values(values):
+    return ' '.join(str(value) for value in values if value)
+
+
+def build_entries(queryset):
+    "(object_id, codes, text) for every object of a queryset of an indexed model"
+    document = DOCUMENTS[queryset.model._meta.label_lower]
+    split = 1 + len(document.codes)
+    rows = queryset.order_by().values_list('pk', *document.codes, *document.text)
+    for row in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield row[0], join_values(row[1:split]), join_values(row[split:])
+
+
+def index_queryset(queryset):
+    "create or refresh the entries of a queryset, returns the ids whose entry changed"
+    kind = queryset.model._meta.label_lower
+    now = timezone.now()
+    changed = []
+    for chunk in chunked(build_entries(queryset), CHUNK_SIZE):
+        existing = {
+            entry.object_id: entry
+            for entry in SearchEntry.objects.filter(kind=kind, object_id__in=[row[0] for row in chunk])
+        }
+        to_create = []
+        to_update = []
+        for object_id, codes, text in chunk:
+            entry = existing.get(object_id)
+            if entry is None:
+                to_create.append(SearchEntry(kind=kind, object_id=object_id, codes=codes, text=text))
+            elif (entry.codes, entry.text) != (codes, text):
+                entry.codes, entry.text, entry.updated_at = codes, text, now
+                to_update.append(entry)
+            else:
+                continue
+            changed.append(object_id)
+        SearchEntry.objects.bulk_create(to_create, ignore_conflicts=True)
+        SearchEntry.objects.bulk_update(to_update, ['codes', 'text', 'updated_at'])
+    return changed
+
+
+def index_objects(model, pks):
+    "index the given objects and queue the documents that embed their fields"
+    changed = index_queryset(model._default_manager.filter(pk__in=pks))
+    if changed:
+        now = timezone.now()
+        pending = [
+            PendingReindex(kind=label, field=field, object_id=object_id, queued_at=now)
+            for label, field in DOCUMENTS[model._meta.label_lower].dependents
+            for object_id in changed
+        ]
+        PendingReindex.objects.bulk_create(
+            pending, batch_size=CHUNK_SIZE, update_conflicts=True,
+            unique_fields=['kind', 'field', 'object_id'], update_fields=['queued_at'],
+        )
+    return changed
+
+
+def reindex_pending():
+    "refresh the queued dependent documents, returns how many entries changed"
+    changed = 0
+    last_pk = 0
+    while True:
+        started = timezone.now()
+        batch = list(PendingReindex.objects.filter(pk__gt=last_pk).order_by('pk')[:CHUNK_SIZE])
+        if not batch:
+            return changed
+
+        groups = defaultdict(list)
+        for pending in batch:
+            groups[pending.kind, pending.field].append(pending.object_id)
+        for (label, field), object_ids in groups.items():
+            dependent = apps.get_model(label)
+            changed += len(index_queryset(dependent._default_manager.filter(**{f'{field}__in': object_ids})))
+
+        # rows queued again while this batch was indexed stay for the next sweep
+        last_pk = batch[-1].pk
+        PendingReindex.objects.filter(pk__in=[pending.pk for pending in batch], queued_at__lt=started).delete()
+
+
+def unindex(model, pks):
+    SearchEntry.objects.filter(kind=model._meta.label_lower, object_id__in=pks).delete()
+
+
+def rebuild_index(labels=None):
+    "bring the entries of the given model labels (default all) in line with the tables, returns {label: changed}"
+    stats = {}
+    for label in labels or DOCUMENTS:
+        model = apps.get_model(label)
+        stats[label] = len(index_queryset(model._default_manager.all()))
+        SearchEntry.objects.filter(kind=label).exclude(
+            object_id__in=model._default_manager.values('pk')
+        ).delete()
+    return stats
+
+
+def filter_by_search(queryset, query):
+    """
+    restrict a list view queryset to the objects matching every term of the
+    query as a prefix, best match first
+    """
+    terms = [term for term in query.split() if re.search(r'\w', term)]
+    if not terms:
+        return queryset.none()
+
+    model = queryset.model
+    kind = model._meta.label_lower
+    join = f'{ENTRY_TABLE}.object_id = {model._meta.db_table}.{model._meta.pk.column}'
+    if connection.vendor == 'sqlite':
+        phrases = ' '.join('"%s"*' % term.replace('"', '""') for term in terms)
+        # unary + keeps SQLite off the (kind, object_id) index, so the MATCH drives the join
+        return queryset.extra(
+            tables=[ENTRY_TABLE, FTS_TABLE],
+            where=[f'+{ENTRY_TABLE}.kind = %s', join, f'{FTS_TABLE}.rowid = {ENTRY_TABLE}.id', f'{FTS_TABLE} MATCH %s'],
+            params=[kind, f'kind : "{kind}" AND {{codes text}} : ({phrases})'],
+            select={'search_rank': f'bm25({FTS_TABLE}, 0, {CODE_WEIGHT}, 1.0)'},
+            order_by=['search_rank'],
+        )
+    if connection.vendor == 'postgresql':
+        # operators of to_tsquery are dropped, each word becomes a prefix match
+        words = re.findall(r'[\w-]+', query)
+        tsquery = ' & '.join(f'{word}:*' for word in words)
+        like = '%' + re.sub(r'([\\%_])', r'\\\1', query.strip()) + '%'
+        return queryset.extra(
+            tables=[ENTRY_TABLE],
+            where=[f'{ENTRY_TABLE}.kind = %s', join, f"({TSVECTOR} @@ to_tsquery('simple', %s) OR {ENTRY_TABLE}.codes ILIKE %s)"],
+            params=[kind, tsquery, like],
+            select={'search_rank': f"ts_rank({TSVECTOR}, to_tsquery('simple', %s))"},
+            select_params=[tsquery],
+            order_by=['-search_rank', '-pk'],
+        )
+
+    entries = SearchEntry.objects.filter(kind=kind)
+    for term in terms:
+        entries = entries.filter(Q(codes__icontains=term) | Q(text__icontains=term))
+    return queryset.filter(pk__in=entries.values('object_id')).order_by('-pk')
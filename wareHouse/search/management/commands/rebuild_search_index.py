@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from search.documents import DOCUMENTS
+from search.index import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the search index, refreshing changed entries and dropping entries of deleted objects'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model',
+            action='append',
+            dest='labels',
+            help=f'model label to rebuild, repeatable (default all: {", ".join(DOCUMENTS)})'
+        )
+
+    def handle(self, *args, **options):
+        labels = options['labels']
+        unknown = set(labels or []) - set(DOCUMENTS)
+        if unknown:
+            raise CommandError(f'Not indexed: {", ".join(sorted(unknown))}')
+
+        stats = rebuild_index(labels)
+        for label, changed in stats.items():
+            self.stdout.write(f'{label}: {changed} entries written')
+
+        self.stdout.write(self.style.SUCCESS('✓ Search index rebuilt'))
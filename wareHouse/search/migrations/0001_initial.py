@@ -0,0 +1,72 @@
+# Generated by Django 6.0.1 on 2026-10-18 23:11
+
+from django.db import migrations, models
+
+SQLITE_INDEX = [
+    """CREATE VIRTUAL TABLE search_searchentry_fts USING fts5(
+        kind, codes, text, content='search_searchentry', content_rowid='id',
+        tokenize="unicode61 tokenchars '-._/'", prefix='2 3'
+    )""",
+    """CREATE TRIGGER search_searchentry_ai AFTER INSERT ON search_searchentry BEGIN
+        INSERT INTO search_searchentry_fts(rowid, kind, codes, text) VALUES (new.id, new.kind, new.codes, new.text);
+    END""",
+    """CREATE TRIGGER search_searchentry_ad AFTER DELETE ON search_searchentry BEGIN
+        INSERT INTO search_searchentry_fts(search_searchentry_fts, rowid, kind, codes, text)
+        VALUES ('delete', old.id, old.kind, old.codes, old.text);
+    END""",
+    """CREATE TRIGGER search_searchentry_au AFTER UPDATE ON search_searchentry BEGIN
+        INSERT INTO search_searchentry_fts(search_searchentry_fts, rowid, kind, codes, text)
+        VALUES ('delete', old.id, old.kind, old.codes, old.text);
+        INSERT INTO search_searchentry_fts(rowid, kind, codes, text) VALUES (new.id, new.kind, new.codes, new.text);
+    END""",
+]
+
+POSTGRES_INDEX = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    """CREATE INDEX search_searchentry_tsv ON search_searchentry USING gin (
+        (setweight(to_tsvector('simple', codes), 'A') || to_tsvector('simple', text))
+    )""",
+    'CREATE INDEX search_searchentry_codes_trgm ON search_searchentry USING gin (codes gin_trgm_ops)',
+]
+
+
+def create_backend_index(apps, schema_editor):
+    statements = {'sqlite': SQLITE_INDEX, 'postgresql': POSTGRES_INDEX}
+    for statement in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def drop_backend_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS search_searchentry_fts')
+    elif schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS search_searchentry_tsv')
+        schema_editor.execute('DROP INDEX IF EXISTS search_searchentry_codes_trgm')
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(help_text='model label e.g. products.product', max_length=50)),
+                ('object_id', models.BigIntegerField()),
+                ('codes', models.TextField(blank=True, help_text='SKUs, barcodes and document numbers, prefix matched')),
+                ('text', models.TextField(blank=True, help_text='names, party names and descriptions')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Search Entry',
+                'verbose_name_plural': 'Search Entries',
+                'unique_together': {('kind', 'object_id')},
+            },
+        ),
+        migrations.RunPython(create_backend_index, drop_backend_index),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 6.0.1 on 2026-10-18 23:12
+
+from django.db import migrations
+
+# The index used to be filled here by calling search.index.rebuild_index, which
+# runs today's code against the historical schema. Existing rows are indexed
+# after migrate instead (SearchConfig.ready connects a post_migrate backfill),
+# or at any time with: python manage.py rebuild_search_index
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0001_initial'),
+        ('products', '0002_rename_shelf_life_product_shelf_life_days'),
+        ('inventory', '0009_partition_stockmovement'),
+        ('orders', '0002_initial'),
+        ('suppliers', '0001_initial'),
+    ]
+
+    operations = [
+    ]
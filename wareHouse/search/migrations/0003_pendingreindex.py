@@ -0,0 +1,28 @@
+# Generated by Django 6.0.1 on 2026-10-19 00:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0002_populate_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingReindex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(help_text='model label of the dependent documents', max_length=50)),
+                ('field', models.CharField(help_text='foreign key of the dependents to the changed object', max_length=100)),
+                ('object_id', models.BigIntegerField()),
+                ('queued_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Pending Reindex',
+                'verbose_name_plural': 'Pending Reindexes',
+                'unique_together': {('kind', 'field', 'object_id')},
+            },
+        ),
+    ]
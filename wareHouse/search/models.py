@@ -0,0 +1,44 @@
+from django.db import models
+
+
+class SearchEntry(models.Model):
+    """
+    Denormalised search document for one indexed object (product, inventory,
+    movement, order or supplier). Mirrored into a full-text index on the
+    database backend, see search.index.
+    """
+
+    kind = models.CharField(max_length=50, help_text='model label e.g. products.product')
+    object_id = models.BigIntegerField()
+    codes = models.TextField(blank=True, help_text='SKUs, barcodes and document numbers, prefix matched')
+    text = models.TextField(blank=True, help_text='names, party names and descriptions')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Search Entry'
+        verbose_name_plural = 'Search Entries'
+        unique_together = ['kind', 'object_id']
+
+    def __str__(self):
+        return f"{self.kind} #{self.object_id}"
+
+
+class PendingReindex(models.Model):
+    """
+    Dependent documents waiting to be re-indexed because an object they embed
+    changed, e.g. the movements of a renamed product. Worked off in the
+    background by search.index.reindex_pending.
+    """
+
+    kind = models.CharField(max_length=50, help_text='model label of the dependent documents')
+    field = models.CharField(max_length=100, help_text='foreign key of the dependents to the changed object')
+    object_id = models.BigIntegerField()
+    queued_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = 'Pending Reindex'
+        verbose_name_plural = 'Pending Reindexes'
+        unique_together = ['kind', 'field', 'object_id']
+
+    def __str__(self):
+        return f"{self.kind} by {self.field} #{self.object_id}"
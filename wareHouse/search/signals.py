@@ -0,0 +1,47 @@
+from django.apps import apps
+from django.db import DEFAULT_DB_ALIAS, connection
+from django.db.models.signals import post_delete, post_save
+
+from .documents import DOCUMENTS
+from .index import index_objects, rebuild_index, unindex
+from .models import SearchEntry
+
+# movements leave the hot table in bulk (inventory.archive), which unindexes them
+# itself; a post_delete receiver would make every queryset delete load the rows
+NO_DELETE_SIGNAL = ['inventory.stockmovement']
+
+
+def index_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    index_objects(sender, [instance.pk])
+
+
+def unindex_deleted(sender, instance, **kwargs):
+    unindex(sender, [instance.pk])
+
+
+def connect_signals():
+    for label in DOCUMENTS:
+        model = apps.get_model(label)
+        post_save.connect(index_saved, sender=model, dispatch_uid=f'search_index_{label}')
+        if label not in NO_DELETE_SIGNAL:
+            post_delete.connect(unindex_deleted, sender=model, dispatch_uid=f'search_unindex_{label}')
+
+
+def backfill_index(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    "after migrate, index the models that have rows but no entries yet (e.g. data older than the index)"
+    if using != DEFAULT_DB_ALIAS:
+        return
+    tables = connection.introspection.table_names()
+    if SearchEntry._meta.db_table not in tables:
+        return
+    labels = []
+    for label in DOCUMENTS:
+        model = apps.get_model(label)
+        if model._meta.db_table not in tables or SearchEntry.objects.filter(kind=label).exists():
+            continue
+        if model._default_manager.exists():
+            labels.append(label)
+    if labels:
+        rebuild_index(labels)
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Supplier, SupplierProduct
+from .models import Supplier, SupplierProduct, SupplierPriceChange, BestSupplier
 
 @admin.register(Supplier)
 class SupplierAdmin(admin.ModelAdmin):
@@ -86,4 +86,20 @@ class SupplierProductAdmin(admin.ModelAdmin):
     ]
     
     list_filter = ['is_available', 'is_preferred', 'supplier']
-    search_fields = ['supplier__name', 'product__name', 'supplier_sku']
\ No newline at end of file
+    search_fields = ['supplier__name', 'product__name', 'supplier_sku']
+
+
+@admin.register(SupplierPriceChange)
+class SupplierPriceChangeAdmin(admin.ModelAdmin):
+    list_display = ['supplier_product', 'old_price', 'new_price', 'source', 'changed_at']
+    list_filter = ['source', 'supplier_product__supplier']
+    search_fields = ['supplier_product__product__name', 'supplier_product__product__sku']
+    raw_id_fields = ['supplier_product']
+
+
+@admin.register(BestSupplier)
+class BestSupplierAdmin(admin.ModelAdmin):
+    list_display = ['product', 'supplier', 'unit_price', 'minimum_order_quantity', 'lead_time_days', 'is_preferred', 'offer_count', 'updated_at']
+    list_filter = ['is_preferred', 'supplier']
+    search_fields = ['product__name', 'product__sku']
+    raw_id_fields = ['product', 'supplier', 'supplier_product']
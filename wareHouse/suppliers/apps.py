@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class SuppliersConfig(AppConfig):
     name = 'suppliers'
+
+    def ready(self):
+        # connects the price history and best supplier signals
+        from . import signals  # noqa: F401
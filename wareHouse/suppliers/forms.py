@@ -62,4 +62,19 @@ class SupplierProductForm(forms.ModelForm):
             'lead_time_days': forms.NumberInput(attrs={'class': 'form-control', 'placeholder': 'Days'}),
             'is_available': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
             'is_preferred': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
-        }
\ No newline at end of file
+        }
+
+
+class SupplierPriceListForm(forms.Form):
+    """Upload of a supplier's full price list"""
+
+    file = forms.FileField(
+        help_text='CSV or JSONL with sku (or supplier_sku) and unit_price columns',
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.jsonl,.ndjson'})
+    )
+    deactivate_missing = forms.BooleanField(
+        required=False,
+        initial=True,
+        help_text='Mark products missing from the list as unavailable from this supplier',
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
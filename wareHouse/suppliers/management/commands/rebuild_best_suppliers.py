@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from suppliers.sync import refresh_best_suppliers
+
+
+class Command(BaseCommand):
+    help = 'Recompute the best supplier index of every product'
+
+    def handle(self, *args, **options):
+        count = refresh_best_suppliers()
+        self.stdout.write(self.style.SUCCESS(f'✓ Best supplier index rebuilt: {count} products with an available offer'))
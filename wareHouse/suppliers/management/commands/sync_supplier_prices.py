@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+from products.importer import detect_format
+from suppliers.models import Supplier
+from suppliers.sync import sync_price_list
+
+
+class Command(BaseCommand):
+    help = "Sync a supplier's products and prices from a CSV or JSONL price list"
+
+    def add_arguments(self, parser):
+        parser.add_argument('supplier', help='supplier code')
+        parser.add_argument('path', help='price list file, .csv or .jsonl')
+        parser.add_argument(
+            '--format',
+            choices=['csv', 'jsonl'],
+            help='file format (default: from the file extension)'
+        )
+        parser.add_argument(
+            '--keep-missing',
+            action='store_true',
+            help='leave products missing from the list available instead of deactivating them'
+        )
+
+    def handle(self, *args, **options):
+        supplier = Supplier.objects.filter(code__iexact=options['supplier']).first()
+        if supplier is None:
+            raise CommandError(f"Unknown supplier {options['supplier']}")
+
+        try:
+            with open(options['path'], 'rb') as stream:
+                result = sync_price_list(
+                    supplier,
+                    stream,
+                    fmt=options['format'] or detect_format(options['path']),
+                    deactivate_missing=not options['keep_missing'],
+                )
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        for line, sku, message in result.errors[:20]:
+            self.stdout.write(self.style.WARNING(f'  line {line} {sku}: {message}'))
+        if len(result.errors) > 20:
+            self.stdout.write(self.style.WARNING(f'  ... {len(result.errors) - 20} more rejected rows'))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {supplier.code}: {result.created} added, {result.updated} updated, {result.unchanged} unchanged, '
+            f'{result.deactivated} deactivated, {result.price_changes} price changes, {len(result.errors)} rejected'
+        ))
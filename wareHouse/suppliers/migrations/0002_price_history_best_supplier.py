@@ -0,0 +1,58 @@
+# Generated by Django 6.0.1 on 2026-10-18 23:25
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def populate(apps, schema_editor):
+    from suppliers.sync import refresh_best_suppliers
+    refresh_best_suppliers()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_rename_shelf_life_product_shelf_life_days'),
+        ('suppliers', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BestSupplier',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('unit_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('minimum_order_quantity', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('lead_time_days', models.IntegerField(default=0)),
+                ('is_preferred', models.BooleanField(default=False)),
+                ('offer_count', models.IntegerField(default=1, help_text='available offers the best one was chosen from')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='best_supplier', to='products.product')),
+                ('supplier', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='suppliers.supplier')),
+                ('supplier_product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='suppliers.supplierproduct')),
+            ],
+            options={
+                'verbose_name': 'Best Supplier',
+                'verbose_name_plural': 'Best Suppliers',
+            },
+        ),
+        migrations.CreateModel(
+            name='SupplierPriceChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('old_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('new_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('source', models.CharField(default='manual', help_text='manual or price_list', max_length=20)),
+                ('supplier_product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_changes', to='suppliers.supplierproduct')),
+            ],
+            options={
+                'verbose_name': 'Supplier Price Change',
+                'verbose_name_plural': 'Supplier Price Changes',
+                'ordering': ['-changed_at'],
+                'indexes': [models.Index(fields=['supplier_product', 'changed_at'], name='suppliers_s_supplie_331929_idx')],
+            },
+        ),
+        migrations.RunPython(populate, migrations.RunPython.noop),
+    ]
@@ -2,6 +2,7 @@ from django.db import models
 from django.contrib.auth import get_user_model
 from django.core.validators import EmailValidator, MinValueValidator
 from django.utils.text import slugify
+from django.utils import timezone
 from orders.models import PurchaseOrder
 
 User = get_user_model()
@@ -185,3 +186,70 @@ class SupplierProduct(models.Model):
     def __str__(self):
         return f"{self.product.name} - {self.supplier.name}"
 
+
+
+class SupplierPriceChange(models.Model):
+    "one row per unit_price change of a supplier product, written only when the price actually moves"
+
+    supplier_product = models.ForeignKey(
+        SupplierProduct,
+        on_delete=models.CASCADE,
+        related_name='price_changes'
+    )
+    old_price = models.DecimalField(max_digits=10, decimal_places=2)
+    new_price = models.DecimalField(max_digits=10, decimal_places=2)
+    changed_at = models.DateTimeField(default=timezone.now)
+    source = models.CharField(max_length=20, default='manual', help_text='manual or price_list')
+
+    class Meta:
+        ordering = ['-changed_at']
+        verbose_name = 'Supplier Price Change'
+        verbose_name_plural = 'Supplier Price Changes'
+        indexes = [
+            models.Index(fields=['supplier_product', 'changed_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.supplier_product}: {self.old_price} -> {self.new_price}"
+
+
+class BestSupplier(models.Model):
+    """
+    Cached best supplier of each product for purchasing: the available offer of an
+    active supplier, preferred offers first, then the lowest unit price, the
+    shortest lead time and the smallest minimum order quantity. Kept up to date by
+    the price list sync and the SupplierProduct/Supplier save signals.
+    """
+
+    product = models.OneToOneField(
+        'products.Product',
+        on_delete=models.CASCADE,
+        related_name='best_supplier'
+    )
+    supplier_product = models.ForeignKey(
+        SupplierProduct,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    supplier = models.ForeignKey(
+        Supplier,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+    minimum_order_quantity = models.DecimalField(max_digits=10, decimal_places=2)
+    lead_time_days = models.IntegerField(default=0)
+    is_preferred = models.BooleanField(default=False)
+    offer_count = models.IntegerField(default=1, help_text='available offers the best one was chosen from')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Best Supplier'
+        verbose_name_plural = 'Best Suppliers'
+
+    def __str__(self):
+        return f"{self.product_id}: {self.supplier} @ {self.unit_price}"
+
+    def order_quantity(self, quantity):
+        "quantity rounded up to the supplier's minimum order quantity"
+        return max(quantity, self.minimum_order_quantity)
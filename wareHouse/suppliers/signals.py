@@ -0,0 +1,38 @@
+"""
+Single-row edits (admin, forms) of supplier offers: record price changes and
+keep the BestSupplier index current. The bulk price list sync does both itself.
+"""
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import Supplier, SupplierPriceChange, SupplierProduct
+from .sync import refresh_best_suppliers
+
+
+@receiver(pre_save, sender=SupplierProduct)
+def remember_price(sender, instance, raw=False, **kwargs):
+    instance._previous_price = None
+    if instance.pk and not raw:
+        instance._previous_price = SupplierProduct.objects.filter(pk=instance.pk).values_list('unit_price', flat=True).first()
+
+
+@receiver(post_save, sender=SupplierProduct)
+def offer_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_price', None)
+    if previous is not None and previous != instance.unit_price:
+        SupplierPriceChange.objects.create(supplier_product=instance, old_price=previous, new_price=instance.unit_price)
+    refresh_best_suppliers([instance.product_id])
+
+
+@receiver(post_delete, sender=SupplierProduct)
+def offer_deleted(sender, instance, **kwargs):
+    refresh_best_suppliers([instance.product_id])
+
+
+@receiver(post_save, sender=Supplier)
+def supplier_saved(sender, instance, created=False, raw=False, **kwargs):
+    # status or is_active decide whether the supplier's offers count
+    if not created and not raw:
+        refresh_best_suppliers(set(instance.supplied_products.values_list('product_id', flat=True)))
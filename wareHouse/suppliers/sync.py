@@ -0,0 +1,241 @@
+"""
+Supplier price list sync and the best supplier index.
+
+sync_price_list() reads a supplier's price list (CSV or JSONL, one row per
+product), diffs it against all of the supplier's SupplierProduct rows fetched in
+one query and applies the inserts, updates and deactivations with bulk queries.
+Every price that moves gets one SupplierPriceChange row, unchanged offers write
+nothing. The BestSupplier rows of the affected products are then recomputed.
+"""
+from collections import Counter
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from products.importer import FALSE_VALUES, TRUE_VALUES, read_rows
+from products.models import Product
+from .models import BestSupplier, SupplierPriceChange, SupplierProduct
+
+CHUNK_SIZE = 2000
+
+# offer columns of a price list, unit_price is required for a new offer
+OFFER_FIELDS = ['supplier_sku', 'unit_price', 'minimum_order_quantity', 'lead_time_days', 'is_preferred']
+COLUMN_ALIASES = {'price': 'unit_price', 'moq': 'minimum_order_quantity', 'lead_time': 'lead_time_days', 'product_sku': 'sku'}
+NEW_OFFER_DEFAULTS = {'supplier_sku': None, 'minimum_order_quantity': Decimal('1'), 'lead_time_days': 0, 'is_preferred': False}
+
+# best offer first
+RANKING = ['-is_preferred', 'unit_price', 'lead_time_days', 'minimum_order_quantity', 'pk']
+
+
+@dataclass
+class SyncResult:
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    deactivated: int = 0
+    price_changes: int = 0
+    errors: list = field(default_factory=list)
+
+
+def clean_offer(row):
+    "offer values of a price list row, raises ValidationError listing the bad columns"
+    values = {}
+    problems = []
+    for name in OFFER_FIELDS:
+        if name not in row:
+            continue
+        raw = row[name]
+        model_field = SupplierProduct._meta.get_field(name)
+        try:
+            if name == 'is_preferred':
+                if raw.lower() not in TRUE_VALUES | FALSE_VALUES:
+                    raise ValidationError('must be true or false')
+                values[name] = raw.lower() in TRUE_VALUES
+            elif raw == '':
+                if not model_field.null and name == 'unit_price':
+                    raise ValidationError('is required')
+                values[name] = None if model_field.null else NEW_OFFER_DEFAULTS[name]
+            else:
+                values[name] = model_field.clean(raw, None)
+        except ValidationError as e:
+            problems.append(f"{name}: {' '.join(e.messages)}")
+    if problems:
+        raise ValidationError('; '.join(problems))
+    return values
+
+
+def read_price_list(supplier, stream, fmt):
+    """
+    Validated offers of a price list keyed by product id, returns (offers, errors,
+    rejected) where rejected holds the products of rows that failed validation.
+    Rows are matched by our product SKU, or by the supplier's own SKU for products
+    already on the supplier's list. Raises ValueError when the list has neither column.
+    """
+    by_supplier_sku = dict(
+        SupplierProduct.objects.filter(supplier=supplier).exclude(supplier_sku=None).values_list('supplier_sku', 'product_id')
+    )
+
+    rows = []
+    errors = []
+    for line, row in read_rows(stream, fmt):
+        if isinstance(row, str):
+            errors.append((line, '', row))
+            continue
+        rows.append((line, {COLUMN_ALIASES.get(key, key): value for key, value in row.items()}))
+
+    if rows and not any('sku' in row or 'supplier_sku' in row for _, row in rows):
+        raise ValueError('The price list needs a sku or supplier_sku column')
+
+    skus = list({row.get('sku', '') for _, row in rows} - {''})
+    product_ids = {}
+    for start in range(0, len(skus), CHUNK_SIZE):
+        product_ids.update(Product.objects.filter(sku__in=skus[start:start + CHUNK_SIZE]).values_list('sku', 'pk'))
+
+    offers = {}
+    rejected = set()
+    for line, row in rows:
+        sku = row.get('sku', '')
+        product_id = product_ids.get(sku) if sku else by_supplier_sku.get(row.get('supplier_sku', ''))
+        if product_id is None:
+            errors.append((line, sku or row.get('supplier_sku', ''), 'unknown product'))
+            continue
+        try:
+            offers[product_id] = (line, clean_offer(row))
+        except ValidationError as e:
+            rejected.add(product_id)
+            errors.append((line, sku or row.get('supplier_sku', ''), ' '.join(e.messages)))
+    return offers, errors, rejected
+
+
+def sync_price_list(supplier, stream, fmt='csv', deactivate_missing=True):
+    """
+    Bring the supplier's SupplierProduct rows in line with a price list. Offers
+    missing from the list are marked unavailable (unless deactivate_missing is
+    False), columns missing from the list keep their current values. Returns a
+    SyncResult, rows that fail validation are reported in errors and skipped.
+    Offers of rejected rows are left as they are, and nothing is deactivated
+    when no row of the list is valid.
+    """
+    offers, errors, rejected = read_price_list(supplier, stream, fmt)
+    result = SyncResult(errors=errors)
+    now = timezone.now()
+
+    existing = {
+        values['product_id']: values
+        for values in SupplierProduct.objects.filter(supplier=supplier).values('pk', 'product_id', 'is_available', *OFFER_FIELDS)
+    }
+
+    to_create = []
+    to_update = []
+    changes = []
+    for product_id, (line, values) in offers.items():
+        current = existing.get(product_id)
+        if current is None:
+            if values.get('unit_price') is None:
+                result.errors.append((line, '', 'unit_price: is required for a new offer'))
+                continue
+            to_create.append(SupplierProduct(
+                supplier=supplier, product_id=product_id, is_available=True,
+                **{**NEW_OFFER_DEFAULTS, **values},
+            ))
+            continue
+
+        merged = {name: values.get(name, current[name]) for name in OFFER_FIELDS}
+        if all(merged[name] == current[name] for name in OFFER_FIELDS) and current['is_available']:
+            result.unchanged += 1
+            continue
+        offer = SupplierProduct(pk=current['pk'], product_id=product_id, is_available=True, updated_at=now, **merged)
+        to_update.append(offer)
+        if merged['unit_price'] != current['unit_price']:
+            changes.append(SupplierPriceChange(
+                supplier_product_id=current['pk'], old_price=current['unit_price'], new_price=merged['unit_price'],
+                changed_at=now, source='price_list',
+            ))
+
+    # an empty or entirely rejected list says nothing about what the supplier dropped
+    missing = [
+        current['pk'] for product_id, current in existing.items()
+        if product_id not in offers and product_id not in rejected and current['is_available']
+    ] if deactivate_missing and offers else []
+
+    with transaction.atomic():
+        SupplierProduct.objects.bulk_create(to_create, batch_size=CHUNK_SIZE)
+        SupplierProduct.objects.bulk_update(to_update, OFFER_FIELDS + ['is_available', 'updated_at'], batch_size=CHUNK_SIZE)
+        SupplierPriceChange.objects.bulk_create(changes, batch_size=CHUNK_SIZE)
+        for start in range(0, len(missing), CHUNK_SIZE):
+            SupplierProduct.objects.filter(pk__in=missing[start:start + CHUNK_SIZE]).update(is_available=False, updated_at=now)
+
+        deactivated = set(missing)
+        affected = {offer.product_id for offer in to_create + to_update}
+        affected.update(product_id for product_id, current in existing.items() if current['pk'] in deactivated)
+        refresh_best_suppliers(affected)
+
+    result.created = len(to_create)
+    result.updated = len(to_update)
+    result.deactivated = len(missing)
+    result.price_changes = len(changes)
+    return result
+
+
+def refresh_best_suppliers(product_ids=None):
+    """
+    Recompute the BestSupplier rows of the given products (default: every product
+    with an offer or a cached row), returns the number of products with a best supplier.
+    """
+    if product_ids is None:
+        product_ids = set(SupplierProduct.objects.values_list('product_id', flat=True).distinct())
+        product_ids.update(BestSupplier.objects.values_list('product_id', flat=True))
+    product_ids = sorted(product_ids)
+    now = timezone.now()
+
+    found = 0
+    for start in range(0, len(product_ids), CHUNK_SIZE):
+        chunk = product_ids[start:start + CHUNK_SIZE]
+        offers = SupplierProduct.objects.filter(
+            product_id__in=chunk, is_available=True, supplier__is_active=True, supplier__status='active'
+        ).order_by('product_id', *RANKING).values_list(
+            'pk', 'product_id', 'supplier_id', 'unit_price', 'minimum_order_quantity', 'lead_time_days', 'is_preferred'
+        )
+
+        best = {}
+        counts = Counter()
+        for offer in offers:
+            counts[offer[1]] += 1
+            best.setdefault(offer[1], offer)
+
+        rows = [
+            BestSupplier(
+                product_id=product_id, supplier_product_id=pk, supplier_id=supplier_id, unit_price=unit_price,
+                minimum_order_quantity=moq, lead_time_days=lead_time_days, is_preferred=is_preferred,
+                offer_count=counts[product_id], updated_at=now,
+            )
+            for pk, product_id, supplier_id, unit_price, moq, lead_time_days, is_preferred in best.values()
+        ]
+        with transaction.atomic():
+            BestSupplier.objects.filter(product_id__in=chunk).exclude(product_id__in=list(best)).delete()
+            BestSupplier.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=['product'],
+                update_fields=[
+                    'supplier_product', 'supplier', 'unit_price', 'minimum_order_quantity',
+                    'lead_time_days', 'is_preferred', 'offer_count', 'updated_at',
+                ],
+            )
+        found += len(rows)
+    return found
+
+
+def best_suppliers(product_ids):
+    "{product_id: BestSupplier} for the given products, read from the index"
+    product_ids = list(product_ids)
+    best = {}
+    for start in range(0, len(product_ids), CHUNK_SIZE):
+        best.update(
+            (row.product_id, row)
+            for row in BestSupplier.objects.select_related('supplier').filter(product_id__in=product_ids[start:start + CHUNK_SIZE])
+        )
+    return best
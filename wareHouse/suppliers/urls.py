@@ -10,4 +10,5 @@ urlpatterns = [
     path('create/', views.supplier_create, name='supplier_create'),
     path('<int:pk>/update/', views.supplier_update, name='supplier_update'),
     path('<int:pk>/delete/', views.supplier_delete, name='supplier_delete'),
+    path('<int:pk>/price-list/', views.supplier_price_list, name='supplier_price_list'),
 ]
\ No newline at end of file
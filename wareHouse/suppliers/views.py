@@ -2,10 +2,13 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.core.paginator import Paginator
-from django.db.models import Q, Count, Sum, F
+from django.db.models import Count, Sum, F
 
-from .models import Supplier, SupplierProduct
-from .forms import SupplierForm, SupplierProductForm
+from .models import Supplier, SupplierProduct, SupplierPriceChange
+from .forms import SupplierForm, SupplierProductForm, SupplierPriceListForm
+from .sync import sync_price_list
+from products.importer import detect_format
+from search.index import filter_by_search
 
 # =====================
 # SUPPLIER VIEWS
@@ -22,11 +25,7 @@ def supplier_list(request):
     # Search
     search_query = request.GET.get('search', '')
     if search_query:
-        suppliers = suppliers.filter(
-            Q(name__icontains=search_query) |
-            Q(code__icontains=search_query) |
-            Q(contact_person__icontains=search_query)
-        )
+        suppliers = filter_by_search(suppliers, search_query)
     
     # Filter by status
     status = request.GET.get('status', '')
@@ -59,7 +58,7 @@ def supplier_detail(request, pk):
     supplier = get_object_or_404(Supplier, pk=pk)
     
     # Get supplier products
-    supplier_products = supplier.supplier_products.select_related('product')
+    supplier_products = supplier.supplied_products.select_related('product')
     
     # Get recent purchase orders
     recent_orders = supplier.purchase_orders.order_by('-order_date')[:10]
@@ -139,4 +138,48 @@ def supplier_delete(request, pk):
         'supplier': supplier,
     }
     
-    return render(request, 'suppliers/supplier_confirm_delete.html', context)
\ No newline at end of file
+    return render(request, 'suppliers/supplier_confirm_delete.html', context)
+
+
+@login_required
+def supplier_price_list(request, pk):
+    """Sync the supplier's products and prices from an uploaded price list"""
+    supplier = get_object_or_404(Supplier, pk=pk)
+    result = None
+
+    if request.method == 'POST':
+        form = SupplierPriceListForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            try:
+                result = sync_price_list(
+                    supplier,
+                    upload,
+                    fmt=detect_format(upload.name),
+                    deactivate_missing=form.cleaned_data['deactivate_missing'],
+                )
+                messages.success(
+                    request,
+                    f'Price list synced: {result.created} added, {result.updated} updated, '
+                    f'{result.deactivated} deactivated, {result.price_changes} price changes'
+                )
+            except ValueError as e:
+                messages.error(request, f'Sync failed: {e}')
+        else:
+            messages.error(request, 'Please fix the errors below.')
+    else:
+        form = SupplierPriceListForm()
+
+    recent_changes = SupplierPriceChange.objects.filter(
+        supplier_product__supplier=supplier
+    ).select_related('supplier_product__product')[:20]
+
+    context = {
+        'supplier': supplier,
+        'form': form,
+        'result': result,
+        'errors': result.errors[:200] if result else [],
+        'recent_changes': recent_changes,
+    }
+
+    return render(request, 'suppliers/supplier_price_list.html', context)
@@ -52,6 +52,8 @@ INSTALLED_APPS = [
     'orders',
     'reports',
     'dashboards',
+    'search',
+    'api',
 ]
 
 # Custom User Model
@@ -190,6 +192,90 @@ LOGGING = {
     },
 }
 
+# Idempotency keys for stock movement submissions (retried scanner POSTs)
+IDEMPOTENCY_KEY_HEADER = 'Idempotency-Key'
+IDEMPOTENCY_KEY_TTL_HOURS = int(os.getenv('IDEMPOTENCY_KEY_TTL_HOURS', '24'))
+
+# Inventory event outbox consumers (consume_inventory_events), name -> dotted path of a
+# callable taking a list of InventoryEvent rows
+INVENTORY_EVENT_HANDLERS = {
+    'log': 'inventory.events.log_events',
+    'stock_alerts': 'inventory.alerts.handle_events',
+    'pick_counts': 'inventory.pickcounts.count_picks',
+}
+# seconds a consumer keeps waiting for event ids skipped by its offset (their posting
+# had not committed yet) before it assumes the posting rolled back
+INVENTORY_EVENT_GAP_SECONDS = int(os.getenv('INVENTORY_EVENT_GAP_SECONDS', '3600'))
+# time-based sweeps of consumers and deferred work, name -> dotted path of a callable
+# without arguments, run by consume_inventory_events every INVENTORY_EVENT_SWEEP_SECONDS
+INVENTORY_EVENT_SWEEPS = {
+    'stock_alerts': 'inventory.alerts.sweep',
+    'search_dependents': 'search.index.reindex_pending',
+}
+INVENTORY_EVENT_SWEEP_SECONDS = int(os.getenv('INVENTORY_EVENT_SWEEP_SECONDS', '300'))
+# out of stock inventory rows untouched this long are used up batches and raise no alert
+STOCK_ALERT_DORMANT_DAYS = int(os.getenv('STOCK_ALERT_DORMANT_DAYS', '30'))
+
+# Archived StockMovement segments (archive_movements)
+MOVEMENT_ARCHIVE_DIR = Path(os.getenv('MOVEMENT_ARCHIVE_DIR', BASE_DIR / 'archive' / 'movements'))
+
+# In-process barcode/SKU lookup cache of the scan API (per worker process)
+SCAN_CACHE_SIZE = int(os.getenv('SCAN_CACHE_SIZE', '10000'))
+SCAN_CACHE_TTL = int(os.getenv('SCAN_CACHE_TTL', '30'))
+# seconds a cached product's stock locations are served before its inventory version is checked again
+SCAN_LOCATION_RECHECK = float(os.getenv('SCAN_LOCATION_RECHECK', '2'))
+
+# Reorder suggestions (compute_reorder_suggestions): days of OUT movements the demand
+# is measured over, the service level the safety stock covers, the review period an
+# order has to last and the lead time used for products without a supplier offer
+REORDER_DEMAND_DAYS = int(os.getenv('REORDER_DEMAND_DAYS', '90'))
+REORDER_SERVICE_LEVEL = float(os.getenv('REORDER_SERVICE_LEVEL', '0.95'))
+REORDER_REVIEW_DAYS = int(os.getenv('REORDER_REVIEW_DAYS', '7'))
+REORDER_DEFAULT_LEAD_TIME_DAYS = int(os.getenv('REORDER_DEFAULT_LEAD_TIME_DAYS', '7'))
+
+# Demand forecasts (forecast_demand): days of OUT movements the models are fitted
+# on and the number of days ahead the stored forecast quantity covers
+FORECAST_HISTORY_DAYS = int(os.getenv('FORECAST_HISTORY_DAYS', '365'))
+FORECAST_HORIZON_DAYS = int(os.getenv('FORECAST_HORIZON_DAYS', '30'))
+
+# Pick lists (orders.picking): default route through the stops, 'serpentine' (aisle by
+# aisle, racks up one aisle and down the next) or 'nearest' (nearest neighbour over the
+# (x, y) returned by the PICK_LOCATION_COORDINATES callable for a StorageLocation)
+PICK_ROUTE = os.getenv('PICK_ROUTE', 'serpentine')
+PICK_LOCATION_COORDINATES = os.getenv('PICK_LOCATION_COORDINATES', 'orders.picking.grid_coordinates')
+
+# Wave picking (orders.waves): limits of one wave, the orders it holds (cart slots),
+# the order lines and the units; 0 turns a limit off
+WAVE_MAX_ORDERS = int(os.getenv('WAVE_MAX_ORDERS', '12'))
+WAVE_MAX_LINES = int(os.getenv('WAVE_MAX_LINES', '200'))
+WAVE_MAX_UNITS = int(os.getenv('WAVE_MAX_UNITS', '0'))
+
+# Slotting (warehouses.slotting): days of pick counts velocity is measured over, moves
+# proposed per run, the shelf level easiest to pick from and the cost (in metres of
+# walking) of every level above or below it
+SLOTTING_DAYS = int(os.getenv('SLOTTING_DAYS', '90'))
+SLOTTING_MAX_MOVES = int(os.getenv('SLOTTING_MAX_MOVES', '100'))
+SLOTTING_GOLDEN_SHELF = int(os.getenv('SLOTTING_GOLDEN_SHELF', '2'))
+SLOTTING_SHELF_WEIGHT = float(os.getenv('SLOTTING_SHELF_WEIGHT', '2.0'))
+
+# JSON API (api): rows per page when the client sends no limit, and the largest limit accepted
+API_PAGE_SIZE = int(os.getenv('API_PAGE_SIZE', '100'))
+API_MAX_PAGE_SIZE = int(os.getenv('API_MAX_PAGE_SIZE', '1000'))
+# operations accepted by one POST to the movement batch endpoint
+API_BATCH_MAX_OPERATIONS = int(os.getenv('API_BATCH_MAX_OPERATIONS', '5000'))
+
+# Handheld sync (api.sync): rows per change stream in one delta response, seconds a device
+# cursor keeps waiting for change ids skipped because their transaction had not committed
+# yet, age in seconds after which a bootstrap snapshot is rebuilt on request, seconds a
+# replaced snapshot file is kept for devices still downloading it, days the change log is
+# kept (devices with an older cursor bootstrap again) and where the snapshot files are written
+SYNC_PAGE_SIZE = int(os.getenv('SYNC_PAGE_SIZE', '5000'))
+SYNC_GAP_SECONDS = int(os.getenv('SYNC_GAP_SECONDS', '3600'))
+SYNC_SNAPSHOT_MAX_AGE = int(os.getenv('SYNC_SNAPSHOT_MAX_AGE', '3600'))
+SYNC_SNAPSHOT_GRACE_SECONDS = int(os.getenv('SYNC_SNAPSHOT_GRACE_SECONDS', '900'))
+SYNC_CHANGE_DAYS = int(os.getenv('SYNC_CHANGE_DAYS', '30'))
+SYNC_SNAPSHOT_DIR = Path(os.getenv('SYNC_SNAPSHOT_DIR', BASE_DIR / 'archive' / 'sync'))
+
 # Custom User Model (we'll create this)
 AUTH_USER_MODEL = 'accounts.User'
 
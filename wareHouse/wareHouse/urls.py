@@ -18,6 +18,7 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from products import views as product_views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -37,6 +38,10 @@ urlpatterns = [
     path('suppliers/', include('suppliers.urls')),
     # orders urls
     path('orders/', include('orders.urls')),
+    # scanner api
+    path('api/scan/<str:code>/', product_views.scan_lookup, name='api_scan'),
+    # read-only JSON api
+    path('api/v1/', include('api.urls')),
 ]
 
 # media files
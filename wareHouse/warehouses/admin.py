@@ -122,6 +122,7 @@ class StorageLocationAdmin(admin.ModelAdmin):
         'zone',
         'position_display',
         'capacity',
+        'occupied_quantity',
         'occupied_badge',
         'is_active'
     ]
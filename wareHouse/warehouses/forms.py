@@ -1,6 +1,8 @@
 from django import forms
+from django.conf import settings
 from django.forms import widgets
 from .models import Warehouse, StorageLocation, StorageZone
+from .grid import MAX_LOCATIONS, check_pattern, default_pattern, grid_size, parse_level
 
 
 class WarehouseForm(forms.ModelForm):
@@ -174,4 +176,87 @@ class StorageZoneForm(forms.ModelForm):
         }
 
 
-        
\ No newline at end of file
+        
+
+class LocationGridForm(forms.Form):
+    'form for generating a grid of storage locations in a zone'
+
+    zone = forms.ModelChoiceField(
+        queryset=StorageZone.objects.filter(is_active=True).select_related('warehouse'),
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    aisles = forms.CharField(required=False, widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'e.g. A-D'}))
+    racks = forms.CharField(required=False, widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'e.g. 01-20'}))
+    shelves = forms.CharField(required=False, widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'e.g. 1-5'}))
+    bins = forms.CharField(required=False, widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'e.g. 1-4'}))
+    pattern = forms.CharField(
+        required=False,
+        max_length=100,
+        widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': '{aisle}-{rack}-{shelf}-{bin}'}),
+        help_text='leave blank to join the used levels with dashes'
+    )
+    capacity = forms.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        min_value=0,
+        initial=0,
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'placeholder': 'kg', 'step': '0.1'})
+    )
+
+    # form field -> location level
+    LEVEL_FIELDS = {'aisles': 'aisle', 'racks': 'rack', 'shelves': 'shelf', 'bins': 'bin'}
+
+    def clean(self):
+        'parse the level ranges and check the pattern and size of the grid'
+        cleaned_data = super().clean()
+        levels = {}
+        for field_name, level in self.LEVEL_FIELDS.items():
+            try:
+                levels[level] = parse_level(cleaned_data.get(field_name) or '')
+            except ValueError as e:
+                self.add_error(field_name, str(e))
+        if self.errors:
+            return cleaned_data
+
+        if not any(levels.values()):
+            raise forms.ValidationError('Give values for at least one of aisles, racks, shelves and bins.')
+        pattern = cleaned_data.get('pattern') or default_pattern(levels)
+        try:
+            check_pattern(pattern, levels)
+        except ValueError as e:
+            self.add_error('pattern', str(e))
+            return cleaned_data
+        if grid_size(levels) > MAX_LOCATIONS:
+            raise forms.ValidationError(f'The grid has {grid_size(levels)} locations, the limit is {MAX_LOCATIONS}.')
+
+        cleaned_data['levels'] = levels
+        cleaned_data['pattern'] = pattern
+        return cleaned_data
+
+
+class SlottingForm(forms.Form):
+    'form for analysing the slotting of a warehouse'
+
+    zone = forms.ModelChoiceField(
+        queryset=StorageZone.objects.none(),
+        required=False,
+        empty_label='All zones',
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    days = forms.IntegerField(
+        min_value=1,
+        initial=settings.SLOTTING_DAYS,
+        widget=forms.NumberInput(attrs={'class': 'form-control'}),
+        help_text='days of picks velocity is measured over'
+    )
+    max_moves = forms.IntegerField(
+        min_value=1,
+        initial=settings.SLOTTING_MAX_MOVES,
+        label='Moves',
+        widget=forms.NumberInput(attrs={'class': 'form-control'}),
+        help_text='most moves to propose, a swap is two'
+    )
+
+    def __init__(self, *args, warehouse=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['zone'].queryset = StorageZone.objects.filter(warehouse=warehouse, is_active=True)
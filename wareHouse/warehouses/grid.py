@@ -0,0 +1,156 @@
+"""
+Bulk storage location grid generator.
+
+generate_locations() creates one StorageLocation per combination of the aisle,
+rack, shelf and bin values given for a zone, with codes built from a pattern
+such as "{aisle}-{rack}-{shelf}-{bin}". The combinations are produced lazily and
+written in chunks with bulk_create; codes that already exist in the warehouse
+are looked up once per chunk and skipped, so a grid can be extended by running
+it again with wider ranges.
+
+Level values are given as specs: a range ("A-D", "1-12", "01-12" keeps the zero
+padding), a list ("A,C,E") or a mix of both ("1-3,7").
+"""
+import re
+import string
+from dataclasses import dataclass
+from itertools import islice, product
+
+from django.db import transaction
+
+from api.sync import record_changes
+from .models import StorageLocation
+
+CHUNK_SIZE = 2000
+MAX_LOCATIONS = 100000
+
+LEVELS = ['aisle', 'rack', 'shelf', 'bin']
+PATTERN_FIELDS = ['warehouse', 'zone'] + LEVELS
+CODE_LENGTH = StorageLocation._meta.get_field('code').max_length
+LEVEL_LENGTH = StorageLocation._meta.get_field('aisle').max_length
+
+NUMBER_RANGE = re.compile(r'^(\d+)-(\d+)$')
+LETTER_RANGE = re.compile(r'^([A-Z])-([A-Z])$')
+
+
+@dataclass
+class GridResult:
+    created: int = 0
+    skipped: int = 0
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def parse_level(spec):
+    "values of a level spec, [] for a blank spec, raises ValueError"
+    values = []
+    for item in (part.strip().upper() for part in spec.split(',')):
+        if not item:
+            continue
+        if match := NUMBER_RANGE.match(item):
+            start, end = match.groups()
+            width = len(start) if start.startswith('0') else 0
+            if int(start) > int(end):
+                raise ValueError(f'Range {item} runs backwards')
+            values += [str(number).zfill(width) for number in range(int(start), int(end) + 1)]
+        elif match := LETTER_RANGE.match(item):
+            start, end = match.groups()
+            if start > end:
+                raise ValueError(f'Range {item} runs backwards')
+            letters = string.ascii_uppercase
+            values += list(letters[letters.index(start):letters.index(end) + 1])
+        else:
+            values.append(item)
+
+    for value in values:
+        if len(value) > LEVEL_LENGTH:
+            raise ValueError(f'{value} is longer than {LEVEL_LENGTH} characters')
+    if len(set(values)) != len(values):
+        raise ValueError(f'{spec} repeats a value')
+    return values
+
+
+def default_pattern(levels):
+    "codes joining the used levels with dashes, e.g. {aisle}-{rack}-{shelf}"
+    return '-'.join(f'{{{name}}}' for name in LEVELS if levels.get(name))
+
+
+def check_pattern(pattern, levels):
+    "raise ValueError unless the pattern gives every combination its own code"
+    try:
+        pattern.format(**{name: '' for name in PATTERN_FIELDS})
+    except (KeyError, IndexError, ValueError):
+        raise ValueError(f"Invalid pattern, use fields {', '.join('{' + name + '}' for name in PATTERN_FIELDS)}")
+    fields = set(re.findall(r'{(\w*)[^}]*}', pattern))
+    for name in LEVELS:
+        if name in fields and not levels.get(name):
+            raise ValueError(f'The pattern uses {{{name}}} but no {name} values are given')
+        if levels.get(name) and name not in fields:
+            raise ValueError(f'The pattern needs {{{name}}} to tell the locations apart')
+
+
+def grid_size(levels):
+    size = 1
+    for name in LEVELS:
+        size *= len(levels.get(name) or [None])
+    return size
+
+
+def generate_locations(zone, levels, pattern=None, capacity=0, chunk_size=CHUNK_SIZE):
+    """
+    Create the locations of a grid in zone. levels maps aisle/rack/shelf/bin to
+    lists of values (missing or empty levels are left blank on the locations).
+    Returns a GridResult; raises ValueError for an invalid pattern, an empty or
+    oversized grid, or a code longer than the code column.
+    """
+    if not any(levels.get(name) for name in LEVELS):
+        raise ValueError('Give values for at least one of aisle, rack, shelf and bin')
+    pattern = pattern or default_pattern(levels)
+    check_pattern(pattern, levels)
+    if grid_size(levels) > MAX_LOCATIONS:
+        raise ValueError(f'The grid has {grid_size(levels)} locations, the limit is {MAX_LOCATIONS}')
+
+    warehouse = zone.warehouse
+
+    def make_code(level_values):
+        return pattern.format(warehouse=warehouse.code, zone=zone.code, **{
+            name: value or '' for name, value in level_values.items()
+        }).upper()
+
+    # the longest values make the longest code, check it before anything is written
+    longest = make_code({name: max(levels.get(name) or [''], key=len) for name in LEVELS})
+    if len(longest) > CODE_LENGTH:
+        raise ValueError(f'Code {longest} is longer than {CODE_LENGTH} characters')
+
+    columns = [levels.get(name) or [None] for name in LEVELS]
+    result = GridResult()
+    for chunk in chunked(product(*columns), chunk_size):
+        rows = {}
+        for values in chunk:
+            level_values = dict(zip(LEVELS, values))
+            rows[make_code(level_values)] = level_values
+
+        existing = set(StorageLocation.objects.filter(warehouse=warehouse, code__in=list(rows)).values_list('code', flat=True))
+        locations = [
+            StorageLocation(warehouse=warehouse, zone=zone, code=code, capacity=capacity, **level_values)
+            for code, level_values in rows.items()
+            if code not in existing
+        ]
+        with transaction.atomic():
+            # a location created concurrently is skipped by the (warehouse, code) constraint,
+            # ignore_conflicts does not say which rows went in so read their ids again
+            StorageLocation.objects.bulk_create(locations, batch_size=chunk_size, ignore_conflicts=True)
+            created_ids = list(
+                StorageLocation.objects.filter(warehouse=warehouse, code__in=list(rows)).exclude(code__in=existing)
+                .values_list('pk', flat=True)
+            )
+            # bulk_create skips the post_save signal that logs the change for handheld sync
+            record_changes(StorageLocation, created_ids, warehouse.pk)
+        created = len(created_ids)
+        result.created += created
+        result.skipped += len(chunk) - created
+    return result
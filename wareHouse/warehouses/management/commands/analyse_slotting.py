@@ -0,0 +1,63 @@
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from warehouses.models import StorageZone, Warehouse
+from warehouses.slotting import analyse_slotting, apply_slotting
+
+
+class Command(BaseCommand):
+    help = 'Propose moves that put the most picked products of a warehouse in its most accessible locations'
+
+    def add_arguments(self, parser):
+        parser.add_argument('warehouse', help='warehouse code, e.g. WH-001')
+        parser.add_argument('--zone', help='only slot the locations of this zone code')
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.SLOTTING_DAYS,
+            help=f'days of picks velocity is measured over (default {settings.SLOTTING_DAYS})'
+        )
+        parser.add_argument(
+            '--max-moves',
+            type=int,
+            default=settings.SLOTTING_MAX_MOVES,
+            help=f'most moves to propose, a swap is two (default {settings.SLOTTING_MAX_MOVES})'
+        )
+        parser.add_argument('--apply', action='store_true', help='post the moves as a stock transfer batch')
+
+    def handle(self, *args, **options):
+        try:
+            warehouse = Warehouse.objects.get(code=options['warehouse'])
+        except Warehouse.DoesNotExist:
+            raise CommandError(f"Warehouse {options['warehouse']} not found")
+        zone = None
+        if options['zone']:
+            try:
+                zone = StorageZone.objects.get(warehouse=warehouse, code=options['zone'])
+            except StorageZone.DoesNotExist:
+                raise CommandError(f"Zone {options['zone']} not found in {warehouse.code}")
+
+        started = perf_counter()
+        try:
+            plan = analyse_slotting(warehouse, zone, options['days'], options['max_moves'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        elapsed = perf_counter() - started
+
+        for move in plan.moves:
+            self.stdout.write(
+                f'{move.inventory.product.sku:<20} {move.velocity:>6} picks  '
+                f'{move.from_location.code} -> {move.to_location.code}'
+                + ('  (swap)' if move.swap else '')
+            )
+        self.stdout.write(
+            f'{plan.picked_products} picked products in {plan.locations} locations analysed in {elapsed:.2f}s, '
+            f'{len(plan.moves)} moves save {plan.total_gain:.0f} pick-metres over {plan.days} days'
+        )
+
+        if options['apply']:
+            movements = apply_slotting(plan)
+            self.stdout.write(self.style.SUCCESS(f'✓ {len(movements)} stock rows relocated'))
+        else:
+            self.stdout.write(self.style.SUCCESS('✓ Slotting analysed, run with --apply to move the stock'))
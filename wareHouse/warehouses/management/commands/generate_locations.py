@@ -0,0 +1,49 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from warehouses.grid import generate_locations, parse_level
+from warehouses.models import StorageZone
+
+
+class Command(BaseCommand):
+    help = 'Generate a grid of storage locations (aisle x rack x shelf x bin) for a zone, skipping existing codes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('warehouse', help='warehouse code, e.g. WH-001')
+        parser.add_argument('zone', help='zone code within the warehouse')
+        parser.add_argument('--aisles', default='', help='e.g. A-D or A,C,E')
+        parser.add_argument('--racks', default='', help='e.g. 01-20 (zero padding is kept)')
+        parser.add_argument('--shelves', default='', help='e.g. 1-5')
+        parser.add_argument('--bins', default='', help='e.g. 1-4')
+        parser.add_argument(
+            '--pattern',
+            default=None,
+            help='code pattern with {warehouse} {zone} {aisle} {rack} {shelf} {bin} (default: the used levels joined with dashes)'
+        )
+        parser.add_argument('--capacity', default='0', help='capacity of every location in kg (default 0)')
+
+    def handle(self, *args, **options):
+        try:
+            zone = StorageZone.objects.select_related('warehouse').get(
+                warehouse__code=options['warehouse'], code=options['zone']
+            )
+        except StorageZone.DoesNotExist:
+            raise CommandError(f"No zone {options['zone']} in warehouse {options['warehouse']}")
+
+        started = perf_counter()
+        try:
+            levels = {
+                'aisle': parse_level(options['aisles']),
+                'rack': parse_level(options['racks']),
+                'shelf': parse_level(options['shelves']),
+                'bin': parse_level(options['bins']),
+            }
+            result = generate_locations(zone, levels, options['pattern'], options['capacity'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if result.skipped:
+            self.stdout.write(self.style.WARNING(f'{result.skipped} existing codes skipped'))
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {result.created} locations created in {zone} ({perf_counter() - started:.1f}s)'
+        ))
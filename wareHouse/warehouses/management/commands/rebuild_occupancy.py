@@ -0,0 +1,17 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+from warehouses.occupancy import rebuild_occupancy
+
+
+class Command(BaseCommand):
+    help = 'Recompute the occupancy counters of every warehouse, zone and storage location from Inventory'
+
+    def handle(self, *args, **options):
+        started = perf_counter()
+        corrected = rebuild_occupancy()
+        self.stdout.write(
+            f"Corrected {corrected['warehouses']} warehouse(s), {corrected['zones']} zone(s) "
+            f"and {corrected['locations']} location(s)"
+        )
+        self.stdout.write(self.style.SUCCESS(f'✓ Occupancy rebuilt ({perf_counter() - started:.1f}s)'))
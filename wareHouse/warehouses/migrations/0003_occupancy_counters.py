@@ -0,0 +1,46 @@
+# Generated by Django 6.0.1 on 2026-10-18 23:38
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def populate(apps, schema_editor):
+    "fill the counters from the current Inventory"
+    Inventory = apps.get_model('inventory', 'Inventory')
+    for model_name, column in [
+        ('Warehouse', 'warehouse_id'),
+        ('StorageZone', 'storage_location__zone_id'),
+        ('StorageLocation', 'storage_location_id'),
+    ]:
+        model = apps.get_model('warehouses', model_name)
+        totals = Inventory.objects.filter(**{f'{column}__isnull': False}).values_list(column).annotate(
+            total=Sum('quantity')
+        ).order_by()
+        for pk, total in totals:
+            model.objects.filter(pk=pk).update(occupied_quantity=total or 0)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0010_stocktake'),
+        ('warehouses', '0002_alter_warehouse_manager'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storagelocation',
+            name='occupied_quantity',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, help_text='stock held at the location, kept up to date by the occupancy counters', max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='storagezone',
+            name='occupied_quantity',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, help_text='stock held in the zone, kept up to date by the occupancy counters', max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='warehouse',
+            name='occupied_quantity',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, help_text='stock held in the warehouse, kept up to date by the occupancy counters', max_digits=14),
+        ),
+        migrations.RunPython(populate, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 6.0.1 on 2026-10-18 23:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('warehouses', '0003_occupancy_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='storagelocation',
+            index=models.Index(condition=models.Q(('is_occupied', False)), fields=['warehouse', 'capacity', 'code'], name='location_putaway_empty_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='storagelocation',
+            index=models.Index(condition=models.Q(('is_occupied', True)), fields=['warehouse', 'capacity', 'code'], name='location_putaway_used_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 6.0.1 on 2026-10-18 23:45
+
+from django.db import migrations
+from django.db.models import Count
+
+
+def check_duplicate_codes(apps, schema_editor):
+    StorageLocation = apps.get_model('warehouses', 'StorageLocation')
+    duplicates = list(
+        StorageLocation.objects.values('warehouse__code', 'code')
+        .annotate(count=Count('id')).filter(count__gt=1)
+        .order_by('warehouse__code', 'code')[:20]
+    )
+    if duplicates:
+        listed = ', '.join(f"{row['warehouse__code']}/{row['code']} ({row['count']}x)" for row in duplicates)
+        raise ValueError(
+            'Storage location codes must be unique per warehouse before this migration, '
+            f'rename or merge the duplicates first: {listed}'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('warehouses', '0004_location_putaway_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_codes, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='storagelocation',
+            unique_together={('warehouse', 'code')},
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.0.1 on 2026-10-19 00:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('warehouses', '0005_location_unique_code'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='storagelocation',
+            index=models.Index(fields=['warehouse', 'updated_at', 'id'], name='warehouses__warehou_83f98d_idx'),
+        ),
+    ]
@@ -50,6 +50,13 @@ class Warehouse(models.Model):
         validators=[MinValueValidator(0)],
         help_text='total capacity of the warehouse in square meters'
     )
+    occupied_quantity = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        editable=False,
+        help_text='stock held in the warehouse, kept up to date by the occupancy counters'
+    )
 
     # status 
     status = models.CharField(
@@ -96,10 +103,8 @@ class Warehouse(models.Model):
         return self.storage_locations.count()
 
     def get_occupied_capacity(self):
-        "get total occupied capacity in warehouse"
-        return Inventory.objects.filter(warehouse=self, quantity__gt=0).aggregate(
-            total=Sum('quantity')
-        )['total'] or 0
+        "get total occupied capacity in warehouse (occupancy counter, see warehouses.occupancy)"
+        return self.occupied_quantity
 
     def get_total_stock_value(self):
         "get total value of inventory in warehouse"
@@ -151,6 +156,13 @@ class StorageZone(models.Model):
         validators=[MinValueValidator(0)],
         help_text='capacity of the storage zone in square meters'
     )
+    occupied_quantity = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        editable=False,
+        help_text='stock held in the zone, kept up to date by the occupancy counters'
+    )
 
     # temprature (for cold storage)
     temperature = models.DecimalField(
@@ -187,6 +199,14 @@ class StorageZone(models.Model):
     def get_total_locations(self):
         return self.locations.count()
 
+    def get_available_capacity(self):
+        return self.capacity - self.occupied_quantity
+
+    def capacity_percentage(self):
+        if self.capacity == 0:
+            return 0
+        return (self.occupied_quantity / self.capacity) * 100
+
 
 class StorageLocation(models.Model):
     "specific storage location within a zone (e.g. A1, B2, etc.)"
@@ -228,6 +248,13 @@ class StorageLocation(models.Model):
         default=0,
         help_text='maximum weigth capacity in kg'
     )
+    occupied_quantity = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        editable=False,
+        help_text='stock held at the location, kept up to date by the occupancy counters'
+    )
 
     # status
     is_occupied = models.BooleanField(default=False)
@@ -243,6 +270,22 @@ class StorageLocation(models.Model):
         ordering = ['warehouse', 'code']
         verbose_name = 'Storage Location'
         verbose_name_plural = 'Storage Locations'
+        unique_together = ['warehouse', 'code']
+        indexes = [
+            # putaway: empty and partly filled locations of a warehouse by size
+            models.Index(
+                fields=['warehouse', 'capacity', 'code'],
+                condition=models.Q(is_occupied=False),
+                name='location_putaway_empty_idx'
+            ),
+            models.Index(
+                fields=['warehouse', 'capacity', 'code'],
+                condition=models.Q(is_occupied=True),
+                name='location_putaway_used_idx'
+            ),
+            # handheld sync feed (api.sync): changes of a warehouse since a cursor
+            models.Index(fields=['warehouse', 'updated_at', 'id']),
+        ]
         
     def __str__(self):
         return f'{self.warehouse.code} - {self.code}'
@@ -262,3 +305,6 @@ class StorageLocation(models.Model):
 
         return ' - '.join(parts) if parts else self.code
 
+    def get_available_capacity(self):
+        return self.capacity - self.occupied_quantity
+
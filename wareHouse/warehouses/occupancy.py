@@ -0,0 +1,110 @@
+"""
+Occupancy counters of warehouses, zones and storage locations.
+
+Warehouse, StorageZone and StorageLocation keep the stock they hold in an
+occupied_quantity counter instead of summing Inventory on every read. Postings
+hand apply_deltas() the (warehouse, location, quantity change) of every balance
+they touch; the changes are summed per row and applied with
+UPDATE ... SET occupied_quantity = occupied_quantity + delta, so concurrent
+postings add up instead of overwriting each other. is_occupied of the touched
+locations follows their counter.
+
+rebuild_occupancy() recomputes every counter from Inventory, for the initial
+fill and to repair drift after changes made outside the postings (admin edits,
+deleted locations).
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import BooleanField, ExpressionWrapper, F, Q, Sum
+
+from inventory.models import Inventory
+from .models import StorageLocation, StorageZone, Warehouse
+
+CHUNK_SIZE = 2000
+
+
+def add_to_counters(model, deltas):
+    "add {pk: delta} to the occupied_quantity of model rows, one UPDATE per distinct delta"
+    by_delta = defaultdict(list)
+    for pk, delta in deltas.items():
+        if delta:
+            by_delta[delta].append(pk)
+    for delta, pks in by_delta.items():
+        for start in range(0, len(pks), CHUNK_SIZE):
+            model.objects.filter(pk__in=pks[start:start + CHUNK_SIZE]).update(occupied_quantity=F('occupied_quantity') + delta)
+
+
+def apply_deltas(deltas):
+    """
+    Move the occupancy counters by deltas, an iterable of (warehouse_id,
+    location_id, quantity change), either id may be None. Zones are found
+    through their locations.
+    """
+    warehouses = defaultdict(Decimal)
+    locations = defaultdict(Decimal)
+    for warehouse_id, location_id, delta in deltas:
+        if not delta:
+            continue
+        if warehouse_id:
+            warehouses[warehouse_id] += Decimal(delta)
+        if location_id:
+            locations[location_id] += Decimal(delta)
+    if not warehouses and not locations:
+        return
+
+    zones = defaultdict(Decimal)
+    location_ids = list(locations)
+    for start in range(0, len(location_ids), CHUNK_SIZE):
+        rows = StorageLocation.objects.filter(
+            pk__in=location_ids[start:start + CHUNK_SIZE], zone__isnull=False
+        ).values_list('pk', 'zone_id')
+        for location_id, zone_id in rows:
+            zones[zone_id] += locations[location_id]
+
+    with transaction.atomic():
+        add_to_counters(Warehouse, warehouses)
+        add_to_counters(StorageZone, zones)
+        add_to_counters(StorageLocation, locations)
+        for start in range(0, len(location_ids), CHUNK_SIZE):
+            StorageLocation.objects.filter(pk__in=location_ids[start:start + CHUNK_SIZE]).update(
+                is_occupied=ExpressionWrapper(Q(occupied_quantity__gt=0), output_field=BooleanField())
+            )
+
+
+def stock_totals(column):
+    "{id: total quantity} of Inventory grouped by column"
+    rows = Inventory.objects.filter(**{f'{column}__isnull': False}).values_list(column).annotate(
+        total=Sum('quantity')
+    ).order_by()
+    return dict(rows.iterator(chunk_size=CHUNK_SIZE))
+
+
+def rebuild_occupancy():
+    """
+    Recompute every occupancy counter (and location is_occupied) from Inventory
+    and write the ones that differ, returns {'warehouses': n, 'zones': n,
+    'locations': n} rows corrected. Postings made while it runs can be lost,
+    run it when stock is not moving.
+    """
+    targets = [
+        ('warehouses', Warehouse, stock_totals('warehouse_id')),
+        ('zones', StorageZone, stock_totals('storage_location__zone_id')),
+        ('locations', StorageLocation, stock_totals('storage_location_id')),
+    ]
+
+    corrected = {}
+    with transaction.atomic():
+        for name, model, totals in targets:
+            is_location = model is StorageLocation
+            fields = ['occupied_quantity', 'is_occupied'] if is_location else ['occupied_quantity']
+            stale = []
+            for pk, *current in model.objects.values_list('pk', *fields).iterator(chunk_size=CHUNK_SIZE):
+                total = totals.get(pk) or Decimal(0)
+                expected = [total, total > 0] if is_location else [total]
+                if current != expected:
+                    stale.append(model(pk=pk, **dict(zip(fields, expected))))
+            model.objects.bulk_update(stale, fields, batch_size=CHUNK_SIZE)
+            corrected[name] = len(stale)
+    return corrected
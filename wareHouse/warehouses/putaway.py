@@ -0,0 +1,124 @@
+"""
+Putaway suggestions.
+
+suggest_putaway() ranks the storage locations of a warehouse for a quantity of
+a product being received. Candidates, best first:
+
+1. locations already holding the same product and batch,
+2. locations already holding the product,
+3. empty locations, the smallest capacity that fits first (locations with no
+   capacity recorded come after the sized ones),
+4. partly filled locations with enough room, the smallest capacity first.
+
+Only active locations of active zones are considered, and only zones whose
+zone_type matches the product's storage_type when it has one. Free space comes
+from the occupancy counters (warehouses.occupancy), and every step is a short
+query on an index: Inventory (product, warehouse) for steps 1-2 and
+the partial StorageLocation (warehouse, capacity, code) indexes of empty and
+occupied locations for steps 3-4, so the cost does not grow with the number of
+locations.
+"""
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.db.models import F, Q
+
+from inventory.models import Inventory
+from .models import StorageLocation, StorageZone
+
+DEFAULT_LIMIT = 5
+
+# candidate kinds, in ranking order
+SAME_BATCH = 'same_batch'
+SAME_PRODUCT = 'same_product'
+EMPTY = 'empty'
+SHARED = 'shared'
+REASONS = {
+    SAME_BATCH: 'Holds this batch',
+    SAME_PRODUCT: 'Holds this product',
+    EMPTY: 'Empty',
+    SHARED: 'Has room',
+}
+
+
+@dataclass
+class PutawayCandidate:
+    location: StorageLocation
+    kind: str
+    # None when the location has no capacity recorded
+    free_capacity: Decimal = None
+
+    @property
+    def reason(self):
+        return REASONS[self.kind]
+
+
+def free_capacity(location):
+    if not location.capacity:
+        return None
+    return location.capacity - location.occupied_quantity
+
+
+def suggest_putaway(product, warehouse, quantity, batch_number='', limit=DEFAULT_LIMIT):
+    """
+    Up to `limit` PutawayCandidates for storing quantity of product in
+    warehouse, best first. Locations with a recorded capacity must have room
+    for the whole quantity.
+    """
+    quantity = Decimal(quantity)
+    if quantity <= 0:
+        raise ValueError('Quantity must be greater than 0')
+    batch_number = batch_number or ''
+
+    zones = StorageZone.objects.filter(warehouse=warehouse, is_active=True)
+    if product.storage_type:
+        zones = zones.filter(zone_type=product.storage_type)
+    zone_ids = list(zones.values_list('pk', flat=True))
+    if not zone_ids and product.storage_type:
+        return []
+
+    # locations outside a zone only take products without a storage requirement
+    in_zone = Q(zone_id__in=zone_ids) if product.storage_type else Q(zone_id__in=zone_ids) | Q(zone__isnull=True)
+    locations = StorageLocation.objects.filter(in_zone, warehouse=warehouse, is_active=True)
+    candidates = []
+    seen = set()
+
+    def add(location, kind):
+        room = free_capacity(location)
+        if location.pk in seen or (room is not None and room < quantity):
+            return
+        seen.add(location.pk)
+        candidates.append(PutawayCandidate(location, kind, room))
+
+    # 1-2: where the product already is, the batch first
+    held = Inventory.objects.filter(
+        product=product, warehouse=warehouse, storage_location__isnull=False
+    ).values_list('storage_location_id', 'batch_number')
+    batches = {}
+    for location_id, batch in held:
+        batches[location_id] = batches.get(location_id) or (batch or '') == batch_number
+    if batches:
+        holding = sorted(locations.filter(pk__in=list(batches)).select_related('zone'), key=lambda loc: loc.code)
+        for same_batch in (True, False):
+            for location in holding:
+                if batches[location.pk] == same_batch:
+                    add(location, SAME_BATCH if same_batch else SAME_PRODUCT)
+
+    # 3: empty locations, sized best fit first, then the ones without a capacity
+    empty = locations.filter(is_occupied=False).select_related('zone')
+    if len(candidates) < limit:
+        for location in empty.filter(capacity__gte=quantity).order_by('capacity', 'code')[:limit]:
+            add(location, EMPTY)
+    if len(candidates) < limit:
+        for location in empty.filter(capacity=0).order_by('code')[:limit]:
+            add(location, EMPTY)
+
+    # 4: partly filled locations with room, the smallest capacity first
+    if len(candidates) < limit:
+        shared = locations.filter(is_occupied=True, capacity__gte=quantity).filter(
+            capacity__gte=F('occupied_quantity') + quantity
+        ).exclude(pk__in=seen)
+        for location in shared.select_related('zone').order_by('capacity', 'code')[:limit]:
+            add(location, SHARED)
+
+    return candidates[:limit]
@@ -0,0 +1,223 @@
+"""
+Velocity-based slotting.
+
+analyse_slotting() proposes moves that bring the products picked most often to
+the most accessible storage locations of a warehouse (or one of its zones):
+
+- velocity is the number of picks of a product in the warehouse over the last
+  `days` days, summed from the daily PickCount rows (inventory.pickcounts)
+  rather than from the movement ledger,
+- accessibility is the walking distance of a location from the depot at (0, 0),
+  using the coordinates of settings.PICK_LOCATION_COORDINATES like the pick
+  routes, plus SLOTTING_SHELF_WEIGHT for every shelf level away from
+  SLOTTING_GOLDEN_SHELF,
+- stocked rows are taken fastest first and moved to the most accessible empty
+  location that beats their own (a location left empty by a move is offered to
+  the next rows), then fast movers still in poor locations swap places with
+  slower products holding better ones.
+
+Locations without an aisle have no position and are left out. A row moves with
+its whole balance, a location with a capacity must have room for it, and
+products with a storage_type only go to zones of that type, like putaway. apply_slotting() posts the moves as one bulk transfer batch.
+"""
+import heapq
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q, Sum
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from inventory.models import Inventory, PickCount
+from inventory.transfers import post_relocations
+from orders.picking import label_position
+from .models import StorageLocation, StorageZone
+
+# sized locations looked at per row before giving up on the ones too small for it
+SCAN_LIMIT = 50
+
+
+@dataclass
+class SlotMove:
+    inventory: Inventory
+    from_location: StorageLocation
+    to_location: StorageLocation
+    # picks of the product over the analysed days
+    velocity: int
+    # picks x metres saved over the analysed days, negative for the slow side of a swap
+    gain: float
+    swap: bool = False
+
+
+@dataclass
+class SlottingPlan:
+    warehouse: object
+    zone: object
+    days: int
+    moves: list = field(default_factory=list)
+    picked_products: int = 0
+    locations: int = 0
+
+    @property
+    def total_gain(self):
+        return sum(move.gain for move in self.moves)
+
+    @property
+    def swap_count(self):
+        return sum(1 for move in self.moves if move.swap) // 2
+
+
+def accessibility(location, coordinates):
+    "cost of reaching a location, lower is better"
+    x, y = coordinates(location)
+    cost = abs(x) + abs(y)
+    if location.shelf:
+        cost += settings.SLOTTING_SHELF_WEIGHT * abs(label_position(location.shelf) - settings.SLOTTING_GOLDEN_SHELF)
+    return cost
+
+
+def fits(location, zone_type, row, leaving=0):
+    "room for the row at the location (after `leaving` moves out), and the right storage type"
+    if row.product.storage_type and zone_type != row.product.storage_type:
+        return False
+    return not location.capacity or location.capacity - location.occupied_quantity + leaving >= row.quantity
+
+
+def take_slot(heaps, row, current_cost):
+    "pop the most accessible free location beating current_cost that fits the row, or None"
+    keys = [row.product.storage_type] if row.product.storage_type else list(heaps)
+    best = None
+    for key in keys:
+        heap = heaps.get(key) or []
+        skipped = []
+        found = None
+        while heap and len(skipped) < SCAN_LIMIT and heap[0][0] < current_cost:
+            entry = heapq.heappop(heap)
+            if fits(entry[2], key, row):
+                found = entry
+                break
+            skipped.append(entry)
+        for entry in skipped:
+            heapq.heappush(heap, entry)
+        if found and (best is None or found[:2] < best[0][:2]):
+            if best:
+                heapq.heappush(heaps[best[1]], best[0])
+            best = (found, key)
+        elif found:
+            heapq.heappush(heap, found)
+    return best[0][2] if best else None
+
+
+def analyse_slotting(warehouse, zone=None, days=None, max_moves=None):
+    """
+    SlottingPlan for the active locations of warehouse (of zone when given),
+    with up to max_moves moves (a swap is two), the fastest movers first.
+    Nothing is moved, see apply_slotting().
+    """
+    days = days or settings.SLOTTING_DAYS
+    max_moves = settings.SLOTTING_MAX_MOVES if max_moves is None else max_moves
+    if days < 1 or max_moves < 0:
+        raise ValueError('Days must be at least 1 and moves cannot be negative')
+    coordinates = import_string(settings.PICK_LOCATION_COORDINATES)
+
+    locations = StorageLocation.objects.filter(warehouse=warehouse, is_active=True).exclude(Q(aisle__isnull=True) | Q(aisle='')).filter(
+        Q(zone__isnull=True) | Q(zone__is_active=True)
+    )
+    if zone:
+        locations = locations.filter(zone=zone)
+    stocked = Inventory.objects.filter(warehouse=warehouse, storage_location__in=locations.values('pk'), quantity__gt=0)
+    since = timezone.localdate() - timedelta(days=days - 1)
+    velocity = dict(
+        PickCount.objects.filter(
+            warehouse=warehouse, day__gte=since, product_id__in=stocked.values('product_id')
+        ).values_list('product_id').annotate(total=Sum('picks')).order_by()
+    )
+    rows = list(stocked.select_related('product').order_by('pk'))
+    # occupied_quantity of these instances follows the planned moves
+    zone_types = dict(StorageZone.objects.filter(warehouse=warehouse).values_list('pk', 'zone_type'))
+    locations = {
+        location.pk: location
+        for location in locations.only('code', 'aisle', 'rack', 'shelf', 'bin', 'capacity', 'occupied_quantity', 'zone')
+    }
+    zone_type = {pk: zone_types.get(location.zone_id) for pk, location in locations.items()}
+    cost = {pk: accessibility(location, coordinates) for pk, location in locations.items()}
+
+    plan = SlottingPlan(warehouse, zone, days, picked_products=len(velocity), locations=len(locations))
+    held = {}
+    for row in rows:
+        held.setdefault(row.storage_location_id, []).append(row)
+
+    # free locations per zone type, most accessible first
+    heaps = {}
+    for pk, location in locations.items():
+        if pk not in held:
+            heaps.setdefault(zone_type[pk], []).append((cost[pk], location.code, location))
+    for heap in heaps.values():
+        heapq.heapify(heap)
+
+    hot = sorted(
+        (row for row in rows if velocity.get(row.product_id)),
+        key=lambda row: (-velocity[row.product_id], -cost[row.storage_location_id], row.pk),
+    )
+    moved = set()
+
+    # 1: fast movers to better free locations
+    for row in hot:
+        if len(plan.moves) >= max_moves:
+            break
+        current = locations[row.storage_location_id]
+        target = take_slot(heaps, row, cost[current.pk])
+        if target is None:
+            continue
+        plan.moves.append(SlotMove(
+            row, current, target, velocity[row.product_id], velocity[row.product_id] * (cost[current.pk] - cost[target.pk])
+        ))
+        moved.add(row.pk)
+        held.setdefault(target.pk, []).append(row)
+        held[current.pk].remove(row)
+        target.occupied_quantity += row.quantity
+        current.occupied_quantity -= row.quantity
+        if not held[current.pk]:
+            heapq.heappush(heaps.setdefault(zone_type[current.pk], []), (cost[current.pk], current.code, current))
+
+    # 2: swaps of fast movers in poor locations with slower rows alone in better ones
+    singles = sorted(
+        (pk for pk, held_rows in held.items() if len(held_rows) == 1 and held_rows[0].pk not in moved),
+        key=lambda pk: (cost[pk], locations[pk].code),
+    )
+    position = 0
+    for row in hot:
+        if len(plan.moves) + 2 > max_moves:
+            break
+        if row.pk in moved:
+            continue
+        current = locations[row.storage_location_id]
+        while position < len(singles) and cost[singles[position]] < cost[current.pk]:
+            target = locations[singles[position]]
+            other = held[target.pk][0]
+            if other.pk in moved or velocity.get(other.product_id, 0) >= velocity[row.product_id]:
+                position += 1
+                continue
+            position += 1
+            if fits(target, zone_type[target.pk], row, other.quantity) and fits(current, zone_type[current.pk], other, row.quantity):
+                saved = cost[current.pk] - cost[target.pk]
+                plan.moves.append(SlotMove(row, current, target, velocity[row.product_id], velocity[row.product_id] * saved, True))
+                plan.moves.append(SlotMove(other, target, current, velocity.get(other.product_id, 0), -velocity.get(other.product_id, 0) * saved, True))
+                moved.update([row.pk, other.pk])
+                target.occupied_quantity += row.quantity - other.quantity
+                current.occupied_quantity += other.quantity - row.quantity
+                break
+
+    return plan
+
+
+def apply_slotting(plan, user=None):
+    "post the moves of a SlottingPlan as one transfer batch, returns the movements"
+    return post_relocations(
+        [(move.inventory.pk, move.to_location.pk) for move in plan.moves],
+        prefix=f"SLOT-{timezone.now():%Y%m%d%H%M%S%f}",
+        reason='Velocity slotting',
+        source='slotting',
+        user=user,
+    )
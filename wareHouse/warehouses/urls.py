@@ -10,6 +10,7 @@ urlpatterns = [
     path('create/', views.warehouse_create, name='warehouse_create'),
     path('<int:pk>/update/', views.warehouse_update, name='warehouse_update'),
     path('<int:pk>/delete/', views.warehouse_delete, name='warehouse_delete'),
+    path('<int:pk>/slotting/', views.slotting, name='slotting'),
     
     # Storage Zone URLs
     path('<int:warehouse_pk>/zones/', views.zone_list, name='zone_list'),
@@ -18,4 +19,6 @@ urlpatterns = [
     # Storage Location URLs
     path('locations/', views.location_list, name='location_list'),
     path('locations/create/', views.location_create, name='location_create'),
+    path('locations/grid/', views.location_grid, name='location_grid'),
+    path('putaway/', views.putaway_suggestions, name='putaway_suggestions'),
 ]
\ No newline at end of file
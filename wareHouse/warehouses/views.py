@@ -1,10 +1,16 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
 from django.db.models import Q, Count
+from django.http import JsonResponse
+from products.models import Product
 from .models import Warehouse, StorageZone, StorageLocation
-from .forms import WarehouseForm, StorageZoneForm, StorageLocationForm
+from .forms import WarehouseForm, StorageZoneForm, StorageLocationForm, LocationGridForm, SlottingForm
+from .grid import generate_locations
+from .putaway import suggest_putaway
+from .slotting import analyse_slotting, apply_slotting
 
 # Create your views here.
 # Warehouse Views
@@ -65,8 +71,8 @@ def warehouse_detail(request, pk):
     'view single warehouse details'
     warehouse = get_object_or_404(Warehouse, pk=pk)
 
-    # get zones and locations
-    zones = warehouse.storage_zones.all()
+    # get zones and locations, utilisation comes from the occupancy counters
+    zones = warehouse.storage_zones.annotate(total_locations=Count('locations'))
     locations = warehouse.storage_locations.all()[:10]
 
     context = {
@@ -251,4 +257,89 @@ def location_create(request):
     return render(request, 'warehouses/location_form.html', context)
 
 
+@login_required
+def location_grid(request):
+    'generate a grid of storage locations (aisle x rack x shelf x bin) for a zone'
+
+    if request.method == 'POST':
+        form = LocationGridForm(request.POST)
+        if form.is_valid():
+            zone = form.cleaned_data['zone']
+            try:
+                result = generate_locations(
+                    zone, form.cleaned_data['levels'], form.cleaned_data['pattern'], form.cleaned_data['capacity']
+                )
+            except ValueError as e:
+                messages.error(request, str(e))
+            else:
+                messages.success(
+                    request,
+                    f'{result.created} locations created in {zone}'
+                    + (f', {result.skipped} existing codes skipped' if result.skipped else '')
+                )
+                return redirect(f"{reverse('warehouses:location_list')}?warehouse={zone.warehouse_id}")
+        else:
+            messages.error(request, 'Please correct the errors below.')
+    else:
+        form = LocationGridForm(initial={'zone': request.GET.get('zone')})
+
+    context = {
+        'form': form,
+        'title': 'Generate location grid'
+    }
+
+    return render(request, 'warehouses/location_grid.html', context)
+
+
+@login_required
+def putaway_suggestions(request):
+    'ranked storage locations for receiving ?quantity= of ?product= (and ?batch=) into ?warehouse='
+    try:
+        product = Product.objects.get(pk=int(request.GET.get('product', '')))
+        warehouse = Warehouse.objects.get(pk=int(request.GET.get('warehouse', '')))
+        candidates = suggest_putaway(
+            product, warehouse, request.GET.get('quantity') or 1, request.GET.get('batch', '').strip()
+        )
+    except (ValueError, ArithmeticError, Product.DoesNotExist, Warehouse.DoesNotExist):
+        return JsonResponse({'error': 'Choose a product, a warehouse and a quantity'}, status=400)
+
+    return JsonResponse({'results': [
+        {
+            'id': candidate.location.pk,
+            'code': candidate.location.code,
+            'text': f'{warehouse.code} - {candidate.location.code}',
+            'zone': candidate.location.zone.name if candidate.location.zone else None,
+            'reason': candidate.reason,
+            'free_capacity': None if candidate.free_capacity is None else float(candidate.free_capacity),
+        }
+        for candidate in candidates
+    ]})
+
+
+@login_required
+def slotting(request, pk):
+    'velocity slotting moves for a warehouse, POST posts them as a transfer batch'
+    warehouse = get_object_or_404(Warehouse, pk=pk)
+    data = request.POST if request.method == 'POST' else request.GET
+    form = SlottingForm(data if data.get('days') else None, warehouse=warehouse)
+    plan = None
+    if form.is_valid():
+        plan = analyse_slotting(
+            warehouse, form.cleaned_data['zone'], form.cleaned_data['days'], form.cleaned_data['max_moves']
+        )
+        if request.method == 'POST':
+            try:
+                movements = apply_slotting(plan, user=request.user)
+            except ValueError as e:
+                messages.error(request, str(e))
+            else:
+                messages.success(request, f'{len(movements)} stock rows relocated')
+                return redirect('warehouses:slotting', pk=warehouse.pk)
+
+    context = {
+        'warehouse': warehouse,
+        'form': form,
+        'plan': plan,
+    }
 
+    return render(request, 'warehouses/slotting.html', context)